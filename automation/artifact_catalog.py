@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Artifact Catalog Module
+Danh mục SQLite các lần chạy và file dữ liệu trong data/
+
+Reader (API, dashboard, retention) truy vấn catalog để tìm file mới nhất hoặc
+file cần xử lý thay vì liệt kê và stat toàn bộ thư mục mỗi lần.
+"""
+
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+
+# Trạng thái file
+STATE_ACTIVE = 'active'
+STATE_COMPRESSED = 'compressed'
+STATE_DELETED = 'deleted'
+
+# Nhận diện file cũ (trước khi có catalog) theo tên: kind + run_id (YYYYmmdd_HHMMSS)
+_TS = r'(?P<run_id>\d{8}_\d{6})'
+KIND_PATTERNS = [
+    ('csv', re.compile(rf'^orders_export_{_TS}\.csv$')),
+    ('excel', re.compile(rf'^orders_export_{_TS}\.xlsx$')),
+    ('json', re.compile(rf'^orders_export_{_TS}\.json$')),
+    ('dashboard_csv', re.compile(rf'^orders_dashboard_{_TS}\.csv$')),
+    ('products', re.compile(rf'^products_detail_{_TS}\.csv$')),
+    ('sku_top_daily', re.compile(rf'^sku_top_daily_{_TS}\.csv$')),
+    ('sku_quantity_histogram', re.compile(rf'^sku_quantity_histogram_{_TS}\.csv$')),
+    ('page_json', re.compile(rf'^june_2025_enhanced_page_\d+_{_TS}\.json$')),
+    ('page_archive', re.compile(rf'^june_2025_enhanced_{_TS}\.jsonl\.(gz|zst)$')),
+    ('sla_report', re.compile(rf'^sla_report_{_TS}\.(json|txt)$')),
+    ('sla_alerts', re.compile(rf'^sla_alerts_{_TS}\.csv$')),
+    ('sla_summary', re.compile(rf'^sla_summary_{_TS}\.txt$')),
+    ('summary', re.compile(rf'^summary_report_{_TS}\.txt$')),
+]
+
+# Các loại file chứa dữ liệu đơn hàng gốc cần gộp vào kho lịch sử
+SOURCE_KINDS = ('csv', 'page_json', 'page_archive')
+
+
+def classify_file(filename: str) -> Optional[Dict[str, str]]:
+    """Xác định kind và run_id từ tên file (None nếu không nhận diện được)"""
+    for kind, pattern in KIND_PATTERNS:
+        match = pattern.match(filename)
+        if match:
+            return {'kind': kind, 'run_id': match.group('run_id')}
+    return None
+
+
+def path_size(path: str) -> int:
+    """Kích thước file, hoặc tổng kích thước các file bên trong nếu là thư mục (kho Parquet)"""
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass  # File bị compaction xóa giữa chừng
+    return total
+
+
+def run_started_at(run_id: str) -> Optional[str]:
+    try:
+        return datetime.strptime(run_id, '%Y%m%d_%H%M%S').isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+class ArtifactCatalog:
+    """Catalog runs + files lưu trong SQLite (WAL)"""
+
+    def __init__(self, db_path: str = 'data/catalog.db'):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        """Mở kết nối SQLite (WAL), commit khi thành công và luôn đóng kết nối"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    order_count INTEGER,
+                    source TEXT
+                );
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    run_id TEXT,
+                    kind TEXT NOT NULL,
+                    size INTEGER,
+                    rows INTEGER,
+                    sha256 TEXT,
+                    created_at TEXT NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'active',
+                    consolidated_at TEXT,
+                    updated_at TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_files_kind ON files(kind, state, created_at);
+                CREATE INDEX IF NOT EXISTS idx_files_run ON files(run_id);
+                """
+            )
+
+    # ---------------------------------------------------------------- write
+
+    def register_run(self, run_id: str, export_files: Dict[str, str],
+                     details: Optional[Dict[str, Dict]] = None,
+                     order_count: Optional[int] = None, source: str = 'automation') -> int:
+        """
+        Ghi nhận một lần chạy và các file đã xuất
+
+        Args:
+            export_files: {kind: path} như kết quả export_data()
+            details: thông tin size/rows/sha256 theo kind (từ ArtifactPublisher.entries)
+        """
+        details = details or {}
+        now = datetime.now().isoformat()
+        rows = []
+        for kind, path in export_files.items():
+            if not path or not os.path.isfile(path):
+                continue
+            info = details.get(kind, {})
+            rows.append((
+                os.path.normpath(path), run_id, kind,
+                info.get('size', os.path.getsize(path)), info.get('rows'), info.get('sha256'),
+                run_started_at(run_id) or now, now
+            ))
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO runs (run_id, started_at, finished_at, order_count, source)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(run_id) DO UPDATE SET
+                    finished_at = excluded.finished_at,
+                    order_count = COALESCE(excluded.order_count, runs.order_count)
+                """,
+                (run_id, run_started_at(run_id) or now, now, order_count, source)
+            )
+            self._upsert_files(conn, rows)
+        return len(rows)
+
+    def _upsert_files(self, conn, rows):
+        conn.executemany(
+            """
+            INSERT INTO files (path, run_id, kind, size, rows, sha256, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(path) DO UPDATE SET
+                size = excluded.size,
+                rows = COALESCE(excluded.rows, files.rows),
+                sha256 = COALESCE(excluded.sha256, files.sha256),
+                state = 'active',
+                updated_at = excluded.updated_at
+            """,
+            rows
+        )
+
+    def scan_directory(self, data_dir: str = 'data') -> int:
+        """
+        Import file cũ chưa có trong catalog (chỉ cần chạy một lần / khi migrate)
+
+        Chỉ thêm file chưa được ghi nhận; file đã có giữ nguyên trạng thái.
+        """
+        known = {row['path'] for row in self._query('SELECT path FROM files')}
+        now = datetime.now().isoformat()
+        rows, runs = [], set()
+        with os.scandir(data_dir) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                path = os.path.normpath(entry.path)
+                info = classify_file(entry.name)
+                if not info or path in known:
+                    continue
+                stat = entry.stat()
+                rows.append((path, info['run_id'], info['kind'], stat.st_size, None, None,
+                             run_started_at(info['run_id']) or datetime.fromtimestamp(stat.st_mtime).isoformat(),
+                             now))
+                runs.add(info['run_id'])
+
+        with self._connect() as conn:
+            conn.executemany(
+                'INSERT OR IGNORE INTO runs (run_id, started_at, source) VALUES (?, ?, ?)',
+                [(run_id, run_started_at(run_id), 'scan') for run_id in runs]
+            )
+            self._upsert_files(conn, rows)
+        return len(rows)
+
+    def mark_consolidated(self, paths: Iterable[str]):
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            conn.executemany(
+                'UPDATE files SET consolidated_at = ?, updated_at = ? WHERE path = ?',
+                [(now, now, os.path.normpath(p)) for p in paths]
+            )
+
+    def set_state(self, paths: Iterable[str], state: str, new_paths: Optional[Dict[str, str]] = None):
+        """Cập nhật trạng thái file (active/compressed/deleted), đổi path nếu file được nén"""
+        new_paths = new_paths or {}
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            for path in paths:
+                path = os.path.normpath(path)
+                new_path = new_paths.get(path, path)
+                size = os.path.getsize(new_path) if os.path.isfile(new_path) else None
+                conn.execute(
+                    'UPDATE files SET state = ?, path = ?, size = COALESCE(?, size), updated_at = ? WHERE path = ?',
+                    (state, new_path, size, now, path)
+                )
+
+    # ----------------------------------------------------------------- read
+
+    def _query(self, sql: str, params=()) -> List[sqlite3.Row]:
+        with self._connect() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def latest_file(self, kinds: Iterable[str]) -> Optional[str]:
+        """File active mới nhất thuộc một trong các kind (ưu tiên theo thứ tự kinds)"""
+        kinds = list(kinds)
+        placeholders = ','.join('?' * len(kinds))
+        order = ' '.join(f'WHEN ? THEN {i}' for i in range(len(kinds)))
+        rows = self._query(
+            f"""
+            SELECT path FROM files
+            WHERE kind IN ({placeholders}) AND state = 'active'
+            ORDER BY created_at DESC, CASE kind {order} END
+            LIMIT 1
+            """,
+            kinds + kinds
+        )
+        return rows[0]['path'] if rows else None
+
+    def files(self, kinds: Optional[Iterable[str]] = None, states: Iterable[str] = (STATE_ACTIVE,),
+              older_than: Optional[str] = None, consolidated: Optional[bool] = None) -> List[Dict]:
+        """Danh sách file theo điều kiện, cũ nhất trước"""
+        clauses, params = [], []
+        states = list(states)
+        clauses.append(f"state IN ({','.join('?' * len(states))})")
+        params.extend(states)
+        if kinds is not None:
+            kinds = list(kinds)
+            clauses.append(f"kind IN ({','.join('?' * len(kinds))})")
+            params.extend(kinds)
+        if older_than:
+            clauses.append('created_at < ?')
+            params.append(older_than)
+        if consolidated is not None:
+            clauses.append('consolidated_at IS NOT NULL' if consolidated else 'consolidated_at IS NULL')
+
+        rows = self._query(
+            f"SELECT * FROM files WHERE {' AND '.join(clauses)} ORDER BY created_at, path", params
+        )
+        return [dict(row) for row in rows]
+
+    def live_paths(self) -> set:
+        """
+        File không được xóa: file mới nhất của mỗi kind và file nguồn
+        (đơn hàng gốc) chưa được gộp vào kho lịch sử
+        """
+        rows = self._query(
+            f"""
+            SELECT path FROM files f
+            WHERE state != 'deleted' AND (
+                created_at = (SELECT MAX(created_at) FROM files g
+                              WHERE g.kind = f.kind AND g.state != 'deleted')
+                OR (kind IN ({','.join('?' * len(SOURCE_KINDS))}) AND consolidated_at IS NULL)
+            )
+            """,
+            SOURCE_KINDS
+        )
+        return {row['path'] for row in rows}
+
+    def runs(self, limit: int = 50) -> List[Dict]:
+        rows = self._query(
+            """
+            SELECT r.*, COUNT(f.path) AS file_count, COALESCE(SUM(f.size), 0) AS total_size
+            FROM runs r LEFT JOIN files f ON f.run_id = r.run_id AND f.state != 'deleted'
+            GROUP BY r.run_id ORDER BY r.started_at DESC LIMIT ?
+            """,
+            (limit,)
+        )
+        return [dict(row) for row in rows]
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Artifact Publisher Module
+Xuất file dữ liệu một lần duy nhất và công bố nguyên tử
+
+Mỗi artifact được ghi ra file tạm, fsync rồi rename thành file có timestamp.
+File "latest" được trỏ tới bằng hardlink (rename đè lên bản cũ), nên reader
+(dashboard, API) không bao giờ đọc phải file ghi dở. Thông tin kích thước,
+số dòng và sha256 của từng artifact được ghi vào manifest.json.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+
+import pandas as pd
+
+
+MANIFEST_FILENAME = 'manifest.json'
+
+
+class _HashingWriter(io.RawIOBase):
+    """Ghi bytes ra file đồng thời tính sha256 và đếm kích thước"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        self.raw.write(data)
+        return len(data)
+
+
+def _fsync_dir(directory: str):
+    """fsync thư mục để rename được ghi bền (bỏ qua trên Windows)"""
+    if os.name == 'nt':
+        return
+    fd = os.open(directory or '.', os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _tmp_path(path: str) -> str:
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f'.{name}.{uuid.uuid4().hex[:8]}.tmp')
+
+
+class ArtifactPublisher:
+    """Công bố artifact nguyên tử + cập nhật manifest"""
+
+    def __init__(self, data_dir: str = 'data', manifest_name: str = MANIFEST_FILENAME):
+        self.logger = logging.getLogger('ArtifactPublisher')
+        self.data_dir = data_dir
+        self.manifest_path = os.path.join(data_dir, manifest_name)
+        self.entries: Dict[str, Dict] = {}
+        os.makedirs(data_dir, exist_ok=True)
+
+    # ---------------------------------------------------------------- publish
+
+    def publish_csv(self, name: str, df: pd.DataFrame, filename: str,
+                    latest_name: Optional[str] = None, encoding: str = 'utf-8-sig') -> str:
+        """Ghi DataFrame ra CSV một lần, trỏ latest tới cùng file"""
+        def write(handle):
+            text = io.TextIOWrapper(handle, encoding=encoding, newline='')
+            df.to_csv(text, index=False)
+            text.flush()
+            text.detach()
+
+        return self._publish(name, filename, latest_name, write, rows=len(df))
+
+    def publish_text(self, name: str, content: str, filename: str,
+                     latest_name: Optional[str] = None, encoding: str = 'utf-8') -> str:
+        """Ghi nội dung text (báo cáo, SLA summary...)"""
+        data = content.encode(encoding)
+        return self._publish(name, filename, latest_name, lambda handle: handle.write(data),
+                             rows=content.count('\n') + 1 if content else 0)
+
+    def publish_json(self, name: str, obj, filename: str,
+                     latest_name: Optional[str] = None) -> str:
+        """Ghi object JSON (config, metadata...)"""
+        content = json.dumps(obj, indent=2, ensure_ascii=False, default=str)
+        return self.publish_text(name, content, filename, latest_name)
+
+    def _publish(self, name: str, filename: str, latest_name: Optional[str], write, rows: int) -> str:
+        path = os.path.join(self.data_dir, filename)
+        tmp_path = _tmp_path(path)
+        try:
+            with open(tmp_path, 'wb') as raw:
+                writer = _HashingWriter(raw)
+                write(writer)
+                raw.flush()
+                os.fsync(raw.fileno())
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        latest_path = None
+        if latest_name:
+            latest_path = os.path.join(self.data_dir, latest_name)
+            self._point_latest(path, latest_path)
+        _fsync_dir(self.data_dir)
+
+        self.entries[name] = {
+            'path': path,
+            'latest': latest_path,
+            'size': writer.size,
+            'rows': rows,
+            'sha256': writer.sha256.hexdigest(),
+            'published_at': datetime.now().isoformat(),
+        }
+        return path
+
+    def _point_latest(self, path: str, latest_path: str):
+        """Hardlink latest tới file vừa ghi (copy nếu filesystem không hỗ trợ)"""
+        if os.path.abspath(path) == os.path.abspath(latest_path):
+            return
+        tmp_link = _tmp_path(latest_path)
+        try:
+            os.link(path, tmp_link)
+        except OSError:
+            shutil.copyfile(path, tmp_link)
+        os.replace(tmp_link, latest_path)
+
+    # --------------------------------------------------------------- manifest
+
+    def load_manifest(self) -> Dict:
+        if not os.path.exists(self.manifest_path):
+            return {'artifacts': {}}
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.warning(f"⚠️ Không đọc được manifest, tạo mới: {e}")
+            return {'artifacts': {}}
+
+    def write_manifest(self) -> Optional[str]:
+        """Gộp các artifact vừa công bố vào manifest.json (ghi nguyên tử)"""
+        if not self.entries:
+            return None
+
+        manifest = self.load_manifest()
+        manifest.setdefault('artifacts', {}).update(self.entries)
+        manifest['updated_at'] = datetime.now().isoformat()
+
+        tmp_path = _tmp_path(self.manifest_path)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+        self.logger.info(f"📝 Manifest: {len(self.entries)} artifact → {self.manifest_path}")
+        self.entries = {}
+        return self.manifest_path
+
+
+def verify_artifact(entry: Dict) -> bool:
+    """Kiểm tra file khớp kích thước và sha256 ghi trong manifest"""
+    path = entry.get('latest') or entry.get('path')
+    if not path or not os.path.exists(path) or os.path.getsize(path) != entry.get('size'):
+        return False
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest() == entry.get('sha256')
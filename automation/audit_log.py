@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Audit Log Module
+Log đăng nhập ghi vào buffer SQLite cục bộ, gửi lên sheet Login_Logs theo lô
+
+- record(): một INSERT vào SQLite (WAL, synchronous=NORMAL) - không gọi Sheets
+  trên luồng xử lý request
+- Thread nền nhận (claim) một lô dòng trong buffer, gửi bằng một values_append
+  (ưu tiên logging trong scheduler) rồi xóa các dòng đã gửi
+- Nhiều process/worker dùng chung một file buffer: mỗi lô được claim trong một
+  transaction (UPDATE ... SET claimed_by) trước khi gửi, nên hai flusher không
+  gửi trùng cùng một dòng
+- Sheets lỗi/mất kết nối: lô được trả lại buffer (kể cả qua restart) và gửi ở chu
+  kỳ sau; giao nhận at-least-once (crash giữa append và xóa để lại claim, lô được
+  claim lại sau claim_timeout và có thể gửi trùng)
+"""
+
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sheets_scheduler import PRIORITY_LOGGING, get_scheduler
+from sheets_writer import a1_range
+
+
+DEFAULT_DB_PATH = 'data/cache/login_audit.db'
+DEFAULT_FLUSH_INTERVAL = float(os.getenv('AUTH_AUDIT_FLUSH_INTERVAL', '5'))
+DEFAULT_BATCH_SIZE = 500
+# Claim của flusher đã chết (crash giữa append và xóa) được nhận lại sau khoảng này
+DEFAULT_CLAIM_TIMEOUT = 600
+
+
+class LoginAuditLog:
+    """Buffer bền (SQLite) + flusher nền cho log đăng nhập"""
+
+    def __init__(self, spreadsheet=None, scheduler=None, sheet_name: str = 'Login_Logs',
+                 db_path: str = DEFAULT_DB_PATH, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 batch_size: int = DEFAULT_BATCH_SIZE, claim_timeout: float = DEFAULT_CLAIM_TIMEOUT,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            spreadsheet: gspread Spreadsheet (None = chỉ ghi buffer, gửi khi có kết nối)
+            sheet_name: sheet nhận log
+            db_path: file SQLite làm buffer
+            flush_interval: chu kỳ gửi (giây)
+            batch_size: số dòng tối đa mỗi values_append
+            claim_timeout: giây trước khi lô đã claim nhưng chưa xóa được claim lại
+        """
+        self.spreadsheet = spreadsheet
+        self.scheduler = scheduler or get_scheduler()
+        self.sheet_name = sheet_name
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.claim_timeout = claim_timeout
+        # Định danh flusher (process + instance) ghi vào cột claimed_by
+        self.flusher_id = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        self.logger = logger or logging.getLogger('LoginAuditLog')
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        # Một kết nối dùng chung (có lock): mở kết nối mỗi lần ghi tốn hơn chính lệnh INSERT
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # WAL + NORMAL: commit không fsync, vẫn an toàn khi process crash
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS login_audit (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created TEXT NOT NULL,
+                row TEXT NOT NULL,
+                claimed_by TEXT,
+                claimed_at REAL
+            )
+            """
+        )
+        # Buffer tạo từ phiên bản trước chưa có cột claim
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(login_audit)')}
+        for column, column_type in (('claimed_by', 'TEXT'), ('claimed_at', 'REAL')):
+            if column not in columns:
+                self._conn.execute(f'ALTER TABLE login_audit ADD COLUMN {column} {column_type}')
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {'recorded': 0, 'shipped': 0, 'batches': 0, 'errors': 0, 'record_errors': 0}
+
+    # ----------------------------------------------------------------- write
+
+    def record(self, row: List[Any]) -> bool:
+        """Ghi một dòng log vào buffer (không chặn bởi Sheets)"""
+        try:
+            payload = json.dumps(['' if value is None else value for value in row],
+                                 ensure_ascii=False, default=str)
+            with self._lock:
+                self._conn.execute(
+                    'INSERT INTO login_audit (created, row) VALUES (?, ?)',
+                    (datetime.now().isoformat(), payload)
+                )
+                self._conn.commit()
+                self.stats['recorded'] += 1
+            return True
+        except Exception as e:
+            with self._lock:
+                self.stats['record_errors'] += 1
+            self.logger.error(f"❌ Lỗi ghi audit log cục bộ: {e}")
+            return False
+
+    def backlog(self) -> int:
+        """Số dòng chưa gửi lên Sheets"""
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM login_audit').fetchone()[0]
+
+    # ----------------------------------------------------------------- flush
+
+    def _claim_batch(self):
+        """Nhận một lô dòng chưa ai claim (hoặc claim đã quá hạn) cho flusher này"""
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE: khóa ghi ngay, hai process không claim cùng dòng
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute(
+                    """
+                    UPDATE login_audit SET claimed_by = ?, claimed_at = ?
+                    WHERE id IN (
+                        SELECT id FROM login_audit
+                        WHERE claimed_by IS NULL OR claimed_at < ?
+                        ORDER BY id LIMIT ?
+                    )
+                    """,
+                    (self.flusher_id, now, now - self.claim_timeout, self.batch_size)
+                )
+                batch = self._conn.execute(
+                    'SELECT id, row FROM login_audit WHERE claimed_by = ? ORDER BY id', (self.flusher_id,)
+                ).fetchall()
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            return batch
+
+    def _release_batch(self, shipped: bool):
+        """Xóa lô đã gửi, hoặc trả lô lỗi về buffer cho lần sau"""
+        with self._lock:
+            if shipped:
+                self._conn.execute('DELETE FROM login_audit WHERE claimed_by = ?', (self.flusher_id,))
+            else:
+                self._conn.execute(
+                    'UPDATE login_audit SET claimed_by = NULL, claimed_at = NULL WHERE claimed_by = ?',
+                    (self.flusher_id,)
+                )
+            self._conn.commit()
+
+    def flush(self) -> Dict[str, int]:
+        """Gửi toàn bộ buffer theo lô; dừng ở lô lỗi (giữ lại cho lần sau)"""
+        if self.spreadsheet is None:
+            return dict(self.stats)
+
+        with self._flush_lock:
+            while True:
+                batch = self._claim_batch()
+                if not batch:
+                    break
+                try:
+                    self.scheduler.write(
+                        self.spreadsheet.values_append, a1_range(self.sheet_name, 'A1'),
+                        params={'valueInputOption': 'RAW', 'insertDataOption': 'INSERT_ROWS'},
+                        body={'values': [json.loads(row) for _, row in batch]},
+                        priority=PRIORITY_LOGGING, idempotent=False
+                    )
+                except Exception as e:
+                    self._release_batch(shipped=False)
+                    with self._lock:
+                        self.stats['errors'] += 1
+                    self.logger.warning(f"⚠️ Chưa gửi được {len(batch)} dòng audit log lên Sheets: {e}")
+                    break
+
+                self._release_batch(shipped=True)
+                with self._lock:
+                    self.stats['shipped'] += len(batch)
+                    self.stats['batches'] += 1
+                if len(batch) < self.batch_size:
+                    break
+
+        with self._lock:
+            return dict(self.stats)
+
+    # ------------------------------------------------------------ background
+
+    def start(self) -> 'LoginAuditLog':
+        """Chạy thread gửi định kỳ (gửi lần cuối khi thoát chương trình)"""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='login-audit', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.logger.error(f"❌ Audit log thread error: {e}")
+
+    def request_flush(self):
+        self._wakeup.set()
+
+    def stop(self, flush: bool = True):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=self.flush_interval + 5)
+        if flush:
+            self.flush()
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Auth API Benchmark
+Đo tải /api/auth/login, /api/auth/verify, /api/auth/logout của auth_api_server
+
+- Mặc định chạy trong process: Flask test client + backend Sheets giả (fake_sheets),
+  đếm được số request Sheets trên mỗi request API
+- --url: bắn vào server đang chạy qua HTTP (không đếm được request Sheets)
+- Mỗi worker lặp: login → verify × N → logout, với IP riêng (không dính limiter IP)
+- Báo cáo: throughput, độ trễ p50/p95/p99 theo endpoint, mã HTTP, Sheets calls/request
+- --save-baseline lưu kết quả; --baseline so sánh và trả exit code 1 nếu hồi quy
+
+Ví dụ:
+    python auth_benchmark.py --concurrency 16 --duration 20
+    python auth_benchmark.py --save-baseline benchmarks/auth_baseline.json
+    python auth_benchmark.py --baseline benchmarks/auth_baseline.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+ENDPOINTS = ('login', 'verify', 'logout')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'auth_baseline.json')
+DEFAULT_PASSWORD = 'bench-123456'
+
+# Ngưỡng hồi quy mặc định so với baseline
+DEFAULT_TOLERANCE = {'latency': 0.5, 'throughput': 0.3, 'sheets_calls': 0.05}
+
+
+def percentile(ordered: List[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    """Độ trễ (ms) của một endpoint"""
+    ordered = sorted(samples)
+    ms = lambda value: round(value * 1000, 2) if value is not None else None
+    return {
+        'count': len(ordered),
+        'mean': ms(sum(ordered) / len(ordered)) if ordered else None,
+        'p50': ms(percentile(ordered, 0.50)),
+        'p95': ms(percentile(ordered, 0.95)),
+        'p99': ms(percentile(ordered, 0.99)),
+        'max': ms(ordered[-1] if ordered else None),
+    }
+
+
+# ---------------------------------------------------------------- transports
+
+class FlaskTransport:
+    """Gọi app Flask trong process (mỗi worker một test client)"""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def post(self, path: str, payload: Dict[str, Any], ip_address: str) -> Tuple[int, Dict[str, Any]]:
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.post(path, json=payload, environ_base={'REMOTE_ADDR': ip_address})
+        return response.status_code, response.get_json(silent=True) or {}
+
+
+class HttpTransport:
+    """
+    Gọi server đang chạy qua HTTP
+
+    Server lấy IP từ kết nối (không tin X-Forwarded-For) nên mọi user ảo dùng chung
+    IP máy chạy benchmark; kịch bản chỉ đăng nhập đúng nên không chạm giới hạn theo IP
+    """
+
+    def __init__(self, base_url: str, timeout: float = 30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def post(self, path: str, payload: Dict[str, Any], ip_address: str) -> Tuple[int, Dict[str, Any]]:
+        request = urllib.request.Request(
+            self.base_url + path, data=json.dumps(payload).encode('utf-8'), method='POST',
+            headers={'Content-Type': 'application/json'}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, json.loads(response.read() or b'{}')
+        except urllib.error.HTTPError as e:
+            try:
+                return e.code, json.loads(e.read() or b'{}')
+            except ValueError:
+                return e.code, {}
+
+
+# --------------------------------------------------------------- environment
+
+def setup_in_process(users: int, latency: float, jitter: float):
+    """
+    Dựng backend Sheets giả + auth_api_server trong process
+
+    Returns:
+        (transport, backend, auth_service)
+    """
+    # Module cùng thư mục vẫn import được sau khi đổi cwd
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import fake_sheets
+
+    # File buffer/trạng thái (audit SQLite, lockout) nằm trong thư mục tạm
+    os.chdir(tempfile.mkdtemp(prefix='auth-bench-'))
+
+    backend = fake_sheets.FakeSheetsBackend(latency=latency, jitter=jitter, seed=42)
+    # Đăng ký client giả cho credentials mặc định: auth_api_server tạo service lúc import
+    fake_sheets.install(backend, 'config/service_account.json')
+
+    import auth_api_server
+    auth_service = auth_api_server.auth_service
+
+    # Seed user qua store của service (cùng đường ghi với add_user);
+    # mọi user dùng chung một hash - salt giống nhau không ảnh hưởng chi phí verify
+    password_hash = auth_service.hasher.hash(DEFAULT_PASSWORD)
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    for i in range(users):
+        auth_service.store.add_user({
+            'User ID': f'bench{i:04d}', 'Email': f'bench{i:04d}@mia.vn', 'Password Hash': password_hash,
+            'Full Name': f'Bench User {i}', 'Role': 'user', 'Department': 'QA', 'Status': 'ACTIVE',
+            'Created Date': now, 'Last Login': '', 'Failed Attempts': '0', 'Locked Until': ''
+        })
+    auth_service.store.flush()
+
+    return FlaskTransport(auth_api_server.app), backend, auth_service
+
+
+# -------------------------------------------------------------------- runner
+
+class AuthBenchmark:
+    """Chạy các worker login → verify × N → logout song song"""
+
+    def __init__(self, transport, users: int, concurrency: int, duration: float,
+                 iterations: int, verifies: int):
+        self.transport = transport
+        self.users = users
+        self.concurrency = concurrency
+        self.duration = duration
+        self.iterations = iterations
+        self.verifies = verifies
+
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.errors = Counter()
+
+    def _call(self, endpoint: str, payload: Dict[str, Any], ip_address: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            status, body = self.transport.post(f'/api/auth/{endpoint}', payload, ip_address)
+        except Exception as e:
+            status, body = 'error', {}
+            with self._lock:
+                self.errors[type(e).__name__] += 1
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.latencies[endpoint].append(elapsed)
+            self.statuses[endpoint][str(status)] += 1
+        return body if status == 200 else {}
+
+    def _worker(self, index: int, deadline: float):
+        ip_address = f'10.{index // 250}.{index % 250}.1'
+        iteration = 0
+        while time.perf_counter() < deadline and (not self.iterations or iteration < self.iterations):
+            email = f'bench{(index + iteration * self.concurrency) % self.users:04d}@mia.vn'
+            iteration += 1
+
+            body = self._call('login', {'email': email, 'password': DEFAULT_PASSWORD}, ip_address)
+            session_id = (body.get('session') or {}).get('session_id')
+            if not session_id:
+                continue
+            for _ in range(self.verifies):
+                self._call('verify', {'sessionId': session_id}, ip_address)
+            self._call('logout', {'sessionId': session_id}, ip_address)
+
+    def run(self) -> float:
+        """Chạy benchmark, trả thời gian thực (giây)"""
+        started = time.perf_counter()
+        deadline = started + self.duration if self.duration else float('inf')
+        workers = [threading.Thread(target=self._worker, args=(i, deadline), name=f'bench-{i}')
+                   for i in range(self.concurrency)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return time.perf_counter() - started
+
+
+def flush_background(auth_service):
+    """Đẩy các ghi còn treo (store, audit log) để đếm đủ request Sheets"""
+    if auth_service is None:
+        return
+    if getattr(auth_service, 'store', None):
+        auth_service.store.flush()
+    if getattr(auth_service, 'audit', None):
+        auth_service.audit.flush()
+
+
+def build_report(bench: AuthBenchmark, elapsed: float, sheets_stats: Optional[Dict[str, Any]],
+                 auth_service=None) -> Dict[str, Any]:
+    total = sum(len(samples) for samples in bench.latencies.values())
+    report: Dict[str, Any] = {
+        'timestamp': datetime.now().isoformat(),
+        'config': {
+            'concurrency': bench.concurrency,
+            'users': bench.users,
+            'duration': bench.duration,
+            'iterations': bench.iterations,
+            'verifies_per_login': bench.verifies,
+        },
+        'elapsed': round(elapsed, 3),
+        'requests': total,
+        'throughput': round(total / elapsed, 2) if elapsed else None,
+        'endpoints': {
+            endpoint: {
+                **summarize(bench.latencies.get(endpoint, [])),
+                'throughput': round(len(bench.latencies.get(endpoint, [])) / elapsed, 2) if elapsed else None,
+                'status': dict(bench.statuses.get(endpoint, {})),
+            }
+            for endpoint in ENDPOINTS
+        },
+        'errors': dict(bench.errors),
+    }
+    if sheets_stats is not None:
+        report['sheets'] = {
+            'requests': sheets_stats['requests'],
+            'read': sheets_stats['read'],
+            'write': sheets_stats['write'],
+            'throttled': sheets_stats['throttled'],
+            'calls_per_request': round(sheets_stats['requests'] / total, 4) if total else None,
+            'targets': sheets_stats['targets'],
+        }
+    if auth_service is not None and getattr(auth_service, 'hasher', None):
+        report['password_hasher'] = auth_service.hasher.metrics()
+    return report
+
+
+def compare_to_baseline(report: Dict[str, Any], baseline: Dict[str, Any],
+                        tolerance: Dict[str, float] = DEFAULT_TOLERANCE) -> List[str]:
+    """Danh sách hồi quy so với baseline (rỗng = đạt)"""
+    regressions = []
+    for endpoint in ENDPOINTS:
+        current = report['endpoints'].get(endpoint, {})
+        base = baseline.get('endpoints', {}).get(endpoint, {})
+        for metric in ('p50', 'p95', 'p99'):
+            if current.get(metric) is None or not base.get(metric):
+                continue
+            limit = base[metric] * (1 + tolerance['latency'])
+            if current[metric] > limit:
+                regressions.append(f"{endpoint} {metric}: {current[metric]}ms > {limit:.2f}ms "
+                                   f"(baseline {base[metric]}ms)")
+
+    if baseline.get('throughput') and report.get('throughput') is not None:
+        limit = baseline['throughput'] * (1 - tolerance['throughput'])
+        if report['throughput'] < limit:
+            regressions.append(f"throughput: {report['throughput']} req/s < {limit:.2f} req/s "
+                               f"(baseline {baseline['throughput']})")
+
+    current_calls = (report.get('sheets') or {}).get('calls_per_request')
+    base_calls = (baseline.get('sheets') or {}).get('calls_per_request')
+    if current_calls is not None and base_calls is not None:
+        limit = base_calls + tolerance['sheets_calls']
+        if current_calls > limit:
+            regressions.append(f"sheets calls/request: {current_calls} > {limit:.4f} "
+                               f"(baseline {base_calls})")
+    return regressions
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"\n📊 {report['requests']} request trong {report['elapsed']}s "
+          f"→ {report['throughput']} req/s (concurrency {report['config']['concurrency']})")
+    print(f"{'endpoint':<8} {'count':>7} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  status")
+    for endpoint in ENDPOINTS:
+        stats = report['endpoints'][endpoint]
+        cells = [stats.get(metric) for metric in ('p50', 'p95', 'p99', 'max')]
+        print(f"{endpoint:<8} {stats['count']:>7} {stats['throughput'] or 0:>9} "
+              + ' '.join(f"{value if value is not None else '-':>9}" for value in cells)
+              + f"  {stats['status']}")
+    if report['errors']:
+        print(f"❌ Lỗi: {report['errors']}")
+    sheets = report.get('sheets')
+    if sheets:
+        print(f"\n📄 Sheets: {sheets['requests']} request ({sheets['read']} read, {sheets['write']} write, "
+              f"{sheets['throttled']} throttled) → {sheets['calls_per_request']} / request API")
+        for call, count in sorted(sheets['targets'].items()):
+            print(f"   • {call}: {count}")
+    hasher = report.get('password_hasher')
+    if hasher:
+        print(f"\n🔐 Password hash ({hasher['algorithm']}, {hasher['workers']} worker): "
+              f"compute p95 {hasher['compute_ms']['p95']}ms, total p95 {hasher['total_ms']['p95']}ms, "
+              f"busy {hasher['rejected_busy']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark Auth API (login/verify/logout)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Số worker song song')
+    parser.add_argument('--duration', type=float, default=10, help='Thời gian chạy (giây, 0 = theo --iterations)')
+    parser.add_argument('--iterations', type=int, default=0, help='Số vòng login/verify/logout mỗi worker (0 = không giới hạn)')
+    parser.add_argument('--verifies', type=int, default=5, help='Số lần verify sau mỗi login')
+    parser.add_argument('--users', type=int, default=50, help='Số user seed vào sheet Users giả')
+    parser.add_argument('--latency', type=float, default=0.05, help='Độ trễ giả mỗi request Sheets (giây)')
+    parser.add_argument('--jitter', type=float, default=0.02, help='Độ trễ ngẫu nhiên thêm (giây)')
+    parser.add_argument('--url', help='Bắn vào server đang chạy (vd. http://localhost:5001) thay vì chạy trong process')
+    parser.add_argument('--output', help='Ghi kết quả JSON ra file')
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, help='Lưu kết quả làm baseline')
+    parser.add_argument('--baseline', nargs='?', const=DEFAULT_BASELINE, help='So sánh với baseline, exit 1 nếu hồi quy')
+    args = parser.parse_args(argv)
+
+    if not args.duration and not args.iterations:
+        parser.error('Cần --duration hoặc --iterations')
+
+    # Đường dẫn do người dùng truyền tính theo thư mục hiện tại (chế độ in-process đổi cwd)
+    paths = {name: os.path.abspath(getattr(args, name)) if getattr(args, name) else None
+             for name in ('output', 'save_baseline', 'baseline')}
+
+    print("🏁 AUTH API BENCHMARK")
+    print("=" * 50)
+
+    backend = auth_service = None
+    if args.url:
+        transport = HttpTransport(args.url)
+    else:
+        transport, backend, auth_service = setup_in_process(args.users, args.latency, args.jitter)
+        flush_background(auth_service)
+        backend.reset_stats()
+
+    bench = AuthBenchmark(transport, args.users, args.concurrency, args.duration,
+                          args.iterations, args.verifies)
+    elapsed = bench.run()
+
+    sheets_stats = None
+    if backend is not None:
+        flush_background(auth_service)
+        sheets_stats = backend.stats()
+    report = build_report(bench, elapsed, sheets_stats, auth_service)
+    print_report(report)
+
+    for name in ('output', 'save_baseline'):
+        if paths[name]:
+            os.makedirs(os.path.dirname(paths[name]), exist_ok=True)
+            with open(paths[name], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"\n💾 Đã lưu kết quả: {paths[name]}")
+
+    if paths['baseline']:
+        try:
+            with open(paths['baseline'], 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            print(f"⚠️ Chưa có baseline: {paths['baseline']}")
+            return 1
+        regressions = compare_to_baseline(report, baseline)
+        if regressions:
+            print("\n❌ HỒI QUY SO VỚI BASELINE:")
+            for regression in regressions:
+                print(f"   • {regression}")
+            return 1
+        print("\n✅ Không có hồi quy so với baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Auth Store Module
+Kho user/session trong bộ nhớ cho AuthenticationService, Google Sheets là nơi lưu bền
+
+- Users và User_Sessions được đọc một lần (một values_batch_get) và đánh chỉ
+  mục: user theo email/User ID, session theo Session ID (chỉ session ACTIVE
+  chưa hết hạn; session hết hạn được bỏ khỏi bộ nhớ định kỳ)
+- Đọc (login, verify) là tra dict trong bộ nhớ, không gọi Sheets
+- Ghi: cập nhật bộ nhớ ngay (write-through), ô thay đổi và dòng mới được xếp
+  hàng rồi gửi theo lô trên background thread (write-behind):
+  mỗi lần flush = 1 values_append mỗi sheet có dòng mới + 1 values_batch_update
+- Dòng append lấy số dòng thật từ updatedRange của response, nên cập nhật
+  sau đó (vd. logout) ghi đúng dòng kể cả khi nơi khác cũng append
+- Làm mới định kỳ (refresh_interval) và khi tra không thấy (tối đa một lần mỗi
+  miss_reload_interval) để thấy user/session do process khác hoặc người sửa tay tạo
+"""
+
+import atexit
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sheets_client import column_letter
+from sheets_scheduler import PRIORITY_AUTH
+from sheets_writer import a1_range
+
+
+DEFAULT_FLUSH_INTERVAL = float(os.getenv('AUTH_STORE_FLUSH_INTERVAL', '2'))
+DEFAULT_REFRESH_INTERVAL = float(os.getenv('AUTH_STORE_REFRESH_INTERVAL', '300'))
+DEFAULT_MISS_RELOAD_INTERVAL = float(os.getenv('AUTH_STORE_MISS_RELOAD_INTERVAL', '5'))
+DEFAULT_PRUNE_INTERVAL = float(os.getenv('AUTH_STORE_PRUNE_INTERVAL', '60'))
+SESSION_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_UPDATED_ROW_RE = re.compile(r'![A-Za-z]+(\d+)')
+
+
+def session_is_live(record: Dict[str, str], now: Optional[datetime] = None) -> bool:
+    """Session ACTIVE và chưa hết hạn (Expires không đọc được thì coi như chưa hết hạn)"""
+    if record.get('Status', '').strip().upper() != 'ACTIVE':
+        return False
+    try:
+        expires = datetime.strptime(record.get('Expires', '').strip(), SESSION_TIME_FORMAT)
+    except ValueError:
+        return True
+    return expires > (now or datetime.now())
+
+
+class _Row:
+    """Một dòng của sheet: giá trị theo header + số dòng (None khi chưa append xong)"""
+
+    __slots__ = ('values', 'row', 'appending')
+
+    def __init__(self, values: Dict[str, str], row: Optional[int] = None):
+        self.values = values
+        self.row = row
+        self.appending = False
+
+
+class IndexedSheetTable:
+    """Bảng trong bộ nhớ của một sheet, chỉ mục theo cột khóa (+ cột phụ)"""
+
+    def __init__(self, sheet_name: str, key_header: str, index_headers: Sequence[str] = (),
+                 row_filter=None):
+        self.sheet_name = sheet_name
+        self.key_header = key_header
+        self.index_headers = list(index_headers)
+        # Chỉ giữ dòng row_filter(values) = True khi nạp (vd. session còn ACTIVE)
+        self.row_filter = row_filter
+        self.headers: List[str] = []
+        self.rows: Dict[str, _Row] = {}
+        self.indexes: Dict[str, Dict[str, str]] = {header: {} for header in self.index_headers}
+        self.pending_appends: List[_Row] = []
+        self.dirty: Dict[str, set] = {}
+        self.loaded_at = 0.0
+
+    @staticmethod
+    def normalize(value: Any) -> str:
+        return str(value or '').strip().lower()
+
+    def _index(self, key: str, row: _Row):
+        for header in self.index_headers:
+            value = self.normalize(row.values.get(header))
+            if value:
+                # Trùng giá trị (vd. email): giữ dòng đầu tiên như lần quét tuần tự trước đây
+                self.indexes[header].setdefault(value, key)
+
+    def load(self, values: List[List[Any]]):
+        """Nạp từ giá trị sheet (dòng 1 là header); thay đổi chưa flush được giữ lại"""
+        headers = [str(h).strip() for h in values[0]] if values else []
+        rows: Dict[str, _Row] = {}
+        for row_num, raw in enumerate(values[1:], start=2):
+            record = {header: str(raw[i]) if i < len(raw) else '' for i, header in enumerate(headers)}
+            key = record.get(self.key_header, '').strip()
+            if not key or key in rows:
+                continue
+            if self.row_filter and not self.row_filter(record):
+                continue
+            rows[key] = _Row(record, row_num)
+
+        # Ô đã sửa nhưng chưa ghi: giá trị local mới hơn giá trị vừa đọc
+        for key, headers_changed in self.dirty.items():
+            local = self.rows.get(key)
+            if local is None:
+                continue
+            if key in rows:
+                rows[key].values.update({h: local.values.get(h, '') for h in headers_changed})
+            else:
+                rows[key] = local
+        # Dòng chưa append (load và flush không chạy chồng nhau nên không có dòng đang append)
+        for row in self.pending_appends:
+            rows[row.values[self.key_header]] = row
+
+        self.headers = headers or self.headers
+        self.rows = rows
+        self.indexes = {header: {} for header in self.index_headers}
+        for key, row in rows.items():
+            self._index(key, row)
+        self.loaded_at = time.monotonic()
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        row = self.rows.get(str(key or '').strip())
+        return dict(row.values) if row else None
+
+    def find(self, header: str, value: Any) -> Optional[Dict[str, str]]:
+        key = self.indexes[header].get(self.normalize(value))
+        return self.get(key) if key else None
+
+    def update(self, key: str, values: Dict[str, Any]) -> bool:
+        row = self.rows.get(key)
+        if row is None:
+            return False
+        values = {header: '' if value is None else str(value) for header, value in values.items()}
+        row.values.update(values)
+        if row.row is None and not row.appending and any(r is row for r in self.pending_appends):
+            # Dòng còn trong hàng đợi append: giá trị mới đi cùng lần append
+            return True
+        # Dòng đã append nhưng chưa biết số dòng: giữ ở dirty tới khi refresh nạp số dòng
+        self.dirty.setdefault(key, set()).update(values)
+        return True
+
+    def append(self, values: Dict[str, Any]) -> bool:
+        key = str(values.get(self.key_header, '')).strip()
+        if not key or key in self.rows:
+            return False
+        row = _Row({header: '' if value is None else str(value) for header, value in values.items()})
+        self.rows[key] = row
+        self.pending_appends.append(row)
+        self._index(key, row)
+        return True
+
+    def pending(self) -> int:
+        return len(self.pending_appends) + sum(len(h) for h in self.dirty.values())
+
+    def prune(self) -> int:
+        """Bỏ khỏi bộ nhớ các dòng không còn thỏa row_filter (trừ dòng còn thay đổi chưa ghi)"""
+        if not self.row_filter:
+            return 0
+        removed = [key for key, row in self.rows.items()
+                   if row.row is not None and key not in self.dirty and not self.row_filter(row.values)]
+        for key in removed:
+            del self.rows[key]
+        if removed and self.index_headers:
+            self.indexes = {header: {} for header in self.index_headers}
+            for key, row in self.rows.items():
+                self._index(key, row)
+        return len(removed)
+
+
+class AuthStore:
+    """Users + User_Sessions trong bộ nhớ, ghi Sheets theo lô"""
+
+    def __init__(self, spreadsheet, scheduler, users_sheet: str = 'Users',
+                 sessions_sheet: str = 'User_Sessions', worksheets=None,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+                 miss_reload_interval: float = DEFAULT_MISS_RELOAD_INTERVAL,
+                 prune_interval: float = DEFAULT_PRUNE_INTERVAL,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            spreadsheet: gspread Spreadsheet chứa Users/User_Sessions
+            scheduler: SheetsRequestScheduler dùng chung
+            worksheets: WorksheetCache (để cập nhật cache header sau khi nạp)
+            flush_interval: chu kỳ ghi lô (giây)
+            refresh_interval: chu kỳ đọc lại toàn bộ từ Sheets (giây)
+            miss_reload_interval: khoảng cách tối thiểu giữa hai lần đọc lại do tra không thấy
+            prune_interval: chu kỳ bỏ session hết hạn khỏi bộ nhớ (giây)
+        """
+        self.spreadsheet = spreadsheet
+        self.scheduler = scheduler
+        self.worksheets = worksheets
+        self.flush_interval = flush_interval
+        self.refresh_interval = refresh_interval
+        self.miss_reload_interval = miss_reload_interval
+        self.prune_interval = prune_interval
+        self.logger = logger or logging.getLogger('AuthStore')
+
+        self.users = IndexedSheetTable(users_sheet, 'User ID', index_headers=['Email'])
+        self.sessions = IndexedSheetTable(sessions_sheet, 'Session ID', row_filter=session_is_live)
+        self._tables = {table.sheet_name: table for table in (self.users, self.sessions)}
+
+        self._lock = threading.RLock()
+        # Flush và reload không chạy chồng nhau
+        self._io_lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self._last_load_attempt = float('-inf')
+        self._last_refresh = 0.0
+        self._last_prune = time.monotonic()
+
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {
+            'lookups': 0,
+            'misses': 0,
+            'loads': 0,
+            'miss_reloads': 0,
+            'flushes': 0,
+            'rows_appended': 0,
+            'cells_updated': 0,
+            'api_calls': 0,
+            'errors': 0,
+            'sessions_pruned': 0,
+        }
+
+    # ------------------------------------------------------------------ load
+
+    def _read(self, tables: Sequence[IndexedSheetTable]):
+        response = self.scheduler.read(
+            self.spreadsheet.values_batch_get, [a1_range(table.sheet_name, 'A:ZZ') for table in tables],
+            priority=PRIORITY_AUTH
+        )
+        with self._lock:
+            self.stats['api_calls'] += 1
+            for table, value_range in zip(tables, response.get('valueRanges', [])):
+                table.load(value_range.get('values', []))
+                if self.worksheets is not None and table.headers:
+                    self.worksheets.remember_headers(table.sheet_name, table.headers)
+
+    def load(self, tables: Optional[Sequence[IndexedSheetTable]] = None) -> bool:
+        """Đọc lại từ Sheets (mặc định cả hai sheet trong một request)"""
+        tables = list(tables or self._tables.values())
+        with self._io_lock:
+            try:
+                self._read(tables)
+            except Exception as e:
+                with self._lock:
+                    self.stats['errors'] += 1
+                self.logger.error(f"❌ Lỗi nạp dữ liệu auth từ Google Sheets: {e}")
+                return False
+        with self._lock:
+            self.stats['loads'] += 1
+            if len(tables) == len(self._tables):
+                self._loaded = True
+                self._last_refresh = time.monotonic()
+        self.logger.info(
+            f"✅ Auth store: {len(self.users.rows)} user, {len(self.sessions.rows)} session đang hoạt động"
+        )
+        return True
+
+    def ensure_loaded(self) -> bool:
+        """Nạp lần đầu (các thread đồng thời chờ một lần đọc); lỗi thì thử lại sau miss_reload_interval"""
+        if self._loaded:
+            return True
+        with self._load_lock:
+            if self._loaded:
+                return True
+            if time.monotonic() - self._last_load_attempt < self.miss_reload_interval:
+                return False
+            self._last_load_attempt = time.monotonic()
+            return self.load()
+
+    def _reload_on_miss(self, table: IndexedSheetTable) -> bool:
+        """Tra không thấy: đọc lại sheet đó nếu lần nạp gần nhất đã đủ cũ"""
+        with self._lock:
+            self.stats['misses'] += 1
+            if time.monotonic() - table.loaded_at < self.miss_reload_interval:
+                return False
+            # Đánh dấu trước để các request đồng thời không cùng đọc lại
+            table.loaded_at = time.monotonic()
+            self.stats['miss_reloads'] += 1
+        return self.load([table])
+
+    # ---------------------------------------------------------------- lookup
+
+    def _lookup(self, table: IndexedSheetTable, find) -> Optional[Dict[str, str]]:
+        if not self.ensure_loaded():
+            return None
+        with self._lock:
+            self.stats['lookups'] += 1
+            result = find()
+        if result is None and self._reload_on_miss(table):
+            with self._lock:
+                result = find()
+        return result
+
+    def get_user_by_email(self, email: str) -> Optional[Dict[str, str]]:
+        return self._lookup(self.users, lambda: self.users.find('Email', email))
+
+    def get_user(self, user_id: str) -> Optional[Dict[str, str]]:
+        return self._lookup(self.users, lambda: self.users.get(user_id))
+
+    def get_session(self, session_id: str) -> Optional[Dict[str, str]]:
+        return self._lookup(self.sessions, lambda: self.sessions.get(session_id))
+
+    # ----------------------------------------------------------------- write
+
+    def _write(self, func) -> bool:
+        if not self.ensure_loaded():
+            return False
+        with self._lock:
+            changed = func()
+        if changed:
+            self.start()
+        return changed
+
+    def update_user(self, user_id: str, values: Dict[str, Any]) -> bool:
+        return self._write(lambda: self.users.update(user_id, values))
+
+    def add_user(self, values: Dict[str, Any]) -> bool:
+        return self._write(lambda: self.users.append(values))
+
+    def update_session(self, session_id: str, values: Dict[str, Any]) -> bool:
+        return self._write(lambda: self.sessions.update(session_id, values))
+
+    def add_session(self, values: Dict[str, Any]) -> bool:
+        return self._write(lambda: self.sessions.append(values))
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(table.pending() for table in self._tables.values())
+
+    def prune_sessions(self) -> int:
+        """Bỏ session hết hạn/không còn ACTIVE khỏi bộ nhớ (sheet giữ nguyên)"""
+        with self._lock:
+            removed = self.sessions.prune()
+            self.stats['sessions_pruned'] += removed
+            self._last_prune = time.monotonic()
+        if removed:
+            self.logger.debug(f"🧹 Auth store: bỏ {removed} session hết hạn khỏi bộ nhớ")
+        return removed
+
+    # ----------------------------------------------------------------- flush
+
+    def _take_pending(self):
+        with self._lock:
+            appends, updates = {}, []
+            for table in self._tables.values():
+                if table.pending_appends:
+                    rows, table.pending_appends = table.pending_appends, []
+                    for row in rows:
+                        row.appending = True
+                    appends[table.sheet_name] = rows
+
+                dirty, table.dirty = table.dirty, {}
+                for key, headers in dirty.items():
+                    row = table.rows.get(key)
+                    if row is None:
+                        continue
+                    if row.row is None:
+                        # Append của dòng này chưa xong: giữ lại cho lần flush sau
+                        table.dirty.setdefault(key, set()).update(headers)
+                        continue
+                    for header in headers:
+                        if header in table.headers:
+                            updates.append((table, key, row, header, row.values.get(header, '')))
+                        else:
+                            self.logger.warning(f"⚠️ Sheet '{table.sheet_name}' không có cột '{header}' - bỏ qua")
+            return appends, updates
+
+    def _append(self, table: IndexedSheetTable, rows: List[_Row]):
+        values = [[row.values.get(header, '') for header in table.headers] for row in rows]
+        response = self.scheduler.write(
+            self.spreadsheet.values_append, a1_range(table.sheet_name, 'A1'),
+            params={'valueInputOption': 'RAW', 'insertDataOption': 'INSERT_ROWS'},
+            body={'values': values}, priority=PRIORITY_AUTH, idempotent=False
+        )
+        updated_range = ((response or {}).get('updates') or {}).get('updatedRange', '')
+        match = _UPDATED_ROW_RE.search(updated_range)
+        with self._lock:
+            self.stats['api_calls'] += 1
+            self.stats['rows_appended'] += len(rows)
+            for offset, row in enumerate(rows):
+                row.appending = False
+                row.row = int(match.group(1)) + offset if match else None
+            if not match:
+                # Không biết dòng thật: lần refresh sau sẽ nạp lại số dòng
+                self._last_refresh = 0.0
+
+    def flush(self) -> Dict[str, int]:
+        """Ghi mọi thay đổi đang chờ; lỗi thì đưa lại vào hàng đợi"""
+        with self._io_lock:
+            appends, updates = self._take_pending()
+            if not appends and not updates:
+                return dict(self.stats)
+
+            try:
+                for sheet_name in list(appends):
+                    self._append(self._tables[sheet_name], appends[sheet_name])
+                    del appends[sheet_name]
+
+                if updates:
+                    data = [
+                        {'range': a1_range(table.sheet_name,
+                                           f'{column_letter(table.headers.index(header) + 1)}{row.row}'),
+                         'values': [[value]]}
+                        for table, _, row, header, value in updates
+                    ]
+                    self.scheduler.write(self.spreadsheet.values_batch_update,
+                                         body={'valueInputOption': 'RAW', 'data': data},
+                                         priority=PRIORITY_AUTH)
+                    with self._lock:
+                        self.stats['api_calls'] += 1
+                        self.stats['cells_updated'] += len(data)
+                    updates = []
+
+            except Exception as e:
+                self.logger.error(f"❌ Lỗi ghi dữ liệu auth lên Google Sheets: {e}")
+                with self._lock:
+                    self.stats['errors'] += 1
+                    for sheet_name, rows in appends.items():
+                        table = self._tables[sheet_name]
+                        for row in rows:
+                            row.appending = False
+                        table.pending_appends = rows + table.pending_appends
+                    for table, key, _, header, _ in updates:
+                        table.dirty.setdefault(key, set()).add(header)
+
+            with self._lock:
+                self.stats['flushes'] += 1
+                return dict(self.stats)
+
+    # ------------------------------------------------------------ background
+
+    def start(self) -> 'AuthStore':
+        """Chạy thread flush/refresh định kỳ (flush lần cuối khi thoát chương trình)"""
+        if self._thread and self._thread.is_alive():
+            return self
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return self
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='auth-store', daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                if self._loaded and time.monotonic() - self._last_refresh >= self.refresh_interval:
+                    self.load()
+                if time.monotonic() - self._last_prune >= self.prune_interval:
+                    self.prune_sessions()
+            except Exception as e:
+                self.logger.error(f"❌ Auth store thread error: {e}")
+
+    def request_flush(self):
+        self._wakeup.set()
+
+    def stop(self, flush: bool = True):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=self.flush_interval + 5)
+        if flush:
+            self.flush()
@@ -13,9 +13,11 @@ import json
 import logging
 import time
 import pickle
+import multiprocessing
 import schedule
 import pandas as pd
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -31,7 +33,14 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
 from selenium.webdriver.common.keys import Keys
-import numpy as np
+from line_items import build_line_items, build_sku_aggregates, has_product_data
+from order_index import OrderIndex, changed_only
+from dashboard_projection import SLA_SHEET_COLUMNS, load_sla_rules, project_incremental
+from parquet_store import PARQUET_AVAILABLE, ParquetOrderStore
+from artifact_publisher import ArtifactPublisher
+from artifact_catalog import ArtifactCatalog, path_size
+from excel_export import write_workbook
+from export_scheduler import STATUS_OK, ExportScheduler
 
 class SessionManager:
     """Quản lý session để tránh login lại"""
@@ -90,6 +99,18 @@ class OneAutomationSystem:
         self.session_data = {}
         self.session_manager = SessionManager()
         self.is_logged_in = False
+        self.order_index = self.setup_order_index()
+        self.catalog = self.setup_catalog()
+
+    def setup_order_index(self):
+        """Khởi tạo chỉ mục đơn hàng dùng để loại trùng giữa các lần chạy"""
+        index_path = self.config.get('data_processing', {}).get('order_index_path', 'data/order_index.db')
+        return OrderIndex(index_path)
+
+    def setup_catalog(self):
+        """Khởi tạo catalog các lần chạy và file đã xuất"""
+        catalog_path = self.config.get('export', {}).get('catalog_path', 'data/catalog.db')
+        return ArtifactCatalog(catalog_path)
 
     def load_config(self, config_path):
         """Tải cấu hình từ file JSON"""
@@ -593,10 +614,12 @@ class OneAutomationSystem:
             # Xử lý dữ liệu theo config
             processing_config = self.config.get('data_processing', {})
 
-            # 1. Loại bỏ duplicates nếu được cấu hình
+            # 1. Loại bỏ duplicates theo mã đơn + phân loại new/changed/unchanged
             if processing_config.get('remove_duplicates', True):
-                df = df.drop_duplicates()
-                self.logger.info(f"🧹 Loại bỏ trùng lặp: {len(df)} đơn còn lại")
+                df = self.order_index.deduplicate(df)
+                self.logger.info(
+                    f"🧹 Loại bỏ trùng lặp: {len(df)} đơn còn lại {self.order_index.summarize(df)}"
+                )
 
             # 2. Làm sạch dữ liệu trống
             if processing_config.get('clean_empty_values', True):
@@ -650,7 +673,9 @@ class OneAutomationSystem:
             return pd.DataFrame()
 
     def export_data(self, df):
-        """Xuất dữ liệu ra các định dạng file"""
+        """Xuất dữ liệu ra các định dạng file (các định dạng độc lập chạy song song)"""
+        # Báo cáo của lần xuất này (không dùng lại kết quả lần trước nếu lần này lỗi sớm)
+        self.last_export_report = {}
         try:
             self.logger.info("📁 Bắt đầu xuất dữ liệu...")
 
@@ -664,68 +689,153 @@ class OneAutomationSystem:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             export_files = {}
             export_config = self.config.get('export', {})
+            publisher = ArtifactPublisher('data')
+
+            # Một bản sao dùng chung (chỉ đọc) cho tất cả writer chạy song song,
+            # không task nào tự copy. Writer nào cần sửa dữ liệu phải tạo frame mới
+            # (project_incremental, build_line_items...). Excel lớn chạy ở process
+            # riêng: frame chỉ được pickle một lần khi gửi sang process đó.
+            df = df.copy()
+            parallel_config = export_config.get('parallel', {})
+            scheduler = ExportScheduler(
+                max_workers=parallel_config.get('max_workers', 4) if parallel_config.get('enabled', True) else 1,
+                deadline_seconds=parallel_config.get('deadline_seconds', 120),
+                logger=self.logger
+            )
 
             # 1. Xuất CSV raw data (mặc định)
             if export_config.get('csv', {}).get('enabled', True):
-                csv_filename = f"data/orders_export_{timestamp}.csv"
-                try:
-                    df.to_csv(csv_filename, index=False, encoding='utf-8-sig')
-                    export_files['csv'] = csv_filename
+                def export_csv():
+                    csv_filename = publisher.publish_csv('csv', df, f"orders_export_{timestamp}.csv")
                     self.logger.info(f"✅ Đã xuất CSV: {csv_filename}")
-                except Exception as e:
-                    self.logger.error(f"❌ Lỗi xuất CSV: {e}")
+                    return {'csv': csv_filename}
 
-            # 1b. Xuất Dashboard format CSV
-            try:
-                dashboard_df = self.create_dashboard_format(df)
-                if not dashboard_df.empty:
-                    dashboard_filename = f"data/orders_dashboard_{timestamp}.csv"
-                    dashboard_df.to_csv(dashboard_filename, index=False, encoding='utf-8-sig')
-                    export_files['dashboard_csv'] = dashboard_filename
-                    self.logger.info(f"✅ Đã xuất Dashboard CSV: {dashboard_filename}")
-
-                    # Cập nhật file mới nhất để dashboard tự động load
-                    latest_filename = "data/orders_latest.csv"
-                    dashboard_df.to_csv(latest_filename, index=False, encoding='utf-8-sig')
-                    self.logger.info(f"✅ Đã cập nhật file mới nhất: {latest_filename}")
-            except Exception as e:
-                self.logger.error(f"❌ Lỗi xuất Dashboard format: {e}")
+                scheduler.add('csv', export_csv)
 
-            # 2. Xuất Excel
-            if export_config.get('excel', {}).get('enabled', False):
-                excel_filename = f"data/orders_export_{timestamp}.xlsx"
-                try:
-                    with pd.ExcelWriter(excel_filename, engine='openpyxl') as writer:
-                        df.to_excel(writer, sheet_name='Đơn hàng', index=False)
-
-                        # Tự động điều chỉnh độ rộng cột
-                        worksheet = writer.sheets['Đơn hàng']
-                        for column in worksheet.columns:
-                            max_length = 0
-                            column_letter = column[0].column_letter
-                            for cell in column:
-                                try:
-                                    if len(str(cell.value)) > max_length:
-                                        max_length = len(str(cell.value))
-                                except:
-                                    pass
-                            adjusted_width = min(max_length + 2, 50)
-                            worksheet.column_dimensions[column_letter].width = adjusted_width
+            # 1b. Xuất Dashboard format CSV (cập nhật tăng dần từ orders_latest.csv)
+            def export_dashboard():
+                latest_filename = "data/orders_latest.csv"
+                previous_df = None
+                if os.path.exists(latest_filename):
+                    try:
+                        previous_df = pd.read_csv(latest_filename, dtype=str, keep_default_na=False)
+                    except Exception as e:
+                        self.logger.warning(f"⚠️ Không đọc được {latest_filename}, tạo lại toàn bộ: {e}")
 
-                    export_files['excel'] = excel_filename
-                    self.logger.info(f"✅ Đã xuất Excel: {excel_filename}")
-                except Exception as e:
-                    self.logger.error(f"❌ Lỗi xuất Excel: {e}")
+                dashboard_df = self.create_dashboard_format(df, previous_df)
+                if dashboard_df.empty:
+                    return {}, dashboard_df
+
+                # Ghi một lần, orders_latest.csv được trỏ nguyên tử tới file mới
+                dashboard_filename = publisher.publish_csv(
+                    'dashboard_csv', dashboard_df, f"orders_dashboard_{timestamp}.csv",
+                    latest_name=os.path.basename(latest_filename)
+                )
+                self.logger.info(f"✅ Đã xuất Dashboard CSV: {dashboard_filename} → {latest_filename}")
+                return {'dashboard_csv': dashboard_filename}, dashboard_df
+
+            scheduler.add('dashboard', export_dashboard)
+
+            # 1c. Xuất dòng hàng sản phẩm + bảng tổng hợp SKU
+            if export_config.get('line_items', {}).get('enabled', True):
+                def export_products():
+                    if not has_product_data(df):
+                        self.logger.info("ℹ️ Không có dữ liệu sản phẩm - bỏ qua xuất dòng hàng")
+                        return {}, None
+                    line_items = build_line_items(df)
+                    return self.export_line_items(line_items, timestamp, publisher), line_items
+
+                scheduler.add('line_items', export_products)
+
+            # 2. Xuất Excel (streaming, một workbook nhiều sheet)
+            excel_config = export_config.get('excel', {})
+            if excel_config.get('enabled', True):
+                def export_excel(dashboard=None, line_items=None):
+                    excel_filename = f"data/orders_export_{timestamp}.xlsx"
+                    sheets = {'Đơn hàng': df, 'Dòng hàng': line_items[1] if line_items else None}
+                    dashboard_df = dashboard[1] if dashboard else None
+                    if dashboard_df is not None:
+                        sla_columns = [col for col in SLA_SHEET_COLUMNS if col in dashboard_df.columns]
+                        sheets['SLA'] = dashboard_df[sla_columns]
+                    sample_rows = excel_config.get('width_sample_rows', 5000)
+                    if len(df) >= excel_config.get('process_min_rows', 20000):
+                        # xlsxwriter là Python thuần (giữ GIL): file lớn ghi ở process riêng
+                        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                            written = pool.submit(write_workbook, excel_filename, sheets, sample_rows).result()
+                    else:
+                        written = write_workbook(excel_filename, sheets, sample_rows=sample_rows)
+                    self.logger.info(f"✅ Đã xuất Excel: {excel_filename} {written}")
+                    return {'excel': excel_filename}
+
+                depends_on = [name for name in ('dashboard', 'line_items') if name in scheduler.tasks]
+                scheduler.add('excel', export_excel, depends_on=depends_on,
+                              optional=excel_config.get('optional', True))
 
             # 3. Xuất JSON
-            if export_config.get('json', {}).get('enabled', False):
-                json_filename = f"data/orders_export_{timestamp}.json"
-                try:
-                    df.to_json(json_filename, orient='records', ensure_ascii=False, indent=2)
-                    export_files['json'] = json_filename
+            json_config = export_config.get('json', {})
+            if json_config.get('enabled', False):
+                def export_json():
+                    json_filename = f"data/orders_export_{timestamp}.json"
+                    df.to_json(json_filename, orient='records', force_ascii=False, indent=2)
                     self.logger.info(f"✅ Đã xuất JSON: {json_filename}")
-                except Exception as e:
-                    self.logger.error(f"❌ Lỗi xuất JSON: {e}")
+                    return {'json': json_filename}
+
+                scheduler.add('json', export_json, optional=json_config.get('optional', True))
+
+            # 3b. Lưu lịch sử Parquet phân vùng theo ngày/sàn (chỉ đơn mới/thay đổi)
+            parquet_config = export_config.get('parquet', {})
+            if parquet_config.get('enabled', True) and PARQUET_AVAILABLE:
+                def export_parquet():
+                    store = ParquetOrderStore(parquet_config.get('root', 'data/parquet'))
+                    written = store.append(changed_only(df), run_id=timestamp)
+                    if not written:
+                        return {}
+                    self.logger.info(f"✅ Đã ghi Parquet: {len(written)} phân vùng trong {store.base_dir}")
+                    return {'parquet': store.base_dir}
+
+                scheduler.add('parquet', export_parquet, optional=parquet_config.get('optional', False))
+
+            # 3c. Đồng bộ delta lên worksheet đơn hàng cố định (chỉ gửi dòng mới/thay đổi)
+            sheets_sync_config = export_config.get('sheets_sync', {})
+            if sheets_sync_config.get('enabled', False):
+                def export_sheets_sync():
+                    from google_sheets_config import GoogleSheetsConfigService
+                    service = GoogleSheetsConfigService(
+                        spreadsheet_id=sheets_sync_config.get('spreadsheet_id'),
+                        credentials_path=sheets_sync_config.get('credentials_path')
+                    )
+                    stats = service.sync_orders_to_sheets(
+                        df.to_dict('records'),
+                        sheet_name=sheets_sync_config.get('sheet_name', 'Orders_Sync'),
+                        remove_missing=sheets_sync_config.get('remove_missing', False)
+                    )
+                    if stats is None:
+                        raise RuntimeError("Đồng bộ Google Sheets thất bại")
+                    return {}
+
+                scheduler.add('sheets_sync', export_sheets_sync,
+                              optional=sheets_sync_config.get('optional', True))
+
+            def register_late(name, result):
+                # Định dạng tùy chọn hoàn thành sau deadline: vẫn ghi nhận vào catalog
+                files = result[0] if isinstance(result, tuple) else result
+                self.logger.info(f"⏱️ Export {name} hoàn thành sau deadline: {files}")
+                self.catalog.register_run(timestamp, files or {}, order_count=len(df))
+
+            run = scheduler.run(late_callback=register_late)
+            for name, result in run['results'].items():
+                files = result[0] if isinstance(result, tuple) else result
+                export_files.update(files or {})
+            parquet_synced = run['status'].get('parquet') == STATUS_OK
+
+            self.last_export_report = {
+                'timings': run['timings'],
+                'status': run['status'],
+                'elapsed': run['elapsed'],
+                # Mọi task bắt buộc (csv, dashboard...) đều thành công
+                'required_ok': run['required_ok'],
+            }
+            self.logger.info(f"⏱️ Export timings: {run['timings']} (tổng {run['elapsed']}s)")
 
             # 4. Tạo file báo cáo tổng hợp
             if export_config.get('summary', {}).get('enabled', True):
@@ -740,9 +850,14 @@ class OneAutomationSystem:
 
                         f.write("📁 Các file đã xuất:\n")
                         for file_type, file_path in export_files.items():
-                            file_size = os.path.getsize(file_path) / 1024  # KB
+                            file_size = path_size(file_path) / 1024  # KB (thư mục Parquet: tổng các file)
                             f.write(f"  • {file_type.upper()}: {file_path} ({file_size:.1f} KB)\n")
 
+                        if run['timings']:
+                            f.write("\n⏱️ Thời gian xuất theo định dạng:\n")
+                            for name, seconds in run['timings'].items():
+                                f.write(f"  • {name}: {seconds:.2f}s ({run['status'].get(name)})\n")
+
                         f.write("\n📋 Cấu trúc dữ liệu:\n")
                         for i, col in enumerate(df.columns, 1):
                             f.write(f"  {i}. {col}\n")
@@ -762,6 +877,20 @@ class OneAutomationSystem:
                 except Exception as e:
                     self.logger.error(f"❌ Lỗi tạo báo cáo: {e}")
 
+            # 5. Ghi nhận lần chạy vào catalog (reader truy vấn catalog thay vì quét thư mục)
+            try:
+                self.catalog.register_run(timestamp, export_files, details=publisher.entries, order_count=len(df))
+                if parquet_synced and 'csv' in export_files:
+                    # Đơn của lần chạy này đã nằm trong kho Parquet, compaction không cần nạp lại
+                    self.catalog.mark_consolidated([export_files['csv']])
+            except Exception as e:
+                self.logger.error(f"❌ Lỗi cập nhật catalog: {e}")
+
+            try:
+                publisher.write_manifest()
+            except Exception as e:
+                self.logger.error(f"❌ Lỗi ghi manifest: {e}")
+
             self.logger.info(f"🎉 Hoàn thành xuất dữ liệu: {len(export_files)} file")
             return export_files
 
@@ -769,6 +898,44 @@ class OneAutomationSystem:
             self.logger.error(f"❌ Lỗi xuất dữ liệu: {e}")
             return {}
 
+    def export_succeeded(self, export_files):
+        """Lần xuất vừa rồi thành công: có file và mọi task bắt buộc đều OK"""
+        return bool(export_files) and getattr(self, 'last_export_report', {}).get('required_ok', False)
+
+    def commit_order_index(self, df, export_files):
+        """
+        Ghi fingerprint vào chỉ mục chỉ khi xuất thành công; xuất lỗi thì giữ nguyên
+        để lần chạy sau vẫn coi các đơn này là mới/thay đổi và xuất lại
+        """
+        if not self.export_succeeded(export_files):
+            self.logger.warning("⚠️ Xuất dữ liệu chưa thành công - không cập nhật chỉ mục đơn hàng")
+            return 0
+        return self.order_index.commit(df)
+
+    def export_line_items(self, line_items, timestamp, publisher):
+        """Xuất bảng dòng hàng sản phẩm và các bảng tổng hợp SKU qua publisher"""
+        if line_items.empty:
+            self.logger.warning("⚠️ Không tách được dòng hàng sản phẩm nào")
+            return {}
+
+        top_n = self.config.get('export', {}).get('line_items', {}).get('top_n', 20)
+        outputs = {'products': line_items}
+        outputs.update(build_sku_aggregates(line_items, top_n=top_n))
+
+        export_files = {}
+        for name, frame in outputs.items():
+            # products_detail_* giữ tên cũ cho /api/products
+            prefix = 'products_detail' if name == 'products' else name
+            export_files[name] = publisher.publish_csv(
+                name, frame, f"{prefix}_{timestamp}.csv", latest_name=f"{name}_latest.csv"
+            )
+
+        self.logger.info(
+            f"✅ Đã xuất {len(line_items)} dòng hàng từ {line_items['order_id'].nunique()} đơn "
+            f"+ {len(outputs) - 1} bảng tổng hợp SKU"
+        )
+        return export_files
+
     def send_notification(self, result):
         """Gửi thông báo kết quả"""
         try:
@@ -822,7 +989,7 @@ class OneAutomationSystem:
 
             # Đính kèm file báo cáo
             for file_type, file_path in result.get('export_files', {}).items():
-                if os.path.exists(file_path):
+                if os.path.isfile(file_path):
                     try:
                         with open(file_path, 'rb') as attachment:
                             part = MIMEBase('application', 'octet-stream')
@@ -927,6 +1094,7 @@ class OneAutomationSystem:
                 progress_callback("Đang xuất dữ liệu...", 80)
 
             export_files = self.export_data(df)
+            self.commit_order_index(df, export_files)
 
             # 7. Cập nhật kết quả
             if progress_callback:
@@ -935,6 +1103,8 @@ class OneAutomationSystem:
             result.update({
                 'success': True,
                 'order_count': len(df),
+                'change_summary': self.order_index.summarize(df),
+                'export_report': getattr(self, 'last_export_report', {}),
                 'export_files': export_files,
                 'end_time': datetime.now(),
                 'duration': (datetime.now() - result['start_time']).total_seconds()
@@ -1262,109 +1432,25 @@ class OneAutomationSystem:
             self.logger.error(f"❌ Lỗi bấm tab 'Đơn chờ xuất kho': {e}")
             return False
 
-    def create_dashboard_format(self, df):
-        """Chuyển đổi dữ liệu thô sang format dashboard"""
+    def create_dashboard_format(self, df, previous_df=None):
+        """Chuyển đổi dữ liệu thô sang format dashboard
+
+        Nếu có snapshot trước đó (orders_latest.csv) thì chỉ chiếu lại các đơn
+        mới/thay đổi và giữ nguyên các đơn không đổi.
+        """
         try:
             self.logger.info("🔄 Chuyển đổi sang format dashboard...")
 
             if df.empty:
                 return pd.DataFrame()
 
-            # Tạo DataFrame mới cho dashboard
-            dashboard_df = pd.DataFrame()
-
-            # 1. Mã đơn hàng
-            if 'order_code' in df.columns:
-                dashboard_df['order_id'] = df['order_code']
-            elif 'id' in df.columns:
-                dashboard_df['order_id'] = df['id']
-            else:
-                dashboard_df['order_id'] = 'ORD_' + df.index.astype(str).str.zfill(6)
-
-            # 2. Ngày đơn hàng
-            if 'scraped_at' in df.columns:
-                dashboard_df['order_date'] = pd.to_datetime(df['scraped_at'], errors='coerce')
-            else:
-                dashboard_df['order_date'] = datetime.now()
-
-            # 3. Trạng thái từ col_7
-            status_mapping = {
-                'Xác nhận': 'confirmed',
-                'Hủy': 'cancelled',
-                'Chờ xử lý': 'pending',
-                'Hoàn thành': 'delivered',
-                'Giao hàng': 'delivered'
-            }
+            sla_rules = load_sla_rules(self.config.get('sla_config_path', 'config/sla_config.json'))
+            dashboard_df, projected_count = project_incremental(df, previous_df, sla_rules)
 
-            if 'col_7' in df.columns:
-                dashboard_df['status'] = df['col_7'].map(status_mapping).fillna('confirmed')
-            else:
-                dashboard_df['status'] = 'confirmed'
-
-            # 4. Vùng từ platform
-            region_mapping = {
-                'Shopee': 'TP.HCM',
-                'Tiktok': 'Hà Nội',
-                'MIA.vn website': 'TP.HCM',
-                'Lazada': 'Đà Nẵng',
-                'Sendo': 'Cần Thơ'
-            }
-
-            if 'col_18' in df.columns:
-                dashboard_df['region'] = df['col_18'].map(region_mapping).fillna('Khác')
-            else:
-                regions = ['TP.HCM', 'Hà Nội', 'Đà Nẵng', 'Cần Thơ', 'Hải Phòng', 'Khác']
-                dashboard_df['region'] = np.random.choice(regions, size=len(dashboard_df))
-
-            # 5. Giá trị đơn hàng từ col_16
-            if 'col_16' in df.columns:
-                price_clean = df['col_16'].astype(str).str.replace(',', '').str.replace('"', '')
-                price_clean = pd.to_numeric(price_clean, errors='coerce').fillna(0)
-                dashboard_df['order_value'] = price_clean
-            else:
-                dashboard_df['order_value'] = np.random.randint(100000, 5000000, size=len(dashboard_df))
-
-            # 6. Thời gian xác nhận và giao hàng (random realistic)
-            dashboard_df['confirm_hours'] = np.random.randint(1, 24, size=len(dashboard_df))
-            dashboard_df['delivery_hours'] = np.random.randint(12, 72, size=len(dashboard_df))
-
-            # 7. Xác nhận và giao hàng đúng hạn
-            dashboard_df['is_confirmed_ontime'] = np.random.choice([True, False], size=len(dashboard_df), p=[0.9, 0.1])
-            dashboard_df['is_delivered_ontime'] = np.random.choice([True, False], size=len(dashboard_df), p=[0.8, 0.2])
-
-            # 8. Loại khách hàng từ platform
-            customer_type_mapping = {
-                'Shopee': 'Regular',
-                'Tiktok': 'New',
-                'MIA.vn website': 'VIP',
-                'Lazada': 'Regular',
-                'Sendo': 'New'
-            }
-
-            if 'col_18' in df.columns:
-                dashboard_df['customer_type'] = df['col_18'].map(customer_type_mapping).fillna('Regular')
-            else:
-                customer_types = ['New', 'Regular', 'VIP']
-                dashboard_df['customer_type'] = np.random.choice(customer_types, size=len(dashboard_df))
-
-            # 9. Danh mục sản phẩm (random)
-            categories = ['Electronics', 'Fashion', 'Home', 'Beauty', 'Books', 'Sports']
-            dashboard_df['product_category'] = np.random.choice(categories, size=len(dashboard_df))
-
-            # 10. Thông tin bổ sung từ dữ liệu thật
-            if 'customer' in df.columns:
-                dashboard_df['customer_name'] = df['customer']
-
-            if 'col_13' in df.columns:
-                dashboard_df['shipping_method'] = df['col_13']
-
-            if 'col_18' in df.columns:
-                dashboard_df['platform'] = df['col_18']
-
-            # Làm sạch dữ liệu
-            dashboard_df = dashboard_df.fillna('')
-
-            self.logger.info(f"✅ Đã chuyển đổi {len(dashboard_df)} đơn hàng sang format dashboard")
+            self.logger.info(
+                f"✅ Đã chuyển đổi {projected_count} đơn hàng sang format dashboard "
+                f"(snapshot {len(dashboard_df)} đơn)"
+            )
             return dashboard_df
 
         except Exception as e:
@@ -23,6 +23,7 @@ import os
 
 # Import base automation
 from automation import OneAutomationSystem, SessionManager
+from line_items import build_line_items
 
 
 class EnhancedOneAutomationSystem(OneAutomationSystem):
@@ -44,6 +45,8 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
         self.session_data = {}
         self.session_manager = SessionManager()
         self.is_logged_in = False
+        self.order_index = self.setup_order_index()
+        self.catalog = self.setup_catalog()
         self.sla_monitor = self.setup_sla_monitor()
         self.sheets_config_service = self.setup_sheets_config()
 
@@ -85,6 +88,7 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
             # Try to load from Google Sheets first
             try:
                 from google_sheets_config import GoogleSheetsConfigService
+                from sheets_config_cache import log_cache_info
                 sheets_service = GoogleSheetsConfigService()
                 self.config = sheets_service.get_config_merged(config_path)
 
@@ -92,6 +96,7 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
                 metadata = self.config.get('_metadata', {})
                 config_source = metadata.get('config_source', 'unknown')
                 self.logger.info(f"✅ Configuration loaded from: {config_source}")
+                log_cache_info(self.logger, metadata)
 
                 if metadata.get('has_sheets_config'):
                     self.logger.info("📊 Google Sheets configuration active")
@@ -479,18 +484,8 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
             # Additional enhanced exports
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
 
-            # 1. Products-only CSV
-            if 'products' in df.columns:
-                try:
-                    products_df = self.create_products_export(df)
-                    products_filename = f"data/products_detail_{timestamp}.csv"
-                    products_df.to_csv(products_filename, index=False, encoding='utf-8-sig')
-                    export_files['products'] = products_filename
-                    self.logger.info(f"✅ Đã xuất Products CSV: {products_filename}")
-                except Exception as e:
-                    self.logger.error(f"❌ Lỗi xuất Products CSV: {e}")
-
-            # 2. Enhanced summary report
+            # Products CSV + tổng hợp SKU đã được xuất trong export_data()
+            # Enhanced summary report
             try:
                 enhanced_summary = f"data/enhanced_summary_{timestamp}.txt"
                 self.create_enhanced_summary(df, enhanced_summary)
@@ -508,24 +503,7 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
     def create_products_export(self, df):
         """Create products-only export"""
         try:
-            products_data = []
-
-            for _, row in df.iterrows():
-                order_id = row.get('id', '')
-                products = row.get('products', [])
-
-                if isinstance(products, list):
-                    for product in products:
-                        products_data.append({
-                            'order_id': order_id,
-                            'order_code': row.get('order_code', ''),
-                            'customer': row.get('customer', ''),
-                            'product_name': product.get('name', ''),
-                            'quantity': product.get('quantity', 0),
-                            'scraped_at': row.get('scraped_at', '')
-                        })
-
-            return pd.DataFrame(products_data)
+            return build_line_items(df)
 
         except Exception as e:
             self.logger.error(f"❌ Error creating products export: {e}")
@@ -610,6 +588,7 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
                 progress_callback("Xuất dữ liệu ENHANCED...", 85)
 
             export_files = self.export_enhanced_data(df)
+            self.commit_order_index(df, export_files)
 
             # Calculate enhanced metrics
             enhanced_count = len(df[df['product_count'] > 0]) if 'product_count' in df.columns else 0
@@ -618,6 +597,8 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
                 'success': True,
                 'order_count': len(df),
                 'enhanced_order_count': enhanced_count,
+                'change_summary': self.order_index.summarize(df),
+                'export_report': getattr(self, 'last_export_report', {}),
                 'export_files': export_files,
                 'end_time': datetime.now(),
                 'duration': (datetime.now() - result['start_time']).total_seconds()
@@ -659,6 +640,13 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
             if isinstance(raw_data, list) and raw_data:
                 processed_data = pd.DataFrame(raw_data)
                 self.logger.info(f"✅ Converted {len(processed_data)} orders to DataFrame")
+
+                # Dedupe by order key and classify new/changed/unchanged
+                if self.config.get('data_processing', {}).get('remove_duplicates', True):
+                    processed_data = self.order_index.deduplicate(processed_data)
+                    self.logger.info(
+                        f"🧹 Deduplicated: {len(processed_data)} orders {self.order_index.summarize(processed_data)}"
+                    )
             else:
                 self.logger.warning("⚠️ No raw data to process")
                 return pd.DataFrame(), None
@@ -783,9 +771,14 @@ class EnhancedOneAutomationSystem(OneAutomationSystem):
                 'automation_version': '2.1_enhanced'
             })
 
-            success = self.sheets_config_service.log_automation_run(enhanced_result)
+            # Cuối lần chạy: flush luôn để log không phải chờ chu kỳ của bộ ghi buffer
+            success = self.sheets_config_service.log_automation_run(enhanced_result, flush=True)
             if success:
-                self.logger.info("📊 Automation results logged to Google Sheets")
+                stats = self.sheets_config_service.flush_writes()
+                self.logger.info(
+                    f"📊 Automation results logged to Google Sheets "
+                    f"({stats.get('api_calls', 0)} API call, tiết kiệm {stats.get('api_calls_saved', 0)})"
+                )
             else:
                 self.logger.warning("⚠️ Failed to log to Google Sheets")
 
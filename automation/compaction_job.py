@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compaction Job Module
+Gộp file đơn hàng của từng lần chạy / từng trang vào kho Parquet lịch sử
+
+- Nguồn: orders_export_*.csv, june_2025_enhanced_page_*.json (định dạng cũ)
+  và archive trang JSONL nén; danh sách lấy từ catalog (file chưa gộp)
+- Mỗi file được nạp với thời điểm của lần chạy gốc để bản ghi mới nhất của
+  mỗi đơn luôn thắng khi loại trùng
+- Sau khi nạp, các phân vùng bị ảnh hưởng được compact (loại trùng theo order_key)
+"""
+
+import gzip
+import json
+import logging
+import os
+from datetime import date
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from artifact_catalog import SOURCE_KINDS, ArtifactCatalog, run_started_at
+from order_index import compute_order_keys
+from page_archive import PageArchive
+from parquet_store import PARQUET_AVAILABLE, ParquetOrderStore
+
+
+def _partition_day(path: str) -> Optional[date]:
+    """order_day của file .../order_day=YYYY-MM-DD/platform=.../part-*.parquet"""
+    day = os.path.basename(os.path.dirname(os.path.dirname(path))).split('=', 1)[-1]
+    try:
+        return date.fromisoformat(day)
+    except ValueError:
+        return None
+
+
+class CompactionJob:
+    """Gộp file nguồn chưa xử lý vào kho Parquet và cập nhật catalog"""
+
+    def __init__(self, catalog: Optional[ArtifactCatalog] = None,
+                 store: Optional[ParquetOrderStore] = None, data_dir: str = 'data'):
+        if not PARQUET_AVAILABLE:
+            raise ImportError("pyarrow chưa được cài đặt - pip install pyarrow")
+
+        self.logger = logging.getLogger('CompactionJob')
+        self.data_dir = data_dir
+        self.catalog = catalog or ArtifactCatalog(f'{data_dir}/catalog.db')
+        self.store = store or ParquetOrderStore(f'{data_dir}/parquet')
+
+    def load_source(self, entry: Dict) -> pd.DataFrame:
+        """Đọc một file nguồn thành DataFrame đơn hàng"""
+        path, kind = entry['path'], entry['kind']
+        if kind == 'csv':
+            return pd.read_csv(path, dtype=str, keep_default_na=False)
+        if kind == 'page_json':
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'rt', encoding='utf-8') as f:
+                return pd.DataFrame(json.load(f).get('orders', []))
+        if kind == 'page_archive':
+            archive = PageArchive.from_archive(path)
+            return pd.DataFrame(list(archive.iter_records()))
+        raise ValueError(f"Không hỗ trợ loại file nguồn: {kind}")
+
+    def run(self, scan: bool = True, compact: bool = True) -> Dict:
+        """
+        Chạy một lượt compaction
+
+        Args:
+            scan: import file cũ chưa có trong catalog trước khi xử lý
+            compact: gộp file nhỏ trong các phân vùng vừa ghi thêm
+        """
+        stats = {'files': 0, 'rows': 0, 'failed': [], 'partitions_compacted': 0}
+        if scan:
+            stats['scanned'] = self.catalog.scan_directory(self.data_dir)
+
+        pending = self.catalog.files(kinds=SOURCE_KINDS, consolidated=False)
+        consolidated: List[str] = []
+        touched_days: List[date] = []
+
+        for entry in pending:
+            try:
+                df = self.load_source(entry)
+                if not df.empty:
+                    if 'order_key' not in df.columns:
+                        df['order_key'] = compute_order_keys(df)
+                    written = self.store.append(
+                        df, run_id=f"{entry['run_id']}-{entry['kind']}",
+                        ingested_at=run_started_at(entry['run_id']) or entry['created_at']
+                    )
+                    touched_days.extend(filter(None, map(_partition_day, written)))
+                consolidated.append(entry['path'])
+                stats['files'] += 1
+                stats['rows'] += len(df)
+            except Exception as e:
+                self.logger.error(f"❌ Lỗi gộp {entry['path']}: {e}")
+                stats['failed'].append(entry['path'])
+
+        if consolidated:
+            self.catalog.mark_consolidated(consolidated)
+
+        if compact and touched_days:
+            result = self.store.compact(start=min(touched_days), end=max(touched_days))
+            stats['partitions_compacted'] = result['partitions']
+
+        self.logger.info(
+            f"🗜️ Compaction: {stats['files']} file, {stats['rows']} dòng, "
+            f"{stats['partitions_compacted']} phân vùng gộp, {len(stats['failed'])} lỗi"
+        )
+        return stats
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    print(json.dumps(CompactionJob().run(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,12 @@ import plotly.graph_objects as go
 from datetime import datetime
 import os
 
+try:
+    from parquet_store import PARQUET_AVAILABLE, ParquetOrderStore
+    from dashboard_projection import SOURCE_COLUMNS, build_dashboard_frame, load_sla_rules
+except ImportError:
+    PARQUET_AVAILABLE = False
+
 # Page config
 st.set_page_config(
     page_title="Warehouse Automation Dashboard",
@@ -18,10 +24,17 @@ st.set_page_config(
 st.title("🏭 Warehouse Automation Dashboard")
 st.markdown("---")
 
+# Khoảng thời gian: N ngày gần nhất đọc từ kho Parquet (chỉ phân vùng + cột cần)
+DAY_OPTIONS = {'7 ngày': 7, '14 ngày': 14, '30 ngày': 30, 'Snapshot mới nhất': None}
+selected_range = st.sidebar.selectbox("📅 Khoảng thời gian", list(DAY_OPTIONS), index=len(DAY_OPTIONS) - 1)
+
 # Load data
 @st.cache_data
-def load_data():
+def load_data(days=None):
     try:
+        if days and PARQUET_AVAILABLE and os.path.isdir('data/parquet/orders'):
+            raw_df = ParquetOrderStore('data/parquet').read_recent(days=days, columns=SOURCE_COLUMNS)
+            return build_dashboard_frame(raw_df, load_sla_rules('config/sla_config.json'))
         if os.path.exists('data/orders_latest.csv'):
             df = pd.read_csv('data/orders_latest.csv')
             return df
@@ -32,7 +45,7 @@ def load_data():
         st.error(f"❌ Lỗi đọc dữ liệu: {e}")
         return pd.DataFrame()
 
-df = load_data()
+df = load_data(DAY_OPTIONS[selected_range])
 
 if not df.empty:
     # Sidebar filters
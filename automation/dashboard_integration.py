@@ -10,6 +10,8 @@ import pandas as pd
 from datetime import datetime
 import os
 
+from artifact_publisher import ArtifactPublisher
+
 class DashboardIntegration:
     def __init__(self):
         self.data_dir = "data"
@@ -24,46 +26,36 @@ class DashboardIntegration:
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
 
         files_created = {}
+        publisher = ArtifactPublisher(self.data_dir)
 
-        # 1. Export orders với latest symlink
-        orders_file = f"{self.data_dir}/orders_dashboard_{timestamp}.csv"
-        latest_orders = f"{self.data_dir}/orders_latest.csv"
-
-        orders_df.to_csv(orders_file, index=False, encoding='utf-8-sig')
-        orders_df.to_csv(latest_orders, index=False, encoding='utf-8-sig')
+        # 1. Export orders (ghi một lần, orders_latest.csv trỏ nguyên tử tới file mới)
+        orders_file = publisher.publish_csv(
+            'orders', orders_df, f"orders_dashboard_{timestamp}.csv", latest_name="orders_latest.csv"
+        )
         files_created['orders'] = orders_file
 
         print(f"✅ Exported orders: {orders_file}")
 
         # 2. Export products nếu có
         if products_df is not None and not products_df.empty:
-            products_file = f"{self.data_dir}/products_detail_{timestamp}.csv"
-            latest_products = f"{self.data_dir}/products_latest.csv"
-
-            products_df.to_csv(products_file, index=False, encoding='utf-8-sig')
-            products_df.to_csv(latest_products, index=False, encoding='utf-8-sig')
+            products_file = publisher.publish_csv(
+                'products', products_df, f"products_detail_{timestamp}.csv", latest_name="products_latest.csv"
+            )
             files_created['products'] = products_file
 
             print(f"✅ Exported products: {products_file}")
 
         # 3. Export SLA data
         if sla_data:
-            sla_file = f"{self.data_dir}/sla_summary_{timestamp}.txt"
-            latest_sla = f"{self.data_dir}/sla_latest.txt"
-
             sla_content = self.format_sla_for_dashboard(sla_data)
-
-            with open(sla_file, 'w', encoding='utf-8') as f:
-                f.write(sla_content)
-
-            with open(latest_sla, 'w', encoding='utf-8') as f:
-                f.write(sla_content)
+            sla_file = publisher.publish_text(
+                'sla', sla_content, f"sla_summary_{timestamp}.txt", latest_name="sla_latest.txt"
+            )
 
             files_created['sla'] = sla_file
             print(f"✅ Exported SLA: {sla_file}")
 
         # 4. Export dashboard config
-        config_file = f"{self.data_dir}/dashboard_config.json"
         config = {
             'last_update': datetime.now().isoformat(),
             'files': files_created,
@@ -74,9 +66,8 @@ class DashboardIntegration:
                 'automation_version': '2.1_enhanced'
             }
         }
-
-        with open(config_file, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
+        config_file = publisher.publish_json('config', config, "dashboard_config.json")
+        publisher.write_manifest()
 
         files_created['config'] = config_file
         print(f"✅ Exported config: {config_file}")
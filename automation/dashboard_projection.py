@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dashboard Projection Module
+Chuyển dữ liệu đơn hàng thô sang format dashboard (vector hóa, không random)
+SLA tính từ timestamp thật, hỗ trợ cập nhật orders_latest.csv theo đơn thay đổi
+"""
+
+import json
+import os
+import re
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from line_items import PLATFORM_COLUMNS, first_present, resolve_platform, resolve_text
+from order_index import STATUS_UNCHANGED
+
+
+DASHBOARD_COLUMNS = [
+    'order_id', 'order_date', 'status', 'region', 'order_value',
+    'confirm_hours', 'delivery_hours', 'is_confirmed_ontime', 'is_delivered_ontime',
+    'handover_deadline', 'customer_type', 'product_category',
+    'customer_name', 'shipping_method', 'platform'
+]
+
+# Cột SLA trích từ format dashboard (sheet SLA trong file Excel)
+SLA_SHEET_COLUMNS = [
+    'order_id', 'platform', 'order_date', 'status', 'handover_deadline',
+    'confirm_hours', 'delivery_hours', 'is_confirmed_ontime', 'is_delivered_ontime'
+]
+
+STATUS_MAPPING = {
+    'Xác nhận': 'confirmed',
+    'Hủy': 'cancelled',
+    'Chờ xử lý': 'pending',
+    'Hoàn thành': 'delivered',
+    'Giao hàng': 'delivered'
+}
+
+REGION_MAPPING = {
+    'Shopee': 'TP.HCM',
+    'Tiktok': 'Hà Nội',
+    'MIA.vn website': 'TP.HCM',
+    'Lazada': 'Đà Nẵng',
+    'Sendo': 'Cần Thơ'
+}
+
+CUSTOMER_TYPE_MAPPING = {
+    'Shopee': 'Regular',
+    'Tiktok': 'New',
+    'MIA.vn website': 'VIP',
+    'Lazada': 'Regular',
+    'Sendo': 'New'
+}
+
+# Danh mục theo sản phẩm chính của đơn (kiểm tra theo thứ tự)
+CATEGORY_PATTERNS = [
+    ('Accessories', re.compile(r'cover|tag|bag|túi|charm|pack-it|strap|khóa|lock|pouch|organizer', re.IGNORECASE)),
+    ('Luggage', re.compile(r'vali|suitcase|luggage|_\d{2}"?\s+(?:XS|S|M|L|XL)\b', re.IGNORECASE)),
+]
+DEFAULT_CATEGORY = 'Other'
+
+# col_19: thời gian sàn TMĐT, col_20: thời gian tiếp nhận trên ONE
+ORDER_TIME_COLUMNS = ['created_datetime', 'col_19', 'col_20', 'scraped_at']
+CONFIRM_TIME_COLUMNS = ['confirmed_at', 'col_20']
+DELIVERY_TIME_COLUMNS = ['handover_time', 'delivered_at']
+REFERENCE_TIME_COLUMNS = ['scraped_at']
+
+# Cột nguồn cần đọc để dựng format dashboard (cho reader Parquet chỉ đọc cột cần)
+SOURCE_COLUMNS = sorted(set(
+    ['id', 'order_code', 'col_7', 'col_13', 'col_16', 'col_18', 'customer', 'api_amount',
+     'raw_product_detail', 'product_summary']
+    + PLATFORM_COLUMNS + ORDER_TIME_COLUMNS + CONFIRM_TIME_COLUMNS
+    + DELIVERY_TIME_COLUMNS + REFERENCE_TIME_COLUMNS
+))
+
+DEFAULT_SLA_RULES = {
+    'shopee': {'cutoff_time': '18:00', 'confirm_deadline': '09:00', 'handover_deadline': '12:00'},
+    'tiktok': {'cutoff_time': '14:00', 'handover_deadline': '21:00'},
+    'other': {'handover_deadline': '17:00'},
+}
+
+
+def load_sla_rules(config_path: str = 'config/sla_config.json') -> Dict[str, Dict[str, str]]:
+    """Đọc mốc giờ SLA từ sla_config.json (fallback DEFAULT_SLA_RULES)"""
+    rules = {key: dict(value) for key, value in DEFAULT_SLA_RULES.items()}
+    try:
+        if os.path.exists(config_path):
+            with open(config_path, 'r', encoding='utf-8') as f:
+                sla_config = json.load(f)
+            for platform in ('shopee', 'tiktok'):
+                section = sla_config.get(platform, {})
+                if section.get('cutoff_time'):
+                    rules[platform]['cutoff_time'] = section['cutoff_time']
+                rules[platform].update(section.get('rules', {}))
+            other = sla_config.get('other_platforms', {}).get('rules', {})
+            if other.get('default_deadline'):
+                rules['other']['handover_deadline'] = other['default_deadline']
+    except (OSError, ValueError):
+        pass
+    return rules
+
+
+def _parse_first(df: pd.DataFrame, candidates) -> pd.Series:
+    """Datetime đầu tiên parse được theo thứ tự cột ưu tiên"""
+    result = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    for col in reversed(candidates):
+        if col in df.columns:
+            parsed = pd.to_datetime(df[col], errors='coerce')
+            result = parsed.where(parsed.notna(), result)
+    return result
+
+
+def _clock(value: Optional[str]) -> Optional[pd.Timedelta]:
+    return pd.Timedelta(f'{value}:00') if value else None
+
+
+def _platform_key(platform: pd.Series) -> pd.Series:
+    lowered = platform.str.lower()
+    return pd.Series(
+        np.select([lowered.str.contains('shopee', na=False), lowered.str.contains('tiktok', na=False)],
+                  ['shopee', 'tiktok'], default='other'),
+        index=platform.index
+    )
+
+
+def compute_sla_deadlines(order_time: pd.Series, platform_key: pd.Series, rules) -> pd.DataFrame:
+    """
+    Tính deadline xác nhận / bàn giao cho từng đơn
+
+    Đơn trước giờ cutoff phải xử lý trong ngày N (trước giờ cutoff),
+    đơn sau cutoff theo mốc giờ của ngày N+1. Sàn khác: trước
+    default_deadline trong ngày, đặt sau giờ đó thì sang ngày hôm sau.
+    """
+    day = order_time.dt.normalize()
+    time_of_day = order_time - day
+    confirm_deadline = pd.Series(pd.NaT, index=order_time.index, dtype='datetime64[ns]')
+    handover_deadline = pd.Series(pd.NaT, index=order_time.index, dtype='datetime64[ns]')
+
+    for key, rule in rules.items():
+        mask = platform_key == key
+        if not mask.any():
+            continue
+
+        handover = _clock(rule.get('handover_deadline'))
+        confirm = _clock(rule.get('confirm_deadline'))
+        cutoff = _clock(rule.get('cutoff_time'))
+
+        if cutoff is None:
+            next_day = time_of_day[mask] > handover
+            deadline_day = day[mask] + pd.to_timedelta(next_day.astype(int), unit='D')
+            handover_deadline[mask] = deadline_day + handover
+            continue
+
+        after_cutoff = time_of_day[mask] >= cutoff
+        next_day = day[mask] + pd.Timedelta(days=1)
+        same_day_cutoff = day[mask] + cutoff
+        handover_deadline[mask] = (next_day + handover).where(after_cutoff, same_day_cutoff)
+        if confirm is not None:
+            confirm_deadline[mask] = (next_day + confirm).where(after_cutoff, same_day_cutoff)
+
+    return pd.DataFrame({
+        'confirm_deadline': confirm_deadline.fillna(handover_deadline),
+        'handover_deadline': handover_deadline,
+    })
+
+
+def _hours_between(start: pd.Series, end: pd.Series) -> pd.Series:
+    return ((end - start).dt.total_seconds() / 3600).round(2)
+
+
+def _ontime(done_at: pd.Series, deadline: pd.Series, reference: pd.Series) -> pd.Series:
+    """True/False khi đã biết kết quả, rỗng khi đơn còn trong hạn"""
+    result = pd.Series(pd.NA, index=deadline.index, dtype='boolean')
+    done = done_at.notna() & deadline.notna()
+    result[done] = done_at[done] <= deadline[done]
+    missed = done_at.isna() & deadline.notna() & (reference > deadline)
+    result[missed] = False
+    return result
+
+
+def _primary_product(df: pd.DataFrame) -> pd.Series:
+    """Tên sản phẩm đầu tiên của đơn (raw_product_detail hoặc product_summary)"""
+    text = resolve_text(df, ['raw_product_detail', 'product_summary'])
+    return text.str.split(r'[,;]', n=1, regex=True).str[0].str.strip()
+
+
+def categorize_products(product_names: pd.Series) -> pd.Series:
+    """Gán danh mục theo CATEGORY_PATTERNS (vector hóa)"""
+    conditions = [product_names.str.contains(pattern, na=False) for _, pattern in CATEGORY_PATTERNS]
+    choices = [category for category, _ in CATEGORY_PATTERNS]
+    return pd.Series(np.select(conditions, choices, default=DEFAULT_CATEGORY), index=product_names.index)
+
+
+def _parse_amount(values: pd.Series) -> pd.Series:
+    cleaned = values.astype(str).str.replace(r'[^0-9.\-]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce').fillna(0)
+
+
+def dashboard_order_ids(df: pd.DataFrame) -> pd.Series:
+    """Mã đơn dùng trên dashboard (order_code, fallback id)"""
+    ids = resolve_text(df, ['order_code', 'id'])
+    fallback = 'ORD_' + pd.Series(df.index.astype(str), index=df.index).str.zfill(6)
+    return ids.where(ids != '', fallback)
+
+
+def build_dashboard_frame(df: pd.DataFrame, sla_rules=None) -> pd.DataFrame:
+    """Tạo DataFrame format dashboard từ dữ liệu đơn hàng thô"""
+    if df.empty:
+        return pd.DataFrame(columns=DASHBOARD_COLUMNS)
+
+    sla_rules = sla_rules or DEFAULT_SLA_RULES
+    platform = resolve_platform(df)
+    has_platform = first_present(df, PLATFORM_COLUMNS) is not None
+
+    order_time = _parse_first(df, ORDER_TIME_COLUMNS)
+    confirm_time = _parse_first(df, CONFIRM_TIME_COLUMNS)
+    delivery_time = _parse_first(df, DELIVERY_TIME_COLUMNS)
+    reference_time = _parse_first(df, REFERENCE_TIME_COLUMNS).fillna(pd.Timestamp.now())
+
+    # col_20 chỉ là thời điểm tiếp nhận khi có thời gian sàn riêng (col_19)
+    if 'confirmed_at' not in df.columns and 'col_19' in df.columns:
+        confirm_time = confirm_time.where(pd.to_datetime(df['col_19'], errors='coerce').notna())
+
+    deadlines = compute_sla_deadlines(order_time, _platform_key(platform), sla_rules)
+
+    dashboard_df = pd.DataFrame(index=df.index)
+    dashboard_df['order_id'] = dashboard_order_ids(df)
+    dashboard_df['order_date'] = order_time
+    dashboard_df['status'] = (
+        df['col_7'].map(STATUS_MAPPING).fillna('confirmed') if 'col_7' in df.columns else 'confirmed'
+    )
+    dashboard_df['region'] = platform.map(REGION_MAPPING).fillna('Khác') if has_platform else 'Khác'
+
+    amount_column = 'col_16' if 'col_16' in df.columns else ('api_amount' if 'api_amount' in df.columns else None)
+    dashboard_df['order_value'] = _parse_amount(df[amount_column]) if amount_column else 0
+
+    dashboard_df['confirm_hours'] = _hours_between(order_time, confirm_time)
+    dashboard_df['delivery_hours'] = _hours_between(order_time, delivery_time)
+    dashboard_df['is_confirmed_ontime'] = _ontime(confirm_time, deadlines['confirm_deadline'], reference_time)
+    dashboard_df['is_delivered_ontime'] = _ontime(delivery_time, deadlines['handover_deadline'], reference_time)
+    dashboard_df['handover_deadline'] = deadlines['handover_deadline']
+
+    dashboard_df['customer_type'] = (
+        platform.map(CUSTOMER_TYPE_MAPPING).fillna('Regular') if has_platform else 'Regular'
+    )
+    dashboard_df['product_category'] = categorize_products(_primary_product(df))
+
+    if 'customer' in df.columns:
+        dashboard_df['customer_name'] = df['customer']
+    if 'col_13' in df.columns:
+        dashboard_df['shipping_method'] = df['col_13']
+    if 'col_18' in df.columns:
+        dashboard_df['platform'] = df['col_18']
+
+    columns = [col for col in DASHBOARD_COLUMNS if col in dashboard_df.columns]
+    return dashboard_df[columns].astype(object).fillna('').reset_index(drop=True)
+
+
+def _sort_snapshot(snapshot: pd.DataFrame) -> pd.DataFrame:
+    """Sắp xếp ổn định: đơn mới nhất trước, cùng thời gian thì theo mã đơn"""
+    sort_date = pd.to_datetime(snapshot['order_date'], errors='coerce')
+    order = (
+        pd.DataFrame({'date': sort_date, 'order_id': snapshot['order_id'].astype(str)})
+        .sort_values(['date', 'order_id'], ascending=[False, True], kind='stable')
+        .index
+    )
+    return snapshot.loc[order].reset_index(drop=True)
+
+
+SLA_FLAG_COLUMNS = ['is_confirmed_ontime', 'is_delivered_ontime']
+
+
+def _open_sla_ids(previous: pd.DataFrame) -> pd.Series:
+    """Mã đơn trong snapshot cũ còn cờ SLA chưa chốt (rỗng - kết quả phụ thuộc scraped_at)"""
+    if not all(col in previous.columns for col in SLA_FLAG_COLUMNS):
+        return previous['order_id']
+    flags = previous[SLA_FLAG_COLUMNS].fillna('').astype(str)
+    return previous.loc[(flags == '').any(axis=1), 'order_id']
+
+
+def project_incremental(df: pd.DataFrame, previous: Optional[pd.DataFrame], sla_rules=None):
+    """
+    Chỉ chiếu lại các đơn mới/thay đổi rồi ghép vào snapshot trước đó
+
+    Đơn `unchanged` (theo OrderIndex) đã có trong snapshot cũ được giữ nguyên,
+    trừ khi cờ SLA còn rỗng (chưa quá hạn ở lần trước - phải tính lại theo
+    scraped_at mới); đơn chưa có trong snapshot luôn được chiếu lại. Đơn không còn trong lần scrape
+    này (đã xuất kho/hủy) bị bỏ khỏi snapshot. Trả về (snapshot, số đơn chiếu lại).
+    """
+    if previous is None or previous.empty or 'order_id' not in previous.columns \
+            or 'change_status' not in df.columns:
+        projected = build_dashboard_frame(df, sla_rules)
+        return _sort_snapshot(projected), len(projected)
+
+    previous = previous.astype({'order_id': str})
+    order_ids = dashboard_order_ids(df)
+    needs_projection = (
+        (df['change_status'] != STATUS_UNCHANGED)
+        | ~order_ids.isin(previous['order_id'])
+        | order_ids.isin(_open_sla_ids(previous))
+    )
+
+    projected = build_dashboard_frame(df[needs_projection], sla_rules)
+    # Chỉ giữ dòng cũ của đơn có mặt trong lần scrape này và không đổi
+    unchanged_ids = order_ids[~needs_projection]
+    kept = previous[previous['order_id'].isin(unchanged_ids) & ~previous['order_id'].isin(projected['order_id'])]
+    kept = kept.drop_duplicates('order_id', keep='last')
+    snapshot = pd.concat([kept, projected], ignore_index=True).fillna('')
+    return _sort_snapshot(snapshot), len(projected)
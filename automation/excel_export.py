@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel Export Module
+Xuất Excel nhiều sheet dạng streaming (xlsxwriter constant_memory)
+
+Dữ liệu được ghi lần lượt từng dòng nên bộ nhớ không tăng theo số dòng;
+độ rộng cột được tính trước bằng pandas (lấy mẫu với bảng lớn) thay vì
+duyệt từng ô sau khi ghi.
+"""
+
+import json
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+try:
+    import xlsxwriter
+    XLSXWRITER_AVAILABLE = True
+except ImportError:
+    XLSXWRITER_AVAILABLE = False
+
+
+# Giới hạn của Excel
+EXCEL_MAX_ROWS = 1_048_576
+SHEET_NAME_MAX_LENGTH = 31
+
+MAX_COLUMN_WIDTH = 50
+WIDTH_SAMPLE_ROWS = 5_000
+
+
+def column_widths(df: pd.DataFrame, sample_rows: int = WIDTH_SAMPLE_ROWS,
+                  max_width: int = MAX_COLUMN_WIDTH) -> List[int]:
+    """Độ rộng cột = độ dài chuỗi lớn nhất (header + mẫu dữ liệu) + 2"""
+    sample = df.sample(n=sample_rows, random_state=0) if len(df) > sample_rows else df
+    widths = []
+    for col in df.columns:
+        header_length = len(str(col))
+        values = sample[col]
+        data_length = values.astype(str).str.len().max() if len(values) else 0
+        data_length = 0 if pd.isna(data_length) else int(data_length)
+        widths.append(min(max(header_length, data_length) + 2, max_width))
+    return widths
+
+
+def _cell_value(value):
+    """Chuẩn hóa một giá trị cho xlsxwriter (NaN → ô trống, list/dict → JSON)"""
+    if isinstance(value, (list, dict, tuple, set)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    if value is None or (pd.api.types.is_scalar(value) and pd.isna(value)):
+        return None
+    return value
+
+
+def _sheet_chunks(name: str, df: pd.DataFrame):
+    """Chia bảng vượt giới hạn dòng Excel thành nhiều sheet"""
+    capacity = EXCEL_MAX_ROWS - 1  # trừ dòng header
+    if len(df) <= capacity:
+        yield name[:SHEET_NAME_MAX_LENGTH], df
+        return
+    for part, start in enumerate(range(0, len(df), capacity), 1):
+        suffix = f' ({part})'
+        yield name[:SHEET_NAME_MAX_LENGTH - len(suffix)] + suffix, df.iloc[start:start + capacity]
+
+
+def write_workbook(path: str, sheets: Dict[str, Optional[pd.DataFrame]],
+                   sample_rows: int = WIDTH_SAMPLE_ROWS) -> Dict[str, int]:
+    """
+    Ghi nhiều DataFrame vào một workbook ở chế độ constant_memory
+
+    Args:
+        path: đường dẫn file .xlsx
+        sheets: {tên sheet: DataFrame}, sheet rỗng/None bị bỏ qua
+        sample_rows: số dòng lấy mẫu để tính độ rộng cột
+
+    Returns:
+        {tên sheet: số dòng đã ghi}
+    """
+    if not XLSXWRITER_AVAILABLE:
+        raise ImportError("xlsxwriter chưa được cài đặt - pip install xlsxwriter")
+
+    workbook = xlsxwriter.Workbook(path, {
+        'constant_memory': True,
+        'strings_to_urls': False,
+        'strings_to_formulas': False,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+        'remove_timezone': True,
+    })
+    header_format = workbook.add_format({'bold': True, 'bg_color': '#DCE6F1', 'border': 1})
+
+    written = {}
+    try:
+        for name, frame in sheets.items():
+            if frame is None or frame.empty:
+                continue
+
+            for sheet_name, chunk in _sheet_chunks(name, frame):
+                worksheet = workbook.add_worksheet(sheet_name)
+                for col_idx, width in enumerate(column_widths(chunk, sample_rows)):
+                    worksheet.set_column(col_idx, col_idx, width)
+                worksheet.freeze_panes(1, 0)
+
+                # constant_memory: phải ghi theo thứ tự từng dòng; giá trị được
+                # chuẩn hóa theo từng dòng thay vì tạo bản sao object của cả chunk
+                worksheet.write_row(0, 0, [str(col) for col in chunk.columns], header_format)
+                for row_idx, row in enumerate(chunk.itertuples(index=False, name=None), 1):
+                    worksheet.write_row(row_idx, 0, [_cell_value(value) for value in row])
+
+                written[sheet_name] = len(chunk)
+    finally:
+        workbook.close()
+
+    return written
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Export Scheduler Module
+Chạy song song các bước xuất dữ liệu độc lập (CSV, dashboard, Excel, JSON, Parquet)
+
+- Mỗi task có thể phụ thuộc task khác, nhận kết quả của các task đó làm tham số
+- Task bắt buộc luôn được chờ; task tùy chọn (optional) bị bỏ lại nếu quá deadline
+  (vẫn chạy nốt ở background, kết quả trễ được báo qua late_callback)
+- Thời gian chạy của từng task được ghi lại để báo cáo trong kết quả lần chạy
+"""
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+STATUS_OK = 'ok'
+STATUS_ERROR = 'error'
+STATUS_TIMEOUT = 'timeout'
+STATUS_SKIPPED = 'skipped'
+
+
+class ExportScheduler:
+    """Lập lịch các task xuất dữ liệu trên thread pool"""
+
+    def __init__(self, max_workers: int = 4, deadline_seconds: Optional[float] = None,
+                 logger: Optional[logging.Logger] = None):
+        self.max_workers = max_workers
+        self.deadline_seconds = deadline_seconds
+        self.logger = logger or logging.getLogger('ExportScheduler')
+        self.tasks: Dict[str, Dict] = {}
+
+    def add(self, name: str, func: Callable[..., Any], depends_on: Iterable[str] = (),
+            optional: bool = False):
+        """
+        Thêm task
+
+        Args:
+            func: hàm nhận keyword args là kết quả các task phụ thuộc (None nếu task đó lỗi)
+            depends_on: tên các task phải xong trước
+            optional: task có thể bị bỏ lại khi quá deadline
+        """
+        self.tasks[name] = {'func': func, 'depends_on': tuple(depends_on), 'optional': optional}
+
+    def _timed(self, name: str, func: Callable, kwargs: Dict, timings: Dict):
+        start = time.perf_counter()
+        try:
+            return func(**kwargs)
+        finally:
+            timings[name] = round(time.perf_counter() - start, 3)
+
+    def run(self, late_callback: Optional[Callable[[str, Any], None]] = None) -> Dict:
+        """
+        Chạy toàn bộ task
+
+        Returns:
+            {'results': {name: kết quả}, 'status': {name: ok/error/timeout/skipped},
+             'timings': {name: giây}, 'elapsed': tổng giây,
+             'required_ok': mọi task bắt buộc đều ok}
+        """
+        started = time.perf_counter()
+        results, status, timings = {}, {}, {}
+        futures = {}
+        pending = dict(self.tasks)
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='export')
+
+        def submit_ready():
+            for name, task in list(pending.items()):
+                if all(dep in status for dep in task['depends_on']):
+                    kwargs = {dep: results.get(dep) for dep in task['depends_on']}
+                    futures[executor.submit(self._timed, name, task['func'], kwargs, timings)] = name
+                    del pending[name]
+
+        try:
+            submit_ready()
+            while futures or pending:
+                remaining = None
+                if self.deadline_seconds is not None:
+                    remaining = max(self.deadline_seconds - (time.perf_counter() - started), 0)
+
+                required_left = any(not self.tasks[name]['optional'] for name in futures.values()) or \
+                    any(not task['optional'] for task in pending.values())
+                if remaining == 0 and not required_left:
+                    break
+
+                if not futures:
+                    # Task còn lại phụ thuộc task chưa có (tên sai) - bỏ qua
+                    for name in pending:
+                        status[name] = STATUS_SKIPPED
+                    pending.clear()
+                    break
+
+                done, _ = wait(list(futures), timeout=None if required_left else remaining,
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = futures.pop(future)
+                    try:
+                        results[name] = future.result()
+                        status[name] = STATUS_OK
+                    except Exception as e:
+                        self.logger.error(f"❌ Export task {name} lỗi: {e}")
+                        results[name] = None
+                        status[name] = STATUS_ERROR
+                submit_ready()
+
+            # Quá deadline: bỏ lại task tùy chọn
+            for name in pending:
+                status[name] = STATUS_SKIPPED
+            for future, name in futures.items():
+                status[name] = STATUS_TIMEOUT
+                self.logger.warning(f"⏱️ Export task {name} vượt deadline {self.deadline_seconds}s - chạy tiếp ở background")
+                if late_callback:
+                    future.add_done_callback(
+                        lambda f, n=name: late_callback(n, f.result())
+                        if not f.cancelled() and f.exception() is None else None
+                    )
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return {
+            'results': results,
+            'status': status,
+            'timings': dict(timings),
+            'elapsed': round(time.perf_counter() - started, 3),
+            'required_ok': all(status.get(name) == STATUS_OK
+                               for name, task in self.tasks.items() if not task['optional']),
+        }
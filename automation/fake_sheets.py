@@ -0,0 +1,595 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fake Sheets Module
+Backend Google Sheets giả lập trong process (tương thích gspread) cho test/benchmark
+
+- FakeSheetsClient.open_by_key() trả về spreadsheet lưu trong bộ nhớ; Worksheet
+  hỗ trợ các call mà service đang dùng: get_all_records, get_all_values,
+  row_values, append_row(s), update, batch_update, update_cell, clear, resize...
+  và ở mức spreadsheet: worksheets, worksheet, add_worksheet, values_get,
+  values_batch_get, values_update, values_batch_update, values_append
+- Mỗi call là một "API request": có độ trễ cấu hình được (theo read/write),
+  quota theo cửa sổ 60s (vượt quota → APIError 429 như Google) và được đếm
+  theo tên method/sheet để đo số call của từng luồng (login, config, log...)
+- install() đăng ký client giả vào sheets_client: GoogleSheetsConfigService,
+  AuthenticationService... chỉ cần credentials_path=FAKE_CREDENTIALS
+
+Ví dụ:
+    backend = FakeSheetsBackend(latency={'read': 0.1, 'write': 0.2})
+    credentials_path = install(backend)
+    auth = AuthenticationService(spreadsheet_id='bench', credentials_path=credentials_path)
+    backend.reset_stats()
+    auth.authenticate_user('admin@mia.vn', '123456')
+    print(backend.stats())
+"""
+
+import collections
+import functools
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import gspread
+
+from sheets_client import column_letter
+
+
+FAKE_CREDENTIALS = 'fake://sheets'
+
+READ = 'read'
+WRITE = 'write'
+
+_RANGE_RE = re.compile(r'^([A-Za-z]{0,3})(\d*)$')
+_INT_RE = re.compile(r'^-?\d+$')
+_FLOAT_RE = re.compile(r'^-?\d+\.\d+$')
+
+
+class _FakeResponse:
+    """Response tối thiểu để tạo gspread APIError (status_code + json())"""
+
+    def __init__(self, status_code: int, message: str):
+        self.status_code = status_code
+        self.text = message
+        self._payload = {'error': {'code': status_code, 'message': message, 'status': 'FAKE'}}
+
+    def json(self):
+        return self._payload
+
+
+def api_error(status_code: int, message: str) -> gspread.exceptions.APIError:
+    return gspread.exceptions.APIError(_FakeResponse(status_code, message))
+
+
+def _column_index(letters: str) -> int:
+    index = 0
+    for char in letters.upper():
+        index = index * 26 + ord(char) - 64
+    return index
+
+
+def parse_range(range_a1: str) -> Tuple[Optional[str], int, int, Optional[int], Optional[int]]:
+    """
+    'Sheet'!A2:C10 → (sheet, 2, 1, 10, 3); đầu mút để trống ('A:C', 'A2:C') là None
+
+    Returns:
+        (sheet_title hoặc None, first_row, first_col, last_row, last_col)
+    """
+    sheet_title = None
+    if '!' in range_a1:
+        sheet_title, range_a1 = range_a1.rsplit('!', 1)
+    elif not _RANGE_RE.match(range_a1.partition(':')[0].strip()):
+        # Chỉ có tên sheet ('Config') = toàn bộ sheet
+        sheet_title, range_a1 = range_a1, ''
+    if sheet_title and sheet_title.startswith("'") and sheet_title.endswith("'"):
+        sheet_title = sheet_title[1:-1].replace("''", "'")
+    if not range_a1:
+        return sheet_title, 1, 1, None, None
+    start, _, end = range_a1.partition(':')
+
+    start_match = _RANGE_RE.match(start.strip())
+    if not start_match:
+        raise api_error(400, f'Unable to parse range: {range_a1}')
+    first_col = _column_index(start_match.group(1)) if start_match.group(1) else 1
+    first_row = int(start_match.group(2)) if start_match.group(2) else 1
+
+    if not end:
+        # Một ô ('B3') hoặc cả cột/dòng ('B', '3')
+        last_row = first_row if start_match.group(2) else None
+        last_col = first_col if start_match.group(1) else None
+        return sheet_title, first_row, first_col, last_row, last_col
+
+    end_match = _RANGE_RE.match(end.strip())
+    if not end_match:
+        raise api_error(400, f'Unable to parse range: {range_a1}')
+    last_col = _column_index(end_match.group(1)) if end_match.group(1) else None
+    last_row = int(end_match.group(2)) if end_match.group(2) else None
+    return sheet_title, first_row, first_col, last_row, last_col
+
+
+def _to_cell(value: Any) -> str:
+    """Giá trị lưu trong ô (Sheets trả về chuỗi đã định dạng)"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    return str(value)
+
+
+def _numericise(value: str) -> Union[int, float, str]:
+    """Giống get_all_records của gspread: chuỗi số thành int/float"""
+    if _INT_RE.match(value):
+        return int(value)
+    if _FLOAT_RE.match(value):
+        return float(value)
+    return value
+
+
+def _api(kind: str):
+    """Đánh dấu method là một API request: độ trễ, quota, đếm call"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            self._backend._request(kind, func.__name__, self._sheet_label())
+            return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class FakeSheetsBackend:
+    """Kho dữ liệu + mô hình độ trễ/quota/thống kê dùng chung cho mọi client giả"""
+
+    def __init__(self, latency: Union[float, Dict[str, float]] = 0.0, jitter: float = 0.0,
+                 quotas: Optional[Dict[str, int]] = None, auto_create: bool = True,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            latency: giây mỗi request, hoặc {'read': s, 'write': s}
+            jitter: độ trễ ngẫu nhiên thêm vào, 0..jitter giây
+            quotas: {'read': n, 'write': n} request/phút (None = không giới hạn)
+            auto_create: open_by_key tạo spreadsheet rỗng nếu chưa có
+        """
+        if isinstance(latency, dict):
+            self.latency = {READ: latency.get(READ, 0.0), WRITE: latency.get(WRITE, 0.0)}
+        else:
+            self.latency = {READ: latency, WRITE: latency}
+        self.jitter = jitter
+        self.quotas = quotas or {}
+        self.auto_create = auto_create
+        self._random = random.Random(seed)
+
+        self.lock = threading.RLock()
+        self._spreadsheets: Dict[str, 'FakeSpreadsheet'] = {}
+        self._windows: Dict[str, collections.deque] = {READ: collections.deque(), WRITE: collections.deque()}
+        self.reset_stats()
+
+    # ---------------------------------------------------------- spreadsheets
+
+    def create_spreadsheet(self, spreadsheet_id: str, sheets: Optional[Dict[str, List[List[Any]]]] = None,
+                           title: Optional[str] = None) -> 'FakeSpreadsheet':
+        """Tạo (hoặc thay) spreadsheet với dữ liệu ban đầu {tên sheet: các dòng} - không tính là request"""
+        with self.lock:
+            spreadsheet = FakeSpreadsheet(self, spreadsheet_id, title or spreadsheet_id)
+            self._spreadsheets[spreadsheet_id] = spreadsheet
+            for sheet_title, rows in (sheets or {}).items():
+                spreadsheet._create_worksheet(sheet_title, max(len(rows), 100), 26)._write(1, 1, rows)
+            return spreadsheet
+
+    def get_spreadsheet(self, spreadsheet_id: str) -> 'FakeSpreadsheet':
+        with self.lock:
+            spreadsheet = self._spreadsheets.get(spreadsheet_id)
+            if spreadsheet is None:
+                if not self.auto_create:
+                    raise gspread.SpreadsheetNotFound(spreadsheet_id)
+                spreadsheet = self.create_spreadsheet(spreadsheet_id)
+            return spreadsheet
+
+    # -------------------------------------------------------------- requests
+
+    def _request(self, kind: str, method: str, sheet: Optional[str]):
+        """Ghi nhận một request: kiểm tra quota rồi mô phỏng độ trễ mạng (ngoài lock)"""
+        with self.lock:
+            now = time.monotonic()
+            limit = self.quotas.get(kind)
+            if limit:
+                window = self._windows[kind]
+                while window and now - window[0] >= 60:
+                    window.popleft()
+                if len(window) >= limit:
+                    self._stats['throttled'] += 1
+                    raise api_error(429, f'Quota exceeded for {kind} requests per minute (fake)')
+                window.append(now)
+
+            self._stats['requests'] += 1
+            self._stats[kind] += 1
+            self._stats['calls'][method] += 1
+            self._stats['targets'][f'{sheet}.{method}' if sheet else method] += 1
+
+        delay = self.latency[kind] + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+            with self.lock:
+                self._stats['simulated_latency'] += delay
+
+    def reset_stats(self):
+        with self.lock:
+            self._stats = {
+                'requests': 0,
+                READ: 0,
+                WRITE: 0,
+                'throttled': 0,
+                'simulated_latency': 0.0,
+                'calls': collections.Counter(),
+                'targets': collections.Counter(),
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        {'requests', 'read', 'write', 'throttled', 'simulated_latency',
+         'calls': {method: n}, 'targets': {'Sheet.method' hoặc method: n}}
+        """
+        with self.lock:
+            result = dict(self._stats)
+            result['calls'] = dict(self._stats['calls'])
+            result['targets'] = dict(self._stats['targets'])
+            result['simulated_latency'] = round(self._stats['simulated_latency'], 3)
+            return result
+
+
+class FakeSheetsClient:
+    """Thay cho gspread.Client"""
+
+    def __init__(self, backend: Optional[FakeSheetsBackend] = None):
+        self.backend = backend or FakeSheetsBackend()
+        self._backend = self.backend
+
+    def _sheet_label(self) -> Optional[str]:
+        return None
+
+    @_api(READ)
+    def open_by_key(self, key: str) -> 'FakeSpreadsheet':
+        return self.backend.get_spreadsheet(key)
+
+
+class FakeSpreadsheet:
+    """Thay cho gspread.Spreadsheet"""
+
+    def __init__(self, backend: FakeSheetsBackend, spreadsheet_id: str, title: str):
+        self._backend = backend
+        self.id = spreadsheet_id
+        self.title = title
+        self._worksheets: Dict[str, 'FakeWorksheet'] = {}
+        self._next_sheet_id = 0
+        self._updated = datetime.now(timezone.utc)
+
+    def _sheet_label(self) -> Optional[str]:
+        return None
+
+    def _touch(self):
+        self._updated = datetime.now(timezone.utc)
+
+    def _create_worksheet(self, title: str, rows: int, cols: int) -> 'FakeWorksheet':
+        with self._backend.lock:
+            if title in self._worksheets:
+                raise api_error(400, f'A sheet with the name "{title}" already exists')
+            worksheet = FakeWorksheet(self, self._next_sheet_id, title, rows, cols)
+            self._next_sheet_id += 1
+            self._worksheets[title] = worksheet
+            self._touch()
+            return worksheet
+
+    def _resolve(self, range_a1: str) -> Tuple['FakeWorksheet', int, int, Optional[int], Optional[int]]:
+        sheet_title, first_row, first_col, last_row, last_col = parse_range(range_a1)
+        with self._backend.lock:
+            if sheet_title is None:
+                if not self._worksheets:
+                    raise api_error(400, f'Unable to parse range: {range_a1}')
+                worksheet = next(iter(self._worksheets.values()))
+            else:
+                worksheet = self._worksheets.get(sheet_title)
+                if worksheet is None:
+                    raise api_error(400, f'Unable to parse range: {range_a1}')
+        return worksheet, first_row, first_col, last_row, last_col
+
+    # ------------------------------------------------------------- metadata
+
+    @_api(READ)
+    def worksheets(self) -> List['FakeWorksheet']:
+        with self._backend.lock:
+            return list(self._worksheets.values())
+
+    @_api(READ)
+    def worksheet(self, title: str) -> 'FakeWorksheet':
+        with self._backend.lock:
+            worksheet = self._worksheets.get(title)
+        if worksheet is None:
+            raise gspread.WorksheetNotFound(title)
+        return worksheet
+
+    @_api(WRITE)
+    def add_worksheet(self, title: str, rows: int = 100, cols: int = 26, index: Optional[int] = None) -> 'FakeWorksheet':
+        return self._create_worksheet(title, int(rows), int(cols))
+
+    @_api(WRITE)
+    def del_worksheet(self, worksheet: 'FakeWorksheet'):
+        with self._backend.lock:
+            self._worksheets.pop(worksheet.title, None)
+            self._touch()
+
+    @property
+    def lastUpdateTime(self) -> str:
+        return self._updated.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+    @_api(READ)
+    def get_lastUpdateTime(self) -> str:
+        return self.lastUpdateTime
+
+    # --------------------------------------------------------------- values
+
+    @_api(READ)
+    def values_get(self, range: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        worksheet, *bounds = self._resolve(range)
+        return {'range': range, 'values': worksheet._read(*bounds)}
+
+    @_api(READ)
+    def values_batch_get(self, ranges: Sequence[str], params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        value_ranges = []
+        for range_a1 in ranges:
+            worksheet, *bounds = self._resolve(range_a1)
+            value_ranges.append({'range': range_a1, 'values': worksheet._read(*bounds)})
+        return {'spreadsheetId': self.id, 'valueRanges': value_ranges}
+
+    @_api(WRITE)
+    def values_update(self, range: str, params: Optional[Dict[str, Any]] = None,
+                      body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        worksheet, first_row, first_col, _, _ = self._resolve(range)
+        values = (body or {}).get('values', [])
+        worksheet._write(first_row, first_col, values)
+        return {'updatedRange': range, 'updatedRows': len(values)}
+
+    @_api(WRITE)
+    def values_batch_update(self, body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        data = (body or {}).get('data', [])
+        # Kiểm tra mọi range trước khi ghi: request lỗi không ghi một phần
+        targets = [(self._resolve(entry['range']), entry.get('values', [])) for entry in data]
+        for (worksheet, first_row, first_col, _, _), values in targets:
+            worksheet._write(first_row, first_col, values)
+        return {'totalUpdatedRows': sum(len(values) for _, values in targets)}
+
+    @_api(WRITE)
+    def values_append(self, range: str, params: Optional[Dict[str, Any]] = None,
+                      body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        worksheet, _, _, _, _ = self._resolve(range)
+        values = (body or {}).get('values', [])
+        first_row = worksheet._append(values)
+        # Như Google: updatedRange cho biết các dòng vừa được thêm
+        last_col = column_letter(max((len(row) for row in values), default=1))
+        updated_range = "'{}'!A{}:{}{}".format(worksheet.title.replace("'", "''"), first_row,
+                                               last_col, first_row + max(len(values), 1) - 1)
+        return {'updates': {'updatedRange': updated_range, 'updatedRows': len(values)}}
+
+
+class FakeWorksheet:
+    """Thay cho gspread.Worksheet (lưới giá trị chuỗi, dòng/cột đánh số từ 1)"""
+
+    def __init__(self, spreadsheet: FakeSpreadsheet, sheet_id: int, title: str, rows: int, cols: int):
+        self.spreadsheet = spreadsheet
+        self._backend = spreadsheet._backend
+        self.id = sheet_id
+        self.title = title
+        self.row_count = rows
+        self.col_count = cols
+        self._rows: List[List[str]] = []
+
+    def _sheet_label(self) -> Optional[str]:
+        return self.title
+
+    # -------------------------------------------------------------- storage
+
+    def _write(self, first_row: int, first_col: int, values: Sequence[Sequence[Any]]):
+        with self._backend.lock:
+            for offset, row in enumerate(values):
+                row_index = first_row - 1 + offset
+                while len(self._rows) <= row_index:
+                    self._rows.append([])
+                target = self._rows[row_index]
+                needed = first_col - 1 + len(row)
+                if len(target) < needed:
+                    target.extend([''] * (needed - len(target)))
+                for col_offset, value in enumerate(row):
+                    target[first_col - 1 + col_offset] = _to_cell(value)
+                self.col_count = max(self.col_count, len(target))
+            self._trim()
+            self.row_count = max(self.row_count, len(self._rows))
+            self.spreadsheet._touch()
+
+    def _append(self, values: Sequence[Sequence[Any]]) -> int:
+        """Ghi sau dòng cuối có dữ liệu, trả về số dòng đầu tiên được ghi"""
+        with self._backend.lock:
+            first_row = len(self._rows) + 1
+            self._write(first_row, 1, values)
+            return first_row
+
+    def _trim(self):
+        # Dòng trống cuối bảng không thuộc vùng dữ liệu (giống Sheets API)
+        while self._rows and not any(self._rows[-1]):
+            self._rows.pop()
+
+    def _read(self, first_row: int, first_col: int, last_row: Optional[int], last_col: Optional[int]) -> List[List[str]]:
+        with self._backend.lock:
+            last_row = len(self._rows) if last_row is None else min(last_row, len(self._rows))
+            result = []
+            for row in self._rows[first_row - 1:last_row]:
+                end = len(row) if last_col is None else min(last_col, len(row))
+                cells = row[first_col - 1:end]
+                while cells and cells[-1] == '':
+                    cells.pop()
+                result.append(cells)
+            while result and not result[-1]:
+                result.pop()
+            return result
+
+    # ---------------------------------------------------------------- reads
+
+    @_api(READ)
+    def get_all_values(self, *args, **kwargs) -> List[List[str]]:
+        with self._backend.lock:
+            width = max((len(row) for row in self._rows), default=0)
+            return [row + [''] * (width - len(row)) for row in self._rows]
+
+    @_api(READ)
+    def get_all_records(self, head: int = 1, **kwargs) -> List[Dict[str, Any]]:
+        with self._backend.lock:
+            if len(self._rows) < head:
+                return []
+            headers = self._rows[head - 1]
+            records = []
+            for row in self._rows[head:]:
+                records.append({
+                    header: _numericise(row[i]) if i < len(row) else ''
+                    for i, header in enumerate(headers)
+                })
+            return records
+
+    @_api(READ)
+    def row_values(self, row: int, **kwargs) -> List[str]:
+        with self._backend.lock:
+            if row > len(self._rows):
+                return []
+            values = list(self._rows[row - 1])
+            while values and values[-1] == '':
+                values.pop()
+            return values
+
+    @_api(READ)
+    def col_values(self, col: int, **kwargs) -> List[str]:
+        with self._backend.lock:
+            values = [row[col - 1] if col <= len(row) else '' for row in self._rows]
+            while values and values[-1] == '':
+                values.pop()
+            return values
+
+    @_api(READ)
+    def get(self, range_name: Optional[str] = None, **kwargs) -> List[List[str]]:
+        _, first_row, first_col, last_row, last_col = parse_range(range_name or 'A1:ZZ')
+        return self._read(first_row, first_col, last_row, last_col)
+
+    # --------------------------------------------------------------- writes
+
+    @_api(WRITE)
+    def update(self, range_name: Any = None, values: Any = None, **kwargs) -> Dict[str, Any]:
+        # gspread 5: update('A1', values) - gspread 6: update(values, 'A1')
+        if not isinstance(range_name, str) and range_name is not None:
+            range_name, values = values, range_name
+        _, first_row, first_col, _, _ = parse_range(range_name or 'A1')
+        if values and not isinstance(values[0], (list, tuple)):
+            values = [values]
+        self._write(first_row, first_col, values or [])
+        return {'updatedRange': range_name, 'updatedRows': len(values or [])}
+
+    @_api(WRITE)
+    def batch_update(self, data: Sequence[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        for entry in data:
+            _, first_row, first_col, _, _ = parse_range(entry['range'])
+            self._write(first_row, first_col, entry.get('values', []))
+        return {'totalUpdatedRanges': len(data)}
+
+    @_api(WRITE)
+    def update_cell(self, row: int, col: int, value: Any) -> Dict[str, Any]:
+        self._write(row, col, [[value]])
+        return {'updatedCells': 1}
+
+    @_api(WRITE)
+    def append_row(self, values: Sequence[Any], **kwargs) -> Dict[str, Any]:
+        self._append([values])
+        return {'updates': {'updatedRows': 1}}
+
+    @_api(WRITE)
+    def append_rows(self, values: Sequence[Sequence[Any]], **kwargs) -> Dict[str, Any]:
+        self._append(values)
+        return {'updates': {'updatedRows': len(values)}}
+
+    @_api(WRITE)
+    def clear(self) -> Dict[str, Any]:
+        with self._backend.lock:
+            self._rows = []
+            self.spreadsheet._touch()
+        return {}
+
+    @_api(WRITE)
+    def resize(self, rows: Optional[int] = None, cols: Optional[int] = None) -> Dict[str, Any]:
+        with self._backend.lock:
+            if rows is not None:
+                self.row_count = int(rows)
+                del self._rows[self.row_count:]
+            if cols is not None:
+                self.col_count = int(cols)
+                self._rows = [row[:self.col_count] for row in self._rows]
+        return {}
+
+    @_api(WRITE)
+    def format(self, ranges: Any, format: Optional[Dict[str, Any]] = None, **kwargs) -> Dict[str, Any]:
+        # Định dạng không được lưu, chỉ tính là một request
+        return {}
+
+
+def install(backend: Optional[FakeSheetsBackend] = None, credentials_path: str = FAKE_CREDENTIALS) -> str:
+    """
+    Đăng ký client giả vào sheets_client cho credentials_path
+
+    Returns:
+        credentials_path để truyền vào GoogleSheetsConfigService/AuthenticationService
+    """
+    from sheets_client import register_client
+
+    register_client(credentials_path, FakeSheetsClient(backend))
+    return credentials_path
+
+
+def main():
+    """Đo số request Sheets của các luồng config, log và login trên backend giả"""
+    from auth_service import AuthenticationService
+    from google_sheets_config import GoogleSheetsConfigService
+
+    print("🧪 FAKE SHEETS BACKEND - ĐẾM REQUEST THEO LUỒNG")
+    print("=" * 50)
+
+    backend = FakeSheetsBackend(latency={READ: 0.05, WRITE: 0.08})
+    credentials_path = install(backend)
+    spreadsheet_id = 'fake-benchmark'
+
+    def measure(name, func):
+        backend.reset_stats()
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        stats = backend.stats()
+        print(f"\n📊 {name}: {stats['requests']} request "
+              f"({stats[READ]} read, {stats[WRITE]} write) trong {elapsed:.3f}s")
+        for call, count in sorted(stats['targets'].items()):
+            print(f"   • {call}: {count}")
+
+    config_service = GoogleSheetsConfigService(spreadsheet_id, credentials_path)
+    measure('Tạo sheet mẫu', config_service.create_sample_sheets)
+    measure('Đọc config (lần đầu)', lambda: config_service.get_cached_config(refresh=True))
+    measure('Đọc config (cache)', config_service.get_cached_config)
+    measure('Ghi log automation', lambda: config_service.log_automation_run(
+        {'success': True, 'duration': 1.0, 'order_count': 0}, flush=True))
+
+    auth = AuthenticationService(spreadsheet_id, credentials_path)
+    session = {}
+
+    def login():
+        success, result = auth.authenticate_user('admin@mia.vn', '123456', '127.0.0.1', 'fake-bench')
+        session.update(result.get('session', {}) if success else {})
+
+    measure('Đăng nhập', login)
+    measure('Xác minh session', lambda: auth.verify_session(session.get('session_id', '')))
+    measure('Đăng xuất', lambda: auth.logout(session.get('session_id', '')))
+
+
+if __name__ == "__main__":
+    main()
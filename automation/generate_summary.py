@@ -136,6 +136,17 @@ def generate_final_summary():
         else:
             print("No log files found")
 
+        # Sheets API usage (scheduler dùng chung trong process)
+        api_metrics = sheets_service.scheduler.metrics()
+        print("\n📡 GOOGLE SHEETS API")
+        print("-" * 40)
+        print(f"Requests: {api_metrics['requests']} | Retries: {api_metrics['retries']} | "
+              f"429: {api_metrics['throttled']} | Failures: {api_metrics['failures']}")
+        for priority, wait_stats in api_metrics['wait'].items():
+            if wait_stats['count']:
+                print(f"   {priority}: {wait_stats['count']} calls, "
+                      f"avg wait {wait_stats['avg_seconds']}s, max {wait_stats['max_seconds']}s")
+
         # System Health
         print("\n⚡ SYSTEM HEALTH STATUS")
         print("-" * 40)
@@ -12,9 +12,45 @@ from datetime import datetime
 from typing import Dict, Any, Optional, List
 import gspread
 from google.auth.exceptions import RefreshError
-from google.oauth2.service_account import Credentials
 import pandas as pd
 
+from line_items import ORDER_DATE_COLUMNS, resolve_order_date
+from sheets_client import get_worksheet_cache, has_client, open_spreadsheet, values_to_records
+from sheets_config_cache import get_config_cache
+from sheets_exporter import SheetsExporter
+from sheets_order_sync import DEFAULT_SHEET_NAME as ORDER_SYNC_SHEET, OrderSheetSync
+from sheets_scheduler import get_scheduler
+from sheets_writer import BufferedSheetsWriter
+
+
+STATUS_SHEET = 'Automation_Status'
+STATUS_HEADERS = [
+    'Timestamp', 'Status', 'Current_Page', 'Total_Pages',
+    'Orders_Extracted', 'Products_Extracted', 'Progress_Percent',
+    'Estimated_Time_Left', 'Last_Error', 'Session_ID'
+]
+LOG_HEADERS = [
+    'Timestamp', 'Success', 'Duration_Seconds', 'Order_Count',
+    'Enhanced_Order_Count', 'Config_Source', 'Sheets_Integration',
+    'System_URL', 'Automation_Version', 'Error', 'Start_Time',
+    'End_Time', 'Export_Files', 'Platform', 'Notes'
+]
+
+
+def default_export_sheet_name(data: List[Dict[str, Any]], prefix: str = 'Automation_Data') -> str:
+    """
+    Tên sheet mặc định theo ngày của dữ liệu (ngày đơn mới nhất, không có thì hôm nay)
+
+    Cùng dữ liệu luôn cho cùng tên nên lần chạy lại sau khi bị ngắt tiếp tục
+    được từ checkpoint của SheetsExporter.
+    """
+    dates = resolve_order_date(pd.DataFrame(
+        [{col: record.get(col) for col in ORDER_DATE_COLUMNS} for record in data],
+        columns=ORDER_DATE_COLUMNS
+    ))
+    latest = dates.max() if dates.notna().any() else datetime.now()
+    return f"{prefix}_{latest.strftime('%Y%m%d')}"
+
 
 class GoogleSheetsConfigService:
     """Service quản lý cấu hình qua Google Sheets"""
@@ -32,38 +68,36 @@ class GoogleSheetsConfigService:
         self.credentials_path = credentials_path or 'config/service_account.json'
         self.client = None
         self.spreadsheet = None
+        # Cache worksheet handle/header dùng chung trong process
+        self.sheets = None
+        # Mọi request Sheets đi qua scheduler chung (quota, ưu tiên, backoff)
+        self.scheduler = get_scheduler()
 
         # Worksheet names
         self.config_sheet = 'Config'
         self.sla_sheet = 'SLA_Rules'
         self.logs_sheet = 'Automation_Logs'
 
+        # Bộ ghi có buffer cho status/log (khởi tạo khi cần)
+        self.writer = None
+        self._ready_sheets = set()
+
+        # Cache Config/SLA dùng chung giữa các service cùng spreadsheet trong process
+        self.config_cache = get_config_cache(self.spreadsheet_id)
+
         self._init_client()
 
     def _init_client(self):
         """Khởi tạo Google Sheets client"""
         try:
-            # Kiểm tra credentials file
-            if not os.path.exists(self.credentials_path):
+            # Kiểm tra credentials file (client đã đăng ký sẵn, vd. backend giả, thì không cần)
+            if not os.path.exists(self.credentials_path) and not has_client(self.credentials_path):
                 self.logger.warning(f"⚠️ Credentials file not found: {self.credentials_path}")
                 return False
 
-            # Scopes cần thiết
-            scopes = [
-                'https://www.googleapis.com/auth/spreadsheets',
-                'https://www.googleapis.com/auth/drive.file'
-            ]
-
-            # Tạo credentials
-            credentials = Credentials.from_service_account_file(
-                self.credentials_path, scopes=scopes
-            )
-
-            # Khởi tạo client
-            self.client = gspread.authorize(credentials)
-
-            # Mở spreadsheet
-            self.spreadsheet = self.client.open_by_key(self.spreadsheet_id)
+            # Client + spreadsheet dùng chung (chỉ open_by_key lần đầu trong process)
+            self.client, self.spreadsheet = open_spreadsheet(self.credentials_path, self.spreadsheet_id)
+            self.sheets = get_worksheet_cache(self.spreadsheet)
 
             self.logger.info("✅ Google Sheets client initialized successfully")
             return True
@@ -75,12 +109,13 @@ class GoogleSheetsConfigService:
             self.logger.error(f"❌ Failed to initialize Google Sheets client: {e}")
             return False
 
-    def get_config_merged(self, local_config_path: str) -> Dict[str, Any]:
+    def get_config_merged(self, local_config_path: str, refresh: bool = False) -> Dict[str, Any]:
         """
         Lấy config đã merge từ local file và Google Sheets
 
         Args:
             local_config_path: Đường dẫn config local
+            refresh: bỏ qua cache, đọc lại Google Sheets
 
         Returns:
             Dict chứa config đã merge
@@ -92,8 +127,9 @@ class GoogleSheetsConfigService:
                 with open(local_config_path, 'r', encoding='utf-8') as f:
                     local_config = json.load(f)
 
-            # Get Google Sheets config
-            sheets_config = self.get_sheets_config()
+            # Config + SLA từ cache (tối đa một lượt đọc Sheets mỗi TTL)
+            cached = self.get_cached_config(refresh=refresh)
+            sheets_config = cached['config']
 
             # Merge configs (Sheets override local)
             merged_config = local_config.copy()
@@ -104,9 +140,14 @@ class GoogleSheetsConfigService:
             merged_config['_metadata'] = {
                 'config_source': 'google_sheets' if sheets_config else 'local_file',
                 'has_sheets_config': bool(sheets_config),
-                'has_sla_config': bool(self.get_sla_rules()),
+                'has_sla_config': bool(cached['sla_rules']),
                 'last_updated': datetime.now().isoformat(),
-                'spreadsheet_id': self.spreadsheet_id
+                'spreadsheet_id': self.spreadsheet_id,
+                'config_cache': {
+                    'source': cached['source'],
+                    'fetched_at': datetime.fromtimestamp(cached['fetched_at']).isoformat()
+                    if cached['fetched_at'] else None,
+                }
             }
 
             return merged_config
@@ -125,87 +166,99 @@ class GoogleSheetsConfigService:
                     return config
             return {}
 
-    def get_sheets_config(self) -> Dict[str, Any]:
-        """Lấy cấu hình từ Google Sheets"""
-        try:
-            if not self.client or not self.spreadsheet:
-                return {}
-
-            # Lấy worksheet Config
-            try:
-                worksheet = self.spreadsheet.worksheet(self.config_sheet)
-            except gspread.WorksheetNotFound:
-                self.logger.warning(f"⚠️ Worksheet '{self.config_sheet}' not found")
-                return {}
-
-            # Lấy tất cả records
-            records = worksheet.get_all_records()
-
-            if not records:
-                return {}
-
-            # Convert thành config format
-            config = {}
-            for record in records:
-                section = record.get('Section', '').strip()
-                key = record.get('Key', '').strip()
-                value = record.get('Value', '')
+    def get_cached_config(self, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Config + SLA rules qua cache dùng chung trong process
 
-                if not section or not key:
-                    continue
+        Returns:
+            {'config', 'sla_rules', 'fetched_at', 'source'}
+        """
+        # Không probe modifiedTime: mọi lần ghi log/status đều làm nó đổi nên gần
+        # như luôn lệch - dựa vào TTL và invalidate() khi sửa config qua service
+        return self.config_cache.get(self._read_config_sheets, force=refresh)
 
-                # Parse value
-                parsed_value = self._parse_config_value(value)
+    def refresh_config(self) -> Dict[str, Any]:
+        """Đọc lại Config + SLA_Rules ngay, bỏ qua TTL"""
+        return self.get_cached_config(refresh=True)
 
-                # Set nested dict
-                if section not in config:
-                    config[section] = {}
-                config[section][key] = parsed_value
+    def _read_config_sheets(self) -> Optional[Dict[str, Any]]:
+        """Đọc Config và SLA_Rules trong một values_batch_get (None nếu không có kết nối)"""
+        if not self.client or not self.spreadsheet:
+            return None
 
-            self.logger.info(f"✅ Loaded config from Google Sheets: {len(records)} entries")
-            return config
+        try:
+            response = self.scheduler.read(
+                self.spreadsheet.values_batch_get, [self.config_sheet, self.sla_sheet]
+            )
+            value_ranges = response.get('valueRanges', [])
+            config_values = value_ranges[0].get('values', []) if value_ranges else []
+            sla_values = value_ranges[1].get('values', []) if len(value_ranges) > 1 else []
+            config_records = values_to_records(config_values)
+            sla_records = values_to_records(sla_values)
+        except gspread.exceptions.APIError as e:
+            # Thiếu một trong hai sheet làm cả batch lỗi - đọc riêng từng sheet
+            self.logger.debug(f"Batch read config lỗi, đọc từng sheet: {e}")
+            config_records = self._read_records(self.config_sheet)
+            sla_records = self._read_records(self.sla_sheet)
+
+        config = self._records_to_config(config_records)
+        sla_rules = self._records_to_sla_rules(sla_records)
+        self.logger.info(
+            f"✅ Loaded config from Google Sheets: {len(config_records)} entries, "
+            f"SLA rules: {len(sla_rules)} platforms"
+        )
+        return {'config': config, 'sla_rules': sla_rules}
+
+    def _read_records(self, sheet_name: str) -> List[Dict[str, Any]]:
+        try:
+            return self.sheets.call(sheet_name, lambda ws: ws.get_all_records())
+        except gspread.WorksheetNotFound:
+            self.logger.warning(f"⚠️ Worksheet '{sheet_name}' not found")
+            return []
 
+    def _records_to_config(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # Convert thành config format
+        config = {}
+        for record in records:
+            section = str(record.get('Section', '')).strip()
+            key = str(record.get('Key', '')).strip()
+            value = record.get('Value', '')
+
+            if not section or not key:
+                continue
+
+            # Set nested dict
+            config.setdefault(section, {})[key] = self._parse_config_value(value)
+        return config
+
+    def _records_to_sla_rules(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # Group by platform
+        sla_rules = {}
+        for record in records:
+            platform = str(record.get('Platform', '')).lower().strip()
+            if not platform:
+                continue
+
+            rules = sla_rules.setdefault(platform, {})
+            rule_type = str(record.get('Rule_Type', '')).strip()
+            value = record.get('Value', '')
+
+            if rule_type and value:
+                rules[rule_type] = self._parse_config_value(value)
+        return sla_rules
+
+    def get_sheets_config(self, refresh: bool = False) -> Dict[str, Any]:
+        """Lấy cấu hình từ Google Sheets (qua cache)"""
+        try:
+            return self.get_cached_config(refresh=refresh)['config']
         except Exception as e:
             self.logger.error(f"❌ Error getting sheets config: {e}")
             return {}
 
-    def get_sla_rules(self) -> Dict[str, Any]:
-        """Lấy SLA rules từ Google Sheets"""
+    def get_sla_rules(self, refresh: bool = False) -> Dict[str, Any]:
+        """Lấy SLA rules từ Google Sheets (qua cache)"""
         try:
-            if not self.client or not self.spreadsheet:
-                return {}
-
-            try:
-                worksheet = self.spreadsheet.worksheet(self.sla_sheet)
-            except gspread.WorksheetNotFound:
-                self.logger.warning(f"⚠️ Worksheet '{self.sla_sheet}' not found")
-                return {}
-
-            records = worksheet.get_all_records()
-
-            if not records:
-                return {}
-
-            # Group by platform
-            sla_rules = {}
-            for record in records:
-                platform = record.get('Platform', '').lower().strip()
-                if not platform:
-                    continue
-
-                if platform not in sla_rules:
-                    sla_rules[platform] = {}
-
-                # Parse SLA rule
-                rule_type = record.get('Rule_Type', '').strip()
-                value = record.get('Value', '')
-
-                if rule_type and value:
-                    sla_rules[platform][rule_type] = self._parse_config_value(value)
-
-            self.logger.info(f"✅ Loaded SLA rules: {len(sla_rules)} platforms")
-            return sla_rules
-
+            return self.get_cached_config(refresh=refresh)['sla_rules']
         except Exception as e:
             self.logger.error(f"❌ Error getting SLA rules: {e}")
             return {}
@@ -223,18 +276,15 @@ class GoogleSheetsConfigService:
             else:
                 section, key = config_key.split('.', 1)
 
-            try:
-                worksheet = self.spreadsheet.worksheet(self.config_sheet)
-            except gspread.WorksheetNotFound:
-                # Create worksheet nếu chưa có
-                worksheet = self.spreadsheet.add_worksheet(
-                    title=self.config_sheet, rows=100, cols=10
-                )
-                # Add headers
-                worksheet.update('A1:D1', [['Section', 'Key', 'Value', 'Updated']])
+            # Create worksheet nếu chưa có
+            worksheet, _ = self.sheets.get_or_create(
+                self.config_sheet, rows=100, cols=10, headers=['Section', 'Key', 'Value', 'Updated']
+            )
 
             # Find existing row
-            records = worksheet.get_all_records()
+            records = self.sheets.call(self.config_sheet, lambda ws: ws.get_all_records())
+            if records:
+                self.sheets.remember_headers(self.config_sheet, list(records[0].keys()))
             row_num = None
 
             for i, record in enumerate(records):
@@ -246,16 +296,27 @@ class GoogleSheetsConfigService:
             # Update or add new row
             timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
+            headers = self.sheets.headers(self.config_sheet)
+
             if row_num:
-                # Update existing
-                worksheet.update(
-                    values=[[str(config_value), timestamp]],
-                    range_name=f'C{row_num}:D{row_num}'
-                )
+                # Update existing - cột tra theo header nên không lệch khi sheet có thêm cột
+                updates = [{
+                    'range': f"{self.sheets.column(self.config_sheet, 'Value')}{row_num}",
+                    'values': [[str(config_value)]]
+                }]
+                if 'Updated' in headers:
+                    updates.append({
+                        'range': f"{self.sheets.column(self.config_sheet, 'Updated')}{row_num}",
+                        'values': [[timestamp]]
+                    })
+                self.scheduler.write(worksheet.batch_update, updates)
             else:
                 # Add new row
-                worksheet.append_row([section, key, str(config_value), timestamp])
+                row = {'Section': section, 'Key': key, 'Value': str(config_value), 'Updated': timestamp}
+                self.scheduler.write(worksheet.append_row, [row.get(header, '') for header in headers],
+                                     idempotent=False)
 
+            self.config_cache.invalidate()
             self.logger.info(f"✅ Updated config: {section}.{key} = {config_value}")
             return True
 
@@ -263,27 +324,34 @@ class GoogleSheetsConfigService:
             self.logger.error(f"❌ Error updating config: {e}")
             return False
 
-    def log_automation_run(self, automation_result: Dict[str, Any]) -> bool:
-        """Log kết quả automation vào Google Sheets"""
+    def get_writer(self) -> Optional[BufferedSheetsWriter]:
+        """Bộ ghi buffer dùng chung cho status/log (flush định kỳ trên background thread)"""
+        if not self.client or not self.spreadsheet:
+            return None
+        if self.writer is None:
+            self.writer = BufferedSheetsWriter(self.spreadsheet, logger=self.logger).start()
+        return self.writer
+
+    def flush_writes(self) -> Dict[str, int]:
+        """Gửi ngay các thao tác ghi đang chờ, trả về thống kê API call"""
+        return self.writer.flush() if self.writer else {}
+
+    def _ensure_sheet(self, title: str, headers: List[str], rows: int) -> bool:
+        """Tạo worksheet kèm header nếu chưa có (chỉ kiểm tra một lần mỗi service)"""
+        if title in self._ready_sheets:
+            return True
+        self.sheets.get_or_create(title, rows=rows, cols=len(headers), headers=headers)
+        self._ready_sheets.add(title)
+        return True
+
+    def log_automation_run(self, automation_result: Dict[str, Any], flush: bool = False) -> bool:
+        """Log kết quả automation vào Google Sheets (qua bộ ghi buffer)"""
         try:
-            if not self.client or not self.spreadsheet:
+            writer = self.get_writer()
+            if not writer:
                 return False
 
-            try:
-                worksheet = self.spreadsheet.worksheet(self.logs_sheet)
-            except gspread.WorksheetNotFound:
-                # Create logs worksheet
-                worksheet = self.spreadsheet.add_worksheet(
-                    title=self.logs_sheet, rows=1000, cols=15
-                )
-                # Add headers
-                headers = [
-                    'Timestamp', 'Success', 'Duration_Seconds', 'Order_Count',
-                    'Enhanced_Order_Count', 'Config_Source', 'Sheets_Integration',
-                    'System_URL', 'Automation_Version', 'Error', 'Start_Time',
-                    'End_Time', 'Export_Files', 'Platform', 'Notes'
-                ]
-                worksheet.update('A1:O1', [headers])
+            self._ensure_sheet(self.logs_sheet, LOG_HEADERS, rows=1000)
 
             # Prepare log data
             log_data = [
@@ -297,15 +365,18 @@ class GoogleSheetsConfigService:
                 automation_result.get('system_url', 'unknown'),
                 automation_result.get('automation_version', '2.1'),
                 automation_result.get('error', ''),
-                automation_result.get('start_time', ''),
-                automation_result.get('end_time', ''),
+                str(automation_result.get('start_time', '')),
+                str(automation_result.get('end_time', '')),
                 str(automation_result.get('export_files', {})),
                 'multiple',  # Platform
                 'Enhanced automation run'  # Notes
             ]
 
-            # Add log row
-            worksheet.append_row(log_data)
+            # worksheet() + append_row nếu ghi trực tiếp
+            writer.append_rows(self.logs_sheet, [log_data], naive_calls=2)
+            if flush and not writer.flush().get('ok', True):
+                self.logger.warning("⚠️ Chưa gửi được log lên Google Sheets - sẽ thử lại ở lần flush sau")
+                return False
 
             self.logger.info("✅ Automation run logged to Google Sheets")
             return True
@@ -321,13 +392,11 @@ class GoogleSheetsConfigService:
                 return []
 
             try:
-                worksheet = self.spreadsheet.worksheet(self.logs_sheet)
+                # Get all records
+                records = self.sheets.call(self.logs_sheet, lambda ws: ws.get_all_records())
             except gspread.WorksheetNotFound:
                 return []
 
-            # Get all records
-            records = worksheet.get_all_records()
-
             # Sort by timestamp (newest first)
             sorted_records = sorted(
                 records,
@@ -381,13 +450,8 @@ class GoogleSheetsConfigService:
                 return False
 
             # 1. Config sheet
-            try:
-                config_ws = self.spreadsheet.worksheet(self.config_sheet)
-            except gspread.WorksheetNotFound:
-                config_ws = self.spreadsheet.add_worksheet(
-                    title=self.config_sheet, rows=50, cols=10
-                )
-
+            config_ws, created = self.sheets.get_or_create(self.config_sheet, rows=50, cols=10)
+            if created:
                 # Add headers and sample data
                 config_data = [
                     ['Section', 'Key', 'Value', 'Description', 'Updated'],
@@ -399,16 +463,11 @@ class GoogleSheetsConfigService:
                     ['export', 'format', 'csv', 'Default export format', '']
                 ]
 
-                config_ws.update('A1:E7', config_data)
+                self.scheduler.write(config_ws.update, 'A1:E7', config_data)
 
             # 2. SLA Rules sheet
-            try:
-                sla_ws = self.spreadsheet.worksheet(self.sla_sheet)
-            except gspread.WorksheetNotFound:
-                sla_ws = self.spreadsheet.add_worksheet(
-                    title=self.sla_sheet, rows=50, cols=10
-                )
-
+            sla_ws, created = self.sheets.get_or_create(self.sla_sheet, rows=50, cols=10)
+            if created:
                 # Add headers and sample data
                 sla_data = [
                     ['Platform', 'Rule_Type', 'Value', 'Description', 'Active'],
@@ -420,23 +479,12 @@ class GoogleSheetsConfigService:
                     ['lazada', 'confirm_hours', '24', 'Hours to confirm Lazada orders', 'TRUE']
                 ]
 
-                sla_ws.update('A1:E7', sla_data)
+                self.scheduler.write(sla_ws.update, 'A1:E7', sla_data)
 
             # 3. Logs sheet (with headers only)
-            try:
-                logs_ws = self.spreadsheet.worksheet(self.logs_sheet)
-            except gspread.WorksheetNotFound:
-                logs_ws = self.spreadsheet.add_worksheet(
-                    title=self.logs_sheet, rows=1000, cols=15
-                )
-
-                headers = [
-                    'Timestamp', 'Success', 'Duration_Seconds', 'Order_Count',
-                    'Enhanced_Order_Count', 'Config_Source', 'Sheets_Integration',
-                    'System_URL', 'Automation_Version', 'Error', 'Start_Time',
-                    'End_Time', 'Export_Files', 'Platform', 'Notes'
-                ]
-                logs_ws.update('A1:O1', [headers])
+            logs_ws, created = self.sheets.get_or_create(self.logs_sheet, rows=1000, cols=15)
+            if created:
+                self.scheduler.write(logs_ws.update, 'A1:O1', [LOG_HEADERS])
 
             self.logger.info("✅ Sample sheets created successfully")
             return True
@@ -445,55 +493,69 @@ class GoogleSheetsConfigService:
             self.logger.error(f"❌ Error creating sample sheets: {e}")
             return False
 
-    def export_data_to_sheets(self, data: List[Dict[str, Any]], sheet_name: str = None) -> bool:
-        """Export dữ liệu automation ra Google Sheets"""
+    def export_data_to_sheets(self, data: List[Dict[str, Any]], sheet_name: str = None,
+                              resume: bool = True) -> bool:
+        """
+        Export dữ liệu automation ra Google Sheets
+
+        Dữ liệu được gửi theo khối dòng (SheetsExporter); nếu lần trước bị ngắt
+        giữa chừng với cùng sheet_name, các khối đã gửi được bỏ qua.
+        """
         try:
             if not self.client or not self.spreadsheet:
                 return False
 
-            # Generate sheet name
-            if not sheet_name:
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                sheet_name = f'Automation_Data_{timestamp}'
-
-            # Create new worksheet
-            try:
-                worksheet = self.spreadsheet.add_worksheet(
-                    title=sheet_name, rows=len(data) + 10, cols=20
-                )
-            except Exception as e:
-                self.logger.error(f"❌ Error creating worksheet: {e}")
-                return False
-
             if not data:
                 self.logger.warning("⚠️ No data to export")
                 return False
 
-            # Prepare headers từ first row
-            headers = list(data[0].keys())
-
-            # Prepare data rows
-            rows = [headers]
-            for item in data:
-                row = [str(item.get(header, '')) for header in headers]
-                rows.append(row)
-
-            # Update sheet với data
-            worksheet.update(f'A1:{chr(65 + len(headers) - 1)}{len(rows)}', rows)
+            # Tên ổn định theo ngày dữ liệu để chạy lại được từ checkpoint
+            if not sheet_name:
+                sheet_name = default_export_sheet_name(data)
 
-            # Format headers
-            worksheet.format('A1:' + chr(65 + len(headers) - 1) + '1', {
-                'backgroundColor': {'red': 0.2, 'green': 0.6, 'blue': 1.0},
-                'textFormat': {'bold': True, 'foregroundColor': {'red': 1, 'green': 1, 'blue': 1}}
-            })
+            exporter = SheetsExporter(self.spreadsheet, self.sheets, logger=self.logger)
+            stats = exporter.export(data, sheet_name, resume=resume)
 
-            self.logger.info(f"✅ Exported {len(data)} records to sheet '{sheet_name}'")
+            self.logger.info(
+                f"✅ Exported {stats['rows']} records to sheet '{sheet_name}' "
+                f"({stats['uploaded_chunks']} khối, {stats['resumed_chunks']} khối đã có, {stats['elapsed']}s)"
+            )
             return True
 
         except Exception as e:
             self.logger.error(f"❌ Error exporting data to sheets: {e}")
             return False
 
+    def sync_orders_to_sheets(self, data: List[Dict[str, Any]], sheet_name: str = ORDER_SYNC_SHEET,
+                              remove_missing: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Đồng bộ đơn hàng lên một worksheet cố định theo mã đơn
+
+        Chỉ dòng mới/thay đổi (và dòng bị bỏ nếu remove_missing) được gửi, trong
+        một values_batch_update - số request tỉ lệ với lượng thay đổi, không
+        phải kích thước dữ liệu.
+
+        Returns:
+            thống kê của OrderSheetSync.sync, None nếu lỗi
+        """
+        try:
+            if not self.client or not self.spreadsheet:
+                return None
+
+            syncer = OrderSheetSync(self.spreadsheet, self.sheets, sheet_name=sheet_name, logger=self.logger)
+            stats = syncer.sync(data, remove_missing=remove_missing)
+
+            self.logger.info(
+                f"✅ Synced '{sheet_name}': {stats['new']} mới, {stats['changed']} thay đổi, "
+                f"{stats['removed']} xóa, {stats['unchanged']} không đổi "
+                f"({stats['requests']} request, {stats['elapsed']}s)"
+            )
+            return stats
+
+        except Exception as e:
+            self.logger.error(f"❌ Error syncing orders to sheets: {e}")
+            return None
+
     def get_date_range_config(self) -> Dict[str, str]:
         """Lấy cấu hình date range từ Google Sheets"""
         try:
@@ -517,26 +579,20 @@ class GoogleSheetsConfigService:
                 'display_limit': '2000'
             }
 
-    def update_automation_status(self, status: str, progress: Dict[str, Any] = None) -> bool:
-        """Cập nhật trạng thái automation real-time"""
+    def update_automation_status(self, status: str, progress: Dict[str, Any] = None,
+                                 flush: bool = False) -> bool:
+        """
+        Cập nhật trạng thái automation real-time
+
+        Trạng thái được xếp hàng trong bộ ghi buffer: nhiều lần cập nhật liên tiếp
+        chỉ gửi trạng thái mới nhất ở lần flush kế tiếp.
+        """
         try:
-            if not self.client or not self.spreadsheet:
+            writer = self.get_writer()
+            if not writer:
                 return False
 
-            # Tìm hoặc tạo Status sheet
-            try:
-                worksheet = self.spreadsheet.worksheet('Automation_Status')
-            except gspread.WorksheetNotFound:
-                worksheet = self.spreadsheet.add_worksheet(
-                    title='Automation_Status', rows=20, cols=10
-                )
-                # Add headers
-                headers = [
-                    'Timestamp', 'Status', 'Current_Page', 'Total_Pages',
-                    'Orders_Extracted', 'Products_Extracted', 'Progress_Percent',
-                    'Estimated_Time_Left', 'Last_Error', 'Session_ID'
-                ]
-                worksheet.update('A1:J1', [headers])
+            self._ensure_sheet(STATUS_SHEET, STATUS_HEADERS, rows=20)
 
             # Prepare status data
             timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
@@ -557,12 +613,10 @@ class GoogleSheetsConfigService:
             else:
                 status_data = [timestamp, status, '', '', '', '', '', '', '', '']
 
-            # Clear existing data và add new
-            worksheet.clear()
-            worksheet.update('A1:J1', [['Timestamp', 'Status', 'Current_Page', 'Total_Pages',
-                                      'Orders_Extracted', 'Products_Extracted', 'Progress_Percent',
-                                      'Estimated_Time_Left', 'Last_Error', 'Session_ID']])
-            worksheet.update('A2:J2', [status_data])
+            # Header + dòng trạng thái ghi đè A1:J2 (thay cho worksheet/clear/update/update)
+            writer.set_range(STATUS_SHEET, 'A1:J2', [STATUS_HEADERS, status_data], naive_calls=4)
+            if flush:
+                return writer.flush().get('ok', True)
 
             return True
 
@@ -608,12 +662,7 @@ class GoogleSheetsConfigService:
                 return False
 
             # Tạo Dashboard sheet
-            try:
-                dashboard = self.spreadsheet.add_worksheet(
-                    title='Dashboard', rows=50, cols=15
-                )
-            except gspread.WorksheetNotFound:
-                dashboard = self.spreadsheet.worksheet('Dashboard')
+            dashboard, _ = self.sheets.get_or_create('Dashboard', rows=50, cols=15)
 
             # Dashboard structure
             dashboard_data = [
@@ -634,15 +683,15 @@ class GoogleSheetsConfigService:
                 ['=INDEX(Automation_Logs!A:A,ROWS(Automation_Logs!A:A))', '=INDEX(Automation_Logs!B:B,ROWS(Automation_Logs!B:B))', '=INDEX(Automation_Logs!C:C,ROWS(Automation_Logs!C:C))', '=INDEX(Automation_Logs!D:D,ROWS(Automation_Logs!D:D))', '=INDEX(Automation_Logs!E:E,ROWS(Automation_Logs!E:E))', '=INDEX(Automation_Logs!F:F,ROWS(Automation_Logs!F:F))', '=INDEX(Automation_Logs!H:H,ROWS(Automation_Logs!H:H))', '=INDEX(Automation_Logs!I:I,ROWS(Automation_Logs!I:I))', '=INDEX(Automation_Logs!J:J,ROWS(Automation_Logs!J:J))', '', '', '', '', '', '']
             ]
 
-            dashboard.update('A1:O16', dashboard_data)
+            self.scheduler.write(dashboard.update, 'A1:O16', dashboard_data)
 
             # Format dashboard
-            dashboard.format('A1:O1', {
+            self.scheduler.write(dashboard.format, 'A1:O1', {
                 'backgroundColor': {'red': 0.2, 'green': 0.6, 'blue': 1.0},
                 'textFormat': {'bold': True, 'fontSize': 14, 'foregroundColor': {'red': 1, 'green': 1, 'blue': 1}}
             })
 
-            dashboard.format('A3:A11', {
+            self.scheduler.write(dashboard.format, 'A3:A11', {
                 'textFormat': {'bold': True},
                 'backgroundColor': {'red': 0.9, 'green': 0.9, 'blue': 0.9}
             })
@@ -680,17 +729,19 @@ class GoogleSheetsConfigService:
 
             # Update Config sheet
             try:
-                worksheet = self.spreadsheet.worksheet(self.config_sheet)
+                worksheet = self.sheets.worksheet(self.config_sheet)
                 # Clear existing và add headers
-                worksheet.clear()
+                self.scheduler.write(worksheet.clear)
                 headers = [['Section', 'Key', 'Value', 'Description', 'Updated']]
-                worksheet.update('A1:E1', headers)
+                self.scheduler.write(worksheet.update, 'A1:E1', headers)
 
                 # Add flattened config
                 if len(flattened) > 0:
                     range_name = f'A2:E{len(flattened) + 1}'
-                    worksheet.update(range_name, flattened)
+                    self.scheduler.write(worksheet.update, range_name, flattened)
 
+                self.sheets.remember_headers(self.config_sheet, headers[0])
+                self.config_cache.invalidate()
                 self.logger.info(f"✅ Backed up {len(flattened)} config entries to sheets")
                 return True
 
@@ -35,7 +35,7 @@ def inspect_sheets_data():
 
         # List all worksheets
         print("\n📋 Available Worksheets:")
-        worksheets = sheets_service.spreadsheet.worksheets()
+        worksheets = sheets_service.scheduler.read(sheets_service.spreadsheet.worksheets)
         for i, ws in enumerate(worksheets, 1):
             print(f"   {i}. {ws.title} ({ws.row_count}x{ws.col_count})")
 
@@ -77,8 +77,7 @@ def inspect_sheets_data():
         # Show current status
         print("\n⚡ Current Automation Status:")
         try:
-            status_ws = sheets_service.spreadsheet.worksheet('Automation_Status')
-            status_data = status_ws.get_all_records()
+            status_data = sheets_service.sheets.call('Automation_Status', lambda ws: ws.get_all_records())
             if status_data:
                 latest_status = status_data[0]  # Most recent status
                 print(f"   Status: {latest_status.get('Status', 'N/A')}")
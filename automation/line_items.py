@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Line Items Module
+Chuẩn hóa dữ liệu sản phẩm thành bảng dòng hàng (đơn hàng × sản phẩm)
+và tính sẵn các bảng tổng hợp SKU cho kho / API
+"""
+
+import ast
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+
+# Cột chuẩn của bảng dòng hàng
+LINE_ITEM_COLUMNS = [
+    'order_id', 'order_code', 'line_number', 'product_name',
+    'quantity', 'platform', 'order_date'
+]
+
+# Thứ tự ưu tiên khi dò cột trong dữ liệu scrape
+# (gồm cả tên tiếng Việt sau bước chuẩn hóa cột của process_order_data)
+ORDER_ID_COLUMNS = ['id', 'order_id', 'Mã đơn hàng', 'col_2']
+ORDER_CODE_COLUMNS = ['order_code', 'col_3']
+PLATFORM_COLUMNS = ['platform', 'Sàn TMĐT', 'col_18']
+PRODUCT_COLUMNS = ['products', 'Sản phẩm']
+# col_19: thời gian sàn TMĐT, col_20: thời gian tạo trên ONE
+ORDER_DATE_COLUMNS = ['created_datetime', 'col_19', 'col_20', 'scraped_at']
+
+# Các mốc histogram số lượng: 0, 1, 2, 3-4, 5-9, 10+ (bin đóng bên phải)
+QUANTITY_BINS = [float('-inf'), 0, 1, 2, 4, 9, float('inf')]
+QUANTITY_LABELS = ['0', '1', '2', '3-4', '5-9', '10+']
+
+_PRODUCT_ITEM_RE = r'^\s*(?P<product_name>.*?)\s*(?:\((?P<quantity>\d+)\))?\s*$'
+
+
+def first_present(df: pd.DataFrame, candidates: List[str]) -> Optional[str]:
+    """Trả về tên cột đầu tiên có trong DataFrame"""
+    for col in candidates:
+        if col in df.columns:
+            return col
+    return None
+
+
+def resolve_text(df: pd.DataFrame, candidates: List[str], default: str = '') -> pd.Series:
+    """Lấy giá trị text đầu tiên khác rỗng theo thứ tự cột ưu tiên"""
+    result = pd.Series(default, index=df.index, dtype=object)
+    for col in reversed(candidates):
+        if col in df.columns:
+            values = df[col].fillna('').astype(str).str.strip()
+            result = values.where(values != '', result)
+    return result
+
+
+def resolve_order_date(df: pd.DataFrame) -> pd.Series:
+    """Lấy thời gian đơn hàng (ưu tiên thời gian sàn) dạng datetime"""
+    result = pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+    for col in reversed(ORDER_DATE_COLUMNS):
+        if col in df.columns:
+            parsed = pd.to_datetime(df[col], errors='coerce')
+            result = parsed.where(parsed.notna(), result)
+    return result
+
+
+def resolve_platform(df: pd.DataFrame) -> pd.Series:
+    """Lấy tên sàn TMĐT của đơn hàng"""
+    return resolve_text(df, PLATFORM_COLUMNS, default='unknown')
+
+
+def has_product_data(df: pd.DataFrame) -> bool:
+    """DataFrame có cột sản phẩm (list dict hoặc raw_product_detail) không"""
+    return first_present(df, PRODUCT_COLUMNS + ['raw_product_detail']) is not None
+
+
+def _coerce_products(value) -> list:
+    """Chuẩn hóa cột `products` (list hoặc chuỗi repr sau khi đọc lại CSV)"""
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str) and value.startswith('['):
+        try:
+            parsed = ast.literal_eval(value)
+            return parsed if isinstance(parsed, list) else []
+        except (ValueError, SyntaxError):
+            return []
+    return []
+
+
+def _line_items_from_products(base: pd.DataFrame, products: pd.Series) -> pd.DataFrame:
+    """Explode danh sách sản phẩm dạng dict thành từng dòng"""
+    exploded = base.assign(_product=products).explode('_product')
+    exploded = exploded[exploded['_product'].map(lambda p: isinstance(p, dict))]
+    if exploded.empty:
+        return pd.DataFrame(columns=list(base.columns) + ['product_name', 'quantity'])
+
+    details = pd.DataFrame(exploded['_product'].tolist(), index=exploded.index)
+    exploded = exploded.drop(columns='_product')
+    exploded['product_name'] = details.get('name', pd.Series('', index=details.index))
+    exploded['quantity'] = details.get('quantity', pd.Series(1, index=details.index))
+    return exploded
+
+
+def _line_items_from_raw_detail(base: pd.DataFrame, raw_detail: pd.Series) -> pd.DataFrame:
+    """Tách chuỗi `raw_product_detail` dạng 'Tên SP(2), Tên SP khác(1)' thành từng dòng"""
+    exploded = base.assign(_item=raw_detail.str.split(',')).explode('_item')
+    exploded = exploded[exploded['_item'].fillna('').str.strip() != '']
+    if exploded.empty:
+        return pd.DataFrame(columns=list(base.columns) + ['product_name', 'quantity'])
+
+    parts = exploded['_item'].str.extract(_PRODUCT_ITEM_RE)
+    exploded = exploded.drop(columns='_item')
+    exploded['product_name'] = parts['product_name']
+    exploded['quantity'] = parts['quantity'].fillna(1)
+    return exploded
+
+
+def build_line_items(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tạo bảng dòng hàng chuẩn hóa từ DataFrame đơn hàng
+
+    Ưu tiên cột `products`/`Sản phẩm` (list dict), các đơn không có thì tách từ
+    `raw_product_detail`. Kết quả gồm các cột trong LINE_ITEM_COLUMNS.
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=LINE_ITEM_COLUMNS)
+
+    base = pd.DataFrame({
+        'order_id': resolve_text(df, ORDER_ID_COLUMNS),
+        'order_code': resolve_text(df, ORDER_CODE_COLUMNS),
+        'platform': resolve_platform(df),
+        'order_date': resolve_order_date(df),
+    }, index=df.index)
+
+    products_column = first_present(df, PRODUCT_COLUMNS)
+    if products_column:
+        products = df[products_column].map(_coerce_products)
+    else:
+        products = pd.Series([[]] * len(df), index=df.index)
+
+    frames = [_line_items_from_products(base, products)]
+
+    if 'raw_product_detail' in df.columns:
+        missing = products.str.len() == 0
+        raw_detail = df.loc[missing, 'raw_product_detail'].fillna('').astype(str)
+        frames.append(_line_items_from_raw_detail(base.loc[missing], raw_detail))
+
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=LINE_ITEM_COLUMNS)
+
+    line_items = pd.concat(frames)
+    line_items['product_name'] = line_items['product_name'].fillna('').astype(str).str.strip()
+    line_items = line_items[line_items['product_name'] != '']
+    line_items['quantity'] = pd.to_numeric(line_items['quantity'], errors='coerce').fillna(1).astype(int)
+
+    # Giữ thứ tự đơn hàng gốc, đánh số dòng trong từng đơn
+    line_items = line_items.sort_index(kind='stable')
+    line_items['line_number'] = line_items.groupby(level=0).cumcount() + 1
+
+    return line_items[LINE_ITEM_COLUMNS].reset_index(drop=True)
+
+
+def top_skus_by_day(line_items: pd.DataFrame, top_n: int = 20) -> pd.DataFrame:
+    """Top SKU theo ngày và sàn (tổng số lượng, số đơn, thứ hạng)"""
+    columns = ['order_day', 'platform', 'rank', 'product_name', 'quantity', 'order_count']
+    if line_items is None or line_items.empty:
+        return pd.DataFrame(columns=columns)
+
+    grouped = (
+        line_items
+        .assign(order_day=pd.to_datetime(line_items['order_date'], errors='coerce').dt.strftime('%Y-%m-%d').fillna('unknown'))
+        .groupby(['order_day', 'platform', 'product_name'], sort=False)
+        .agg(quantity=('quantity', 'sum'), order_count=('order_id', 'nunique'))
+        .reset_index()
+        .sort_values(['order_day', 'platform', 'quantity', 'order_count', 'product_name'],
+                     ascending=[False, True, False, False, True])
+    )
+    grouped['rank'] = grouped.groupby(['order_day', 'platform']).cumcount() + 1
+    return grouped[grouped['rank'] <= top_n][columns].reset_index(drop=True)
+
+
+def quantity_histogram(line_items: pd.DataFrame) -> pd.DataFrame:
+    """Histogram số lượng theo dòng hàng và theo đơn, tách theo sàn"""
+    columns = ['scope', 'platform', 'bucket', 'count']
+    if line_items is None or line_items.empty:
+        return pd.DataFrame(columns=columns)
+
+    per_order = (
+        line_items.groupby(['order_id', 'platform'], sort=False)['quantity']
+        .sum().reset_index()
+    )
+
+    frames = []
+    for scope, frame in (('line', line_items), ('order', per_order)):
+        buckets = pd.cut(frame['quantity'], bins=QUANTITY_BINS, labels=QUANTITY_LABELS)
+        counts = (
+            frame.assign(bucket=buckets)
+            .groupby(['platform', 'bucket'], observed=True)
+            .size().reset_index(name='count')
+        )
+        counts.insert(0, 'scope', scope)
+        frames.append(counts)
+
+    histogram = pd.concat(frames, ignore_index=True)
+    histogram['bucket'] = histogram['bucket'].astype(str)
+    return histogram[columns]
+
+
+def build_sku_aggregates(line_items: pd.DataFrame, top_n: int = 20) -> Dict[str, pd.DataFrame]:
+    """Tính tất cả bảng tổng hợp SKU cho một lần chạy"""
+    return {
+        'sku_top_daily': top_skus_by_day(line_items, top_n=top_n),
+        'sku_quantity_histogram': quantity_histogram(line_items),
+    }
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Login Limiter Module
+Giới hạn đăng nhập sai và khóa tạm trong bộ nhớ, theo email và theo IP
+
+- Đếm lần sai bằng sliding window counter (hai cửa sổ cố định có trọng số):
+  mỗi khóa chỉ giữ 3 số, không giữ danh sách thời điểm
+- Vượt ngưỡng trong cửa sổ → khóa khóa đó trong lockout_seconds; request bị
+  chặn được trả lời ngay, không đọc/ghi Sheets
+- Bộ nhớ có giới hạn: tối đa max_keys bộ đếm (LRU) và max_keys khóa (bỏ khóa
+  cũ nhất), bộ đếm/khóa hết hạn bị dọn
+- ip_address phải là IP đã xác định phía server (REMOTE_ADDR sau proxy tin cậy),
+  không phải header X-Forwarded-For do client gửi
+- Trạng thái khóa được lưu định kỳ ra file JSON và nạp lại khi khởi động,
+  restart không mở khóa sớm
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+DEFAULT_STATE_PATH = 'data/cache/login_lockouts.json'
+DEFAULT_EMAIL_LIMIT = int(os.getenv('AUTH_LOGIN_EMAIL_LIMIT', '5'))
+DEFAULT_IP_LIMIT = int(os.getenv('AUTH_LOGIN_IP_LIMIT', '20'))
+DEFAULT_LOCKOUT_SECONDS = float(os.getenv('AUTH_LOGIN_LOCKOUT_SECONDS', '900'))
+
+EMAIL = 'email'
+IP = 'ip'
+
+
+class SlidingWindowCounter:
+    """Ước lượng số sự kiện trong window giây gần nhất"""
+
+    __slots__ = ('window', 'start', 'previous', 'current')
+
+    def __init__(self, window: float, now: float):
+        self.window = window
+        self.start = now - now % window
+        self.previous = 0
+        self.current = 0
+
+    def _roll(self, now: float):
+        start = now - now % self.window
+        if start == self.start:
+            return
+        # Sang cửa sổ kế tiếp: cửa sổ hiện tại thành cửa sổ trước; cách xa hơn thì về 0
+        self.previous = self.current if start - self.start == self.window else 0
+        self.current = 0
+        self.start = start
+
+    def count(self, now: float) -> float:
+        self._roll(now)
+        weight = 1 - (now - self.start) / self.window
+        return self.previous * weight + self.current
+
+    def add(self, now: float) -> float:
+        self._roll(now)
+        self.current += 1
+        return self.count(now)
+
+    def expired(self, now: float) -> bool:
+        return now - self.start >= 2 * self.window
+
+
+class LoginRateLimiter:
+    """Chặn đăng nhập theo email/IP sau quá nhiều lần sai"""
+
+    def __init__(self, email_limit: int = DEFAULT_EMAIL_LIMIT, email_window: float = 900,
+                 email_lockout: float = DEFAULT_LOCKOUT_SECONDS,
+                 ip_limit: int = DEFAULT_IP_LIMIT, ip_window: float = 300, ip_lockout: float = 300,
+                 max_keys: int = 100_000, state_path: Optional[str] = DEFAULT_STATE_PATH,
+                 persist_interval: float = 30, logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            email_limit / email_window / email_lockout: số lần sai tối đa của một email
+                trong email_window giây, vượt thì khóa email_lockout giây
+            ip_limit / ip_window / ip_lockout: tương tự cho một IP (chống dò mật khẩu hàng loạt)
+            max_keys: số bộ đếm tối đa giữ trong bộ nhớ
+            state_path: file lưu trạng thái khóa (None = không lưu)
+        """
+        self.rules = {
+            EMAIL: {'limit': email_limit, 'window': email_window, 'lockout': email_lockout},
+            IP: {'limit': ip_limit, 'window': ip_window, 'lockout': ip_lockout},
+        }
+        self.max_keys = max_keys
+        self.state_path = state_path
+        self.persist_interval = persist_interval
+        self.logger = logger or logging.getLogger('LoginRateLimiter')
+
+        self._lock = threading.Lock()
+        self._counters: 'OrderedDict[Tuple[str, str], SlidingWindowCounter]' = OrderedDict()
+        # (loại, khóa) -> thời điểm hết khóa (epoch), theo thứ tự khóa
+        self._locks: 'OrderedDict[Tuple[str, str], float]' = OrderedDict()
+        self._dirty = False
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {'checks': 0, 'blocked': 0, 'failures': 0, 'lockouts': 0, 'evictions': 0}
+        self._load_state()
+
+    @staticmethod
+    def _keys(email: str, ip_address: str):
+        keys = []
+        email = (email or '').strip().lower()
+        if email:
+            keys.append((EMAIL, email))
+        ip_address = (ip_address or '').strip()
+        if ip_address:
+            keys.append((IP, ip_address))
+        return keys
+
+    # ----------------------------------------------------------------- check
+
+    def check(self, email: str, ip_address: str = '') -> Tuple[bool, float, Optional[str]]:
+        """
+        Kiểm tra trước khi xác thực
+
+        Returns:
+            (allowed, retry_after giây, loại bị khóa 'email'/'ip' hoặc None)
+        """
+        now = time.time()
+        with self._lock:
+            self.stats['checks'] += 1
+            for key in self._keys(email, ip_address):
+                until = self._locks.get(key)
+                if until is None:
+                    continue
+                if until > now:
+                    self.stats['blocked'] += 1
+                    return False, round(until - now, 1), key[0]
+                del self._locks[key]
+                self._dirty = True
+        return True, 0.0, None
+
+    def is_locked(self, email: str = '', ip_address: str = '') -> bool:
+        return not self.check(email, ip_address)[0]
+
+    # ---------------------------------------------------------------- record
+
+    def record_failure(self, email: str, ip_address: str = '') -> Optional[float]:
+        """
+        Ghi nhận một lần đăng nhập sai
+
+        Returns:
+            thời điểm hết khóa (epoch) nếu lần sai này làm email/IP bị khóa, ngược lại None
+        """
+        now = time.time()
+        locked_until = None
+        with self._lock:
+            self.stats['failures'] += 1
+            for key in self._keys(email, ip_address):
+                rule = self.rules[key[0]]
+                counter = self._counters.pop(key, None) or SlidingWindowCounter(rule['window'], now)
+                self._counters[key] = counter  # cuối OrderedDict = dùng gần nhất
+                if counter.add(now) >= rule['limit']:
+                    until = now + rule['lockout']
+                    self._locks.pop(key, None)
+                    self._locks[key] = until
+                    self._counters.pop(key, None)
+                    self._dirty = True
+                    self.stats['lockouts'] += 1
+                    if key[0] == EMAIL:
+                        locked_until = until
+                    self.logger.warning(f"🔒 Khóa đăng nhập {key[0]} {key[1]} trong {rule['lockout']:.0f}s")
+            self._evict(now)
+        return locked_until
+
+    def record_success(self, email: str, ip_address: str = ''):
+        """Đăng nhập đúng: xóa bộ đếm của email (bộ đếm IP giữ nguyên)"""
+        with self._lock:
+            for key in self._keys(email, ''):
+                self._counters.pop(key, None)
+
+    def unlock(self, email: str = '', ip_address: str = ''):
+        """Mở khóa thủ công (quản trị viên)"""
+        with self._lock:
+            for key in self._keys(email, ip_address):
+                self._counters.pop(key, None)
+                if self._locks.pop(key, None) is not None:
+                    self._dirty = True
+
+    def _evict(self, now: float):
+        while len(self._counters) > self.max_keys:
+            self._counters.popitem(last=False)
+            self.stats['evictions'] += 1
+        if len(self._locks) > self.max_keys:
+            for key in [key for key, until in self._locks.items() if until <= now]:
+                del self._locks[key]
+            # Vẫn vượt (bị dò từ rất nhiều IP): bỏ khóa cũ nhất, giới hạn bộ nhớ như bộ đếm
+            while len(self._locks) > self.max_keys:
+                self._locks.popitem(last=False)
+                self.stats['evictions'] += 1
+            self._dirty = True
+
+    def sweep(self):
+        """Dọn bộ đếm và khóa đã hết hạn"""
+        now = time.time()
+        with self._lock:
+            for key in [key for key, counter in self._counters.items() if counter.expired(now)]:
+                del self._counters[key]
+            expired = [key for key, until in self._locks.items() if until <= now]
+            for key in expired:
+                del self._locks[key]
+            if expired:
+                self._dirty = True
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.stats, 'counters': len(self._counters), 'locked': len(self._locks)}
+
+    # ----------------------------------------------------------- persistence
+
+    def _load_state(self):
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            now = time.time()
+            for entry in sorted(state.get('locks', []), key=lambda entry: entry['until']):
+                if entry['until'] > now:
+                    self._locks[(entry['kind'], entry['key'])] = entry['until']
+            self._evict(now)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.warning(f"⚠️ Không đọc được trạng thái khóa đăng nhập: {e}")
+
+    def save_state(self):
+        if not self.state_path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            now = time.time()
+            locks = [{'kind': kind, 'key': key, 'until': until}
+                     for (kind, key), until in self._locks.items() if until > now]
+            self._dirty = False
+        try:
+            state_dir = os.path.dirname(self.state_path)
+            if state_dir:
+                os.makedirs(state_dir, exist_ok=True)
+            tmp_path = f'{self.state_path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'saved_at': now, 'locks': locks}, f)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            with self._lock:
+                self._dirty = True
+            self.logger.warning(f"⚠️ Không lưu được trạng thái khóa đăng nhập: {e}")
+
+    def start(self) -> 'LoginRateLimiter':
+        """Chạy thread dọn bộ đếm + lưu trạng thái khóa định kỳ"""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='login-limiter', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.persist_interval):
+            try:
+                self.sweep()
+                self.save_state()
+            except Exception as e:
+                self.logger.error(f"❌ Login limiter thread error: {e}")
+
+    def stop(self):
+        self._stop.set()
+        self.save_state()
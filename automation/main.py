@@ -4,14 +4,17 @@ OneAutomation System - Main Python Automation Service
 Hệ thống tự động hóa chính cho OneAutomation
 """
 import asyncio
+import hashlib
+import json
 import os
 import sys
 import logging
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import uvicorn
 from dotenv import load_dotenv
 
@@ -102,6 +105,8 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("👋 Shutting down OneAutomation System...")
+    if google_service:
+        await google_service.close()
 
 @app.get("/")
 async def root():
@@ -184,19 +189,58 @@ async def run_automation_task(task: AutomationTask):
         logger.error(f"❌ Task {task.task_type} failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def etag_response(request: Request, payload: Dict[str, Any]) -> Response:
+    """
+    JSON kèm ETag theo nội dung; client gửi If-None-Match trùng thì trả 304
+    (dashboard polling không phải tải lại dữ liệu không đổi)
+    """
+    body = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    etag = '"{}"'.format(hashlib.sha1(body.encode('utf-8')).hexdigest())
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={int(google_service.read_cache_ttl)}"
+    }
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=payload, headers=headers)
+
+@app.get("/api/google-sheets/{spreadsheet_id}/batch")
+async def get_sheets_batch(
+    spreadsheet_id: str,
+    request: Request,
+    ranges: List[str] = Query(..., description="Nhiều range A1, vd. ranges=Config&ranges=SLA_Rules"),
+    max_age: Optional[float] = None
+):
+    """Đọc nhiều range trong một request (một values_batch_get cho các range chưa cache)"""
+    try:
+        if not google_service:
+            raise HTTPException(status_code=500, detail="Google Sheets service not initialized")
+        data = await google_service.read_ranges(spreadsheet_id, ranges, max_age=max_age)
+        return etag_response(request, {
+            "status": "success",
+            "data": data,
+            "spreadsheet_id": spreadsheet_id,
+            "ranges": list(data.keys())
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to batch read sheets data: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/google-sheets/{spreadsheet_id}")
-async def get_sheets_data(spreadsheet_id: str, range_name: str = "Sheet1!A:Z"):
+async def get_sheets_data(spreadsheet_id: str, request: Request, range_name: str = "Sheet1!A:Z"):
     """Get data from Google Sheets"""
     try:
         if not google_service:
             raise HTTPException(status_code=500, detail="Google Sheets service not initialized")
         data = await google_service.read_data(spreadsheet_id, range_name)
-        return {
+        return etag_response(request, {
             "status": "success",
             "data": data,
             "spreadsheet_id": spreadsheet_id,
             "range": range_name
-        }
+        })
     except Exception as e:
         logger.error(f"Failed to get sheets data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -19,6 +19,7 @@ from scripts.login_manager import CompleteLoginManager
 from scripts.date_customizer import DateCustomizer
 from scripts.pagination_handler import PaginationHandler
 from scripts.enhanced_scraper import EnhancedScraper
+from page_archive import PageArchive
 
 
 class JuneFreshSessionWithProducts:
@@ -30,6 +31,8 @@ class JuneFreshSessionWithProducts:
         self.processed_pages = 0
         self.total_extracted = 0
         self.total_products_extracted = 0
+        # Một archive JSONL nén cho cả phiên, mỗi trang một khối + index
+        self.page_archive = PageArchive(f"data/june_2025_enhanced_{self.session_id}")
 
     def login_and_setup(self):
         """🔐 Fresh login and setup for each page"""
@@ -350,34 +353,28 @@ class JuneFreshSessionWithProducts:
 
             print("💾 Saving enhanced page data...")
 
-            # Local backup
-            filename = f"data/june_2025_enhanced_page_{page_number:02d}_{self.session_id}.json"
-            os.makedirs('data', exist_ok=True)
-
             # Calculate statistics
             total_products = sum(order.get('product_count', 0) for order in page_data)
             orders_with_products = len([o for o in page_data if o.get('has_product_details', False)])
 
-            backup_data = {
-                'metadata': {
-                    'session_id': self.session_id,
-                    'page_number': page_number,
-                    'extraction_timestamp': datetime.now().isoformat(),
-                    'total_records': len(page_data),
-                    'total_products': total_products,
-                    'orders_with_products': orders_with_products,
-                    'product_extraction_rate': f"{orders_with_products/len(page_data)*100:.1f}%",
-                    'date_range': 'June 2025',
-                    'processing_method': 'Fresh Session Per Page WITH Products',
-                    'target_total': self.target_records
-                },
-                'orders': page_data
+            metadata = {
+                'session_id': self.session_id,
+                'page_number': page_number,
+                'extraction_timestamp': datetime.now().isoformat(),
+                'total_records': len(page_data),
+                'total_products': total_products,
+                'orders_with_products': orders_with_products,
+                'product_extraction_rate': f"{orders_with_products/len(page_data)*100:.1f}%",
+                'date_range': 'June 2025',
+                'processing_method': 'Fresh Session Per Page WITH Products',
+                'target_total': self.target_records
             }
 
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(backup_data, f, ensure_ascii=False, indent=2)
+            # Local backup: append trang vào archive JSONL nén của phiên
+            entry = self.page_archive.append_page(page_number, page_data, metadata)
+            filename = self.page_archive.path
 
-            print(f"📁 Enhanced backup: {filename}")
+            print(f"📁 Enhanced backup: {filename} (page {page_number}, {entry['length']/1024:.1f} KB)")
             print(f"   📊 {len(page_data)} orders, {total_products} products")
             return True
 
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Order Index Module
+Chỉ mục định danh đơn hàng (mã đơn + fingerprint nội dung) lưu trong SQLite
+Dùng để loại trùng trong một lần chạy và giữa các lần chạy
+"""
+
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable
+
+import pandas as pd
+
+
+# Các cột thay đổi mỗi lần scrape, không phản ánh nội dung đơn hàng
+VOLATILE_COLUMNS = {
+    'row_index', 'total_columns', 'scraped_at', 'session_id', 'page_number',
+    'page_position', 'processing_timestamp', 'extraction_method', 'Thời gian xuất',
+    'order_key', 'order_fingerprint', 'change_status'
+}
+
+ORDER_KEY_COLUMNS = ['id', 'order_code', 'order_id', 'Mã đơn hàng']
+
+STATUS_NEW = 'new'
+STATUS_CHANGED = 'changed'
+STATUS_UNCHANGED = 'unchanged'
+
+# SQLite giới hạn số tham số trong một câu lệnh
+_SQLITE_BATCH = 500
+
+
+def compute_order_keys(df: pd.DataFrame) -> pd.Series:
+    """Mã định danh đơn hàng: cột mã đơn đầu tiên khác rỗng"""
+    keys = pd.Series('', index=df.index, dtype=object)
+    for col in reversed(ORDER_KEY_COLUMNS):
+        if col in df.columns:
+            values = df[col].fillna('').astype(str).str.strip()
+            keys = values.where(values != '', keys)
+    return keys
+
+
+def compute_fingerprints(df: pd.DataFrame) -> pd.Series:
+    """Fingerprint nội dung mỗi dòng (bỏ qua các cột thay đổi theo lần scrape)"""
+    content_columns = sorted(col for col in df.columns if col not in VOLATILE_COLUMNS)
+    if not content_columns:
+        return pd.Series('', index=df.index, dtype=object)
+
+    content = df[content_columns].astype(str)
+    hashes = pd.util.hash_pandas_object(content, index=False)
+    return hashes.map('{:016x}'.format)
+
+
+class OrderIndex:
+    """Chỉ mục đơn hàng bền vững: order_key → fingerprint nội dung"""
+
+    def __init__(self, db_path: str = 'data/order_index.db'):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        """Mở kết nối SQLite (WAL), commit khi thành công và luôn đóng kết nối"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS orders (
+                    order_key TEXT PRIMARY KEY,
+                    fingerprint TEXT NOT NULL,
+                    first_seen TEXT NOT NULL,
+                    last_seen TEXT NOT NULL,
+                    last_changed TEXT NOT NULL
+                )
+                """
+            )
+
+    def lookup(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Lấy fingerprint đã lưu cho danh sách order_key"""
+        keys = [k for k in set(keys) if k]
+        known = {}
+        with self._connect() as conn:
+            for start in range(0, len(keys), _SQLITE_BATCH):
+                batch = keys[start:start + _SQLITE_BATCH]
+                placeholders = ','.join('?' * len(batch))
+                rows = conn.execute(
+                    f'SELECT order_key, fingerprint FROM orders WHERE order_key IN ({placeholders})',
+                    batch
+                ).fetchall()
+                known.update(rows)
+        return known
+
+    def deduplicate(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Loại trùng theo mã đơn hàng và phân loại new/changed/unchanged
+
+        Thêm các cột `order_key`, `order_fingerprint`, `change_status`.
+        Đơn không có mã thì loại trùng theo fingerprint nội dung.
+        Chỉ mục chưa được cập nhật cho tới khi gọi commit().
+        """
+        if df.empty:
+            return df
+
+        df = df.copy()
+        df['order_key'] = compute_order_keys(df)
+        df['order_fingerprint'] = compute_fingerprints(df)
+
+        # Đơn không có mã: dùng fingerprint làm khóa tạm
+        dedupe_key = df['order_key'].where(df['order_key'] != '', '#' + df['order_fingerprint'])
+        df = df[~dedupe_key.duplicated(keep='last')]
+
+        known = self.lookup(df['order_key'])
+        previous = df['order_key'].map(known)
+        df['change_status'] = STATUS_NEW
+        df.loc[previous.notna() & (previous != df['order_fingerprint']), 'change_status'] = STATUS_CHANGED
+        df.loc[previous == df['order_fingerprint'], 'change_status'] = STATUS_UNCHANGED
+        return df
+
+    def commit(self, df: pd.DataFrame) -> int:
+        """Ghi nhận các đơn đã xử lý thành công vào chỉ mục"""
+        if df.empty or 'order_key' not in df.columns:
+            return 0
+
+        now = datetime.now().isoformat()
+        rows = [
+            (key, fingerprint, now, now, now)
+            for key, fingerprint in zip(df['order_key'], df['order_fingerprint'])
+            if key
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                """
+                INSERT INTO orders (order_key, fingerprint, first_seen, last_seen, last_changed)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(order_key) DO UPDATE SET
+                    last_seen = excluded.last_seen,
+                    last_changed = CASE
+                        WHEN orders.fingerprint != excluded.fingerprint THEN excluded.last_changed
+                        ELSE orders.last_changed
+                    END,
+                    fingerprint = excluded.fingerprint
+                """,
+                rows
+            )
+        return len(rows)
+
+    def summarize(self, df: pd.DataFrame) -> Dict[str, int]:
+        """Đếm số đơn theo change_status"""
+        if 'change_status' not in df.columns:
+            return {}
+        return {str(k): int(v) for k, v in df['change_status'].value_counts().items()}
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM orders').fetchone()[0]
+
+
+def changed_only(df: pd.DataFrame) -> pd.DataFrame:
+    """Lọc các đơn mới hoặc thay đổi (cho các bước xử lý phía sau)"""
+    if 'change_status' not in df.columns:
+        return df
+    return df[df['change_status'] != STATUS_UNCHANGED]
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Page Archive Module
+Lưu dữ liệu scrape theo trang dạng JSON Lines nén (gzip, hoặc zstd nếu có)
+
+Mỗi phiên một file archive, mỗi trang là một khối nén độc lập (gzip member /
+zstd frame) nối tiếp nhau, mỗi dòng là một đơn hàng. File index đi kèm ghi
+offset, độ dài, số đơn và khoảng mã đơn của từng trang để đọc trực tiếp một
+trang hoặc tìm một đơn mà không cần giải nén toàn bộ archive.
+"""
+
+import glob
+import gzip
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+CODEC_EXTENSIONS = {'gzip': '.jsonl.gz', 'zstd': '.jsonl.zst'}
+INDEX_SUFFIX = '.index.json'
+ORDER_ID_FIELDS = ['id', 'order_id', 'order_code']
+
+
+def _order_id(record: Dict) -> Optional[str]:
+    for field in ORDER_ID_FIELDS:
+        value = record.get(field)
+        if value not in (None, ''):
+            return str(value)
+    return None
+
+
+def _id_sort_key(order_id: str):
+    """So sánh mã đơn dạng số theo giá trị, còn lại theo chuỗi"""
+    return (0, int(order_id), '') if order_id.isdigit() else (1, 0, order_id)
+
+
+class PageArchive:
+    """Archive JSONL nén theo trang + index offset"""
+
+    def __init__(self, path: str, codec: Optional[str] = None):
+        """
+        Args:
+            path: đường dẫn archive không kèm đuôi (vd: data/june_2025_enhanced_<session>)
+            codec: 'gzip' hoặc 'zstd' (mặc định zstd nếu có thư viện zstandard)
+        """
+        codec = codec or ('zstd' if ZSTD_AVAILABLE else 'gzip')
+        if codec not in CODEC_EXTENSIONS:
+            raise ValueError(f"Codec không hỗ trợ: {codec}")
+        if codec == 'zstd' and not ZSTD_AVAILABLE:
+            raise ImportError("zstandard chưa được cài đặt - pip install zstandard")
+
+        self.codec = codec
+        self.path = path + CODEC_EXTENSIONS[codec]
+        # Index gắn với đuôi codec: archive gzip và zstd cùng tên không dùng chung index
+        self.index_path = self.path + INDEX_SUFFIX
+        self._legacy_index_path = path + INDEX_SUFFIX
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.index = self._load_index()
+
+    @classmethod
+    def open(cls, index_path: str) -> 'PageArchive':
+        """Mở archive có sẵn từ file index"""
+        with open(index_path, 'r', encoding='utf-8') as f:
+            codec = json.load(f).get('codec', 'gzip')
+        base = index_path[:-len(INDEX_SUFFIX)]
+        if base.endswith(CODEC_EXTENSIONS.get(codec, '')):
+            base = base[:-len(CODEC_EXTENSIONS[codec])]
+        return cls(base, codec=codec)
+
+    @classmethod
+    def from_archive(cls, archive_path: str) -> 'PageArchive':
+        """Mở archive từ đường dẫn file nén (.jsonl.gz / .jsonl.zst)"""
+        for codec, extension in CODEC_EXTENSIONS.items():
+            if archive_path.endswith(extension):
+                return cls(archive_path[:-len(extension)], codec=codec)
+        raise ValueError(f"Không nhận ra codec của archive: {archive_path}")
+
+    # ------------------------------------------------------------------ index
+
+    def _load_index(self) -> Dict:
+        for index_path in (self.index_path, self._legacy_index_path):
+            if not os.path.exists(index_path):
+                continue
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('codec', 'gzip') == self.codec:
+                return index
+            if index_path == self.index_path:
+                raise ValueError(f"Index {index_path} dùng codec {index.get('codec')}, không phải {self.codec}")
+
+        # Không có index: giữ nguyên dữ liệu đã có, trang mới ghi tiếp ở cuối file
+        return {
+            'archive': os.path.basename(self.path),
+            'codec': self.codec,
+            'created_at': datetime.now().isoformat(),
+            'pages': [],
+            'end_offset': os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        }
+
+    def _save_index(self):
+        tmp_path = f'{self.index_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+        if os.path.exists(self._legacy_index_path):
+            os.remove(self._legacy_index_path)
+
+    @property
+    def pages(self) -> List[Dict]:
+        return self.index['pages']
+
+    # ------------------------------------------------------------------ write
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == 'zstd':
+            return zstandard.ZstdCompressor(level=10).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    def _decompress(self, data: bytes) -> bytes:
+        if self.codec == 'zstd':
+            return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+        return gzip.decompress(data)
+
+    def append_page(self, page_number: int, records: List[Dict],
+                    metadata: Optional[Dict] = None) -> Dict:
+        """Ghi một trang (một khối nén) vào cuối archive và cập nhật index"""
+        payload = ''.join(
+            json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str) + '\n'
+            for record in records
+        ).encode('utf-8')
+        block = self._compress(payload)
+
+        # Offset lấy từ index: phần ghi dở của lần chạy lỗi trước (nằm sau
+        # end_offset) bị cắt bỏ. File ngắn hơn index thì ghi tiếp ở cuối file
+        # và bỏ các trang không còn đủ dữ liệu.
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        offset = min(self.index.get('end_offset', size), size)
+        if offset < self.index.get('end_offset', 0):
+            self.index['pages'] = [p for p in self.pages if p['offset'] + p['length'] <= offset]
+        with open(self.path, 'ab') as f:
+            if size > offset:
+                f.truncate(offset)
+            f.write(block)
+            f.flush()
+            os.fsync(f.fileno())
+
+        order_ids = sorted((oid for oid in map(_order_id, records) if oid), key=_id_sort_key)
+        entry = {
+            'page_number': page_number,
+            'offset': offset,
+            'length': len(block),
+            'raw_size': len(payload),
+            'records': len(records),
+            'min_order_id': order_ids[0] if order_ids else None,
+            'max_order_id': order_ids[-1] if order_ids else None,
+            'written_at': datetime.now().isoformat(),
+            'metadata': metadata or {}
+        }
+        # Ghi lại trang đã có: giữ entry mới nhất
+        self.index['pages'] = [p for p in self.pages if p['page_number'] != page_number] + [entry]
+        self.index['end_offset'] = offset + len(block)
+        self._save_index()
+        return entry
+
+    # ------------------------------------------------------------------- read
+
+    def _read_block(self, entry: Dict) -> Iterator[Dict]:
+        with open(self.path, 'rb') as f:
+            f.seek(entry['offset'])
+            data = self._decompress(f.read(entry['length']))
+        for line in data.decode('utf-8').splitlines():
+            if line:
+                yield json.loads(line)
+
+    def read_page(self, page_number: int) -> List[Dict]:
+        """Đọc một trang (chỉ giải nén khối của trang đó)"""
+        for entry in self.pages:
+            if entry['page_number'] == page_number:
+                return list(self._read_block(entry))
+        return []
+
+    def iter_records(self, pages: Optional[Iterable[int]] = None) -> Iterator[Dict]:
+        """Duyệt tuần tự các đơn hàng (từng trang một, không tải toàn bộ vào bộ nhớ)"""
+        wanted = set(pages) if pages is not None else None
+        for entry in sorted(self.pages, key=lambda p: p['page_number']):
+            if wanted is None or entry['page_number'] in wanted:
+                yield from self._read_block(entry)
+
+    def find_order(self, order_id) -> Optional[Dict]:
+        """Tìm đơn theo mã, chỉ giải nén các trang có khoảng mã chứa mã đơn"""
+        order_id = str(order_id)
+        key = _id_sort_key(order_id)
+        for entry in self.pages:
+            if entry['min_order_id'] is None:
+                continue
+            if _id_sort_key(entry['min_order_id']) <= key <= _id_sort_key(entry['max_order_id']):
+                for record in self._read_block(entry):
+                    if _order_id(record) == order_id:
+                        return record
+        return None
+
+    def summary(self) -> Dict:
+        return {
+            'archive': self.path,
+            'codec': self.codec,
+            'pages': len(self.pages),
+            'records': sum(p['records'] for p in self.pages),
+            'compressed_size': sum(p['length'] for p in self.pages),
+            'raw_size': sum(p['raw_size'] for p in self.pages),
+        }
+
+
+def list_archives(data_dir: str = 'data', pattern: str = '*') -> List[PageArchive]:
+    """Liệt kê các archive trong thư mục (theo file index)"""
+    return [PageArchive.open(path)
+            for path in sorted(glob.glob(os.path.join(data_dir, pattern + INDEX_SUFFIX)))]
+
+
+def iter_archive_records(data_dir: str = 'data', pattern: str = '*') -> Iterator[Dict]:
+    """Duyệt toàn bộ đơn hàng của nhiều archive (dùng cho consolidate/replay)"""
+    for archive in list_archives(data_dir, pattern):
+        yield from archive.iter_records()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parquet Store Module
+Lưu lịch sử đơn hàng dạng Parquet phân vùng theo ngày đặt hàng và sàn
+(data/parquet/<dataset>/order_day=YYYY-MM-DD/platform=<sàn>/part-*.parquet)
+
+Reader chỉ mở các thư mục phân vùng cần thiết và chỉ đọc các cột được yêu cầu.
+"""
+
+import glob
+import json
+import logging
+import os
+import re
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from line_items import resolve_order_date, resolve_platform
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+PARTITION_COLUMNS = ['order_day', 'platform']
+INGESTED_AT_COLUMN = '_ingested_at'
+UNKNOWN_DAY = 'unknown'
+
+# Tên phân vùng an toàn cho filesystem
+_UNSAFE_PARTITION_CHARS = re.compile(r'[\\/:*?"<>|=%]+')
+
+
+def partition_value(value: str) -> str:
+    cleaned = _UNSAFE_PARTITION_CHARS.sub('_', str(value)).strip()
+    return cleaned or 'unknown'
+
+
+def _to_arrow_ready(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Chuẩn hóa mọi cột thành chuỗi (list/dict → JSON) để schema giữa các lần
+    chạy và các nguồn (scrape trực tiếp, CSV cũ, archive trang) luôn khớp nhau
+    """
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype != object:
+            df[col] = df[col].astype(str).where(df[col].notna(), None)
+            continue
+        df[col] = df[col].map(
+            lambda v: None if v is None or (isinstance(v, float) and pd.isna(v))
+            else json.dumps(v, ensure_ascii=False, default=str) if isinstance(v, (list, dict))
+            else str(v)
+        )
+    return df
+
+
+class ParquetOrderStore:
+    """Kho Parquet phân vùng theo order_day/platform với append + compaction"""
+
+    def __init__(self, root: str = 'data/parquet', dataset: str = 'orders',
+                 key_column: str = 'order_key'):
+        if not PARQUET_AVAILABLE:
+            raise ImportError("pyarrow chưa được cài đặt - pip install pyarrow")
+
+        self.logger = logging.getLogger('ParquetOrderStore')
+        self.base_dir = os.path.join(root, dataset)
+        self.key_column = key_column
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    # ------------------------------------------------------------------ write
+
+    def _partition_dir(self, order_day: str, platform: str) -> str:
+        return os.path.join(self.base_dir, f'order_day={order_day}', f'platform={platform}')
+
+    def append(self, df: pd.DataFrame, run_id: Optional[str] = None,
+               ingested_at: Optional[str] = None) -> List[str]:
+        """
+        Ghi thêm một lần chạy, mỗi phân vùng một file part-<run_id>.parquet
+
+        ingested_at: thời điểm dữ liệu được scrape (mặc định hiện tại), dùng để
+        chọn bản ghi mới nhất khi nạp lại dữ liệu cũ
+        """
+        if df.empty:
+            return []
+
+        run_id = run_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+        order_dates = resolve_order_date(df)
+        data = df.copy()
+        data['order_day'] = order_dates.dt.strftime('%Y-%m-%d').fillna(UNKNOWN_DAY)
+        data['platform'] = resolve_platform(df).map(partition_value)
+        data[INGESTED_AT_COLUMN] = ingested_at or datetime.now().isoformat()
+        data = _to_arrow_ready(data)
+
+        written = []
+        for (order_day, platform), part in data.groupby(PARTITION_COLUMNS, sort=True):
+            partition_dir = self._partition_dir(order_day, platform)
+            os.makedirs(partition_dir, exist_ok=True)
+            path = os.path.join(partition_dir, f'part-{run_id}-{uuid.uuid4().hex[:8]}.parquet')
+            self._write_file(part.drop(columns=PARTITION_COLUMNS), path)
+            written.append(path)
+
+        self.logger.info(f"✅ Parquet append: {len(df)} dòng → {len(written)} phân vùng")
+        return written
+
+    def _write_file(self, df: pd.DataFrame, path: str):
+        """Ghi file tạm rồi rename để reader không thấy file ghi dở"""
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        tmp_path = f'{path}.tmp'
+        pq.write_table(
+            table, tmp_path,
+            compression='zstd',
+            use_dictionary=True,
+            write_statistics=True,
+        )
+        os.replace(tmp_path, path)
+
+    # ------------------------------------------------------------------- read
+
+    def partition_dirs(self, start: Optional[date] = None, end: Optional[date] = None,
+                       platforms: Optional[Iterable[str]] = None) -> List[str]:
+        """Danh sách thư mục phân vùng khớp điều kiện (chỉ liệt kê thư mục)"""
+        wanted_platforms = {partition_value(p).lower() for p in platforms} if platforms else None
+        dirs = []
+        for day_dir in sorted(glob.glob(os.path.join(self.base_dir, 'order_day=*'))):
+            order_day = os.path.basename(day_dir).split('=', 1)[1]
+            if start or end:
+                if order_day == UNKNOWN_DAY:
+                    continue
+                day = date.fromisoformat(order_day)
+                if (start and day < start) or (end and day > end):
+                    continue
+            for platform_dir in sorted(glob.glob(os.path.join(day_dir, 'platform=*'))):
+                platform = os.path.basename(platform_dir).split('=', 1)[1]
+                if wanted_platforms and platform.lower() not in wanted_platforms:
+                    continue
+                dirs.append(platform_dir)
+        return dirs
+
+    def _files(self, partition_dirs: Iterable[str]) -> List[str]:
+        files = []
+        for partition_dir in partition_dirs:
+            files.extend(sorted(glob.glob(os.path.join(partition_dir, '*.parquet'))))
+        return files
+
+    def read(self, columns: Optional[List[str]] = None, start: Optional[date] = None,
+             end: Optional[date] = None, platforms: Optional[Iterable[str]] = None,
+             latest_only: bool = True) -> pd.DataFrame:
+        """
+        Đọc các phân vùng khớp điều kiện
+
+        Args:
+            columns: chỉ đọc các cột này (cột phân vùng luôn có)
+            start/end: khoảng ngày đặt hàng (bao gồm hai đầu)
+            platforms: lọc theo sàn
+            latest_only: chỉ giữ bản ghi mới nhất của mỗi đơn
+        """
+        files = self._files(self.partition_dirs(start, end, platforms))
+        if not files:
+            return pd.DataFrame(columns=(columns or []) + PARTITION_COLUMNS)
+
+        partition_schema = pa.schema([pa.field(col, pa.string()) for col in PARTITION_COLUMNS])
+        schema = pa.unify_schemas(
+            [pq.read_schema(path) for path in files] + [partition_schema],
+            promote_options='permissive'
+        )
+        dataset = ds.dataset(files, schema=schema, format='parquet',
+                             partitioning=ds.partitioning(partition_schema, flavor='hive'),
+                             partition_base_dir=self.base_dir)
+
+        read_columns = None
+        if columns is not None:
+            extra = [self.key_column, INGESTED_AT_COLUMN] if latest_only else []
+            read_columns = [c for c in dict.fromkeys(list(columns) + extra + PARTITION_COLUMNS)
+                            if c in dataset.schema.names]
+
+        df = dataset.to_table(columns=read_columns).to_pandas()
+
+        if latest_only and self.key_column in df.columns and INGESTED_AT_COLUMN in df.columns:
+            df = (
+                df.sort_values(INGESTED_AT_COLUMN, kind='stable')
+                .drop_duplicates(subset=[self.key_column], keep='last')
+            )
+            if columns is not None:
+                df = df[[c for c in df.columns if c in columns or c in PARTITION_COLUMNS]]
+
+        return df.reset_index(drop=True)
+
+    def read_recent(self, days: int = 7, columns: Optional[List[str]] = None,
+                    platforms: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """Đọc N ngày gần nhất (chỉ chạm các phân vùng của N ngày đó)"""
+        end = date.today()
+        start = end - timedelta(days=max(days - 1, 0))
+        return self.read(columns=columns, start=start, end=end, platforms=platforms)
+
+    # ------------------------------------------------------------- compaction
+
+    def compact(self, start: Optional[date] = None, end: Optional[date] = None,
+                min_files: int = 2) -> Dict[str, int]:
+        """
+        Gộp các file nhỏ trong mỗi phân vùng thành một file duy nhất
+
+        Bản ghi trùng order_key chỉ giữ bản mới nhất. File gộp được ghi
+        xong (rename nguyên tử) trước khi xóa file cũ.
+        """
+        stats = {'partitions': 0, 'files_removed': 0, 'rows': 0}
+        for partition_dir in self.partition_dirs(start, end):
+            files = self._files([partition_dir])
+            if len(files) < min_files:
+                continue
+
+            schema = pa.unify_schemas([pq.read_schema(path) for path in files],
+                                      promote_options='permissive')
+            table = ds.dataset(files, schema=schema, format='parquet').to_table()
+            df = table.to_pandas()
+            if self.key_column in df.columns and INGESTED_AT_COLUMN in df.columns:
+                df = (
+                    df.sort_values(INGESTED_AT_COLUMN, kind='stable')
+                    .drop_duplicates(subset=[self.key_column], keep='last')
+                )
+
+            target = os.path.join(partition_dir, f'part-compacted-{uuid.uuid4().hex[:8]}.parquet')
+            self._write_file(df, target)
+            for path in files:
+                os.remove(path)
+
+            stats['partitions'] += 1
+            stats['files_removed'] += len(files)
+            stats['rows'] += len(df)
+
+        if stats['partitions']:
+            self.logger.info(
+                f"🗜️ Compaction: {stats['partitions']} phân vùng, "
+                f"{stats['files_removed']} file → {stats['rows']} dòng"
+            )
+        return stats
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Password Hasher Module
+Hash mật khẩu bằng KDF có salt riêng từng user, chạy trong worker pool có giới hạn
+
+- Định dạng lưu: scrypt$<n>$<r>$<p>$<salt>$<hash> hoặc
+  pbkdf2_sha256$<iterations>$<salt>$<hash> (salt/hash base64url)
+- Hash cũ (SHA-256 + salt tĩnh, 64 ký tự hex) vẫn đăng nhập được; needs_rehash()
+  báo cần hash lại bằng thuật toán/chi phí hiện tại
+- KDF chạy trong pool (thread - hashlib nhả GIL khi tính - hoặc process);
+  số việc đang chờ + đang chạy bị giới hạn, vượt thì HasherBusy ngay thay vì để
+  request thread xếp hàng vô hạn (p99 đăng nhập giữ ổn định lúc cao điểm)
+- Quá timeout cũng báo HasherBusy (việc vẫn chạy xong trong pool rồi trả slot)
+- verify_dummy() chạy một lần KDF thật cho email không tồn tại, thời gian trả lời
+  không lộ email nào có tài khoản
+- Thống kê độ trễ (chờ trong hàng + thời gian tính) qua metrics()
+"""
+
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Dict, Optional, Tuple
+
+
+LEGACY_SALT = 'mia_vn_salt_2024'
+
+DEFAULT_ALGORITHM = os.getenv('AUTH_PASSWORD_ALGORITHM', 'scrypt')
+DEFAULT_SCRYPT_N = int(os.getenv('AUTH_SCRYPT_N', str(2 ** 14)))
+DEFAULT_SCRYPT_R = 8
+DEFAULT_SCRYPT_P = 1
+DEFAULT_PBKDF2_ITERATIONS = int(os.getenv('AUTH_PBKDF2_ITERATIONS', '260000'))
+DEFAULT_WORKERS = int(os.getenv('AUTH_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+DEFAULT_MAX_QUEUE = int(os.getenv('AUTH_HASH_QUEUE', '64'))
+DEFAULT_EXECUTOR = os.getenv('AUTH_HASH_EXECUTOR', 'thread')
+DEFAULT_TIMEOUT = float(os.getenv('AUTH_HASH_TIMEOUT', '10'))
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+class HasherBusy(Exception):
+    """Hàng đợi hash đã đầy"""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def legacy_hash(password: str) -> str:
+    """Hash kiểu cũ: SHA-256(password + salt tĩnh)"""
+    return hashlib.sha256((password + LEGACY_SALT).encode()).hexdigest()
+
+
+def is_legacy_hash(password_hash: str) -> bool:
+    return len(password_hash) == 64 and all(c in '0123456789abcdef' for c in password_hash.lower())
+
+
+def _derive(algorithm: str, password: str, salt: bytes, params: Tuple[int, ...]) -> bytes:
+    """Tính KDF (hàm cấp module để chạy được trong ProcessPoolExecutor)"""
+    if algorithm == 'scrypt':
+        n, r, p = params
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r + 1024 * 1024, dklen=KEY_BYTES)
+    if algorithm == 'pbkdf2_sha256':
+        (iterations,) = params
+        return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations, dklen=KEY_BYTES)
+    raise ValueError(f"Thuật toán hash không hỗ trợ: {algorithm}")
+
+
+def _timed_derive(algorithm: str, password: str, salt: bytes, params: Tuple[int, ...]) -> Tuple[bytes, float]:
+    started = time.perf_counter()
+    return _derive(algorithm, password, salt, params), time.perf_counter() - started
+
+
+def _parse(password_hash: str) -> Optional[Tuple[str, Tuple[int, ...], bytes, bytes]]:
+    """(algorithm, params, salt, digest) hoặc None nếu không đúng định dạng"""
+    try:
+        parts = password_hash.split('$')
+        if parts[0] == 'scrypt' and len(parts) == 6:
+            return 'scrypt', tuple(int(x) for x in parts[1:4]), _b64decode(parts[4]), _b64decode(parts[5])
+        if parts[0] == 'pbkdf2_sha256' and len(parts) == 4:
+            return 'pbkdf2_sha256', (int(parts[1]),), _b64decode(parts[2]), _b64decode(parts[3])
+    except Exception:
+        pass
+    return None
+
+
+class PasswordHasher:
+    """Hash/verify mật khẩu qua worker pool có giới hạn hàng đợi"""
+
+    def __init__(self, algorithm: str = DEFAULT_ALGORITHM, scrypt_n: int = DEFAULT_SCRYPT_N,
+                 scrypt_r: int = DEFAULT_SCRYPT_R, scrypt_p: int = DEFAULT_SCRYPT_P,
+                 pbkdf2_iterations: int = DEFAULT_PBKDF2_ITERATIONS, workers: int = DEFAULT_WORKERS,
+                 max_queue: int = DEFAULT_MAX_QUEUE, executor: str = DEFAULT_EXECUTOR,
+                 timeout: float = DEFAULT_TIMEOUT, logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            algorithm: 'scrypt' hoặc 'pbkdf2_sha256'
+            scrypt_n / scrypt_r / scrypt_p: chi phí scrypt (bộ nhớ ~ 128 * n * r byte)
+            pbkdf2_iterations: số vòng PBKDF2
+            workers: số worker tính hash song song
+            max_queue: số việc được chờ thêm ngoài số đang chạy
+            executor: 'thread' hoặc 'process'
+            timeout: thời gian chờ tối đa một lần hash (giây)
+        """
+        if algorithm == 'scrypt':
+            self.params: Tuple[int, ...] = (scrypt_n, scrypt_r, scrypt_p)
+        elif algorithm == 'pbkdf2_sha256':
+            self.params = (pbkdf2_iterations,)
+        else:
+            raise ValueError(f"Thuật toán hash không hỗ trợ: {algorithm}")
+        self.algorithm = algorithm
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.timeout = timeout
+        self.logger = logger or logging.getLogger('PasswordHasher')
+
+        self.executor_type = 'process' if executor == 'process' else 'thread'
+        if self.executor_type == 'process':
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+
+        self._lock = threading.Lock()
+        # Mẫu gần nhất: thời gian tính KDF và tổng thời gian (chờ hàng đợi + tính)
+        self._compute_times = deque(maxlen=2048)
+        self._total_times = deque(maxlen=2048)
+        self.stats = {'hashed': 0, 'verified': 0, 'legacy_verified': 0, 'dummy_verified': 0,
+                      'rejected_busy': 0, 'timeouts': 0, 'errors': 0}
+        self._dummy_hash: Optional[str] = None
+
+    # ------------------------------------------------------------------ pool
+
+    def _submit(self, algorithm: str, password: str, salt: bytes, params: Tuple[int, ...]) -> Future:
+        """Đưa một lần tính KDF vào pool; Future trả digest"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.stats['rejected_busy'] += 1
+            raise HasherBusy("Hàng đợi hash mật khẩu đã đầy")
+
+        submitted = time.perf_counter()
+        try:
+            inner = self._pool.submit(_timed_derive, algorithm, password, salt, params)
+        except Exception:
+            self._slots.release()
+            raise
+        result: Future = Future()
+
+        def _done(future):
+            self._slots.release()
+            try:
+                digest, compute_time = future.result()
+            except Exception as e:
+                with self._lock:
+                    self.stats['errors'] += 1
+                result.set_exception(e)
+                return
+            with self._lock:
+                self._compute_times.append(compute_time)
+                self._total_times.append(time.perf_counter() - submitted)
+            result.set_result(digest)
+
+        inner.add_done_callback(_done)
+        return result
+
+    def _run(self, algorithm: str, password: str, salt: bytes, params: Tuple[int, ...]) -> bytes:
+        future = self._submit(algorithm, password, salt, params)
+        try:
+            return future.result(timeout=self.timeout)
+        except (FutureTimeoutError, TimeoutError):
+            with self._lock:
+                self.stats['timeouts'] += 1
+            raise HasherBusy(f"Hash mật khẩu quá {self.timeout:.0f}s")
+
+    # ------------------------------------------------------------------- API
+
+    def _format(self, salt: bytes, digest: bytes) -> str:
+        params = '$'.join(str(x) for x in self.params)
+        return f'{self.algorithm}${params}${_b64encode(salt)}${_b64encode(digest)}'
+
+    def hash(self, password: str) -> str:
+        """Hash mật khẩu với salt ngẫu nhiên (chặn tới khi xong, HasherBusy nếu quá tải)"""
+        salt = secrets.token_bytes(SALT_BYTES)
+        digest = self._run(self.algorithm, password, salt, self.params)
+        with self._lock:
+            self.stats['hashed'] += 1
+        return self._format(salt, digest)
+
+    def hash_async(self, password: str) -> Future:
+        """Như hash() nhưng trả Future (dùng để hash lại ở nền)"""
+        salt = secrets.token_bytes(SALT_BYTES)
+        inner = self._submit(self.algorithm, password, salt, self.params)
+        result: Future = Future()
+
+        def _done(future):
+            try:
+                result.set_result(self._format(salt, future.result()))
+            except Exception as e:
+                result.set_exception(e)
+                return
+            with self._lock:
+                self.stats['hashed'] += 1
+
+        inner.add_done_callback(_done)
+        return result
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        """So mật khẩu với hash đã lưu (mọi định dạng được hỗ trợ)"""
+        password_hash = password_hash or ''
+        if is_legacy_hash(password_hash):
+            # SHA-256 rẻ - tính tại chỗ, không chiếm slot của pool
+            with self._lock:
+                self.stats['legacy_verified'] += 1
+            return hmac.compare_digest(legacy_hash(password), password_hash.lower())
+
+        parsed = _parse(password_hash)
+        if not parsed:
+            return False
+        algorithm, params, salt, digest = parsed
+        computed = self._run(algorithm, password, salt, params)
+        with self._lock:
+            self.stats['verified'] += 1
+        return hmac.compare_digest(computed, digest)
+
+    def verify_dummy(self, password: str) -> bool:
+        """Verify với hash giả theo cấu hình hiện tại (luôn False, tốn đúng một lần KDF)"""
+        if self._dummy_hash is None:
+            self._dummy_hash = self.hash(secrets.token_urlsafe(16))
+        self.verify(password, self._dummy_hash)
+        with self._lock:
+            self.stats['verified'] -= 1
+            self.stats['dummy_verified'] += 1
+        return False
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Hash cũ hoặc tham số chi phí khác cấu hình hiện tại"""
+        parsed = _parse(password_hash or '')
+        return not parsed or parsed[0] != self.algorithm or parsed[1] != self.params
+
+    def metrics(self) -> Dict[str, Any]:
+        """Số lần hash + độ trễ (ms): compute = tính KDF, total = chờ hàng đợi + tính"""
+        def percentiles(samples):
+            if not samples:
+                return {'p50': None, 'p95': None, 'p99': None, 'max': None}
+            ordered = sorted(samples)
+            pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+            return {'p50': pick(0.50), 'p95': pick(0.95), 'p99': pick(0.99), 'max': round(ordered[-1] * 1000, 2)}
+
+        with self._lock:
+            compute_times, total_times = list(self._compute_times), list(self._total_times)
+            stats = dict(self.stats)
+        return {
+            **stats,
+            'algorithm': self.algorithm,
+            'params': list(self.params),
+            'executor': self.executor_type,
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'compute_ms': percentiles(compute_times),
+            'total_ms': percentiles(total_times),
+        }
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
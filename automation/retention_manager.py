@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Retention Manager Module
+Dọn dẹp data/ và logs/ theo tầng tuổi + hạn mức dung lượng
+
+- Tầng theo loại file (kind trong catalog): giữ nguyên N ngày → nén gzip → xóa
+- File nguồn đơn hàng chỉ bị xóa khi đã được gộp vào kho Parquet
+- File catalog đánh dấu live (bản mới nhất mỗi loại, nguồn chưa gộp) không bao giờ bị xóa
+- Hạn mức dung lượng: vượt quota thì xóa file cũ nhất đủ điều kiện
+- dry_run: chỉ trả về kế hoạch, không thay đổi gì
+"""
+
+import gzip
+import logging
+import os
+import shutil
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from artifact_catalog import STATE_ACTIVE, STATE_COMPRESSED, STATE_DELETED, ArtifactCatalog
+
+
+MB = 1024 * 1024
+
+DEFAULT_POLICY = {
+    # kind: số ngày trước khi nén / xóa; require_consolidated: chỉ xóa khi đã gộp vào Parquet
+    'tiers': {
+        'page_json': {'compress_after_days': 3, 'delete_after_days': 30, 'require_consolidated': True},
+        'page_archive': {'delete_after_days': 30, 'require_consolidated': True},
+        'csv': {'compress_after_days': 7, 'delete_after_days': 30, 'require_consolidated': True},
+        'dashboard_csv': {'compress_after_days': 7, 'delete_after_days': 30},
+        'products': {'compress_after_days': 7, 'delete_after_days': 30},
+        'sku_top_daily': {'delete_after_days': 14},
+        'sku_quantity_histogram': {'delete_after_days': 14},
+        'excel': {'delete_after_days': 30},
+        'json': {'compress_after_days': 3, 'delete_after_days': 30},
+        'sla_report': {'delete_after_days': 30},
+        'sla_alerts': {'delete_after_days': 30},
+        'sla_summary': {'delete_after_days': 30},
+        'summary': {'delete_after_days': 30},
+    },
+    'data_quota_mb': 2048,
+    'logs_dir': 'logs',
+    'logs_delete_after_days': 30,
+    'logs_quota_mb': 512,
+}
+
+
+def _merge_policy(policy: Optional[Dict]) -> Dict:
+    merged = {**DEFAULT_POLICY, 'tiers': {k: dict(v) for k, v in DEFAULT_POLICY['tiers'].items()}}
+    for key, value in (policy or {}).items():
+        if key == 'tiers':
+            for kind, rules in value.items():
+                merged['tiers'].setdefault(kind, {}).update(rules)
+        else:
+            merged[key] = value
+    return merged
+
+
+class RetentionManager:
+    """Lập kế hoạch và thực hiện nén/xóa file dựa trên catalog"""
+
+    def __init__(self, catalog: Optional[ArtifactCatalog] = None, policy: Optional[Dict] = None,
+                 data_dir: str = 'data'):
+        self.logger = logging.getLogger('RetentionManager')
+        self.catalog = catalog or ArtifactCatalog(f'{data_dir}/catalog.db')
+        self.policy = _merge_policy(policy)
+
+    # ------------------------------------------------------------------- plan
+
+    def _action(self, action: str, entry: Dict, reason: str) -> Dict:
+        return {
+            'action': action,
+            'path': entry['path'],
+            'kind': entry.get('kind', 'log'),
+            'size': entry.get('size') or 0,
+            'created_at': entry.get('created_at'),
+            'reason': reason,
+        }
+
+    def plan_data(self, now: Optional[datetime] = None) -> Dict:
+        """Kế hoạch cho các file trong catalog (chỉ truy vấn file đã quá hạn)"""
+        now = now or datetime.now()
+        live = self.catalog.live_paths()
+        actions, skipped = [], []
+
+        def deletable(entry, rules):
+            if entry['path'] in live:
+                skipped.append({'path': entry['path'], 'reason': 'live'})
+                return False
+            if rules.get('require_consolidated') and not entry.get('consolidated_at'):
+                skipped.append({'path': entry['path'], 'reason': 'not_consolidated'})
+                return False
+            return True
+
+        planned = set()
+        for kind, rules in self.policy['tiers'].items():
+            delete_days = rules.get('delete_after_days')
+            if delete_days is not None:
+                cutoff = (now - timedelta(days=delete_days)).isoformat()
+                for entry in self.catalog.files([kind], (STATE_ACTIVE, STATE_COMPRESSED), older_than=cutoff):
+                    if deletable(entry, rules):
+                        actions.append(self._action('delete', entry, f'age>{delete_days}d'))
+                        planned.add(entry['path'])
+
+            compress_days = rules.get('compress_after_days')
+            if compress_days is not None:
+                cutoff = (now - timedelta(days=compress_days)).isoformat()
+                for entry in self.catalog.files([kind], (STATE_ACTIVE,), older_than=cutoff):
+                    if entry['path'] not in planned and entry['path'] not in live:
+                        actions.append(self._action('compress', entry, f'age>{compress_days}d'))
+                        planned.add(entry['path'])
+
+        # Hạn mức: xóa thêm file cũ nhất đủ điều kiện cho tới khi dưới quota
+        quota = self.policy.get('data_quota_mb')
+        usage = sum(e.get('size') or 0 for e in self.catalog.files(states=(STATE_ACTIVE, STATE_COMPRESSED)))
+        projected = usage - sum(a['size'] for a in actions if a['action'] == 'delete')
+        if quota is not None and projected > quota * MB:
+            for entry in self.catalog.files(states=(STATE_ACTIVE, STATE_COMPRESSED)):
+                if projected <= quota * MB:
+                    break
+                rules = self.policy['tiers'].get(entry['kind'], {})
+                if entry['path'] in planned or entry['path'] in live:
+                    continue
+                if rules.get('require_consolidated') and not entry.get('consolidated_at'):
+                    continue
+                actions.append(self._action('delete', entry, 'quota'))
+                planned.add(entry['path'])
+                projected -= entry.get('size') or 0
+
+        return {'actions': actions, 'skipped': skipped, 'usage_bytes': usage, 'projected_bytes': projected}
+
+    def plan_logs(self, now: Optional[datetime] = None) -> Dict:
+        """Kế hoạch cho logs/*.log (không nằm trong catalog)"""
+        now = now or datetime.now()
+        logs_dir = self.policy.get('logs_dir')
+        if not logs_dir or not os.path.isdir(logs_dir):
+            return {'actions': [], 'usage_bytes': 0, 'projected_bytes': 0}
+
+        entries = []
+        with os.scandir(logs_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith('.log'):
+                    stat = entry.stat()
+                    entries.append({'path': entry.path, 'kind': 'log', 'size': stat.st_size,
+                                    'created_at': datetime.fromtimestamp(stat.st_mtime).isoformat()})
+        entries.sort(key=lambda e: e['created_at'])
+
+        actions = []
+        usage = sum(e['size'] for e in entries)
+        projected = usage
+        cutoff = (now - timedelta(days=self.policy.get('logs_delete_after_days', 30))).isoformat()
+        quota = self.policy.get('logs_quota_mb')
+        # Luôn giữ file log mới nhất (đang được ghi)
+        for entry in entries[:-1]:
+            if entry['created_at'] < cutoff:
+                reason = 'age'
+            elif quota is not None and projected > quota * MB:
+                reason = 'quota'
+            else:
+                continue
+            actions.append(self._action('delete', entry, reason))
+            projected -= entry['size']
+
+        return {'actions': actions, 'usage_bytes': usage, 'projected_bytes': projected}
+
+    # ------------------------------------------------------------------ apply
+
+    def _compress(self, path: str) -> str:
+        target = f'{path}.gz'
+        tmp_path = f'{target}.tmp'
+        with open(path, 'rb') as src, gzip.open(tmp_path, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1 << 20)
+        os.replace(tmp_path, target)
+        os.remove(path)
+        return target
+
+    def apply(self, actions: List[Dict]) -> Dict:
+        result = {'compressed': [], 'deleted': [], 'failed': [], 'freed_bytes': 0}
+        compressed_paths, deleted_paths = {}, []
+
+        for action in actions:
+            path = action['path']
+            try:
+                if action['action'] == 'compress':
+                    target = self._compress(path)
+                    compressed_paths[path] = target
+                    result['compressed'].append(target)
+                    result['freed_bytes'] += action['size'] - os.path.getsize(target)
+                else:
+                    if os.path.exists(path):
+                        os.remove(path)
+                    if action['kind'] != 'log':
+                        deleted_paths.append(path)
+                    result['deleted'].append(path)
+                    result['freed_bytes'] += action['size']
+            except Exception as e:
+                self.logger.error(f"❌ Lỗi {action['action']} {path}: {e}")
+                result['failed'].append(path)
+
+        if compressed_paths:
+            self.catalog.set_state(compressed_paths, STATE_COMPRESSED, new_paths=compressed_paths)
+        if deleted_paths:
+            self.catalog.set_state(deleted_paths, STATE_DELETED)
+        return result
+
+    def run(self, dry_run: bool = True, include_logs: bool = True) -> Dict:
+        """Lập kế hoạch và (nếu không dry_run) thực hiện; trả về báo cáo"""
+        data_plan = self.plan_data()
+        logs_plan = self.plan_logs() if include_logs else {'actions': [], 'usage_bytes': 0, 'projected_bytes': 0}
+        actions = data_plan['actions'] + logs_plan['actions']
+
+        report = {
+            'dry_run': dry_run,
+            'planned': actions,
+            'skipped': data_plan['skipped'],
+            'data_usage_mb': round(data_plan['usage_bytes'] / MB, 2),
+            'data_projected_mb': round(data_plan['projected_bytes'] / MB, 2),
+            'logs_usage_mb': round(logs_plan['usage_bytes'] / MB, 2),
+            'logs_projected_mb': round(logs_plan['projected_bytes'] / MB, 2),
+        }
+        if not dry_run:
+            report.update(self.apply(actions))
+
+        self.logger.info(
+            f"🧹 Retention{' (dry-run)' if dry_run else ''}: {len(actions)} thao tác, "
+            f"bỏ qua {len(data_plan['skipped'])} file live/chưa gộp"
+        )
+        return report
@@ -36,6 +36,7 @@ class SystemInitializer:
             # Try to load from Google Sheets first
             try:
                 from google_sheets_config import GoogleSheetsConfigService
+                from sheets_config_cache import log_cache_info
                 sheets_service = GoogleSheetsConfigService()
                 self.config = sheets_service.get_config_merged(config_path)
 
@@ -43,6 +44,7 @@ class SystemInitializer:
                 metadata = self.config.get('_metadata', {})
                 config_source = metadata.get('config_source', 'unknown')
                 self.logger.info(f"✅ Configuration loaded from: {config_source}")
+                log_cache_info(self.logger, metadata)
 
                 if metadata.get('has_sheets_config'):
                     self.logger.info("📊 Google Sheets configuration active")
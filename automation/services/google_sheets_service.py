@@ -1,24 +1,70 @@
 #!/usr/bin/env python3
 """
 Google Sheets Service
+
+gspread là thư viện đồng bộ: mọi call chạy trên thread pool giới hạn để
+event loop của FastAPI không bị chặn; spreadsheet handle được cache theo ID.
+Kết quả đọc được cache theo (spreadsheet, range) trong TTL ngắn (giới hạn số
+entry); nhiều range thiếu trong cache được lấy bằng một values_batch_get, range
+đang được đọc bởi request khác thì chờ kết quả của request đó.
 """
 
+import asyncio
+import functools
 import os
 import logging
-from typing import List, Dict, Any, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 import gspread
 from google.oauth2.service_account import Credentials
 
+from sheets_scheduler import get_scheduler
+
 class GoogleSheetsService:
     """Service for Google Sheets integration"""
 
-    def __init__(self):
+    def __init__(self, max_workers: Optional[int] = None):
         self.logger = logging.getLogger(__name__)
         self.client = None
         self._initialized = False
+        self.scheduler = get_scheduler()
+
+        self.max_workers = max_workers or int(os.getenv("SHEETS_MAX_WORKERS", "8"))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="sheets-io"
+        )
+        # spreadsheet_id -> Spreadsheet (open_by_key chỉ gọi một lần mỗi ID)
+        self._spreadsheets: Dict[str, gspread.Spreadsheet] = {}
+        self._open_locks: Dict[str, asyncio.Lock] = {}
+        # (spreadsheet_id, range) -> future của lần đọc đang chạy
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+        # (spreadsheet_id, range) -> (thời điểm đọc, values), cũ nhất đứng đầu
+        self.read_cache_ttl = float(os.getenv("SHEETS_READ_CACHE_TTL", "15"))
+        self.read_cache_max_entries = int(os.getenv("SHEETS_READ_CACHE_MAX_ENTRIES", "1024"))
+        self._read_cache: Dict[Tuple[str, str], Tuple[float, List[List[Any]]]] = {}
+        self.cache_stats = {"hits": 0, "misses": 0, "batch_calls": 0, "shared": 0, "evictions": 0}
+
+    async def _run(self, func, *args, **kwargs):
+        """Chạy call gspread đồng bộ trên thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def initialize(self, client=None):
+        """
+        Initialize Google Sheets service
+
+        client: dùng client có sẵn thay vì credentials (vd. fake_sheets.FakeSheetsClient)
+        """
+        if client is not None:
+            self.client = client
+            self._initialized = True
+            self.logger.info("Google Sheets service initialized with provided client")
+            return True
 
-    async def initialize(self):
-        """Initialize Google Sheets service"""
         try:
             credentials_path = os.getenv(
                 "GOOGLE_CREDENTIALS_PATH",
@@ -37,7 +83,8 @@ class GoogleSheetsService:
                 'https://www.googleapis.com/auth/drive'
             ]
 
-            creds = Credentials.from_service_account_file(
+            creds = await self._run(
+                Credentials.from_service_account_file,
                 credentials_path,
                 scopes=scopes
             )
@@ -51,25 +98,156 @@ class GoogleSheetsService:
             self._initialized = False
             return False
 
+    async def get_spreadsheet(self, spreadsheet_id: str) -> gspread.Spreadsheet:
+        """Spreadsheet handle đã cache; các request đồng thời cùng ID chờ một lần mở"""
+        if not self._initialized or not self.client:
+            raise RuntimeError("Google Sheets service not initialized")
+
+        spreadsheet = self._spreadsheets.get(spreadsheet_id)
+        if spreadsheet is not None:
+            return spreadsheet
+
+        lock = self._open_locks.setdefault(spreadsheet_id, asyncio.Lock())
+        async with lock:
+            spreadsheet = self._spreadsheets.get(spreadsheet_id)
+            if spreadsheet is None:
+                spreadsheet = await self._run(
+                    self.scheduler.read, self.client.open_by_key, spreadsheet_id
+                )
+                self._spreadsheets[spreadsheet_id] = spreadsheet
+            return spreadsheet
+
+    def forget_spreadsheet(self, spreadsheet_id: str):
+        """Bỏ handle khỏi cache (spreadsheet bị xóa / mất quyền)"""
+        self._spreadsheets.pop(spreadsheet_id, None)
+
     async def read_data(
         self,
         spreadsheet_id: str,
         range_name: str = "Sheet1!A:Z"
     ) -> List[List[Any]]:
         """Read data from Google Sheets"""
+        result = await self.read_ranges(spreadsheet_id, [range_name])
+        return result[range_name]
+
+    async def read_ranges(
+        self,
+        spreadsheet_id: str,
+        ranges: Sequence[str],
+        max_age: Optional[float] = None
+    ) -> Dict[str, List[List[Any]]]:
+        """
+        Đọc nhiều range; range còn trong cache (tuổi <= max_age, mặc định TTL)
+        không gọi API, các range còn lại lấy chung một values_batch_get
+
+        Returns:
+            {range: values} theo đúng chuỗi range đã truyền vào
+        """
         if not self._initialized or not self.client:
             raise RuntimeError("Google Sheets service not initialized")
 
+        max_age = self.read_cache_ttl if max_age is None else max_age
+        result, missing = self._cached_ranges(spreadsheet_id, ranges, max_age)
+        if not missing:
+            return result
+
+        # Range đang được request khác đọc: chờ chung kết quả; phần còn lại
+        # đọc trong một batch, các range khác nhau không phải chờ nhau
+        waiting = {}
+        to_fetch = []
+        for range_name in missing:
+            future = self._inflight.get((spreadsheet_id, range_name))
+            if future is not None:
+                waiting[range_name] = future
+                self.cache_stats["shared"] += 1
+            else:
+                to_fetch.append(range_name)
+
+        if to_fetch:
+            loop = asyncio.get_running_loop()
+            futures = {}
+            for range_name in to_fetch:
+                future = futures[range_name] = loop.create_future()
+                # Lỗi chỉ raise cho request gọi API; tránh cảnh báo future không ai đọc
+                future.add_done_callback(lambda f: f.cancelled() or f.exception())
+                self._inflight[(spreadsheet_id, range_name)] = future
+            try:
+                fetched = await self._fetch_ranges(spreadsheet_id, to_fetch)
+            except BaseException as e:
+                for future in futures.values():
+                    if future.done():
+                        continue
+                    if isinstance(e, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(e)
+                raise
+            finally:
+                for range_name in to_fetch:
+                    self._inflight.pop((spreadsheet_id, range_name), None)
+            for range_name, future in futures.items():
+                future.set_result(fetched.get(range_name, []))
+            result.update(fetched)
+
+        for range_name, future in waiting.items():
+            result[range_name] = await asyncio.shield(future)
+        return result
+
+    def _cached_ranges(self, spreadsheet_id: str, ranges: Sequence[str], max_age: float):
+        now = time.monotonic()
+        result, missing = {}, []
+        for range_name in dict.fromkeys(ranges):
+            cached = self._read_cache.get((spreadsheet_id, range_name))
+            if cached and now - cached[0] <= max_age:
+                result[range_name] = cached[1]
+                self.cache_stats["hits"] += 1
+            else:
+                missing.append(range_name)
+        return result, missing
+
+    async def _fetch_ranges(self, spreadsheet_id: str, missing: List[str]) -> Dict[str, List[List[Any]]]:
         try:
-            spreadsheet = self.client.open_by_key(spreadsheet_id)
-            sheet_name, range_part = range_name.split('!')
-            worksheet = spreadsheet.worksheet(sheet_name)
-            data = worksheet.get(range_part)
-            return data
+            spreadsheet = await self.get_spreadsheet(spreadsheet_id)
+            response = await self._run(
+                self.scheduler.read, spreadsheet.values_batch_get, missing
+            )
+        except gspread.SpreadsheetNotFound:
+            self.forget_spreadsheet(spreadsheet_id)
+            raise
         except Exception as e:
             self.logger.error(f"Failed to read data: {e}")
             raise
 
+        self.cache_stats["misses"] += len(missing)
+        self.cache_stats["batch_calls"] += 1
+        fetched_at = time.monotonic()
+        result = {}
+        # valueRanges trả về theo đúng thứ tự range yêu cầu
+        for range_name, value_range in zip(missing, response.get('valueRanges', [])):
+            values = value_range.get('values', [])
+            # Đưa xuống cuối để thứ tự dict luôn là thứ tự thời điểm đọc
+            self._read_cache.pop((spreadsheet_id, range_name), None)
+            self._read_cache[(spreadsheet_id, range_name)] = (fetched_at, values)
+            result[range_name] = values
+        self._evict_reads(fetched_at)
+        return result
+
+    def _evict_reads(self, now: float):
+        """Bỏ entry hết TTL; vẫn vượt giới hạn thì bỏ entry đọc lâu nhất"""
+        expired = [key for key, (fetched_at, _) in self._read_cache.items()
+                   if now - fetched_at > self.read_cache_ttl]
+        for key in expired:
+            del self._read_cache[key]
+        overflow = len(self._read_cache) - self.read_cache_max_entries
+        for key in list(self._read_cache)[:max(overflow, 0)]:
+            del self._read_cache[key]
+        self.cache_stats["evictions"] += len(expired) + max(overflow, 0)
+
+    def invalidate_reads(self, spreadsheet_id: str):
+        """Xóa cache đọc của một spreadsheet (sau khi ghi)"""
+        for key in [key for key in self._read_cache if key[0] == spreadsheet_id]:
+            self._read_cache.pop(key, None)
+
     async def update_data(
         self,
         spreadsheet_id: str,
@@ -81,15 +259,24 @@ class GoogleSheetsService:
             raise RuntimeError("Google Sheets service not initialized")
 
         try:
-            spreadsheet = self.client.open_by_key(spreadsheet_id)
-            sheet_name, range_part = range_name.split('!')
-            worksheet = spreadsheet.worksheet(sheet_name)
-            worksheet.update(range_name, values)
+            spreadsheet = await self.get_spreadsheet(spreadsheet_id)
+            await self._run(
+                self.scheduler.write,
+                spreadsheet.values_update,
+                range_name,
+                params={'valueInputOption': 'RAW'},
+                body={'values': values}
+            )
+            # Range ghi có thể chồng lên range đã cache - bỏ toàn bộ cache của spreadsheet
+            self.invalidate_reads(spreadsheet_id)
             return {
                 "status": "success",
                 "range": range_name,
                 "rows_updated": len(values)
             }
+        except gspread.SpreadsheetNotFound:
+            self.forget_spreadsheet(spreadsheet_id)
+            raise
         except Exception as e:
             self.logger.error(f"Failed to update data: {e}")
             raise
@@ -97,3 +284,7 @@ class GoogleSheetsService:
     def is_connected(self) -> bool:
         """Check if service is connected"""
         return self._initialized and self.client is not None
+
+    async def close(self):
+        """Dừng thread pool (gọi khi server shutdown)"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Session Tokens Module
+Session token ký HMAC, xác minh hoàn toàn tại chỗ (không đọc Sheets)
+
+- Token: <kid>.<payload base64url>.<chữ ký base64url>, payload mang session ID,
+  user (id, email, tên, role, phòng ban), thời điểm tạo và hết hạn
+- Key rotation: ký bằng key đang dùng (active kid), xác minh bằng mọi key còn
+  trong keyring; bỏ một kid khỏi keyring = vô hiệu mọi token ký bằng key đó
+- Key lấy từ AUTH_TOKEN_KEYS="kid1:secret1,kid2:secret2" và AUTH_TOKEN_ACTIVE_KID
+  (mặc định kid cuối); không cấu hình thì sinh key tạm (token mất hiệu lực khi
+  restart và không dùng chung được giữa các process)
+- Chạy nhiều process/instance (gunicorn nhiều worker, nhiều server sau load
+  balancer) BẮT BUỘC cấu hình AUTH_TOKEN_KEYS giống nhau ở mọi process: key tạm
+  của process này không xác minh được token do process khác ký. Đặt
+  AUTH_TOKEN_KEYS_REQUIRED=1 để từ chối khởi động khi thiếu key
+- Logout: RevocationList giữ session ID đã thu hồi tới khi token hết hạn, đồng bộ
+  định kỳ từ sheet User_Sessions (Status khác ACTIVE) để thấy logout ở process khác
+
+Lưu ý: role/trạng thái user nằm trong token tới khi hết hạn; khóa user thì thu
+hồi session của user đó (đặt Status = INACTIVE trên sheet).
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+TOKEN_VERSION = 1
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_REVOCATION_SYNC_INTERVAL = float(os.getenv('AUTH_REVOCATION_SYNC_INTERVAL', '60'))
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def looks_like_token(value: str) -> bool:
+    """Phân biệt token ký với session ID cũ (token_urlsafe không có dấu chấm)"""
+    return isinstance(value, str) and value.count('.') == 2
+
+
+class SessionTokenSigner:
+    """Ký/xác minh token với keyring {kid: secret}"""
+
+    def __init__(self, keys: Dict[str, bytes], active_kid: Optional[str] = None,
+                 ttl_seconds: int = DEFAULT_TTL_SECONDS, logger: Optional[logging.Logger] = None):
+        if not keys:
+            raise ValueError("Keyring rỗng")
+        self.logger = logger or logging.getLogger('SessionTokens')
+        self.keys = {kid: secret if isinstance(secret, bytes) else secret.encode('utf-8')
+                     for kid, secret in keys.items()}
+        self.active_kid = active_kid or list(self.keys)[-1]
+        if self.active_kid not in self.keys:
+            raise ValueError(f"Active kid '{self.active_kid}' không có trong keyring")
+        self.ttl_seconds = ttl_seconds
+        self.stats = {'issued': 0, 'verified': 0, 'rejected': 0, 'expired': 0}
+
+    @classmethod
+    def from_env(cls, ttl_seconds: int = DEFAULT_TTL_SECONDS,
+                 logger: Optional[logging.Logger] = None) -> 'SessionTokenSigner':
+        logger = logger or logging.getLogger('SessionTokens')
+        keys = {}
+        for entry in os.getenv('AUTH_TOKEN_KEYS', '').split(','):
+            kid, _, secret = entry.strip().partition(':')
+            if kid and secret:
+                keys[kid] = secret.encode('utf-8')
+        if not keys:
+            if os.getenv('AUTH_TOKEN_KEYS_REQUIRED', '').strip().lower() in ('1', 'true', 'yes'):
+                raise RuntimeError(
+                    "Chưa cấu hình AUTH_TOKEN_KEYS (bắt buộc khi AUTH_TOKEN_KEYS_REQUIRED=1)"
+                )
+            logger.warning(
+                "⚠️ Chưa cấu hình AUTH_TOKEN_KEYS - dùng key tạm, session mất hiệu lực khi restart "
+                "và không dùng chung được giữa các process/instance"
+            )
+            keys = {f'tmp{secrets.token_hex(4)}': secrets.token_bytes(32)}
+        return cls(keys, os.getenv('AUTH_TOKEN_ACTIVE_KID') or None, ttl_seconds, logger)
+
+    def rotate(self, kid: str, secret: bytes, drop_kid: Optional[str] = None):
+        """Thêm key mới và ký bằng key đó; drop_kid: bỏ key cũ (token cũ hết hiệu lực)"""
+        self.keys[kid] = secret if isinstance(secret, bytes) else secret.encode('utf-8')
+        self.active_kid = kid
+        if drop_kid and drop_kid != kid:
+            self.keys.pop(drop_kid, None)
+
+    def _sign(self, kid: str, payload: str) -> str:
+        digest = hmac.new(self.keys[kid], f'{kid}.{payload}'.encode('ascii'), hashlib.sha256).digest()
+        return _b64encode(digest)
+
+    def issue(self, claims: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Tạo token cho claims (sid, uid, email, name, role, dept...)
+
+        Returns:
+            {'token', 'iat', 'exp'}
+        """
+        iat = int(now if now is not None else time.time())
+        body = {**claims, 'v': TOKEN_VERSION, 'iat': iat, 'exp': iat + self.ttl_seconds}
+        payload = _b64encode(json.dumps(body, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+        kid = self.active_kid
+        self.stats['issued'] += 1
+        return {'token': f'{kid}.{payload}.{self._sign(kid, payload)}', 'iat': iat, 'exp': body['exp']}
+
+    def decode(self, token: str, verify_expiry: bool = True,
+               now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Claims nếu chữ ký hợp lệ (và chưa hết hạn), ngược lại None"""
+        try:
+            kid, payload, signature = token.split('.')
+            if kid not in self.keys or not hmac.compare_digest(signature, self._sign(kid, payload)):
+                self.stats['rejected'] += 1
+                return None
+            claims = json.loads(_b64decode(payload))
+        except Exception:
+            self.stats['rejected'] += 1
+            return None
+
+        if verify_expiry and claims.get('exp', 0) <= (now if now is not None else time.time()):
+            self.stats['expired'] += 1
+            return None
+        self.stats['verified'] += 1
+        return claims
+
+
+class RevocationList:
+    """Session ID đã thu hồi (tới lúc token hết hạn), đồng bộ định kỳ từ Sheets"""
+
+    def __init__(self, loader: Optional[Callable[[], Dict[str, float]]] = None,
+                 sync_interval: float = DEFAULT_REVOCATION_SYNC_INTERVAL,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            loader: đọc {session_id: exp (epoch)} của các session đã bị thu hồi
+            sync_interval: chu kỳ gọi loader (giây)
+        """
+        self.loader = loader
+        self.sync_interval = sync_interval
+        self.logger = logger or logging.getLogger('SessionRevocations')
+        self._lock = threading.Lock()
+        self._revoked: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_sync: Optional[float] = None
+        self.stats = {'syncs': 0, 'sync_errors': 0, 'local_revocations': 0}
+
+    def revoke(self, session_id: str, expires_at: float):
+        with self._lock:
+            self._revoked[session_id] = expires_at
+            self.stats['local_revocations'] += 1
+
+    def is_revoked(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._revoked
+
+    def _prune(self, now: float):
+        # Token đã hết hạn tự bị từ chối - không cần giữ trong danh sách
+        for session_id in [sid for sid, exp in self._revoked.items() if exp <= now]:
+            del self._revoked[session_id]
+
+    def sync(self) -> bool:
+        if not self.loader:
+            return False
+        try:
+            revoked = self.loader()
+        except Exception as e:
+            self.stats['sync_errors'] += 1
+            self.logger.error(f"❌ Lỗi đồng bộ danh sách session thu hồi: {e}")
+            return False
+        with self._lock:
+            self._revoked.update(revoked)
+            self._prune(time.time())
+            self.stats['syncs'] += 1
+            self.last_sync = time.time()
+        return True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._revoked)
+
+    def start(self) -> 'RevocationList':
+        """Đồng bộ lần đầu rồi chạy thread đồng bộ định kỳ"""
+        if self._thread and self._thread.is_alive():
+            return self
+        self.sync()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='session-revocations', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.sync_interval):
+            self.sync()
+
+    def stop(self):
+        self._stop.set()
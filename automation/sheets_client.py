@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sheets Client Module
+Lớp truy cập gspread dùng chung trong process
+
+- Client và Spreadsheet được mở một lần cho mỗi (credentials, spreadsheet_id)
+- Worksheet handle được cache theo tên: lần đầu lấy metadata của cả spreadsheet
+  (một round trip cho mọi sheet), các lần sau không gọi API
+- Header (dòng 1) được cache theo sheet để tra cột theo tên thay vì cột cố định
+- Khi sheet bị xóa/đổi tên (WorksheetNotFound, lỗi range) hoặc header thay đổi,
+  cache của sheet đó bị hủy và thao tác được thử lại một lần
+- Mọi API call đi qua SheetsRequestScheduler (quota, ưu tiên, backoff)
+"""
+
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import gspread
+from google.oauth2.service_account import Credentials
+from gspread.utils import rowcol_to_a1
+
+from sheets_scheduler import PRIORITY_CONFIG, READ, get_scheduler
+
+
+SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets',
+    'https://www.googleapis.com/auth/drive.file'
+]
+
+_lock = threading.Lock()
+_clients: Dict[str, gspread.Client] = {}
+_spreadsheets: Dict[Tuple[str, str], gspread.Spreadsheet] = {}
+_handle_caches: Dict[str, 'WorksheetCache'] = {}
+
+
+def open_spreadsheet(credentials_path: str, spreadsheet_id: str) -> Tuple[gspread.Client, gspread.Spreadsheet]:
+    """Client + Spreadsheet dùng chung (open_by_key chỉ gọi một lần mỗi process)"""
+    with _lock:
+        client = _clients.get(credentials_path)
+        if client is None:
+            credentials = Credentials.from_service_account_file(credentials_path, scopes=SCOPES)
+            client = _clients[credentials_path] = gspread.authorize(credentials)
+
+        key = (credentials_path, spreadsheet_id)
+        spreadsheet = _spreadsheets.get(key)
+        if spreadsheet is None:
+            spreadsheet = _spreadsheets[key] = client.open_by_key(spreadsheet_id)
+        return client, spreadsheet
+
+
+def register_client(credentials_path: str, client) -> None:
+    """
+    Dùng client có sẵn cho credentials_path thay vì tạo từ file service account
+    (vd. fake_sheets.FakeSheetsClient khi test/benchmark); spreadsheet đã mở
+    bằng client cũ bị bỏ khỏi cache
+    """
+    with _lock:
+        _clients[credentials_path] = client
+        for key in [key for key in _spreadsheets if key[0] == credentials_path]:
+            spreadsheet = _spreadsheets.pop(key)
+            _handle_caches.pop(spreadsheet.id, None)
+
+
+def has_client(credentials_path: str) -> bool:
+    with _lock:
+        return credentials_path in _clients
+
+
+def get_worksheet_cache(spreadsheet) -> 'WorksheetCache':
+    """Cache worksheet dùng chung cho một spreadsheet"""
+    with _lock:
+        cache = _handle_caches.get(spreadsheet.id)
+        if cache is None or cache.spreadsheet is not spreadsheet:
+            cache = _handle_caches[spreadsheet.id] = WorksheetCache(spreadsheet)
+        return cache
+
+
+def column_letter(col: int) -> str:
+    """Chữ cái cột A1 (1 -> A, 27 -> AA)"""
+    return rowcol_to_a1(1, col)[:-1]
+
+
+def values_to_records(values: List[List[Any]]) -> List[Dict[str, Any]]:
+    """Dòng đầu làm header, các dòng sau thành dict (giá trị giữ nguyên dạng chuỗi)"""
+    if not values:
+        return []
+    headers = [str(h).strip() for h in values[0]]
+    return [
+        {header: row[i] if i < len(row) else '' for i, header in enumerate(headers)}
+        for row in values[1:]
+    ]
+
+
+def _is_stale_handle_error(error: Exception) -> bool:
+    """Lỗi cho thấy handle/range không còn đúng (sheet bị xóa, đổi tên)"""
+    if isinstance(error, gspread.WorksheetNotFound):
+        return True
+    if isinstance(error, gspread.exceptions.APIError):
+        code = getattr(getattr(error, 'response', None), 'status_code', None)
+        return code in (400, 404)
+    return False
+
+
+class WorksheetCache:
+    """Cache worksheet handle + header của một spreadsheet"""
+
+    def __init__(self, spreadsheet, logger: Optional[logging.Logger] = None, scheduler=None):
+        self.spreadsheet = spreadsheet
+        self.logger = logger or logging.getLogger('WorksheetCache')
+        self.scheduler = scheduler or get_scheduler()
+        self._lock = threading.RLock()
+        self._worksheets: Optional[Dict[str, Any]] = None
+        self._headers: Dict[str, List[str]] = {}
+        self.stats = {'hits': 0, 'metadata_fetches': 0, 'header_reads': 0, 'invalidations': 0, 'retries': 0}
+
+    # --------------------------------------------------------------- handles
+
+    def worksheet(self, title: str, priority: int = PRIORITY_CONFIG):
+        """Worksheet theo tên; raise gspread.WorksheetNotFound nếu không có"""
+        with self._lock:
+            if self._worksheets is not None and title in self._worksheets:
+                self.stats['hits'] += 1
+                return self._worksheets[title]
+
+        # Chưa có trong cache (hoặc sheet mới do nơi khác tạo) - lấy lại metadata.
+        # Gọi API ngoài lock để các lần tra cache khác không phải chờ quota
+        worksheets = self.scheduler.read(self.spreadsheet.worksheets, priority=priority)
+        with self._lock:
+            self._worksheets = {ws.title: ws for ws in worksheets}
+            self.stats['metadata_fetches'] += 1
+            if title not in self._worksheets:
+                raise gspread.WorksheetNotFound(title)
+            return self._worksheets[title]
+
+    def exists(self, title: str) -> bool:
+        try:
+            self.worksheet(title)
+            return True
+        except gspread.WorksheetNotFound:
+            return False
+
+    def add_worksheet(self, title: str, rows: int = 100, cols: int = 26, priority: int = PRIORITY_CONFIG):
+        worksheet = self.scheduler.write(
+            self.spreadsheet.add_worksheet, title=title, rows=rows, cols=cols, priority=priority
+        )
+        with self._lock:
+            if self._worksheets is not None:
+                self._worksheets[title] = worksheet
+            self._headers.pop(title, None)
+            return worksheet
+
+    def get_or_create(self, title: str, rows: int = 100, cols: int = 26,
+                      headers: Optional[List[str]] = None,
+                      priority: int = PRIORITY_CONFIG) -> Tuple[Any, bool]:
+        """(worksheet, created) - tạo sheet kèm header nếu chưa có"""
+        try:
+            return self.worksheet(title, priority), False
+        except gspread.WorksheetNotFound:
+            worksheet = self.add_worksheet(title, rows=rows, cols=cols, priority=priority)
+            if headers:
+                self.scheduler.write(worksheet.update, values=[headers], range_name='A1', priority=priority)
+                self._headers[title] = list(headers)
+            return worksheet, True
+
+    def invalidate(self, title: Optional[str] = None):
+        """Hủy cache của một sheet (hoặc toàn bộ nếu title=None)"""
+        with self._lock:
+            self.stats['invalidations'] += 1
+            if title is None:
+                self._worksheets = None
+                self._headers.clear()
+            else:
+                if self._worksheets is not None:
+                    self._worksheets.pop(title, None)
+                self._headers.pop(title, None)
+
+    def call(self, title: str, func: Callable[[Any], Any], kind: str = READ,
+             priority: int = PRIORITY_CONFIG) -> Any:
+        """
+        Chạy func(worksheet) qua scheduler (kind: read/write); nếu handle đã cũ
+        (sheet bị xóa/đổi tên) thì hủy cache, lấy lại handle và thử lại một lần
+        """
+        def run():
+            worksheet = self.worksheet(title, priority)
+            return self.scheduler.execute(func, worksheet, kind=kind, priority=priority)
+
+        try:
+            return run()
+        except Exception as e:
+            if not _is_stale_handle_error(e):
+                raise
+            self.logger.info(f"🔄 Worksheet '{title}' thay đổi cấu trúc - làm mới cache ({e})")
+            self.invalidate(title)
+            self.stats['retries'] += 1
+            return run()
+
+    # --------------------------------------------------------------- headers
+
+    def headers(self, title: str, priority: int = PRIORITY_CONFIG) -> List[str]:
+        """Header (dòng 1) của sheet, đọc một lần rồi cache"""
+        with self._lock:
+            if title in self._headers:
+                return self._headers[title]
+        row = self.call(title, lambda ws: ws.row_values(1), priority=priority)
+        with self._lock:
+            self._headers[title] = [str(h).strip() for h in row]
+            self.stats['header_reads'] += 1
+            return self._headers[title]
+
+    def remember_headers(self, title: str, headers: List[str]):
+        """
+        Cập nhật header từ dữ liệu vừa đọc (vd. key của get_all_records) - không tốn API call
+
+        Header khác bản đã cache nghĩa là sheet đã đổi cấu trúc (chèn/xóa cột)
+        """
+        headers = [str(h).strip() for h in headers]
+        with self._lock:
+            cached = self._headers.get(title)
+            if cached is not None and cached != headers:
+                self.logger.info(f"🔄 Header của '{title}' đã thay đổi - cập nhật cache")
+                self.stats['invalidations'] += 1
+            self._headers[title] = headers
+
+    def column(self, title: str, header: str, priority: int = PRIORITY_CONFIG) -> str:
+        """Chữ cái cột theo tên header (KeyError nếu sheet không có cột này)"""
+        headers = self.headers(title, priority)
+        if header not in headers:
+            # Có thể header vừa bị sửa - đọc lại một lần trước khi báo lỗi
+            with self._lock:
+                self._headers.pop(title, None)
+            headers = self.headers(title, priority)
+            if header not in headers:
+                raise KeyError(f"Sheet '{title}' không có cột '{header}'")
+        return column_letter(headers.index(header) + 1)
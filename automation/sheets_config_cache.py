@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sheets Config Cache Module
+Cache cấu hình Google Sheets (Config + SLA_Rules) dùng chung trong process
+
+- TTL: trong thời hạn TTL mọi service dùng lại bản đã đọc, không gọi Sheets
+- Hết TTL: đọc lại toàn bộ trong một lượt (các thread đồng thời chờ chung một lần đọc)
+- invalidate(): đánh dấu hết hạn sau khi sửa config qua service
+- Snapshot trên đĩa: process mới (initialization, generate_summary...) khởi động
+  từ snapshot còn hạn; khi mất kết nối Sheets thì dùng snapshot dù đã cũ
+- refresh(): bỏ qua TTL, đọc lại ngay (sau khi sửa config)
+
+Lưu ý: không kiểm tra modifiedTime của spreadsheet để gia hạn cache - nó đổi với
+mọi lần ghi log/status nên hầu như không bao giờ khớp; chỉ dựa vào TTL + invalidate().
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+DEFAULT_TTL_SECONDS = float(os.getenv('SHEETS_CONFIG_TTL', '300'))
+SNAPSHOT_DIR = os.getenv('SHEETS_CONFIG_SNAPSHOT_DIR', 'data/cache')
+
+# Nguồn của lần lấy config gần nhất
+SOURCE_MEMORY = 'memory'
+SOURCE_SNAPSHOT = 'snapshot'
+SOURCE_SHEETS = 'sheets'
+SOURCE_STALE = 'stale_snapshot'
+
+_caches: Dict[str, 'SheetsConfigCache'] = {}
+_caches_lock = threading.Lock()
+
+
+def get_config_cache(spreadsheet_id: str, ttl_seconds: Optional[float] = None) -> 'SheetsConfigCache':
+    """Cache dùng chung trong process cho một spreadsheet"""
+    with _caches_lock:
+        cache = _caches.get(spreadsheet_id)
+        if cache is None:
+            cache = _caches[spreadsheet_id] = SheetsConfigCache(spreadsheet_id, ttl_seconds)
+        elif ttl_seconds is not None:
+            cache.ttl_seconds = ttl_seconds
+        return cache
+
+
+def log_cache_info(logger: logging.Logger, metadata: Dict[str, Any]):
+    """Ghi log nguồn config cache từ _metadata của config đã merge"""
+    cache_info = metadata.get('config_cache') or {}
+    if cache_info.get('source'):
+        logger.info(
+            f"🗂️ Sheets config cache: {cache_info['source']} "
+            f"(fetched {cache_info.get('fetched_at')})"
+        )
+
+
+class SheetsConfigCache:
+    """Bản cache {'config', 'sla_rules'} của một spreadsheet, kèm snapshot trên đĩa"""
+
+    def __init__(self, spreadsheet_id: str, ttl_seconds: Optional[float] = None,
+                 snapshot_path: Optional[str] = None):
+        self.spreadsheet_id = spreadsheet_id
+        self.ttl_seconds = DEFAULT_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.snapshot_path = snapshot_path or os.path.join(
+            SNAPSHOT_DIR, f'sheets_config_{spreadsheet_id}.json'
+        )
+        self.logger = logging.getLogger('SheetsConfigCache')
+
+        self._lock = threading.Lock()
+        self._entry: Optional[Dict[str, Any]] = None
+        self._snapshot_checked = False
+        self.last_source: Optional[str] = None
+
+        self.stats = {
+            'hits': 0,
+            'snapshot_loads': 0,
+            'sheet_reads': 0,
+            'stale_fallbacks': 0,
+            'errors': 0,
+        }
+
+    # ------------------------------------------------------------- snapshot
+
+    def _load_snapshot(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if entry.get('spreadsheet_id') != self.spreadsheet_id:
+                return None
+            self.stats['snapshot_loads'] += 1
+            return entry
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning(f"⚠️ Không đọc được snapshot config {self.snapshot_path}: {e}")
+            return None
+
+    def _save_snapshot(self, entry: Dict[str, Any]):
+        try:
+            snapshot_dir = os.path.dirname(self.snapshot_path)
+            if snapshot_dir:
+                os.makedirs(snapshot_dir, exist_ok=True)
+            tmp_path = f'{self.snapshot_path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False, indent=2, default=str)
+            os.replace(tmp_path, self.snapshot_path)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Không ghi được snapshot config: {e}")
+
+    # ------------------------------------------------------------------ get
+
+    def _is_fresh(self, entry: Optional[Dict[str, Any]], now: float) -> bool:
+        return bool(entry) and now - entry.get('fetched_at', 0) < self.ttl_seconds
+
+    def get(self, loader: Callable[[], Optional[Dict[str, Any]]], force: bool = False) -> Dict[str, Any]:
+        """
+        Lấy bản cache, chỉ gọi Sheets khi cần
+
+        Args:
+            loader: đọc {'config', 'sla_rules'} từ Sheets (None/exception = không đọc được)
+            force: bỏ qua TTL, luôn đọc lại
+
+        Returns:
+            {'config', 'sla_rules', 'fetched_at', 'source'}
+        """
+        # Một lock cho toàn bộ lượt lấy: các thread đồng thời chờ một lần đọc duy nhất
+        with self._lock:
+            now = time.time()
+
+            if not self._snapshot_checked:
+                self._snapshot_checked = True
+                if self._entry is None:
+                    self._entry = self._load_snapshot()
+                    if self._is_fresh(self._entry, now) and not force:
+                        return self._result(SOURCE_SNAPSHOT)
+
+            if not force and self._is_fresh(self._entry, now):
+                self.stats['hits'] += 1
+                return self._result(SOURCE_MEMORY)
+
+            try:
+                data = loader()
+            except Exception as e:
+                self.logger.error(f"❌ Lỗi đọc config từ Google Sheets: {e}")
+                data = None
+
+            if data is None:
+                self.stats['errors'] += 1
+                if self._entry:
+                    self.stats['stale_fallbacks'] += 1
+                    self.logger.warning("⚠️ Dùng snapshot config cũ (không đọc được Google Sheets)")
+                    return self._result(SOURCE_STALE)
+                return {'config': {}, 'sla_rules': {}, 'fetched_at': None, 'source': None}
+
+            self.stats['sheet_reads'] += 1
+            self._entry = {
+                'spreadsheet_id': self.spreadsheet_id,
+                'config': data.get('config') or {},
+                'sla_rules': data.get('sla_rules') or {},
+                'fetched_at': now,
+            }
+            self._save_snapshot(self._entry)
+            return self._result(SOURCE_SHEETS)
+
+    def _result(self, source: str) -> Dict[str, Any]:
+        self.last_source = source
+        return {**self._entry, 'source': source}
+
+    def age_seconds(self) -> Optional[float]:
+        with self._lock:
+            if not self._entry:
+                return None
+            return round(time.time() - self._entry.get('fetched_at', 0), 1)
+
+    def invalidate(self):
+        """Đánh dấu hết hạn (lần lấy sau sẽ đọc lại)"""
+        with self._lock:
+            if self._entry:
+                self._entry['fetched_at'] = 0
+                self._save_snapshot(self._entry)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sheets Exporter Module
+Xuất bảng lớn lên Google Sheets theo từng khối dòng, có thể chạy tiếp khi bị ngắt
+
+- Lưới (rows x cols) được tạo/resize đúng kích thước trước khi ghi
+- Cột A1 tính đúng sau Z (AA, AB...)
+- Mỗi khối giới hạn theo số dòng và dung lượng payload; các khối được gửi
+  song song với số worker nhỏ, qua SheetsRequestScheduler (quota + backoff)
+- Checkpoint ghi lại các khối đã gửi (kèm digest nội dung); lần chạy lại
+  với cùng dữ liệu bỏ qua các khối đó thay vì ghi lại từ đầu
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from sheets_client import column_letter
+from sheets_scheduler import PRIORITY_EXPORT, get_scheduler
+from sheets_writer import a1_range
+
+
+# Giới hạn của Google Sheets: 10 triệu ô mỗi spreadsheet, payload nên < 2MB
+MAX_GRID_CELLS = 10_000_000
+DEFAULT_CHUNK_ROWS = 2000
+DEFAULT_CHUNK_BYTES = 1_500_000
+CHECKPOINT_DIR = 'data/cache/sheets_export'
+
+
+def collect_headers(records: Sequence[Dict[str, Any]]) -> List[str]:
+    """Hợp các key theo thứ tự xuất hiện (record sau có thể có thêm cột)"""
+    headers, seen = [], set()
+    for record in records:
+        for key in record:
+            if key not in seen:
+                seen.add(key)
+                headers.append(key)
+    return headers
+
+
+def _cell(value: Any) -> str:
+    return '' if value is None else str(value)
+
+
+class SheetsExporter:
+    """Upload danh sách record lên một worksheet theo khối"""
+
+    def __init__(self, spreadsheet, worksheets, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                 chunk_bytes: int = DEFAULT_CHUNK_BYTES, max_workers: int = 3,
+                 checkpoint_dir: str = CHECKPOINT_DIR, logger: Optional[logging.Logger] = None,
+                 scheduler=None):
+        """
+        Args:
+            spreadsheet: gspread Spreadsheet
+            worksheets: WorksheetCache của spreadsheet (sheets_client)
+            chunk_rows / chunk_bytes: giới hạn mỗi request values_update
+            max_workers: số request ghi đồng thời
+        """
+        self.spreadsheet = spreadsheet
+        self.worksheets = worksheets
+        self.chunk_rows = chunk_rows
+        self.chunk_bytes = chunk_bytes
+        self.max_workers = max_workers
+        self.scheduler = scheduler or get_scheduler()
+        self.checkpoint_dir = checkpoint_dir
+        self.logger = logger or logging.getLogger('SheetsExporter')
+        self._checkpoint_lock = threading.Lock()
+
+    # ------------------------------------------------------------- chunking
+
+    def _row(self, record: Dict[str, Any], headers: List[str]) -> List[str]:
+        return [_cell(record.get(header)) for header in headers]
+
+    def plan_chunks(self, records: Sequence[Dict[str, Any]], headers: List[str]) -> List[Dict[str, Any]]:
+        """
+        Chia dòng thành khối (chỉ giữ biên + digest, không giữ dữ liệu chuỗi)
+
+        Returns:
+            [{'start': chỉ số record đầu, 'end': chỉ số sau cuối, 'digest': sha1 nội dung}]
+        """
+        chunks = []
+        start, size = 0, 0
+        digest = hashlib.sha1()
+        for i, record in enumerate(records):
+            encoded = json.dumps(self._row(record, headers), ensure_ascii=False).encode('utf-8')
+            if i > start and (i - start >= self.chunk_rows or size + len(encoded) > self.chunk_bytes):
+                chunks.append({'start': start, 'end': i, 'digest': digest.hexdigest()})
+                start, size, digest = i, 0, hashlib.sha1()
+            digest.update(encoded)
+            size += len(encoded)
+        if len(records) > start:
+            chunks.append({'start': start, 'end': len(records), 'digest': digest.hexdigest()})
+        return chunks
+
+    # ----------------------------------------------------------- checkpoint
+
+    def _checkpoint_path(self, sheet_name: str) -> str:
+        safe_name = ''.join(c if c.isalnum() or c in '-_' else '_' for c in sheet_name)
+        return os.path.join(self.checkpoint_dir, f'{self.spreadsheet.id}_{safe_name}.json')
+
+    def _load_checkpoint(self, sheet_name: str, headers: List[str]) -> Dict[str, Any]:
+        path = self._checkpoint_path(sheet_name)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('headers') == headers:
+                return checkpoint
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.warning(f"⚠️ Checkpoint lỗi, upload lại từ đầu: {e}")
+        return {'sheet_name': sheet_name, 'headers': headers, 'done': {}}
+
+    def _save_checkpoint(self, checkpoint: Dict[str, Any]):
+        path = self._checkpoint_path(checkpoint['sheet_name'])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, path)
+
+    def _clear_checkpoint(self, sheet_name: str):
+        try:
+            os.remove(self._checkpoint_path(sheet_name))
+        except FileNotFoundError:
+            pass
+
+    # --------------------------------------------------------------- upload
+
+    def _prepare_sheet(self, sheet_name: str, rows: int, cols: int, checkpoint: Dict[str, Any]):
+        """Tạo hoặc resize worksheet; sheet cũ không có checkpoint thì xóa dữ liệu cũ"""
+        worksheet, created = self.worksheets.get_or_create(sheet_name, rows=rows, cols=cols,
+                                                           priority=PRIORITY_EXPORT)
+        if created:
+            # Sheet mới: checkpoint cũ (nếu có) không còn giá trị
+            checkpoint['done'] = {}
+            checkpoint['header_done'] = False
+            return worksheet
+
+        if not checkpoint['done']:
+            self.scheduler.write(worksheet.clear, priority=PRIORITY_EXPORT)
+        if worksheet.row_count != rows or worksheet.col_count < cols:
+            self.scheduler.write(worksheet.resize, rows=rows, cols=max(cols, worksheet.col_count),
+                                 priority=PRIORITY_EXPORT)
+        return worksheet
+
+    def _send(self, range_a1: str, values: List[List[str]]):
+        # Scheduler chờ quota và thử lại khi gặp 429/5xx
+        return self.scheduler.write(
+            self.spreadsheet.values_update, range_a1,
+            params={'valueInputOption': 'RAW'}, body={'values': values}, priority=PRIORITY_EXPORT
+        )
+
+    def _upload_chunk(self, sheet_name: str, records: Sequence[Dict[str, Any]], headers: List[str],
+                      chunk: Dict[str, Any], checkpoint: Dict[str, Any]) -> int:
+        last_col = column_letter(len(headers))
+        # Dòng 1 là header, record i nằm ở dòng i + 2
+        first_row, last_row = chunk['start'] + 2, chunk['end'] + 1
+        values = [self._row(records[i], headers) for i in range(chunk['start'], chunk['end'])]
+        self._send(a1_range(sheet_name, f'A{first_row}:{last_col}{last_row}'), values)
+
+        with self._checkpoint_lock:
+            checkpoint['done'][str(chunk['start'])] = chunk['digest']
+            self._save_checkpoint(checkpoint)
+        return len(values)
+
+    def _iter_pending(self, chunks: List[Dict[str, Any]], checkpoint: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        for chunk in chunks:
+            if checkpoint['done'].get(str(chunk['start'])) != chunk['digest']:
+                yield chunk
+
+    def export(self, records: Sequence[Dict[str, Any]], sheet_name: str,
+               headers: Optional[List[str]] = None, resume: bool = True) -> Dict[str, Any]:
+        """
+        Upload records lên sheet_name
+
+        Returns:
+            {'sheet_name', 'rows', 'columns', 'chunks', 'uploaded_chunks',
+             'resumed_chunks', 'uploaded_rows', 'elapsed'}
+        """
+        started = time.perf_counter()
+        headers = headers or collect_headers(records)
+        if not headers:
+            raise ValueError("Không có cột nào để xuất")
+
+        rows, cols = len(records) + 1, len(headers)
+        if rows * cols > MAX_GRID_CELLS:
+            raise ValueError(f"Dữ liệu {rows}x{cols} vượt giới hạn {MAX_GRID_CELLS:,} ô của Google Sheets")
+
+        checkpoint = self._load_checkpoint(sheet_name, headers) if resume else \
+            {'sheet_name': sheet_name, 'headers': headers, 'done': {}}
+        worksheet = self._prepare_sheet(sheet_name, rows, cols, checkpoint)
+
+        chunks = self.plan_chunks(records, headers)
+        pending = list(self._iter_pending(chunks, checkpoint))
+        resumed = len(chunks) - len(pending)
+        if resumed:
+            self.logger.info(f"⏩ Tiếp tục upload '{sheet_name}': bỏ qua {resumed}/{len(chunks)} khối đã gửi")
+
+        if not checkpoint.get('header_done'):
+            self._send(a1_range(sheet_name, f'A1:{column_letter(cols)}1'), [headers])
+            checkpoint['header_done'] = True
+            self._save_checkpoint(checkpoint)
+
+        uploaded_rows = 0
+        # Giữ tối đa 2 khối mỗi worker trong bộ nhớ
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='sheets-export') as executor:
+            in_flight = set()
+            for chunk in pending:
+                if len(in_flight) >= self.max_workers * 2:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    uploaded_rows += sum(f.result() for f in done)
+                in_flight.add(executor.submit(
+                    self._upload_chunk, sheet_name, records, headers, chunk, checkpoint
+                ))
+            done, _ = wait(in_flight)
+            uploaded_rows += sum(f.result() for f in done)
+
+        # Định dạng header
+        self.scheduler.write(worksheet.format, f'A1:{column_letter(cols)}1', {
+            'backgroundColor': {'red': 0.2, 'green': 0.6, 'blue': 1.0},
+            'textFormat': {'bold': True, 'foregroundColor': {'red': 1, 'green': 1, 'blue': 1}}
+        }, priority=PRIORITY_EXPORT)
+        self._clear_checkpoint(sheet_name)
+
+        return {
+            'sheet_name': sheet_name,
+            'rows': len(records),
+            'columns': cols,
+            'chunks': len(chunks),
+            'uploaded_chunks': len(pending),
+            'resumed_chunks': resumed,
+            'uploaded_rows': uploaded_rows,
+            'elapsed': round(time.perf_counter() - started, 3),
+        }
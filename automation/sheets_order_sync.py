@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sheets Order Sync Module
+Đồng bộ đơn hàng lên một worksheet cố định, mỗi đơn một dòng theo mã đơn
+
+- Cột A là order_key; chỉ mục cục bộ order_key → (số dòng, digest nội dung)
+  lưu trong data/cache/order_sync, không phải đọc lại sheet mỗi lần chạy
+- Mỗi lần chạy so với chỉ mục: đơn mới (ghi vào dòng trống hoặc cuối sheet),
+  đơn thay đổi (ghi đè đúng dòng cũ), đơn bị bỏ (xóa trắng dòng, dòng được
+  dùng lại cho đơn mới) - đơn không đổi không tốn request nào
+- Các dòng cần ghi được gom thành dải liên tiếp và gửi trong một
+  values_batch_update (tách thêm request chỉ khi payload vượt giới hạn)
+- Cột chỉ được thêm vào cuối, không đổi vị trí: dòng cũ không phải ghi lại
+- Chỉ mục mất/hỏng hoặc sheet bị tạo lại: dựng lại từ sheet bằng một lần đọc
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from order_index import ORDER_KEY_COLUMNS, VOLATILE_COLUMNS
+from sheets_client import column_letter
+from sheets_exporter import DEFAULT_CHUNK_BYTES, MAX_GRID_CELLS, collect_headers
+from sheets_scheduler import PRIORITY_EXPORT, get_scheduler
+from sheets_writer import a1_range
+
+
+KEY_HEADER = 'order_key'
+DEFAULT_SHEET_NAME = 'Orders_Sync'
+STATE_DIR = 'data/cache/order_sync'
+
+
+def record_key(record: Dict[str, Any]) -> str:
+    """Mã đơn của record: cột mã đơn đầu tiên khác rỗng (giống order_index)"""
+    for column in ORDER_KEY_COLUMNS:
+        value = record.get(column)
+        if value is not None and str(value).strip():
+            return str(value).strip()
+    return ''
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, float) and value != value:  # NaN từ DataFrame
+        return ''
+    return str(value)
+
+
+def row_digest(headers: Sequence[str], row: Sequence[str]) -> str:
+    """
+    Digest nội dung dòng, chỉ tính ô khác rỗng theo tên cột: thêm cột mới vào
+    cuối không làm đổi digest của các dòng không có giá trị ở cột đó
+    """
+    content = {header: value for header, value in zip(headers, row) if value != ''}
+    encoded = json.dumps(content, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()
+
+
+class OrderSheetSync:
+    """Delta sync danh sách đơn hàng lên một worksheet theo mã đơn"""
+
+    def __init__(self, spreadsheet, worksheets, sheet_name: str = DEFAULT_SHEET_NAME,
+                 state_dir: str = STATE_DIR, max_batch_bytes: int = DEFAULT_CHUNK_BYTES,
+                 exclude_columns: Optional[Sequence[str]] = None,
+                 logger: Optional[logging.Logger] = None, scheduler=None):
+        """
+        Args:
+            spreadsheet: gspread Spreadsheet
+            worksheets: WorksheetCache của spreadsheet (sheets_client)
+            sheet_name: worksheet đích (giữ nguyên qua các lần chạy)
+            max_batch_bytes: giới hạn payload mỗi values_batch_update
+            exclude_columns: cột không đưa lên sheet (mặc định các cột đổi theo lần scrape)
+        """
+        self.spreadsheet = spreadsheet
+        self.worksheets = worksheets
+        self.sheet_name = sheet_name
+        self.state_dir = state_dir
+        self.max_batch_bytes = max_batch_bytes
+        self.exclude_columns = set(VOLATILE_COLUMNS if exclude_columns is None else exclude_columns)
+        self.exclude_columns.discard(KEY_HEADER)
+        self.scheduler = scheduler or get_scheduler()
+        self.logger = logger or logging.getLogger('OrderSheetSync')
+
+    # ---------------------------------------------------------------- state
+
+    def _state_path(self) -> str:
+        safe_name = ''.join(c if c.isalnum() or c in '-_' else '_' for c in self.sheet_name)
+        return os.path.join(self.state_dir, f'{self.spreadsheet.id}_{safe_name}.json')
+
+    def _empty_state(self) -> Dict[str, Any]:
+        return {'sheet_name': self.sheet_name, 'worksheet_id': None, 'headers': [KEY_HEADER],
+                'rows': {}, 'free_rows': [], 'next_row': 2}
+
+    def _load_state(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._state_path(), 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('sheet_name') == self.sheet_name and state.get('headers', [None])[0] == KEY_HEADER:
+                return state
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            self.logger.warning(f"⚠️ Chỉ mục sync lỗi, dựng lại từ sheet: {e}")
+        return None
+
+    def _save_state(self, state: Dict[str, Any]):
+        path = self._state_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def reset(self):
+        """Xóa chỉ mục cục bộ (lần sync sau dựng lại từ sheet)"""
+        try:
+            os.remove(self._state_path())
+        except FileNotFoundError:
+            pass
+
+    def _rebuild_state(self, worksheet) -> Dict[str, Any]:
+        """Dựng chỉ mục từ nội dung hiện có của sheet (một lần đọc)"""
+        state = self._empty_state()
+        state['worksheet_id'] = worksheet.id
+        values = self.worksheets.call(self.sheet_name, lambda ws: ws.get_all_values(),
+                                      priority=PRIORITY_EXPORT)
+        if not values or not values[0] or str(values[0][0]).strip() != KEY_HEADER:
+            # Sheet trống hoặc không do sync tạo: ghi lại từ đầu
+            state['overwrite'] = bool(values)
+            return state
+
+        headers = [str(h).strip() for h in values[0]]
+        state['headers'] = headers
+        for row_num, row in enumerate(values[1:], start=2):
+            row = [str(v) for v in row] + [''] * (len(headers) - len(row))
+            key = row[0].strip()
+            if not key or key in state['rows']:
+                state['free_rows'].append(row_num)
+                continue
+            state['rows'][key] = [row_num, row_digest(headers, row)]
+        state['next_row'] = len(values) + 1
+        self.logger.info(f"🔄 Dựng lại chỉ mục '{self.sheet_name}' từ sheet: {len(state['rows'])} đơn")
+        return state
+
+    # ----------------------------------------------------------------- diff
+
+    def _merge_headers(self, state: Dict[str, Any], records: Sequence[Dict[str, Any]]) -> bool:
+        """Thêm cột mới vào cuối header; trả về True nếu header thay đổi"""
+        known = set(state['headers'])
+        added = [h for h in collect_headers(records) if h not in known and h not in self.exclude_columns]
+        state['headers'].extend(added)
+        return bool(added)
+
+    def diff(self, records: Sequence[Dict[str, Any]], state: Dict[str, Any],
+             remove_missing: bool) -> Dict[str, Any]:
+        """
+        So records với chỉ mục
+
+        Returns:
+            {'new': [(key, row)], 'changed': [(key, row_num, row)], 'removed': [(key, row_num)],
+             'unchanged': int, 'skipped': int}
+        """
+        headers = state['headers']
+        incoming: Dict[str, List[str]] = {}
+        skipped = 0
+        for record in records:
+            key = record_key(record)
+            if not key:
+                skipped += 1
+                continue
+            # Trùng mã đơn trong cùng lần chạy: bản sau cùng được giữ
+            incoming[key] = [key] + [_cell(record.get(h)) for h in headers[1:]]
+
+        new, changed, unchanged = [], [], 0
+        for key, row in incoming.items():
+            indexed = state['rows'].get(key)
+            if indexed is None:
+                new.append((key, row))
+            elif indexed[1] != row_digest(headers, row):
+                changed.append((key, indexed[0], row))
+            else:
+                unchanged += 1
+
+        removed = []
+        if remove_missing:
+            removed = [(key, indexed[0]) for key, indexed in state['rows'].items() if key not in incoming]
+        return {'new': new, 'changed': changed, 'removed': removed,
+                'unchanged': unchanged, 'skipped': skipped}
+
+    # ---------------------------------------------------------------- write
+
+    def _ranges(self, updates: Dict[int, List[str]], width: int) -> List[Dict[str, Any]]:
+        """Gom các dòng liền nhau thành một range"""
+        last_col = column_letter(width)
+        data, block = [], []
+        for row_num in sorted(updates):
+            if block and row_num != block[-1][0] + 1:
+                data.append(self._range_entry(block, last_col))
+                block = []
+            block.append((row_num, updates[row_num]))
+        if block:
+            data.append(self._range_entry(block, last_col))
+        return data
+
+    def _range_entry(self, block: List[Tuple[int, List[str]]], last_col: str) -> Dict[str, Any]:
+        first_row, last_row = block[0][0], block[-1][0]
+        return {
+            'range': a1_range(self.sheet_name, f'A{first_row}:{last_col}{last_row}'),
+            'values': [row for _, row in block],
+        }
+
+    def _batches(self, data: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        batches, current, size = [], [], 0
+        for entry in data:
+            encoded = len(json.dumps(entry['values'], ensure_ascii=False).encode('utf-8'))
+            if current and size + encoded > self.max_batch_bytes:
+                batches.append(current)
+                current, size = [], 0
+            current.append(entry)
+            size += encoded
+        if current:
+            batches.append(current)
+        return batches
+
+    def _ensure_grid(self, worksheet, rows: int, cols: int):
+        if rows * cols > MAX_GRID_CELLS:
+            raise ValueError(f"Sheet {rows}x{cols} vượt giới hạn {MAX_GRID_CELLS:,} ô của Google Sheets")
+        if worksheet.row_count < rows or worksheet.col_count < cols:
+            self.scheduler.write(worksheet.resize, rows=max(rows, worksheet.row_count),
+                                 cols=max(cols, worksheet.col_count), priority=PRIORITY_EXPORT)
+
+    def sync(self, records: Sequence[Dict[str, Any]], remove_missing: bool = False,
+             rebuild: bool = False) -> Dict[str, Any]:
+        """
+        Đồng bộ records lên sheet, chỉ ghi các dòng mới/thay đổi/bị bỏ
+
+        Args:
+            records: danh sách đơn (dict), mã đơn lấy theo ORDER_KEY_COLUMNS
+            remove_missing: đơn có trong sheet nhưng không có trong records bị xóa
+                (chỉ bật khi records là toàn bộ tập đơn, không phải một khoảng ngày)
+            rebuild: bỏ qua chỉ mục cục bộ, dựng lại từ sheet
+
+        Returns:
+            {'sheet_name', 'rows', 'new', 'changed', 'removed', 'unchanged', 'skipped',
+             'updated_rows', 'requests', 'rebuilt', 'elapsed'}
+        """
+        started = time.perf_counter()
+        state = None if rebuild else self._load_state()
+
+        worksheet, created = self.worksheets.get_or_create(
+            self.sheet_name, rows=max(len(records) + 1, 100), cols=26, priority=PRIORITY_EXPORT
+        )
+        rebuilt = False
+        if created:
+            state = self._empty_state()
+            state['worksheet_id'] = worksheet.id
+        elif state is None or state.get('worksheet_id') != worksheet.id:
+            # Không có chỉ mục hoặc sheet đã bị xóa/tạo lại dưới cùng tên
+            state = self._rebuild_state(worksheet)
+            rebuilt = True
+
+        overwrite = state.pop('overwrite', False)
+        header_changed = self._merge_headers(state, records) or created or overwrite or (rebuilt and not state['rows'])
+        headers = state['headers']
+        delta = self.diff(records, state, remove_missing)
+
+        updates: Dict[int, List[str]] = {}
+        blank = [''] * len(headers)
+        for key, row_num in delta['removed']:
+            updates[row_num] = blank
+            state['free_rows'].append(row_num)
+            del state['rows'][key]
+        for key, row_num, row in delta['changed']:
+            updates[row_num] = row
+            state['rows'][key] = [row_num, row_digest(headers, row)]
+
+        state['free_rows'].sort(reverse=True)
+        for key, row in delta['new']:
+            if state['free_rows']:
+                row_num = state['free_rows'].pop()
+            else:
+                row_num = state['next_row']
+                state['next_row'] += 1
+            updates[row_num] = row
+            state['rows'][key] = [row_num, row_digest(headers, row)]
+        if header_changed:
+            updates[1] = list(headers)
+
+        requests = 0
+        try:
+            if overwrite:
+                # Sheet có dữ liệu không theo định dạng sync: xóa trước khi ghi
+                self.scheduler.write(worksheet.clear, priority=PRIORITY_EXPORT)
+                requests += 1
+            if updates:
+                self._ensure_grid(worksheet, state['next_row'] - 1, len(headers))
+                for batch in self._batches(self._ranges(updates, len(headers))):
+                    self.scheduler.write(
+                        self.spreadsheet.values_batch_update,
+                        body={'valueInputOption': 'RAW', 'data': batch},
+                        priority=PRIORITY_EXPORT
+                    )
+                    requests += 1
+        except Exception:
+            # Sheet có thể đã được ghi một phần: lần sau dựng lại chỉ mục từ sheet
+            self.reset()
+            raise
+        if updates:
+            self.worksheets.remember_headers(self.sheet_name, headers)
+        self._save_state(state)
+
+        stats = {
+            'sheet_name': self.sheet_name,
+            'rows': len(state['rows']),
+            'new': len(delta['new']),
+            'changed': len(delta['changed']),
+            'removed': len(delta['removed']),
+            'unchanged': delta['unchanged'],
+            'skipped': delta['skipped'],
+            'updated_rows': len(updates),
+            'requests': requests,
+            'rebuilt': rebuilt,
+            'elapsed': round(time.perf_counter() - started, 3),
+        }
+        if delta['skipped']:
+            self.logger.warning(f"⚠️ Bỏ qua {delta['skipped']} đơn không có mã đơn")
+        return stats
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sheets Scheduler Module
+Điều phối mọi request Google Sheets trong process theo quota
+
+- Token bucket cho read/write ở hai mức: project và user (service account),
+  mặc định theo quota Google: 300 request/phút/project, 60 request/phút/user
+- Lớp ưu tiên: auth > config > export > logging; khi hết token, request ưu
+  tiên cao được cấp token trước
+- 429 và 5xx: thử lại với exponential backoff + jitter; 429 còn làm rỗng bucket
+  để các request khác cũng chậm lại thay vì cùng dính 429
+- Call không idempotent (append): caller truyền idempotent=False, chỉ thử lại
+  với 429 - 5xx có thể đã ghi xong ở phía Google, thử lại sẽ nhân đôi dòng
+- Metrics: độ sâu hàng đợi, thời gian chờ theo lớp ưu tiên, số lần thử lại
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Lớp ưu tiên (số nhỏ = ưu tiên cao)
+PRIORITY_AUTH = 0
+PRIORITY_CONFIG = 1
+PRIORITY_EXPORT = 2
+PRIORITY_LOGGING = 3
+PRIORITY_NAMES = {
+    PRIORITY_AUTH: 'auth',
+    PRIORITY_CONFIG: 'config',
+    PRIORITY_EXPORT: 'export',
+    PRIORITY_LOGGING: 'logging',
+}
+
+READ = 'read'
+WRITE = 'write'
+
+# Quota mặc định (request/phút) - có thể chỉnh qua biến môi trường
+DEFAULT_QUOTAS = {
+    READ: {
+        'project': int(os.getenv('SHEETS_READ_QUOTA_PROJECT', '300')),
+        'user': int(os.getenv('SHEETS_READ_QUOTA_USER', '60')),
+    },
+    WRITE: {
+        'project': int(os.getenv('SHEETS_WRITE_QUOTA_PROJECT', '300')),
+        'user': int(os.getenv('SHEETS_WRITE_QUOTA_USER', '60')),
+    },
+}
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# 429 = request bị từ chối trước khi xử lý, luôn thử lại được
+THROTTLED_STATUS = {429}
+
+
+class SheetsQuotaTimeout(Exception):
+    """Request chờ token quá max_wait (thường là request ưu tiên thấp khi quá tải)"""
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """HTTP status của lỗi gspread/requests (None nếu không có)"""
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if status is None:
+        code = getattr(error, 'code', None)
+        status = code if isinstance(code, int) else None
+    return status
+
+
+class TokenBucket:
+    """Bucket nạp đều rate_per_minute token/phút, tối đa capacity token (không tự khóa)"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(rate_per_minute / 6.0, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Số giây cần chờ để có 1 token"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+    def drain(self, now: float):
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0)
+
+
+class SheetsRequestScheduler:
+    """Cấp token theo ưu tiên + retry/backoff cho các call gspread"""
+
+    def __init__(self, quotas: Optional[Dict[str, Dict[str, int]]] = None, max_retries: int = 5,
+                 base_backoff: float = 1.0, max_backoff: float = 32.0,
+                 logger: Optional[logging.Logger] = None):
+        self.quotas = quotas or DEFAULT_QUOTAS
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.logger = logger or logging.getLogger('SheetsScheduler')
+
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._project = {kind: TokenBucket(q['project']) for kind, q in self.quotas.items()}
+        self._users: Dict[Tuple[str, str], TokenBucket] = {}
+        self._waiting: Dict[str, List[Tuple[int, int]]] = {kind: [] for kind in self.quotas}
+
+        self._metrics = {
+            'requests': 0,
+            'retries': 0,
+            'throttled': 0,
+            'server_errors': 0,
+            'failures': 0,
+            'timeouts': 0,
+            'max_queue_depth': {kind: 0 for kind in self.quotas},
+            'wait': {name: {'count': 0, 'total': 0.0, 'max': 0.0} for name in PRIORITY_NAMES.values()},
+        }
+
+    # ---------------------------------------------------------------- tokens
+
+    def _user_bucket(self, kind: str, user: str) -> TokenBucket:
+        key = (kind, user)
+        if key not in self._users:
+            self._users[key] = TokenBucket(self.quotas[kind]['user'])
+        return self._users[key]
+
+    def acquire(self, kind: str = READ, priority: int = PRIORITY_CONFIG, user: str = 'default',
+                max_wait: Optional[float] = None) -> float:
+        """
+        Chờ tới lượt và lấy 1 token ở cả bucket project và user
+
+        Returns:
+            số giây đã chờ
+        """
+        started = time.monotonic()
+        ticket = (priority, next(self._seq))
+        with self._cond:
+            queue = self._waiting[kind]
+            heapq.heappush(queue, ticket)
+            depth = len(queue)
+            if depth > self._metrics['max_queue_depth'][kind]:
+                self._metrics['max_queue_depth'][kind] = depth
+            try:
+                while True:
+                    now = time.monotonic()
+                    timeout = None
+                    # Chỉ request đứng đầu (ưu tiên cao nhất, đến trước) được lấy token
+                    if queue[0] == ticket:
+                        buckets = (self._project[kind], self._user_bucket(kind, user))
+                        timeout = max(bucket.wait_time(now) for bucket in buckets)
+                        if timeout <= 0:
+                            for bucket in buckets:
+                                bucket.consume()
+                            break
+
+                    if max_wait is not None:
+                        remaining = max_wait - (now - started)
+                        if remaining <= 0:
+                            self._metrics['timeouts'] += 1
+                            raise SheetsQuotaTimeout(
+                                f"Chờ quota Sheets ({kind}) quá {max_wait}s - "
+                                f"ưu tiên {PRIORITY_NAMES.get(priority, priority)}"
+                            )
+                        timeout = remaining if timeout is None else min(timeout, remaining)
+                    self._cond.wait(timeout)
+            finally:
+                queue.remove(ticket)
+                heapq.heapify(queue)
+                self._cond.notify_all()
+
+            waited = time.monotonic() - started
+            stats = self._metrics['wait'][PRIORITY_NAMES.get(priority, 'config')]
+            stats['count'] += 1
+            stats['total'] += waited
+            stats['max'] = max(stats['max'], waited)
+            self._metrics['requests'] += 1
+        return waited
+
+    def _count(self, key: str):
+        with self._cond:
+            self._metrics[key] += 1
+
+    def _throttle(self, kind: str, user: str):
+        """Nhận 429: làm rỗng bucket để cả process giảm tốc"""
+        with self._cond:
+            now = time.monotonic()
+            self._project[kind].drain(now)
+            self._user_bucket(kind, user).drain(now)
+
+    # --------------------------------------------------------------- execute
+
+    def execute(self, func: Callable[..., Any], *args, kind: str = READ,
+                priority: int = PRIORITY_CONFIG, user: str = 'default',
+                max_wait: Optional[float] = None, idempotent: bool = True,
+                **kwargs) -> Any:
+        """
+        Chạy func(*args, **kwargs) khi có quota; tự thử lại với 429/5xx
+
+        idempotent: False = chỉ thử lại với 429 - caller append (values_append,
+        append_row...) phải truyền False. Lỗi khác (hoặc hết số lần thử) được
+        raise lại cho caller xử lý như trước.
+        """
+        retryable = RETRYABLE_STATUS if idempotent else THROTTLED_STATUS
+        attempt = 0
+        while True:
+            self.acquire(kind, priority, user, max_wait)
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                status = error_status(e)
+                if status not in retryable or attempt >= self.max_retries:
+                    self._count('failures')
+                    raise
+                if status == 429:
+                    self._count('throttled')
+                    self._throttle(kind, user)
+                else:
+                    self._count('server_errors')
+
+                delay = min(self.max_backoff, self.base_backoff * (2 ** attempt))
+                delay += random.uniform(0, delay / 2)
+                attempt += 1
+                self._count('retries')
+                self.logger.warning(
+                    f"⏳ Sheets {kind} lỗi {status} - thử lại lần {attempt} sau {delay:.1f}s"
+                )
+                time.sleep(delay)
+
+    def read(self, func: Callable[..., Any], *args, priority: int = PRIORITY_CONFIG, **kwargs) -> Any:
+        return self.execute(func, *args, kind=READ, priority=priority, **kwargs)
+
+    def write(self, func: Callable[..., Any], *args, priority: int = PRIORITY_CONFIG,
+              idempotent: bool = True, **kwargs) -> Any:
+        return self.execute(func, *args, kind=WRITE, priority=priority, idempotent=idempotent, **kwargs)
+
+    # --------------------------------------------------------------- metrics
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            result = {
+                key: (dict(value) if isinstance(value, dict) else value)
+                for key, value in self._metrics.items() if key != 'wait'
+            }
+            result['queue_depth'] = {kind: len(queue) for kind, queue in self._waiting.items()}
+            result['wait'] = {
+                name: {
+                    'count': stats['count'],
+                    'avg_seconds': round(stats['total'] / stats['count'], 3) if stats['count'] else 0.0,
+                    'max_seconds': round(stats['max'], 3),
+                }
+                for name, stats in self._metrics['wait'].items()
+            }
+            return result
+
+
+_scheduler: Optional[SheetsRequestScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> SheetsRequestScheduler:
+    """Scheduler dùng chung trong process"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = SheetsRequestScheduler()
+        return _scheduler
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sheets Writer Module
+Bộ ghi Google Sheets có buffer: gom nhiều thao tác ghi thành ít API call
+
+- set_range(): ghi đè một vùng (status, dashboard...) - chỉ giá trị mới nhất được gửi
+- append_rows(): thêm dòng (log) - các dòng cùng sheet được gửi trong một lần append
+- Flush định kỳ trên background thread hoặc gọi flush() trực tiếp;
+  một lần flush = 1 values_batch_update + 1 values_append mỗi sheet có dòng mới
+- Backpressure: khi số dòng chờ vượt max_pending, thread gọi ghi sẽ tự flush;
+  khi Sheets lỗi kéo dài, hàng đợi giữ tối đa max_queued_rows dòng (bỏ dòng cũ nhất)
+- API call đi qua SheetsRequestScheduler với ưu tiên logging (sau auth/config)
+"""
+
+import atexit
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from sheets_scheduler import PRIORITY_LOGGING, get_scheduler
+
+
+def a1_range(sheet_title: str, range_a1: str) -> str:
+    """Range A1 có tên sheet (đặt trong nháy đơn)"""
+    return "'{}'!{}".format(sheet_title.replace("'", "''"), range_a1)
+
+
+class BufferedSheetsWriter:
+    """Hàng đợi ghi Sheets với coalescing + flush theo chu kỳ"""
+
+    def __init__(self, spreadsheet, flush_interval: float = 5.0, max_pending: int = 500,
+                 max_queued_rows: int = 10_000, value_input_option: str = 'USER_ENTERED', logger: Optional[logging.Logger] = None,
+                 scheduler=None, priority: int = PRIORITY_LOGGING):
+        self.spreadsheet = spreadsheet
+        self.scheduler = scheduler or get_scheduler()
+        self.priority = priority
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_queued_rows = max(max_queued_rows, max_pending)
+        self.value_input_option = value_input_option
+        self.logger = logger or logging.getLogger('BufferedSheetsWriter')
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # (sheet, range) -> (values, số API call nếu ghi trực tiếp)
+        self._ranges: Dict[Tuple[str, str], Tuple[List[List[Any]], int]] = {}
+        # sheet -> danh sách dòng chờ append
+        self._appends: Dict[str, List[List[Any]]] = {}
+        self._naive_calls = 0
+
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {
+            'queued_updates': 0,
+            'coalesced_updates': 0,
+            'queued_rows': 0,
+            'flushes': 0,
+            'api_calls': 0,
+            'api_calls_saved': 0,
+            'errors': 0,
+            'dropped_rows': 0,
+        }
+
+    # -------------------------------------------------------------- enqueue
+
+    def set_range(self, sheet_title: str, range_a1: str, values: List[List[Any]],
+                  naive_calls: int = 1):
+        """
+        Ghi đè vùng range_a1; nếu vùng đã có trong hàng đợi thì thay bằng giá trị mới
+
+        naive_calls: số API call thao tác này tốn nếu ghi trực tiếp (để thống kê)
+        """
+        with self._lock:
+            key = (sheet_title, range_a1)
+            if key in self._ranges:
+                self.stats['coalesced_updates'] += 1
+            self._ranges[key] = (values, naive_calls)
+            self._naive_calls += naive_calls
+            self.stats['queued_updates'] += 1
+
+    def append_rows(self, sheet_title: str, rows: List[List[Any]], naive_calls: Optional[int] = None):
+        """Thêm dòng vào cuối sheet (mặc định mỗi dòng tốn 1 append_row nếu ghi trực tiếp)"""
+        with self._lock:
+            self._appends.setdefault(sheet_title, []).extend(rows)
+            self._naive_calls += len(rows) if naive_calls is None else naive_calls
+            self.stats['queued_rows'] += len(rows)
+            pending = self._trim_appends()
+
+        if pending >= self.max_pending:
+            # Backpressure: người ghi tự flush thay vì để hàng đợi phình ra
+            self.flush()
+
+    def _trim_appends(self) -> int:
+        """Bỏ các dòng cũ nhất khi hàng đợi vượt max_queued_rows (gọi khi đang giữ _lock)"""
+        pending = sum(len(r) for r in self._appends.values())
+        overflow = pending - self.max_queued_rows
+        if overflow <= 0:
+            return pending
+
+        dropped = overflow
+        for sheet in list(self._appends):
+            rows = self._appends[sheet]
+            cut = min(overflow, len(rows))
+            self._appends[sheet] = rows[cut:]
+            overflow -= cut
+            if not self._appends[sheet]:
+                del self._appends[sheet]
+            if overflow <= 0:
+                break
+        self.stats['dropped_rows'] += dropped
+        self.logger.warning(f"⚠️ Hàng đợi Sheets đầy ({self.max_queued_rows} dòng) - bỏ {dropped} dòng cũ nhất")
+        return pending - dropped
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._ranges) + sum(len(r) for r in self._appends.values())
+
+    # ---------------------------------------------------------------- flush
+
+    def flush(self) -> Dict[str, int]:
+        """
+        Gửi toàn bộ thao tác đang chờ; lỗi thì đưa lại vào hàng đợi
+
+        Returns:
+            thống kê + 'ok': False nếu lần flush này lỗi (dữ liệu vẫn nằm trong hàng đợi)
+        """
+        with self._flush_lock:
+            with self._lock:
+                ranges, self._ranges = self._ranges, {}
+                appends, self._appends = self._appends, {}
+                naive_calls, self._naive_calls = self._naive_calls, 0
+
+            if not ranges and not appends:
+                return {**self.stats, 'ok': True}
+
+            calls = 0
+            ok = True
+            try:
+                if ranges:
+                    self.scheduler.write(self.spreadsheet.values_batch_update, {
+                        'valueInputOption': self.value_input_option,
+                        'data': [
+                            {'range': a1_range(sheet, range_a1), 'values': values}
+                            for (sheet, range_a1), (values, _) in ranges.items()
+                        ]
+                    }, priority=self.priority)
+                    calls += 1
+                    ranges = {}
+
+                for sheet in list(appends):
+                    self.scheduler.write(
+                        self.spreadsheet.values_append,
+                        a1_range(sheet, 'A1'),
+                        params={'valueInputOption': self.value_input_option, 'insertDataOption': 'INSERT_ROWS'},
+                        body={'values': appends[sheet]},
+                        priority=self.priority, idempotent=False
+                    )
+                    calls += 1
+                    del appends[sheet]
+
+            except Exception as e:
+                ok = False
+                self.stats['errors'] += 1
+                self.logger.error(f"❌ Lỗi flush Sheets: {e}")
+                self._requeue(ranges, appends, naive_calls)
+                naive_calls = calls  # phần chưa gửi được tính lại ở lần flush sau
+            finally:
+                self.stats['api_calls'] += calls
+
+            self.stats['flushes'] += 1
+            self.stats['api_calls_saved'] += max(naive_calls - calls, 0)
+            self.logger.debug(f"📤 Sheets flush: {calls} API call (tiết kiệm {naive_calls - calls})")
+            return {**self.stats, 'ok': ok}
+
+    def _requeue(self, ranges, appends, naive_calls):
+        with self._lock:
+            for key, value in ranges.items():
+                # Giá trị mới hơn đã được xếp hàng trong lúc flush thì giữ giá trị mới
+                self._ranges.setdefault(key, value)
+            for sheet, rows in appends.items():
+                self._appends[sheet] = rows + self._appends.get(sheet, [])
+            self._naive_calls += naive_calls
+            self._trim_appends()
+
+    # ----------------------------------------------------------- background
+
+    def start(self) -> 'BufferedSheetsWriter':
+        """Chạy thread flush định kỳ (flush lần cuối khi thoát chương trình)"""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sheets-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.logger.error(f"❌ Sheets writer thread error: {e}")
+
+    def request_flush(self):
+        """Yêu cầu background thread flush ngay (không chờ)"""
+        self._wakeup.set()
+
+    def stop(self, flush: bool = True):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=self.flush_interval + 5)
+        if flush:
+            self.flush()
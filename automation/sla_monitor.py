@@ -12,6 +12,17 @@ import logging
 import json
 import os
 
+try:
+    from parquet_store import PARQUET_AVAILABLE, ParquetOrderStore
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# Cột cần cho phân tích SLA (reader Parquet chỉ đọc các cột này)
+SLA_COLUMNS = [
+    'id', 'order_code', 'platform', 'col_18', 'customer', 'col_7',
+    'created_datetime', 'col_19', 'col_20', 'scraped_at'
+]
+
 
 class SLAMonitor:
     """Hệ thống giám sát SLA cho các sàn TMĐT"""
@@ -106,6 +117,27 @@ class SLAMonitor:
             self.logger.error(f"❌ Error in SLA analysis: {e}")
             return {}
 
+    def load_recent_orders(self, days=2, parquet_root="data/parquet",
+                           fallback_csv="data/orders_latest.csv"):
+        """Tải đơn hàng N ngày gần nhất (chỉ cột SLA) từ kho Parquet, fallback CSV"""
+        try:
+            if PARQUET_AVAILABLE and os.path.isdir(os.path.join(parquet_root, 'orders')):
+                df = ParquetOrderStore(parquet_root).read_recent(days=days, columns=SLA_COLUMNS)
+                self.logger.info(f"📥 Đã tải {len(df)} đơn ({days} ngày) từ Parquet")
+                return df
+
+            if os.path.exists(fallback_csv):
+                df = pd.read_csv(fallback_csv)
+                self.logger.info(f"📥 Đã tải {len(df)} đơn từ {fallback_csv}")
+                return df
+
+            self.logger.warning("⚠️ Không tìm thấy dữ liệu đơn hàng")
+            return pd.DataFrame()
+
+        except Exception as e:
+            self.logger.error(f"❌ Error loading orders: {e}")
+            return pd.DataFrame()
+
     def prepare_order_data(self, orders_df):
         """Chuẩn bị dữ liệu đơn hàng cho phân tích SLA"""
         try:
@@ -499,8 +531,14 @@ def main():
         # Initialize SLA Monitor
         sla_monitor = SLAMonitor()
 
-        # Load sample data (replace with actual data)
-        # orders_df = pd.read_csv('data/orders_latest.csv')
+        # Load recent orders (Parquet → CSV), fallback to sample data
+        orders_df = sla_monitor.load_recent_orders(days=2)
+        if not orders_df.empty:
+            sla_report = sla_monitor.analyze_orders_sla(orders_df)
+            export_files = sla_monitor.export_sla_report(sla_report)
+            print("✅ SLA Monitor completed")
+            print(f"📁 Reports: {export_files}")
+            return
 
         # For testing, create sample data
         sample_data = pd.DataFrame({
@@ -0,0 +1,79 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from artifact_catalog import STATE_DELETED, ArtifactCatalog, classify_file, path_size
+
+
+class TestArtifactCatalog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_dir = self.tmp.name
+        self.catalog = ArtifactCatalog(os.path.join(self.data_dir, 'catalog.db'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _touch(self, name, content='x'):
+        path = os.path.join(self.data_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_classify_file(self):
+        self.assertEqual(classify_file('orders_export_20250701_113535.csv'),
+                         {'kind': 'csv', 'run_id': '20250701_113535'})
+        self.assertIsNone(classify_file('orders_latest.csv'))
+
+    def test_register_run_and_latest_file(self):
+        old = self._touch('orders_dashboard_20250701_100000.csv')
+        new_csv = self._touch('orders_export_20250702_100000.csv')
+        new_dashboard = self._touch('orders_dashboard_20250702_100000.csv')
+        self.catalog.register_run('20250701_100000', {'dashboard_csv': old}, order_count=1)
+        self.catalog.register_run('20250702_100000', {'csv': new_csv, 'dashboard_csv': new_dashboard},
+                                  order_count=2)
+
+        # Cùng lần chạy: ưu tiên theo thứ tự kinds
+        self.assertEqual(self.catalog.latest_file(['dashboard_csv', 'csv']), os.path.normpath(new_dashboard))
+        runs = self.catalog.runs()
+        self.assertEqual([run['run_id'] for run in runs], ['20250702_100000', '20250701_100000'])
+        self.assertEqual(runs[0]['file_count'], 2)
+
+    def test_missing_files_are_not_registered(self):
+        self.assertEqual(self.catalog.register_run('20250701_100000', {'csv': 'nope.csv'}), 0)
+
+    def test_scan_directory_imports_untracked_files_once(self):
+        self._touch('orders_export_20250701_100000.csv')
+        self._touch('unrelated.txt')
+        self.assertEqual(self.catalog.scan_directory(self.data_dir), 1)
+        self.assertEqual(self.catalog.scan_directory(self.data_dir), 0)
+
+    def test_live_paths_protect_latest_and_unconsolidated_sources(self):
+        first = self._touch('orders_export_20250701_100000.csv')
+        second = self._touch('orders_export_20250702_100000.csv')
+        self.catalog.register_run('20250701_100000', {'csv': first})
+        self.catalog.register_run('20250702_100000', {'csv': second})
+        self.assertEqual(self.catalog.live_paths(), {os.path.normpath(first), os.path.normpath(second)})
+
+        self.catalog.mark_consolidated([first])
+        self.assertEqual(self.catalog.live_paths(), {os.path.normpath(second)})
+
+        # File mới nhất bị xóa: file active còn lại trở thành mới nhất
+        self.catalog.set_state([second], STATE_DELETED)
+        self.assertEqual(self.catalog.latest_file(['csv']), os.path.normpath(first))
+
+    def test_path_size_sums_directories(self):
+        self.assertEqual(path_size(self._touch('orders_export_20250701_100000.csv', 'abc')), 3)
+        partition = os.path.join(self.data_dir, 'parquet', 'order_day=2025-07-01')
+        os.makedirs(partition)
+        for name, content in (('a.parquet', 'x' * 10), ('b.parquet', 'y' * 5)):
+            with open(os.path.join(partition, name), 'w', encoding='utf-8') as f:
+                f.write(content)
+        self.assertEqual(path_size(os.path.join(self.data_dir, 'parquet')), 15)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from artifact_publisher import ArtifactPublisher, verify_artifact
+
+
+class TestArtifactPublisher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_dir = self.tmp.name
+        self.publisher = ArtifactPublisher(self.data_dir)
+        self.df = pd.DataFrame({'order_id': ['A', 'B'], 'status': ['pending', 'confirmed']})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _files(self):
+        return sorted(os.listdir(self.data_dir))
+
+    def test_publish_replaces_file_atomically(self):
+        path = self.publisher.publish_text('report', 'v1', 'report.txt')
+        self.assertEqual(self._files(), ['report.txt'])
+
+        def broken(handle):
+            handle.write(b'half')
+            raise RuntimeError('disk full')
+
+        with self.assertRaises(RuntimeError):
+            self.publisher._publish('report', 'report.txt', None, broken, rows=0)
+        # Ghi lỗi: bản cũ còn nguyên, không sót file tạm
+        self.assertEqual(self._files(), ['report.txt'])
+        with open(path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'v1')
+
+    def test_latest_is_a_hardlink_to_the_published_file(self):
+        path = self.publisher.publish_csv('dashboard_csv', self.df, 'orders_1.csv', latest_name='orders_latest.csv')
+        latest = os.path.join(self.data_dir, 'orders_latest.csv')
+        self.assertTrue(os.path.samefile(path, latest))
+
+        # Lần sau: latest trỏ sang file mới, file cũ giữ nguyên
+        new_path = self.publisher.publish_csv('dashboard_csv', self.df.head(1), 'orders_2.csv',
+                                              latest_name='orders_latest.csv')
+        self.assertTrue(os.path.samefile(new_path, latest))
+        self.assertEqual(len(pd.read_csv(path)), 2)
+        self.assertEqual(self._files(), ['orders_1.csv', 'orders_2.csv', 'orders_latest.csv'])
+
+    def test_latest_falls_back_to_copy_without_hardlinks(self):
+        with mock.patch('artifact_publisher.os.link', side_effect=OSError('EPERM')):
+            path = self.publisher.publish_csv('dashboard_csv', self.df, 'orders_1.csv',
+                                              latest_name='orders_latest.csv')
+        latest = os.path.join(self.data_dir, 'orders_latest.csv')
+        self.assertFalse(os.path.samefile(path, latest))
+        with open(path, 'rb') as a, open(latest, 'rb') as b:
+            self.assertEqual(a.read(), b.read())
+
+    def test_manifest_records_size_rows_and_sha256(self):
+        path = self.publisher.publish_csv('csv', self.df, 'orders_1.csv')
+        self.publisher.publish_json('config', {'a': 1}, 'config.json')
+        manifest_path = self.publisher.write_manifest()
+        self.assertIsNone(self.publisher.write_manifest())
+
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+        entry = manifest['artifacts']['csv']
+        with open(path, 'rb') as f:
+            content = f.read()
+        self.assertEqual((entry['path'], entry['latest'], entry['rows']), (path, None, 2))
+        self.assertEqual(entry['size'], len(content))
+        self.assertEqual(entry['sha256'], hashlib.sha256(content).hexdigest())
+        self.assertEqual(sorted(manifest['artifacts']), ['config', 'csv'])
+
+        # Lần chạy sau gộp vào manifest cũ
+        self.publisher.publish_text('report', 'ok', 'report.txt')
+        self.publisher.write_manifest()
+        self.assertEqual(sorted(self.publisher.load_manifest()['artifacts']), ['config', 'csv', 'report'])
+
+    def test_verify_artifact_rejects_corrupted_file(self):
+        self.publisher.publish_csv('csv', self.df, 'orders_1.csv', latest_name='orders_latest.csv')
+        entry = self.publisher.entries['csv']
+        self.assertTrue(verify_artifact(entry))
+
+        # Cùng kích thước, khác nội dung
+        with open(entry['latest'], 'r+b') as f:
+            f.seek(-2, os.SEEK_END)
+            f.write(b'XX')
+        self.assertFalse(verify_artifact(entry))
+
+        os.remove(entry['latest'])
+        os.remove(entry['path'])
+        self.assertFalse(verify_artifact(entry))
+
+
+if __name__ == '__main__':
+    unittest.main()
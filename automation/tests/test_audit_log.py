@@ -0,0 +1,116 @@
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+HAS_GSPREAD = importlib.util.find_spec('gspread') is not None
+LOG_HEADERS = ['Timestamp', 'Email', 'Status']
+
+
+class DirectScheduler:
+    """Gọi thẳng API (không rate limit/retry) cho test; before_write chạy trước mỗi lần ghi"""
+
+    def __init__(self, before_write=None):
+        self.before_write = before_write
+
+    def write(self, func, *args, priority=None, idempotent=True, **kwargs):
+        if self.before_write:
+            self.before_write()
+        return func(*args, **kwargs)
+
+
+@unittest.skipUnless(HAS_GSPREAD, 'fake_sheets cần gspread')
+class TestLoginAuditLog(unittest.TestCase):
+    def setUp(self):
+        from fake_sheets import FakeSheetsBackend
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'audit.db')
+        self.backend = FakeSheetsBackend()
+        self.spreadsheet = self.backend.create_spreadsheet('audit', {'Login_Logs': [LOG_HEADERS]})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _audit(self, spreadsheet='default', scheduler=None, **kwargs):
+        from audit_log import LoginAuditLog
+        return LoginAuditLog(self.spreadsheet if spreadsheet == 'default' else spreadsheet,
+                             scheduler=scheduler or DirectScheduler(), db_path=self.db_path, **kwargs)
+
+    def _logged(self):
+        return self.spreadsheet.worksheet('Login_Logs').get_all_values()[1:]
+
+    def _appends(self):
+        return self.backend.stats()['calls'].get('values_append', 0)
+
+    def test_record_then_flush(self):
+        audit = self._audit()
+        self.assertTrue(audit.record(['2025-07-01 10:00:00', 'a@mia.vn', None]))
+        self.assertTrue(audit.record(['2025-07-01 10:01:00', 'b@mia.vn', 'SUCCESS']))
+        self.assertEqual(self._appends(), 0)
+
+        stats = audit.flush()
+        self.assertEqual((stats['shipped'], stats['batches']), (2, 1))
+        self.assertEqual(self._logged(), [['2025-07-01 10:00:00', 'a@mia.vn', ''],
+                                          ['2025-07-01 10:01:00', 'b@mia.vn', 'SUCCESS']])
+        self.assertEqual(audit.backlog(), 0)
+
+    def test_failed_append_keeps_rows(self):
+        def fail():
+            raise RuntimeError('503')
+
+        audit = self._audit(scheduler=DirectScheduler(before_write=fail))
+        audit.record(['t1', 'a@mia.vn', 'FAILED'])
+        stats = audit.flush()
+        self.assertEqual((stats['shipped'], stats['errors']), (0, 1))
+        self.assertEqual(audit.backlog(), 1)
+
+        audit.scheduler = DirectScheduler()
+        audit.flush()
+        self.assertEqual(self._logged(), [['t1', 'a@mia.vn', 'FAILED']])
+        self.assertEqual(audit.backlog(), 0)
+
+    def test_batches_are_split(self):
+        audit = self._audit(batch_size=2)
+        for i in range(5):
+            audit.record([f't{i}', 'a@mia.vn', 'ATTEMPT'])
+        stats = audit.flush()
+        self.assertEqual((stats['shipped'], stats['batches']), (5, 3))
+        self.assertEqual(self._appends(), 3)
+        self.assertEqual([row[0] for row in self._logged()], ['t0', 't1', 't2', 't3', 't4'])
+
+    def test_buffer_survives_restart(self):
+        offline = self._audit(spreadsheet=None)
+        offline.record(['t1', 'a@mia.vn', 'ATTEMPT'])
+        offline.flush()
+
+        restarted = self._audit()
+        self.assertEqual(restarted.backlog(), 1)
+        restarted.flush()
+        self.assertEqual(self._logged(), [['t1', 'a@mia.vn', 'ATTEMPT']])
+
+    def test_flushers_sharing_a_buffer_do_not_duplicate(self):
+        other = self._audit()
+        # Flusher thứ hai (process khác) chạy đúng lúc lô của flusher đầu đang được gửi
+        audit = self._audit(scheduler=DirectScheduler(before_write=lambda: other.flush()), batch_size=2)
+        for i in range(3):
+            audit.record([f't{i}', 'a@mia.vn', 'ATTEMPT'])
+
+        audit.flush()
+        self.assertEqual(sorted(row[0] for row in self._logged()), ['t0', 't1', 't2'])
+        self.assertEqual(audit.backlog(), 0)
+
+    def test_stale_claim_is_taken_over(self):
+        crashed = self._audit(claim_timeout=0)
+        crashed.record(['t1', 'a@mia.vn', 'ATTEMPT'])
+        crashed._claim_batch()  # crash trước khi gửi: dòng còn claim
+
+        self._audit(claim_timeout=0).flush()
+        self.assertEqual(self._logged(), [['t1', 'a@mia.vn', 'ATTEMPT']])
+
+
+if __name__ == '__main__':
+    unittest.main()
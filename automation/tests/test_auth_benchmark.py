@@ -0,0 +1,84 @@
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from auth_benchmark import DEFAULT_TOLERANCE, compare_to_baseline, main
+
+HAS_SERVER_DEPS = all(importlib.util.find_spec(name) for name in ('flask', 'flask_cors', 'gspread'))
+
+
+def _report(p95=10.0, throughput=100.0, calls_per_request=0.5):
+    endpoints = {endpoint: {'p50': 5.0, 'p95': p95, 'p99': p95} for endpoint in ('login', 'verify', 'logout')}
+    return {'endpoints': endpoints, 'throughput': throughput, 'sheets': {'calls_per_request': calls_per_request}}
+
+
+class TestCompareToBaseline(unittest.TestCase):
+    def setUp(self):
+        self.baseline = _report()
+
+    def test_same_numbers_pass(self):
+        self.assertEqual(compare_to_baseline(_report(), self.baseline), [])
+
+    def test_latency_regression(self):
+        regressions = compare_to_baseline(_report(p95=10.0 * (1 + DEFAULT_TOLERANCE['latency']) + 1), self.baseline)
+        self.assertEqual(len(regressions), 6)  # p95 + p99 cho 3 endpoint
+        self.assertTrue(regressions[0].startswith('login p95'))
+
+    def test_throughput_regression(self):
+        regressions = compare_to_baseline(_report(throughput=50.0), self.baseline)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith('throughput'))
+        self.assertEqual(compare_to_baseline(_report(throughput=80.0), self.baseline), [])
+
+    def test_sheets_calls_regression(self):
+        regressions = compare_to_baseline(_report(calls_per_request=0.6), self.baseline)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith('sheets calls/request'))
+
+    def test_missing_metrics_are_ignored(self):
+        report = {'endpoints': {}, 'throughput': None}
+        self.assertEqual(compare_to_baseline(report, self.baseline), [])
+
+
+@unittest.skipUnless(HAS_SERVER_DEPS, 'auth_api_server cần flask, flask_cors, gspread')
+class TestBenchmarkSmoke(unittest.TestCase):
+    def setUp(self):
+        # setup_in_process đổi cwd sang thư mục tạm
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        auth_api_server = sys.modules.get('auth_api_server')
+        if auth_api_server is not None:
+            service = auth_api_server.auth_service
+            service.revocations.stop()
+            service.store.stop(flush=False)
+            service.audit.stop(flush=False)
+            service.limiter.stop()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_in_process_run(self):
+        output = os.path.join(self.tmp.name, 'report.json')
+        with contextlib.redirect_stdout(io.StringIO()):
+            code = main(['--iterations', '1', '--concurrency', '2', '--users', '2', '--verifies', '2',
+                         '--latency', '0', '--jitter', '0', '--output', output])
+        self.assertEqual(code, 0)
+
+        with open(output, encoding='utf-8') as f:
+            report = json.load(f)
+        self.assertEqual(report['errors'], {})
+        self.assertEqual({endpoint: stats['status'] for endpoint, stats in report['endpoints'].items()},
+                         {'login': {'200': 2}, 'verify': {'200': 4}, 'logout': {'200': 2}})
+        self.assertGreater(report['sheets']['requests'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
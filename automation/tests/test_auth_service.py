@@ -0,0 +1,95 @@
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+HAS_GSPREAD = importlib.util.find_spec('gspread') is not None
+CREDENTIALS = 'fake://auth-service-test'
+SESSION_HEADERS = ['Session ID', 'User ID', 'Email', 'Created', 'Expires', 'Status', 'IP Address', 'User Agent']
+
+
+def _time(delta):
+    return (datetime.now() + delta).strftime('%Y-%m-%d %H:%M:%S')
+
+
+@unittest.skipUnless(HAS_GSPREAD, 'auth_service cần gspread')
+class AuthServiceTestCase(unittest.TestCase):
+    """AuthenticationService trên backend Sheets giả, file trạng thái trong thư mục tạm"""
+
+    sheets = {}
+
+    def setUp(self):
+        from fake_sheets import FakeSheetsBackend, install
+
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.backend = FakeSheetsBackend()
+        self.backend.create_spreadsheet('auth-test', self.sheets)
+        install(self.backend, CREDENTIALS)
+
+        from auth_service import AuthenticationService
+        self.service = AuthenticationService(spreadsheet_id='auth-test', credentials_path=CREDENTIALS)
+
+    def tearDown(self):
+        self.service.revocations.stop()
+        self.service.store.stop(flush=False)
+        self.service.audit.stop()
+        self.service.limiter.stop()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+
+class TestRevokedSessions(AuthServiceTestCase):
+    sheets = {'User_Sessions': [
+        SESSION_HEADERS + ['Extra'],
+        ['S1', 'U1', 'a@mia.vn', _time(timedelta(0)), _time(timedelta(hours=1)), 'INACTIVE', '', '', 'x' * 500],
+        ['S2', 'U1', 'a@mia.vn', _time(timedelta(0)), _time(timedelta(hours=1)), 'ACTIVE', '', ''],
+        ['S3', 'U1', 'a@mia.vn', _time(timedelta(0)), _time(-timedelta(hours=1)), 'INACTIVE', '', ''],
+    ]}
+
+    def test_only_needed_columns_are_read(self):
+        self.backend.reset_stats()
+        revoked = self.service._load_revoked_sessions()
+        self.assertEqual(list(revoked), ['S1'])
+        self.assertEqual(self.backend.stats()['calls'], {'values_batch_get': 1})
+
+        requested = []
+        spreadsheet = self.service.sheets_service.spreadsheet
+        original = spreadsheet.values_batch_get
+        spreadsheet.values_batch_get = lambda ranges, *a, **kw: requested.extend(ranges) or original(ranges, *a, **kw)
+        self.service._load_revoked_sessions()
+        self.assertEqual(requested, ["'User_Sessions'!A2:A", "'User_Sessions'!F2:F", "'User_Sessions'!E2:E"])
+
+    def test_logout_in_another_process_is_seen_after_sync(self):
+        self.assertTrue(self.service.revocations.is_revoked('S1'))
+        token = self.service.tokens.issue({'sid': 'S4', 'uid': 'U1', 'email': 'a@mia.vn'})['token']
+        self.assertTrue(self.service.verify_session(token)[0])
+
+        # Process khác logout S4: chỉ sheet thay đổi
+        self.backend.get_spreadsheet('auth-test').worksheet('User_Sessions').append_row(
+            ['S4', 'U1', 'a@mia.vn', _time(timedelta(0)), _time(timedelta(hours=1)), 'INACTIVE', '', '']
+        )
+        self.service.revocations.sync()
+        self.assertFalse(self.service.verify_session(token)[0])
+
+
+class TestUnknownEmail(AuthServiceTestCase):
+    sheets = {'Users': [
+        ['User ID', 'Email', 'Password Hash', 'Full Name', 'Role', 'Department', 'Status',
+         'Created Date', 'Last Login', 'Failed Attempts', 'Locked Until'],
+    ]}
+
+    def test_unknown_email_still_runs_the_kdf(self):
+        success, result = self.service.authenticate_user('nobody@mia.vn', 'secret', '10.0.0.1')
+        self.assertFalse(success)
+        self.assertEqual(result['error'], 'Thông tin đăng nhập không chính xác')
+        self.assertEqual(self.service.hasher.metrics()['dummy_verified'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import importlib.util
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+HAS_GSPREAD = importlib.util.find_spec('gspread') is not None
+if HAS_GSPREAD:
+    # auth_store import sheets_client (gspread) - không có thì bỏ qua cả file thay vì lỗi lúc collect
+    from auth_store import IndexedSheetTable, session_is_live
+
+SESSION_HEADERS = ['Session ID', 'User ID', 'Email', 'Created', 'Expires', 'Status', 'IP Address', 'User Agent']
+
+
+def _time(delta):
+    return (datetime.now() + delta).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _session(session_id, status='ACTIVE', expires=timedelta(hours=1)):
+    return [session_id, 'U1', 'a@mia.vn', _time(timedelta(0)), _time(expires), status, '', '']
+
+
+class DirectScheduler:
+    """Gọi thẳng API (không rate limit/retry) cho test"""
+
+    def read(self, func, *args, priority=None, **kwargs):
+        return func(*args, **kwargs)
+
+    def write(self, func, *args, priority=None, idempotent=True, **kwargs):
+        return func(*args, **kwargs)
+
+
+@unittest.skipUnless(HAS_GSPREAD, 'auth_store cần gspread')
+class TestSessionFilter(unittest.TestCase):
+    def test_session_is_live(self):
+        record = dict(zip(SESSION_HEADERS, _session('S1')))
+        self.assertTrue(session_is_live(record))
+        self.assertFalse(session_is_live({**record, 'Status': 'INACTIVE'}))
+        self.assertFalse(session_is_live(dict(zip(SESSION_HEADERS, _session('S2', expires=-timedelta(1))))))
+
+    def test_expired_sessions_are_not_loaded(self):
+        table = IndexedSheetTable('User_Sessions', 'Session ID', row_filter=session_is_live)
+        table.load([SESSION_HEADERS, _session('S1'), _session('S2', expires=-timedelta(minutes=1)),
+                    _session('S3', status='INACTIVE')])
+        self.assertEqual(list(table.rows), ['S1'])
+
+
+@unittest.skipUnless(HAS_GSPREAD, 'auth_store cần gspread')
+class TestAuthStore(unittest.TestCase):
+    def setUp(self):
+        from fake_sheets import FakeSheetsBackend, FakeSheetsClient
+        from auth_store import AuthStore
+
+        self.backend = FakeSheetsBackend()
+        self.spreadsheet = self.backend.create_spreadsheet('auth-store', {
+            'Users': [['User ID', 'Email', 'Status'], ['U1', 'a@mia.vn', 'ACTIVE']],
+            'User_Sessions': [SESSION_HEADERS, _session('S1'), _session('S2', expires=timedelta(seconds=1))],
+        })
+        FakeSheetsClient(self.backend)
+        self.store = AuthStore(self.spreadsheet, DirectScheduler(), flush_interval=60)
+        self.backend.reset_stats()
+
+    def tearDown(self):
+        self.store.stop(flush=False)
+
+    def test_lookups_are_served_from_memory(self):
+        self.assertEqual(self.store.get_user_by_email('A@MIA.VN')['User ID'], 'U1')
+        self.assertEqual(self.store.get_user('U1')['Email'], 'a@mia.vn')
+        self.assertEqual(self.store.get_session('S1')['Status'], 'ACTIVE')
+        self.assertEqual(self.backend.stats()['calls'], {'values_batch_get': 1})
+
+    def test_writes_are_batched_until_flush(self):
+        self.store.ensure_loaded()
+        self.store.add_session(dict(zip(SESSION_HEADERS, _session('S3'))))
+        self.store.update_session('S1', {'Status': 'INACTIVE'})
+        self.store.update_user('U1', {'Status': 'LOCKED'})
+        self.assertEqual(self.store.get_session('S3')['Status'], 'ACTIVE')
+        self.assertEqual(self.backend.stats()['write'], 0)
+
+        self.store.flush()
+        calls = self.backend.stats()['calls']
+        self.assertEqual((calls['values_append'], calls['values_batch_update']), (1, 1))
+        sessions = self.spreadsheet.worksheet('User_Sessions').get_all_values()
+        self.assertEqual([row[0] for row in sessions[1:]], ['S1', 'S2', 'S3'])
+        self.assertEqual(sessions[1][5], 'INACTIVE')
+        self.assertEqual(self.spreadsheet.worksheet('Users').get_all_values()[1][2], 'LOCKED')
+
+        # Dòng vừa append đã có số dòng thật: cập nhật sau đó ghi đúng dòng
+        self.store.update_session('S3', {'Status': 'INACTIVE'})
+        self.store.flush()
+        self.assertEqual(self.spreadsheet.worksheet('User_Sessions').get_all_values()[3][5], 'INACTIVE')
+
+    def test_expired_sessions_are_pruned(self):
+        self.store.ensure_loaded()
+        self.assertIsNotNone(self.store.sessions.get('S2'))
+        self.store.sessions.rows['S2'].values['Expires'] = _time(-timedelta(seconds=1))
+
+        self.assertEqual(self.store.prune_sessions(), 1)
+        self.assertIsNone(self.store.sessions.get('S2'))
+        self.assertIsNotNone(self.store.sessions.get('S1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import sys
+import unittest
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dashboard_projection import build_dashboard_frame, project_incremental
+from order_index import STATUS_CHANGED, STATUS_NEW, STATUS_UNCHANGED
+
+
+def _scrape(rows, scraped_at='2025-07-05 10:00:00'):
+    # Shopee, quét sau hạn nhiều ngày: cờ SLA đã chốt (False/False)
+    return pd.DataFrame([
+        {'id': order_id, 'col_7': status, 'col_18': 'Shopee', 'created_datetime': order_date,
+         'scraped_at': scraped_at, 'change_status': change}
+        for order_id, status, order_date, change in rows
+    ])
+
+
+class TestProjectIncremental(unittest.TestCase):
+    def setUp(self):
+        first = _scrape([
+            ('A', 'Chờ xử lý', '2025-07-01 08:00:00', STATUS_NEW),
+            ('B', 'Chờ xử lý', '2025-07-01 09:00:00', STATUS_NEW),
+            ('C', 'Chờ xử lý', '2025-07-01 10:00:00', STATUS_NEW),
+        ])
+        self.previous, _ = project_incremental(first, None)
+
+    def test_full_projection_without_previous(self):
+        self.assertEqual(sorted(self.previous['order_id']), ['A', 'B', 'C'])
+
+    def test_unchanged_orders_are_reused(self):
+        df = _scrape([
+            ('A', 'Chờ xử lý', '2025-07-01 08:00:00', STATUS_UNCHANGED),
+            ('B', 'Chờ xử lý', '2025-07-01 09:00:00', STATUS_UNCHANGED),
+            ('C', 'Chờ xử lý', '2025-07-01 10:00:00', STATUS_UNCHANGED),
+        ])
+        snapshot, projected = project_incremental(df, self.previous)
+        self.assertEqual(projected, 0)
+        self.assertEqual(sorted(snapshot['order_id']), ['A', 'B', 'C'])
+
+    def test_changed_orders_are_reprojected(self):
+        df = _scrape([
+            ('A', 'Chờ xử lý', '2025-07-01 08:00:00', STATUS_UNCHANGED),
+            ('B', 'Xác nhận', '2025-07-01 09:00:00', STATUS_CHANGED),
+            ('C', 'Chờ xử lý', '2025-07-01 10:00:00', STATUS_UNCHANGED),
+        ])
+        snapshot, projected = project_incremental(df, self.previous)
+        self.assertEqual(projected, 1)
+        self.assertEqual(snapshot.set_index('order_id').loc['B', 'status'], 'confirmed')
+        self.assertEqual(len(snapshot), 3)
+
+    def test_orders_missing_from_scrape_are_dropped(self):
+        # B đã xuất kho: không còn trong danh sách "Đơn chờ xuất kho"
+        df = _scrape([
+            ('A', 'Chờ xử lý', '2025-07-01 08:00:00', STATUS_UNCHANGED),
+            ('C', 'Chờ xử lý', '2025-07-01 10:00:00', STATUS_UNCHANGED),
+            ('D', 'Chờ xử lý', '2025-07-01 11:00:00', STATUS_NEW),
+        ])
+        snapshot, projected = project_incremental(df, self.previous)
+        self.assertEqual(projected, 1)
+        self.assertEqual(sorted(snapshot['order_id']), ['A', 'C', 'D'])
+
+    def test_incremental_matches_full_projection(self):
+        df = _scrape([
+            ('A', 'Chờ xử lý', '2025-07-01 08:00:00', STATUS_UNCHANGED),
+            ('D', 'Hủy', '2025-07-01 11:00:00', STATUS_NEW),
+        ])
+        snapshot, _ = project_incremental(df, self.previous)
+        full = build_dashboard_frame(df.drop(columns=['change_status']))
+        self.assertEqual(sorted(snapshot['order_id']), sorted(full['order_id']))
+
+    def test_open_sla_flags_are_recomputed(self):
+        first = _scrape([('A', 'Chờ xử lý', '2025-07-01 08:00:00', STATUS_NEW)],
+                        scraped_at='2025-07-01 09:00:00')
+        previous, _ = project_incremental(first, None)
+        self.assertEqual(previous.loc[0, ['is_confirmed_ontime', 'is_delivered_ontime']].tolist(), ['', ''])
+
+        later = _scrape([('A', 'Chờ xử lý', '2025-07-01 08:00:00', STATUS_UNCHANGED)],
+                        scraped_at='2025-07-03 09:00:00')
+        snapshot, projected = project_incremental(later, previous)
+        self.assertEqual(projected, 1)
+        full = build_dashboard_frame(later.drop(columns=['change_status']))
+        self.assertEqual(snapshot.loc[0, ['is_confirmed_ontime', 'is_delivered_ontime']].tolist(),
+                         full.loc[0, ['is_confirmed_ontime', 'is_delivered_ontime']].tolist())
+        self.assertEqual(snapshot.loc[0, 'is_confirmed_ontime'], False)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import excel_export
+from excel_export import XLSXWRITER_AVAILABLE, _cell_value, write_workbook
+
+
+class TestCellValue(unittest.TestCase):
+    def test_missing_values_become_empty_cells(self):
+        self.assertIsNone(_cell_value(float('nan')))
+        self.assertIsNone(_cell_value(pd.NaT))
+        self.assertIsNone(_cell_value(None))
+        self.assertEqual(_cell_value('nan'), 'nan')
+        self.assertEqual(_cell_value(3), 3)
+
+    def test_containers_are_serialized_as_json(self):
+        self.assertEqual(_cell_value(['Áo', 2]), '["Áo", 2]')
+        self.assertEqual(_cell_value({'sku': 'A1'}), '{"sku": "A1"}')
+
+
+@unittest.skipUnless(XLSXWRITER_AVAILABLE, 'cần xlsxwriter')
+class TestWriteWorkbook(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'orders.xlsx')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        df = pd.DataFrame({
+            'id': ['A', 'B'],
+            'amount': [1.5, None],
+            'items': [['x', 'y'], None],
+        })
+        written = write_workbook(self.path, {'Orders': df, 'Empty': pd.DataFrame()})
+        self.assertEqual(written, {'Orders': 2})
+
+        result = pd.read_excel(self.path, sheet_name='Orders')
+        self.assertEqual(list(result['id']), ['A', 'B'])
+        self.assertEqual(result['items'][0], '["x", "y"]')
+        self.assertTrue(pd.isna(result['amount'][1]))
+
+    def test_large_tables_are_split_across_sheets(self):
+        df = pd.DataFrame({'id': range(5)})
+        with mock.patch.object(excel_export, 'EXCEL_MAX_ROWS', 3):
+            written = write_workbook(self.path, {'Orders': df})
+        self.assertEqual(written, {'Orders (1)': 2, 'Orders (2)': 2, 'Orders (3)': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dashboard_projection import project_incremental
+from excel_export import XLSXWRITER_AVAILABLE, write_workbook
+from export_scheduler import STATUS_ERROR, STATUS_OK, STATUS_TIMEOUT, ExportScheduler
+from line_items import build_line_items
+from order_index import STATUS_NEW
+
+
+def _orders():
+    return pd.DataFrame([
+        {'id': 'A', 'col_7': 'Chờ xử lý', 'order_date': '2025-07-01 08:00:00', 'change_status': STATUS_NEW,
+         'platform': 'Shopee', 'products': [{'sku': 'S1', 'name': 'Áo', 'quantity': 2}]},
+        {'id': 'B', 'col_7': 'Hủy', 'order_date': '2025-07-01 09:00:00', 'change_status': STATUS_NEW,
+         'platform': 'Lazada', 'products': None},
+    ])
+
+
+class TestSharedExportFrame(unittest.TestCase):
+    """Các writer chạy song song dùng chung một DataFrame nên không được sửa nó"""
+
+    def test_writers_leave_shared_frame_untouched(self):
+        df = _orders()
+        original = df.copy()
+        with tempfile.TemporaryDirectory() as tmp:
+            scheduler = ExportScheduler(max_workers=3)
+            scheduler.add('dashboard', lambda: project_incremental(df, None))
+            scheduler.add('line_items', lambda: build_line_items(df))
+            if XLSXWRITER_AVAILABLE:
+                scheduler.add('excel', lambda: write_workbook(os.path.join(tmp, 'x.xlsx'), {'Đơn hàng': df}))
+            report = scheduler.run()
+
+        self.assertEqual(set(report['status'].values()), {STATUS_OK})
+        pd.testing.assert_frame_equal(df, original)
+
+
+class TestExportDeadline(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def _slow(self):
+        self.release.wait(5)
+        return {'json': 'late.json'}
+
+    def test_optional_task_past_deadline_is_timed_out(self):
+        late = []
+        scheduler = ExportScheduler(max_workers=2, deadline_seconds=0.1)
+        scheduler.add('csv', lambda: {'csv': 'orders.csv'})
+        scheduler.add('json', self._slow, optional=True)
+        report = scheduler.run(late_callback=lambda name, result: late.append((name, result)))
+
+        self.assertEqual(report['status'], {'csv': STATUS_OK, 'json': STATUS_TIMEOUT})
+        self.assertTrue(report['required_ok'])
+        self.assertLess(report['elapsed'], 2)
+
+        # Task trễ vẫn được báo khi chạy xong
+        self.release.set()
+        for _ in range(50):
+            if late:
+                break
+            time.sleep(0.05)
+        self.assertEqual(late, [('json', {'json': 'late.json'})])
+
+    def test_required_failure_is_reported(self):
+        def broken():
+            raise RuntimeError('disk full')
+
+        scheduler = ExportScheduler(max_workers=2, deadline_seconds=0.1)
+        scheduler.add('csv', broken)
+        scheduler.add('json', self._slow, optional=True)
+        report = scheduler.run()
+        self.assertEqual(report['status'], {'csv': STATUS_ERROR, 'json': STATUS_TIMEOUT})
+        self.assertFalse(report['required_ok'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+import importlib.util
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+@unittest.skipUnless(importlib.util.find_spec('gspread'), 'fake_sheets cần gspread')
+class TestFakeSheetsBackend(unittest.TestCase):
+    def test_quota_and_stats(self):
+        import gspread
+        from fake_sheets import FakeSheetsBackend, FakeSheetsClient
+
+        backend = FakeSheetsBackend(quotas={'read': 3})
+        backend.create_spreadsheet('quota', {'Config': [['Section', 'Key', 'Value'], ['a', 'b', 1]]})
+        spreadsheet = FakeSheetsClient(backend).open_by_key('quota')
+        self.assertEqual(spreadsheet.worksheet('Config').get_all_records(),
+                         [{'Section': 'a', 'Key': 'b', 'Value': 1}])
+        with self.assertRaises(gspread.exceptions.APIError):
+            spreadsheet.values_get('Config!A1')
+        stats = backend.stats()
+        self.assertEqual((stats['read'], stats['throttled']), (3, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import asyncio
+import importlib.util
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+@unittest.skipUnless(importlib.util.find_spec('gspread'), 'google_sheets_service cần gspread')
+class TestGoogleSheetsServiceReads(unittest.TestCase):
+    def setUp(self):
+        from fake_sheets import FakeSheetsBackend, FakeSheetsClient
+        from services.google_sheets_service import GoogleSheetsService
+
+        self.backend = FakeSheetsBackend(latency={'read': 0.05, 'write': 0.0})
+        self.backend.create_spreadsheet('svc', {
+            'Orders': [['id'], ['1'], ['2']],
+            'Users': [['email'], ['a@mia.vn']],
+        })
+        self.service = GoogleSheetsService(max_workers=4)
+        asyncio.run(self.service.initialize(client=FakeSheetsClient(self.backend)))
+        asyncio.run(self.service.get_spreadsheet('svc'))
+        self.backend.reset_stats()
+
+    def tearDown(self):
+        asyncio.run(self.service.close())
+
+    def _batch_gets(self):
+        return self.backend.stats()['calls'].get('values_batch_get', 0)
+
+    def test_concurrent_reads_of_same_range_share_one_call(self):
+        async def run():
+            return await asyncio.gather(*[self.service.read_data('svc', 'Orders!A:A') for _ in range(5)])
+
+        results = asyncio.run(run())
+        self.assertEqual(results, [[['id'], ['1'], ['2']]] * 5)
+        self.assertEqual(self._batch_gets(), 1)
+
+    def test_different_ranges_do_not_wait_for_each_other(self):
+        # Hai read phải cùng nằm trong backend một lúc mới qua được barrier;
+        # xếp hàng sau một lock chung thì read đầu chờ hết timeout và barrier vỡ
+        barrier = threading.Barrier(2, timeout=5)
+        request = self.backend._request
+
+        def meet(kind, method, sheet):
+            request(kind, method, sheet)
+            if method == 'values_batch_get':
+                barrier.wait()
+
+        self.backend._request = meet
+
+        async def run():
+            return await asyncio.gather(
+                self.service.read_data('svc', 'Orders!A:A'),
+                self.service.read_data('svc', 'Users!A:A'),
+            )
+
+        self.assertEqual(asyncio.run(run()), [[['id'], ['1'], ['2']], [['email'], ['a@mia.vn']]])
+        self.assertFalse(barrier.broken)
+        self.assertEqual(self._batch_gets(), 2)
+
+    def test_cache_is_bounded_and_expires(self):
+        self.service.read_cache_max_entries = 2
+        ranges = ['Orders!A1', 'Orders!A2', 'Orders!A3']
+        asyncio.run(self.service.read_ranges('svc', ranges))
+        self.assertEqual(len(self.service._read_cache), 2)
+        self.assertNotIn(('svc', 'Orders!A1'), self.service._read_cache)
+
+        self.service.read_cache_ttl = 0
+        asyncio.run(self.service.read_data('svc', 'Users!A:A'))
+        self.assertEqual(list(self.service._read_cache), [('svc', 'Users!A:A')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import sys
+import unittest
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from line_items import build_line_items, quantity_histogram, resolve_platform, top_skus_by_day
+
+
+class TestBuildLineItems(unittest.TestCase):
+    def test_products_column(self):
+        df = pd.DataFrame([
+            {'id': 'A', 'platform': 'Shopee', 'created_datetime': '2025-07-01 08:00:00',
+             'products': [{'name': 'Vali M', 'quantity': 2}, {'name': 'Tag', 'quantity': 1}]},
+            {'id': 'B', 'platform': 'Lazada', 'created_datetime': '2025-07-01 09:00:00',
+             'products': "[{'name': 'Vali M', 'quantity': 1}]"},
+        ])
+        items = build_line_items(df)
+        self.assertEqual(items[['order_id', 'line_number', 'product_name', 'quantity', 'platform']].values.tolist(), [
+            ['A', 1, 'Vali M', 2, 'Shopee'],
+            ['A', 2, 'Tag', 1, 'Shopee'],
+            ['B', 1, 'Vali M', 1, 'Lazada'],
+        ])
+
+    def test_raw_product_detail_fills_orders_without_products(self):
+        df = pd.DataFrame([
+            {'id': 'A', 'products': [{'name': 'Vali M', 'quantity': 1}], 'raw_product_detail': 'ignored(9)'},
+            {'id': 'B', 'products': [], 'raw_product_detail': 'Vali S(3), Túi đeo'},
+        ])
+        items = build_line_items(df)
+        self.assertEqual(items[['order_id', 'product_name', 'quantity']].values.tolist(), [
+            ['A', 'Vali M', 1],
+            ['B', 'Vali S', 3],
+            ['B', 'Túi đeo', 1],
+        ])
+
+    def test_normalized_column_names_are_used(self):
+        # Sau bước chuẩn hóa cột của process_order_data
+        df = pd.DataFrame([{
+            'Mã đơn hàng': 'A', 'Sàn TMĐT': 'Shopee', 'customer': 'Nguyen Van A',
+            'Sản phẩm': [{'name': 'Vali M', 'quantity': 1}],
+        }])
+        items = build_line_items(df)
+        self.assertEqual(items[['order_id', 'platform', 'product_name']].values.tolist(),
+                         [['A', 'Shopee', 'Vali M']])
+
+    def test_platform_never_falls_back_to_customer(self):
+        df = pd.DataFrame([{'platform': '', 'col_18': 'Tiktok', 'customer': 'Nguyen Van A'},
+                           {'platform': '', 'col_18': '', 'customer': 'Nguyen Van B'}])
+        self.assertEqual(resolve_platform(df).tolist(), ['Tiktok', 'unknown'])
+
+
+class TestSkuAggregates(unittest.TestCase):
+    def setUp(self):
+        self.items = pd.DataFrame([
+            {'order_id': 'A', 'product_name': 'Vali M', 'quantity': 2, 'platform': 'Shopee', 'order_date': '2025-07-01'},
+            {'order_id': 'B', 'product_name': 'Vali M', 'quantity': 1, 'platform': 'Shopee', 'order_date': '2025-07-01'},
+            {'order_id': 'B', 'product_name': 'Tag', 'quantity': 0, 'platform': 'Shopee', 'order_date': '2025-07-01'},
+            {'order_id': 'C', 'product_name': 'Tag', 'quantity': 12, 'platform': 'Shopee', 'order_date': '2025-07-02'},
+        ])
+
+    def test_top_skus_by_day(self):
+        top = top_skus_by_day(self.items, top_n=1)
+        self.assertEqual(top[['order_day', 'rank', 'product_name', 'quantity', 'order_count']].values.tolist(), [
+            ['2025-07-02', 1, 'Tag', 12, 1],
+            ['2025-07-01', 1, 'Vali M', 3, 2],
+        ])
+
+    def test_quantity_histogram_buckets(self):
+        histogram = quantity_histogram(self.items)
+        lines = histogram[histogram['scope'] == 'line'].set_index('bucket')['count'].to_dict()
+        orders = histogram[histogram['scope'] == 'order'].set_index('bucket')['count'].to_dict()
+        # Số lượng 0 vẫn có bucket riêng, không bị rơi khỏi histogram
+        self.assertEqual(lines, {'0': 1, '1': 1, '2': 1, '10+': 1})
+        self.assertEqual(orders, {'1': 1, '2': 1, '10+': 1})
+        self.assertEqual(histogram['count'].sum(), len(self.items) + 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
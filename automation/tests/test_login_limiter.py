@@ -0,0 +1,88 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import login_limiter
+from login_limiter import EMAIL, IP, LoginRateLimiter
+
+
+class TestLoginRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.state_path = os.path.join(self.tmp.name, 'lockouts.json')
+        self.now = 1_000_000.0
+        patcher = mock.patch.object(login_limiter.time, 'time', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _limiter(self, **kwargs):
+        options = {'email_limit': 3, 'email_window': 60, 'email_lockout': 120,
+                   'ip_limit': 5, 'ip_window': 60, 'ip_lockout': 60, 'state_path': self.state_path}
+        return LoginRateLimiter(**{**options, **kwargs})
+
+    def test_email_is_locked_after_limit_and_unlocks_after_lockout(self):
+        limiter = self._limiter()
+        self.assertIsNone(limiter.record_failure('a@mia.vn'))
+        self.assertIsNone(limiter.record_failure('A@mia.vn '))
+        self.assertEqual(limiter.record_failure('a@mia.vn'), self.now + 120)
+
+        allowed, retry_after, scope = limiter.check('a@mia.vn')
+        self.assertEqual((allowed, retry_after, scope), (False, 120.0, EMAIL))
+        self.assertTrue(limiter.check('b@mia.vn')[0])
+
+        self.now += 121
+        self.assertEqual(limiter.check('a@mia.vn'), (True, 0.0, None))
+
+    def test_success_resets_email_counter(self):
+        limiter = self._limiter()
+        limiter.record_failure('a@mia.vn')
+        limiter.record_failure('a@mia.vn')
+        limiter.record_success('a@mia.vn')
+        self.assertIsNone(limiter.record_failure('a@mia.vn'))
+        self.assertTrue(limiter.check('a@mia.vn')[0])
+
+    def test_ip_lockout_covers_every_email(self):
+        limiter = self._limiter()
+        for i in range(5):
+            limiter.record_failure(f'user{i}@mia.vn', '10.0.0.1')
+        self.assertEqual(limiter.check('other@mia.vn', '10.0.0.1')[2], IP)
+        self.assertTrue(limiter.check('other@mia.vn', '10.0.0.2')[0])
+
+    def test_ip_is_used_as_given(self):
+        # IP do server xác định - không tách danh sách kiểu X-Forwarded-For
+        limiter = self._limiter(ip_limit=2)
+        limiter.record_failure('', '1.1.1.1, 10.0.0.1')
+        limiter.record_failure('', '2.2.2.2, 10.0.0.1')
+        self.assertTrue(limiter.check('', '10.0.0.1')[0])
+
+    def test_locks_are_capped(self):
+        limiter = self._limiter(email_limit=1, max_keys=3)
+        for i in range(5):
+            limiter.record_failure(f'user{i}@mia.vn')
+            self.now += 1
+        snapshot = limiter.snapshot()
+        self.assertEqual(snapshot['locked'], 3)
+        # Khóa cũ nhất bị bỏ trước
+        self.assertTrue(limiter.check('user0@mia.vn')[0])
+        self.assertFalse(limiter.check('user4@mia.vn')[0])
+
+    def test_lockouts_survive_restart(self):
+        limiter = self._limiter(email_limit=1)
+        limiter.record_failure('a@mia.vn')
+        limiter.save_state()
+
+        restored = self._limiter(email_limit=1)
+        self.assertFalse(restored.check('a@mia.vn')[0])
+        self.now += 121
+        self.assertTrue(self._limiter(email_limit=1).check('a@mia.vn')[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
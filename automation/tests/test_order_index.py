@@ -0,0 +1,88 @@
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from order_index import (STATUS_CHANGED, STATUS_NEW, STATUS_UNCHANGED, OrderIndex,
+                         changed_only)
+
+
+def _orders(**statuses):
+    return pd.DataFrame([
+        {'id': order_id, 'status': status, 'scraped_at': '2025-07-01 10:00:00'}
+        for order_id, status in statuses.items()
+    ])
+
+
+class TestOrderIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = OrderIndex(os.path.join(self.tmp.name, 'order_index.db'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_deduplicate_keeps_last_row_per_order(self):
+        df = pd.concat([_orders(A='chờ'), _orders(A='đã xuất', B='chờ')], ignore_index=True)
+        result = self.index.deduplicate(df)
+        self.assertEqual(sorted(result['order_key']), ['A', 'B'])
+        self.assertEqual(result.set_index('order_key').loc['A', 'status'], 'đã xuất')
+
+    def test_change_status_after_commit(self):
+        first = self.index.deduplicate(_orders(A='chờ', B='chờ'))
+        self.assertEqual(set(first['change_status']), {STATUS_NEW})
+        self.assertEqual(self.index.commit(first), 2)
+
+        # scraped_at thay đổi không làm đơn bị coi là thay đổi
+        second = _orders(A='chờ', B='đã xuất', C='chờ')
+        second['scraped_at'] = '2025-07-02 10:00:00'
+        statuses = self.index.deduplicate(second).set_index('order_key')['change_status']
+        self.assertEqual(statuses.to_dict(), {'A': STATUS_UNCHANGED, 'B': STATUS_CHANGED, 'C': STATUS_NEW})
+
+    def test_uncommitted_orders_stay_new(self):
+        self.index.deduplicate(_orders(A='chờ'))
+        again = self.index.deduplicate(_orders(A='chờ'))
+        self.assertEqual(list(again['change_status']), [STATUS_NEW])
+        self.assertEqual(self.index.count(), 0)
+
+    def test_changed_only(self):
+        self.index.commit(self.index.deduplicate(_orders(A='chờ')))
+        df = self.index.deduplicate(_orders(A='chờ', B='chờ'))
+        self.assertEqual(list(changed_only(df)['order_key']), ['B'])
+
+
+@unittest.skipUnless(importlib.util.find_spec('selenium'), 'automation.py cần selenium')
+class TestCommitAfterExport(unittest.TestCase):
+    def setUp(self):
+        from automation import OneAutomationSystem
+        self.commit = OneAutomationSystem.commit_order_index
+        self.system = SimpleNamespace(
+            order_index=mock.Mock(), logger=mock.Mock(), last_export_report={}
+        )
+        self.system.export_succeeded = lambda files: OneAutomationSystem.export_succeeded(self.system, files)
+
+    def test_failed_export_does_not_commit(self):
+        self.commit(self.system, _orders(A='chờ'), {})
+        self.system.order_index.commit.assert_not_called()
+
+    def test_required_task_error_does_not_commit(self):
+        self.system.last_export_report = {'required_ok': False}
+        self.commit(self.system, _orders(A='chờ'), {'excel': 'data/x.xlsx'})
+        self.system.order_index.commit.assert_not_called()
+
+    def test_successful_export_commits(self):
+        self.system.last_export_report = {'required_ok': True}
+        df = _orders(A='chờ')
+        self.commit(self.system, df, {'csv': 'data/x.csv'})
+        self.system.order_index.commit.assert_called_once_with(df)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from page_archive import INDEX_SUFFIX, PageArchive, list_archives
+
+
+def _page(*order_ids):
+    return [{'id': order_id, 'status': 'chờ'} for order_id in order_ids]
+
+
+class TestPageArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = os.path.join(self.tmp.name, 'june_2025_enhanced_20250701_100000')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_read_page_and_find_order(self):
+        archive = PageArchive(self.base, codec='gzip')
+        archive.append_page(1, _page('1', '2'))
+        archive.append_page(2, _page('10', '11'))
+
+        self.assertEqual([r['id'] for r in archive.read_page(2)], ['10', '11'])
+        self.assertEqual(archive.find_order(11)['id'], '11')
+        self.assertIsNone(archive.find_order('5'))
+        self.assertEqual(archive.summary()['records'], 4)
+
+    def test_reopen_from_index_and_archive_path(self):
+        archive = PageArchive(self.base, codec='gzip')
+        archive.append_page(1, _page('1'))
+        self.assertEqual(archive.index_path, archive.path + INDEX_SUFFIX)
+
+        for reopened in (PageArchive.open(archive.index_path), PageArchive.from_archive(archive.path)):
+            self.assertEqual([r['id'] for r in reopened.iter_records()], ['1'])
+        self.assertEqual([a.path for a in list_archives(self.tmp.name)], [archive.path])
+
+    def test_partial_write_after_index_is_truncated(self):
+        archive = PageArchive(self.base, codec='gzip')
+        archive.append_page(1, _page('1'))
+        with open(archive.path, 'ab') as f:
+            f.write(b'half-written block')
+
+        archive = PageArchive(self.base, codec='gzip')
+        archive.append_page(2, _page('2'))
+        self.assertEqual([r['id'] for r in archive.iter_records()], ['1', '2'])
+        self.assertEqual(os.path.getsize(archive.path), archive.index['end_offset'])
+
+    def test_missing_index_does_not_wipe_archive(self):
+        archive = PageArchive(self.base, codec='gzip')
+        archive.append_page(1, _page('1'))
+        size = os.path.getsize(archive.path)
+        os.remove(archive.index_path)
+
+        archive = PageArchive(self.base, codec='gzip')
+        entry = archive.append_page(2, _page('2'))
+        self.assertEqual(entry['offset'], size)
+        self.assertEqual(os.path.getsize(archive.path), size + entry['length'])
+
+    def test_legacy_index_is_migrated(self):
+        archive = PageArchive(self.base, codec='gzip')
+        archive.append_page(1, _page('1'))
+        os.replace(archive.index_path, self.base + INDEX_SUFFIX)
+
+        archive = PageArchive(self.base, codec='gzip')
+        self.assertEqual(len(archive.pages), 1)
+        archive.append_page(2, _page('2'))
+        self.assertFalse(os.path.exists(self.base + INDEX_SUFFIX))
+        self.assertEqual([r['id'] for r in PageArchive.open(archive.index_path).iter_records()], ['1', '2'])
+
+    def test_codec_mismatch_is_refused(self):
+        archive = PageArchive(self.base, codec='gzip')
+        archive.append_page(1, _page('1'))
+        with open(archive.index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        index['codec'] = 'zstd'
+        with open(archive.index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+
+        with self.assertRaises(ValueError):
+            PageArchive(self.base, codec='gzip')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import date
+
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from parquet_store import PARQUET_AVAILABLE, ParquetOrderStore
+
+
+def _orders(rows):
+    return pd.DataFrame([
+        {'order_key': key, 'created_datetime': created, 'platform': platform, 'status': status}
+        for key, created, platform, status in rows
+    ])
+
+
+@unittest.skipUnless(PARQUET_AVAILABLE, 'cần pyarrow')
+class TestParquetOrderStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ParquetOrderStore(self.tmp.name)
+        self.store.append(_orders([
+            ('A', '2025-07-01 08:00:00', 'Shopee', 'pending'),
+            ('B', '2025-07-01 09:00:00', 'Lazada', 'pending'),
+            ('C', '2025-07-02 10:00:00', 'Shopee', 'pending'),
+        ]), run_id='r1', ingested_at='2025-07-02T10:00:00')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_append_partitions_by_day_and_platform(self):
+        partitions = [os.path.relpath(path, self.store.base_dir) for path in self.store.partition_dirs()]
+        self.assertEqual(partitions, [
+            os.path.join('order_day=2025-07-01', 'platform=Lazada'),
+            os.path.join('order_day=2025-07-01', 'platform=Shopee'),
+            os.path.join('order_day=2025-07-02', 'platform=Shopee'),
+        ])
+
+    def test_read_prunes_partitions_and_columns(self):
+        df = self.store.read(columns=['order_key', 'status'], start=date(2025, 7, 1),
+                             end=date(2025, 7, 1), platforms=['shopee'])
+        self.assertEqual(list(df['order_key']), ['A'])
+        self.assertEqual(sorted(df.columns), ['order_day', 'order_key', 'platform', 'status'])
+
+    def test_latest_version_wins_and_compaction_keeps_it(self):
+        self.store.append(_orders([('A', '2025-07-01 08:00:00', 'Shopee', 'confirmed')]),
+                          run_id='r2', ingested_at='2025-07-03T10:00:00')
+        statuses = self.store.read().set_index('order_key')['status']
+        self.assertEqual(statuses['A'], 'confirmed')
+        self.assertEqual(len(self.store.read(latest_only=False)), 4)
+
+        stats = self.store.compact()
+        self.assertEqual(stats['partitions'], 1)
+        self.assertEqual(stats['files_removed'], 2)
+        self.assertEqual(len(self.store.read(latest_only=False)), 3)
+        self.assertEqual(self.store.read().set_index('order_key')['status']['A'], 'confirmed')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import password_hasher
+from password_hasher import HasherBusy, PasswordHasher, legacy_hash
+
+
+class TestPasswordHasher(unittest.TestCase):
+    def setUp(self):
+        self.hasher = PasswordHasher(algorithm='scrypt', scrypt_n=2 ** 4, workers=1, max_queue=1, timeout=5)
+
+    def tearDown(self):
+        self.hasher.shutdown()
+
+    def test_hash_and_verify(self):
+        password_hash = self.hasher.hash('secret')
+        self.assertTrue(password_hash.startswith('scrypt$16$8$1$'))
+        self.assertTrue(self.hasher.verify('secret', password_hash))
+        self.assertFalse(self.hasher.verify('wrong', password_hash))
+        self.assertNotEqual(self.hasher.hash('secret'), password_hash)
+
+    def test_legacy_hash_verifies_and_needs_rehash(self):
+        old = legacy_hash('secret')
+        self.assertTrue(self.hasher.verify('secret', old))
+        self.assertFalse(self.hasher.verify('wrong', old))
+        self.assertEqual(self.hasher.metrics()['legacy_verified'], 2)
+        self.assertTrue(self.hasher.needs_rehash(old))
+
+        rehashed = self.hasher.hash_async('secret').result(timeout=5)
+        self.assertFalse(self.hasher.needs_rehash(rehashed))
+        self.assertTrue(self.hasher.verify('secret', rehashed))
+
+    def test_changed_cost_needs_rehash(self):
+        password_hash = self.hasher.hash('secret')
+        stronger = PasswordHasher(algorithm='scrypt', scrypt_n=2 ** 5, workers=1)
+        try:
+            self.assertTrue(stronger.needs_rehash(password_hash))
+            self.assertTrue(stronger.verify('secret', password_hash))
+        finally:
+            stronger.shutdown()
+
+    def test_dummy_verify_runs_the_kdf(self):
+        self.assertFalse(self.hasher.verify_dummy('secret'))
+        self.assertFalse(self.hasher.verify_dummy('secret'))
+        metrics = self.hasher.metrics()
+        self.assertEqual((metrics['dummy_verified'], metrics['verified']), (2, 0))
+
+    def test_full_queue_and_timeout_raise_busy(self):
+        release = threading.Event()
+        original = password_hasher._timed_derive
+
+        def slow_derive(*args):
+            release.wait(5)
+            return original(*args)
+
+        hasher = PasswordHasher(algorithm='scrypt', scrypt_n=2 ** 4, workers=1, max_queue=0, timeout=0.05)
+        try:
+            with mock.patch.object(password_hasher, '_timed_derive', slow_derive):
+                with self.assertRaises(HasherBusy):
+                    hasher.hash('secret')  # quá timeout
+                with self.assertRaises(HasherBusy):
+                    hasher.hash('secret')  # slot còn bị việc trước giữ
+            metrics = hasher.metrics()
+            self.assertEqual((metrics['timeouts'], metrics['rejected_busy']), (1, 1))
+        finally:
+            release.set()
+            hasher.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from artifact_catalog import STATE_COMPRESSED, ArtifactCatalog
+from retention_manager import RetentionManager
+
+
+NOW = datetime(2025, 8, 15, 12, 0, 0)
+
+
+class TestRetentionManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_dir = self.tmp.name
+        self.catalog = ArtifactCatalog(os.path.join(self.data_dir, 'catalog.db'))
+        self.policy = {'logs_dir': None, 'data_quota_mb': None}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _export(self, run_id, kind, name):
+        path = os.path.join(self.data_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('order_id\n1\n' * 50)
+        self.catalog.register_run(run_id, {kind: path})
+        return os.path.normpath(path)
+
+    def _plan(self, manager):
+        return {action['path']: action['action'] for action in manager.plan_data(now=NOW)['actions']}
+
+    def test_sources_are_deleted_only_after_consolidation(self):
+        old = self._export('20250601_100000', 'csv', 'orders_export_20250601_100000.csv')
+        self._export('20250815_100000', 'csv', 'orders_export_20250815_100000.csv')
+        manager = RetentionManager(self.catalog, self.policy)
+        self.assertNotIn(old, self._plan(manager))
+
+        self.catalog.mark_consolidated([old])
+        self.assertEqual(self._plan(manager).get(old), 'delete')
+
+    def test_latest_file_of_a_kind_is_never_deleted(self):
+        only = self._export('20250601_100000', 'excel', 'orders_export_20250601_100000.xlsx')
+        manager = RetentionManager(self.catalog, self.policy)
+        self.assertNotIn(only, self._plan(manager))
+
+    def test_compress_tier_and_apply(self):
+        old = self._export('20250805_100000', 'dashboard_csv', 'orders_dashboard_20250805_100000.csv')
+        self._export('20250815_100000', 'dashboard_csv', 'orders_dashboard_20250815_100000.csv')
+        manager = RetentionManager(self.catalog, self.policy)
+        actions = manager.plan_data(now=NOW)['actions']
+        self.assertEqual([(a['path'], a['action']) for a in actions], [(old, 'compress')])
+
+        result = manager.apply(actions)
+        self.assertEqual(result['compressed'], [f'{old}.gz'])
+        self.assertFalse(os.path.exists(old))
+        compressed = self.catalog.files(['dashboard_csv'], states=(STATE_COMPRESSED,))
+        self.assertEqual([entry['path'] for entry in compressed], [f'{old}.gz'])
+
+    def test_dry_run_leaves_files_alone(self):
+        old = self._export('20250101_100000', 'excel', 'orders_export_20250101_100000.xlsx')
+        self._export('20250815_100000', 'excel', 'orders_export_20250815_100000.xlsx')
+        report = RetentionManager(self.catalog, self.policy).run(dry_run=True, include_logs=False)
+        self.assertIn(old, [action['path'] for action in report['planned']])
+        self.assertTrue(os.path.exists(old))
+
+    def test_quota_removes_oldest_eligible_files(self):
+        paths = [self._export(f'202508{day:02d}_100000', 'excel', f'orders_export_202508{day:02d}_100000.xlsx')
+                 for day in (10, 11, 12)]
+        policy = {**self.policy, 'data_quota_mb': 0}
+        plan = self._plan(RetentionManager(self.catalog, policy))
+        # File mới nhất (live) được giữ dù vượt quota
+        self.assertEqual(plan, {paths[0]: 'delete', paths[1]: 'delete'})
+
+
+if __name__ == '__main__':
+    unittest.main()
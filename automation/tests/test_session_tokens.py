@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from session_tokens import RevocationList, SessionTokenSigner, looks_like_token
+
+
+class TestSessionTokenSigner(unittest.TestCase):
+    def setUp(self):
+        self.signer = SessionTokenSigner({'k1': b'secret-1'}, ttl_seconds=60)
+
+    def test_issue_and_decode(self):
+        token = self.signer.issue({'sid': 'S1', 'uid': 'U1'})['token']
+        self.assertTrue(looks_like_token(token))
+        claims = self.signer.decode(token)
+        self.assertEqual((claims['sid'], claims['uid']), ('S1', 'U1'))
+
+    def test_tampered_and_expired_tokens_are_rejected(self):
+        token = self.signer.issue({'sid': 'S1'}, now=time.time() - 120)['token']
+        self.assertIsNone(self.signer.decode(token))
+        self.assertIsNotNone(self.signer.decode(token, verify_expiry=False))
+
+        kid, payload, signature = self.signer.issue({'sid': 'S1'})['token'].split('.')
+        self.assertIsNone(self.signer.decode(f'{kid}.{payload}x.{signature}'))
+        self.assertEqual(self.signer.stats['rejected'], 1)
+
+    def test_rotation_keeps_old_tokens_until_dropped(self):
+        old = self.signer.issue({'sid': 'S1'})['token']
+        self.signer.rotate('k2', b'secret-2')
+        self.assertTrue(self.signer.issue({'sid': 'S2'})['token'].startswith('k2.'))
+        self.assertIsNotNone(self.signer.decode(old))
+        self.signer.rotate('k3', b'secret-3', drop_kid='k1')
+        self.assertIsNone(self.signer.decode(old))
+
+    def test_processes_sharing_keys_accept_each_others_tokens(self):
+        env = {'AUTH_TOKEN_KEYS': 'k1:secret-1,k2:secret-2', 'AUTH_TOKEN_ACTIVE_KID': 'k1'}
+        with mock.patch.dict(os.environ, env):
+            first, second = SessionTokenSigner.from_env(), SessionTokenSigner.from_env()
+        self.assertIsNotNone(second.decode(first.issue({'sid': 'S1'})['token']))
+
+    def test_missing_keys_can_be_required(self):
+        with mock.patch.dict(os.environ, {'AUTH_TOKEN_KEYS': '', 'AUTH_TOKEN_KEYS_REQUIRED': '1'}):
+            with self.assertRaises(RuntimeError):
+                SessionTokenSigner.from_env()
+        with mock.patch.dict(os.environ, {'AUTH_TOKEN_KEYS': '', 'AUTH_TOKEN_KEYS_REQUIRED': ''}):
+            first, second = SessionTokenSigner.from_env(), SessionTokenSigner.from_env()
+        # Key tạm: process khác không xác minh được token
+        self.assertIsNone(second.decode(first.issue({'sid': 'S1'})['token']))
+
+
+class TestRevocationList(unittest.TestCase):
+    def test_local_revoke_and_sync(self):
+        now = time.time()
+        revocations = RevocationList(loader=lambda: {'S2': now + 60, 'OLD': now - 1})
+        revocations.revoke('S1', now + 60)
+        self.assertTrue(revocations.sync())
+        self.assertTrue(revocations.is_revoked('S1'))
+        self.assertTrue(revocations.is_revoked('S2'))
+        self.assertFalse(revocations.is_revoked('OLD'))
+
+    def test_sync_error_keeps_previous_list(self):
+        revocations = RevocationList(loader=mock.Mock(side_effect=RuntimeError('503')))
+        revocations.revoke('S1', time.time() + 60)
+        self.assertFalse(revocations.sync())
+        self.assertTrue(revocations.is_revoked('S1'))
+        self.assertEqual(revocations.stats['sync_errors'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
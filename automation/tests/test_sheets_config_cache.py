@@ -0,0 +1,57 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sheets_config_cache import (SOURCE_MEMORY, SOURCE_SHEETS, SOURCE_SNAPSHOT, SOURCE_STALE,
+                                 SheetsConfigCache, log_cache_info)
+
+
+class TestSheetsConfigCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.snapshot = os.path.join(self.tmp.name, 'config.json')
+        self.loader = mock.Mock(return_value={'config': {'automation': {'batch_size': 10}}, 'sla_rules': {}})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _cache(self, ttl=300):
+        return SheetsConfigCache('sheet-id', ttl_seconds=ttl, snapshot_path=self.snapshot)
+
+    def test_ttl_hit_does_not_call_loader(self):
+        cache = self._cache()
+        self.assertEqual(cache.get(self.loader)['source'], SOURCE_SHEETS)
+        self.assertEqual(cache.get(self.loader)['source'], SOURCE_MEMORY)
+        self.assertEqual(self.loader.call_count, 1)
+
+    def test_new_process_starts_from_snapshot(self):
+        self._cache().get(self.loader)
+        result = self._cache().get(self.loader)
+        self.assertEqual(result['source'], SOURCE_SNAPSHOT)
+        self.assertEqual(result['config'], {'automation': {'batch_size': 10}})
+        self.assertEqual(self.loader.call_count, 1)
+
+    def test_expired_entry_is_reread_and_stale_used_on_error(self):
+        cache = self._cache(ttl=0)
+        cache.get(self.loader)
+        self.assertEqual(cache.get(self.loader)['source'], SOURCE_SHEETS)
+
+        self.loader.side_effect = RuntimeError('503')
+        result = cache.get(self.loader)
+        self.assertEqual(result['source'], SOURCE_STALE)
+        self.assertEqual(result['config'], {'automation': {'batch_size': 10}})
+
+    def test_log_cache_info(self):
+        logger = mock.Mock()
+        log_cache_info(logger, {'config_cache': {'source': SOURCE_MEMORY, 'fetched_at': '2025-07-01T10:00:00'}})
+        log_cache_info(logger, {})
+        logger.info.assert_called_once()
+        self.assertIn(SOURCE_MEMORY, logger.info.call_args[0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+HAS_GSPREAD = importlib.util.find_spec('gspread') is not None
+
+
+class DirectScheduler:
+    """Gọi thẳng API (không rate limit/retry) cho test"""
+
+    def read(self, func, *args, priority=None, **kwargs):
+        return func(*args, **kwargs)
+
+    def write(self, func, *args, priority=None, idempotent=True, **kwargs):
+        return func(*args, **kwargs)
+
+
+def _records(count):
+    return [{'id': str(i), 'status': 'chờ', 'scraped_at': '2025-07-01 10:00:00'} for i in range(count)]
+
+
+@unittest.skipUnless(HAS_GSPREAD, 'fake_sheets cần gspread')
+class TestSheetsExporterResume(unittest.TestCase):
+    def setUp(self):
+        from fake_sheets import FakeSheetsBackend, install
+        from sheets_client import get_worksheet_cache, open_spreadsheet
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = FakeSheetsBackend()
+        credentials_path = install(self.backend, credentials_path='fake://exporter-test')
+        _, self.spreadsheet = open_spreadsheet(credentials_path, 'exporter-test')
+        self.worksheets = get_worksheet_cache(self.spreadsheet)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _exporter(self):
+        from sheets_exporter import SheetsExporter
+        return SheetsExporter(self.spreadsheet, self.worksheets, chunk_rows=2, max_workers=1,
+                              checkpoint_dir=self.tmp.name, scheduler=DirectScheduler())
+
+    def _interrupt_after(self, records, sheet_name, chunks):
+        update = self.spreadsheet.values_update
+        calls = {'n': 0}
+
+        def failing_update(*args, **kwargs):
+            calls['n'] += 1
+            if calls['n'] > chunks + 1:  # header + các khối đầu rồi mất kết nối
+                raise ValueError('connection reset')
+            return update(*args, **kwargs)
+
+        self.spreadsheet.values_update = failing_update
+        try:
+            with self.assertRaises(ValueError):
+                self._exporter().export(records, sheet_name)
+        finally:
+            self.spreadsheet.values_update = update
+
+    def test_interrupted_export_resumes_from_checkpoint(self):
+        records = _records(7)
+        self._interrupt_after(records, 'Automation_Data_20250701', chunks=2)
+
+        stats = self._exporter().export(records, 'Automation_Data_20250701')
+        self.assertEqual((stats['resumed_chunks'], stats['uploaded_chunks']), (2, 2))
+        values = self.spreadsheet.worksheet('Automation_Data_20250701').get_all_values()
+        self.assertEqual([row[0] for row in values], ['id'] + [str(i) for i in range(7)])
+
+    def test_changed_chunks_are_uploaded_again(self):
+        records = _records(7)
+        self._interrupt_after(records, 'Automation_Data_20250701', chunks=2)
+
+        records[0]['status'] = 'đã xuất'
+        stats = self._exporter().export(records, 'Automation_Data_20250701')
+        self.assertEqual((stats['resumed_chunks'], stats['uploaded_chunks']), (1, 3))
+
+
+@unittest.skipUnless(HAS_GSPREAD, 'google_sheets_config cần gspread')
+class TestDefaultExportSheetName(unittest.TestCase):
+    def test_name_follows_data_date(self):
+        from google_sheets_config import default_export_sheet_name
+        records = _records(2) + [{'id': '9', 'created_datetime': '2025-07-03 08:00:00'}]
+        self.assertEqual(default_export_sheet_name(records), 'Automation_Data_20250703')
+        # Chạy lại với cùng dữ liệu → cùng tên (checkpoint dùng lại được)
+        self.assertEqual(default_export_sheet_name(list(reversed(records))), 'Automation_Data_20250703')
+
+
+if __name__ == '__main__':
+    unittest.main()
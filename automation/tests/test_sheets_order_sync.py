@@ -0,0 +1,84 @@
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+class DirectScheduler:
+    """Gọi thẳng API (không rate limit/retry) cho test"""
+
+    def read(self, func, *args, priority=None, **kwargs):
+        return func(*args, **kwargs)
+
+    def write(self, func, *args, priority=None, idempotent=True, **kwargs):
+        return func(*args, **kwargs)
+
+
+def _orders(**statuses):
+    return [{'id': order_id, 'status': status, 'scraped_at': '2025-07-01 10:00:00'}
+            for order_id, status in statuses.items()]
+
+
+@unittest.skipUnless(importlib.util.find_spec('gspread'), 'fake_sheets cần gspread')
+class TestOrderSheetSync(unittest.TestCase):
+    def setUp(self):
+        from fake_sheets import FakeSheetsBackend, install
+        from sheets_client import get_worksheet_cache, open_spreadsheet
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = FakeSheetsBackend()
+        credentials_path = install(self.backend, credentials_path='fake://order-sync-test')
+        _, self.spreadsheet = open_spreadsheet(credentials_path, 'order-sync-test')
+        self.worksheets = get_worksheet_cache(self.spreadsheet)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _sync(self, records, **kwargs):
+        from sheets_order_sync import OrderSheetSync
+        syncer = OrderSheetSync(self.spreadsheet, self.worksheets, state_dir=self.tmp.name,
+                                scheduler=DirectScheduler())
+        return syncer, syncer.sync(records, **kwargs)
+
+    def _sheet(self):
+        return self.spreadsheet.worksheet('Orders_Sync').get_all_values()
+
+    def test_only_changed_rows_are_sent(self):
+        self._sync(_orders(A='chờ', B='chờ'))
+        self.backend.reset_stats()
+
+        _, stats = self._sync(_orders(A='chờ', B='đã xuất', C='chờ'))
+        self.assertEqual((stats['new'], stats['changed'], stats['unchanged']), (1, 1, 1))
+        self.assertEqual(stats['requests'], 1)
+        self.assertEqual(self.backend.stats()['calls'].get('values_batch_update'), 1)
+        self.assertEqual([row[:2] for row in self._sheet()],
+                         [['order_key', 'id'], ['A', 'A'], ['B', 'B'], ['C', 'C']])
+
+    def test_unchanged_run_sends_nothing(self):
+        self._sync(_orders(A='chờ'))
+        self.backend.reset_stats()
+        _, stats = self._sync(_orders(A='chờ'))
+        self.assertEqual(stats['requests'], 0)
+        self.assertEqual(self.backend.stats()['write'], 0)
+
+    def test_removed_rows_are_reused(self):
+        self._sync(_orders(A='chờ', B='chờ'))
+        _, stats = self._sync(_orders(A='chờ', C='chờ'), remove_missing=True)
+        self.assertEqual((stats['new'], stats['removed']), (1, 1))
+        self.assertEqual([row[0] for row in self._sheet()], ['order_key', 'A', 'C'])
+
+    def test_lost_index_is_rebuilt_from_sheet(self):
+        syncer, _ = self._sync(_orders(A='chờ', B='chờ'))
+        syncer.reset()
+
+        _, stats = self._sync(_orders(A='chờ', B='đã xuất'))
+        self.assertTrue(stats['rebuilt'])
+        self.assertEqual((stats['changed'], stats['unchanged'], stats['new']), (1, 1, 0))
+        self.assertEqual(len(self._sheet()), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
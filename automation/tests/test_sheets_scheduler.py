@@ -0,0 +1,82 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sheets_scheduler import PRIORITY_AUTH, PRIORITY_LOGGING, SheetsRequestScheduler
+
+
+class HttpError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f'HTTP {status_code}')
+        self.response = mock.Mock(status_code=status_code)
+
+
+def _failing(name, *statuses):
+    """Method giả tên `name`, lần lượt raise các status rồi trả 'ok'"""
+    errors = [HttpError(status) for status in statuses]
+
+    def func(*args, **kwargs):
+        func.calls += 1
+        if errors:
+            raise errors.pop(0)
+        return 'ok'
+
+    func.__name__ = name
+    func.calls = 0
+    return func
+
+
+class TestSheetsRequestScheduler(unittest.TestCase):
+    def setUp(self):
+        quotas = {kind: {'project': 6000, 'user': 6000} for kind in ('read', 'write')}
+        self.scheduler = SheetsRequestScheduler(quotas=quotas, max_retries=3, base_backoff=0, max_backoff=0)
+
+    def test_idempotent_write_is_retried_on_5xx(self):
+        func = _failing('values_update', 503, 500)
+        self.assertEqual(self.scheduler.write(func), 'ok')
+        self.assertEqual(func.calls, 3)
+        self.assertEqual(self.scheduler.metrics()['server_errors'], 2)
+
+    def test_append_is_not_retried_on_5xx(self):
+        func = _failing('values_append', 503)
+        with self.assertRaises(HttpError):
+            self.scheduler.write(func, idempotent=False)
+        self.assertEqual(func.calls, 1)
+
+    def test_append_is_retried_on_429(self):
+        func = _failing('values_append', 429)
+        self.assertEqual(self.scheduler.write(func, idempotent=False), 'ok')
+        self.assertEqual(func.calls, 2)
+
+    def test_wrapped_append_uses_the_explicit_flag(self):
+        # Bọc trong lambda/partial: không đoán được theo tên, caller phải truyền idempotent
+        func = _failing('values_append', 502)
+        with self.assertRaises(HttpError):
+            self.scheduler.write(lambda: func(), idempotent=False)
+        self.assertEqual(func.calls, 1)
+
+    def test_idempotent_is_the_default(self):
+        func = _failing('values_update', 502)
+        self.assertEqual(self.scheduler.write(func), 'ok')
+        func = _failing('values_update', 502)
+        with self.assertRaises(HttpError):
+            self.scheduler.write(func, idempotent=False)
+
+    def test_client_errors_are_raised(self):
+        func = _failing('values_update', 400)
+        with self.assertRaises(HttpError):
+            self.scheduler.write(func)
+        self.assertEqual(func.calls, 1)
+
+    def test_higher_priority_waits_are_tracked(self):
+        self.scheduler.acquire('write', PRIORITY_AUTH)
+        self.scheduler.acquire('write', PRIORITY_LOGGING)
+        wait = self.scheduler.metrics()['wait']
+        self.assertEqual((wait['auth']['count'], wait['logging']['count']), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
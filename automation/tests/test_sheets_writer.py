@@ -0,0 +1,95 @@
+import importlib.util
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sheets_writer import BufferedSheetsWriter
+
+
+class DirectScheduler:
+    """Gọi thẳng API (không rate limit) cho test"""
+
+    def write(self, func, *args, priority=None, idempotent=True, **kwargs):
+        return func(*args, **kwargs)
+
+
+class TestBufferedSheetsWriter(unittest.TestCase):
+    def setUp(self):
+        self.spreadsheet = mock.Mock()
+        self.writer = BufferedSheetsWriter(self.spreadsheet, max_pending=100, max_queued_rows=100,
+                                           scheduler=DirectScheduler())
+
+    def test_coalesces_updates_and_appends(self):
+        self.writer.set_range('Status', 'A1:B2', [['old']])
+        self.writer.set_range('Status', 'A1:B2', [['new']])
+        self.writer.append_rows('Logs', [[1]])
+        self.writer.append_rows('Logs', [[2]])
+
+        stats = self.writer.flush()
+        self.assertTrue(stats['ok'])
+        self.assertEqual(stats['api_calls'], 2)
+        body = self.spreadsheet.values_batch_update.call_args[0][0]
+        self.assertEqual([item['values'] for item in body['data']], [[['new']]])
+        self.assertEqual(self.spreadsheet.values_append.call_args[1]['body'], {'values': [[1], [2]]})
+
+    def test_append_is_sent_as_non_idempotent(self):
+        scheduler = mock.Mock()
+        writer = BufferedSheetsWriter(self.spreadsheet, scheduler=scheduler)
+        writer.append_rows('Logs', [[1]])
+        writer.flush()
+        func, kwargs = scheduler.write.call_args[0][0], scheduler.write.call_args[1]
+        self.assertIs(func, self.spreadsheet.values_append)
+        self.assertFalse(kwargs['idempotent'])
+
+    def test_failed_flush_reports_and_requeues(self):
+        self.spreadsheet.values_append.side_effect = RuntimeError('503')
+        self.writer.append_rows('Logs', [[1]])
+
+        self.assertFalse(self.writer.flush()['ok'])
+        self.assertEqual(self.writer.pending(), 1)
+
+        self.spreadsheet.values_append.side_effect = None
+        self.assertTrue(self.writer.flush()['ok'])
+        self.assertEqual(self.writer.pending(), 0)
+
+    def test_queue_is_bounded_during_outage(self):
+        self.spreadsheet.values_append.side_effect = RuntimeError('503')
+        for i in range(250):
+            self.writer.append_rows('Logs', [[i]])
+
+        self.assertLessEqual(self.writer.pending(), 100)
+        self.assertEqual(self.writer.stats['dropped_rows'], 250 - self.writer.pending())
+
+        # Các dòng mới nhất được giữ lại
+        self.spreadsheet.values_append.side_effect = None
+        self.writer.flush()
+        sent = self.spreadsheet.values_append.call_args[1]['body']['values']
+        self.assertEqual(sent[-1], [249])
+
+
+@unittest.skipUnless(importlib.util.find_spec('gspread'), 'google_sheets_config cần gspread')
+class TestLogAutomationRun(unittest.TestCase):
+    def setUp(self):
+        from google_sheets_config import GoogleSheetsConfigService
+        self.spreadsheet = mock.Mock()
+        self.service = GoogleSheetsConfigService.__new__(GoogleSheetsConfigService)
+        self.service.logger = mock.Mock()
+        self.service.logs_sheet = 'Automation_Logs'
+        self.service._ensure_sheet = mock.Mock(return_value=True)
+        self.service.get_writer = lambda: self.writer
+        self.writer = BufferedSheetsWriter(self.spreadsheet, scheduler=DirectScheduler())
+
+    def test_flush_failure_is_reported(self):
+        self.spreadsheet.values_append.side_effect = RuntimeError('503')
+        self.assertFalse(self.service.log_automation_run({'success': True}, flush=True))
+        self.assertEqual(self.writer.pending(), 1)
+
+    def test_flush_success(self):
+        self.assertTrue(self.service.log_automation_run({'success': True}, flush=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
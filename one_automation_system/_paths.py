@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Đường dẫn tới module dùng chung ở thư mục automation/ của repo
+(parquet_store, artifact_catalog, retention_manager...)
+
+Đặt AUTOMATION_MODULES_PATH để trỏ tới bản cài ở nơi khác.
+"""
+
+import os
+import sys
+
+AUTOMATION_MODULES_PATH = os.getenv('AUTOMATION_MODULES_PATH') or os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'automation')
+)
+
+
+def ensure_automation_path() -> str:
+    """Thêm AUTOMATION_MODULES_PATH vào cuối sys.path (nếu tồn tại), trả về đường dẫn"""
+    if os.path.isdir(AUTOMATION_MODULES_PATH) and AUTOMATION_MODULES_PATH not in sys.path:
+        sys.path.append(AUTOMATION_MODULES_PATH)
+    return AUTOMATION_MODULES_PATH
@@ -3,11 +3,34 @@ from flask import Flask, jsonify, send_from_directory, request
 from flask_cors import CORS
 import pandas as pd
 import json
+import logging
 import os
+import sys
 from datetime import datetime
 import subprocess
 import threading
 
+# Module dùng chung (parquet_store, artifact_catalog...) nằm ở thư mục automation/ của repo
+# (_paths.py ở thư mục one_automation_system/, thêm vào cuối sys.path để không che module khác)
+_SYSTEM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _SYSTEM_DIR not in sys.path:
+    sys.path.append(_SYSTEM_DIR)
+from _paths import ensure_automation_path
+
+AUTOMATION_MODULES_PATH = ensure_automation_path()
+
+try:
+    from parquet_store import PARQUET_AVAILABLE, ParquetOrderStore
+except ImportError as e:
+    PARQUET_AVAILABLE = False
+    logging.warning(f"⚠️ Không import được parquet_store ({e}) - /api/orders bỏ qua bộ lọc days/platform/columns")
+
+try:
+    from artifact_catalog import ArtifactCatalog
+except ImportError as e:
+    ArtifactCatalog = None
+    logging.warning(f"⚠️ Không import được artifact_catalog ({e}) - /api/runs và file mới nhất dùng quét thư mục")
+
 app = Flask(__name__)
 CORS(app)
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
@@ -23,7 +46,7 @@ def root():
         return jsonify({
             'success': True,
             'message': 'API server is running',
-            'endpoints': ['/api/orders', '/api/products', '/api/sla']
+            'endpoints': ['/api/orders', '/api/runs', '/api/products', '/api/products/top', '/api/products/histogram', '/api/sla']
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -48,19 +71,69 @@ def serve_enterprise_dashboard():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _latest_orders_file():
+    """File orders CSV mới nhất theo catalog (data/catalog.db)"""
+    catalog_path = 'data/catalog.db'
+    if ArtifactCatalog is not None and os.path.exists(catalog_path):
+        latest_file = ArtifactCatalog(catalog_path).latest_file(['dashboard_csv', 'csv'])
+        if latest_file and os.path.exists(latest_file):
+            return latest_file
+
+    csv_files = []
+    if os.path.exists('data'):
+        for file in os.listdir('data'):
+            if file.startswith('orders_') and file.endswith('.csv'):
+                csv_files.append(f'data/{file}')
+    return max(csv_files, key=os.path.getmtime) if csv_files else None
+
+@app.route('/api/runs')
+def get_runs():
+    """Danh sách các lần chạy gần nhất và file đã xuất (từ catalog)"""
+    try:
+        if ArtifactCatalog is None or not os.path.exists('data/catalog.db'):
+            return jsonify({'success': False, 'error': 'Catalog not found'})
+
+        catalog = ArtifactCatalog('data/catalog.db')
+        runs = catalog.runs(limit=request.args.get('limit', default=20, type=int))
+        return jsonify({
+            'success': True,
+            'data': runs,
+            'count': len(runs),
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
 @app.route('/api/orders')
 def get_orders():
-    """API endpoint cho orders data"""
+    """API endpoint cho orders data
+
+    Query: ?days=7&platform=shopee&columns=id,col_7 → đọc kho Parquet phân vùng
+    (chỉ các ngày/sàn/cột được yêu cầu), không có thì đọc CSV mới nhất.
+    """
     try:
-        # Tìm file CSV mới nhất
-        csv_files = []
-        if os.path.exists('data'):
-            for file in os.listdir('data'):
-                if file.startswith('orders_') and file.endswith('.csv'):
-                    csv_files.append(f'data/{file}')
+        parquet_root = 'data/parquet'
+        wants_filter = any(arg in request.args for arg in ('days', 'platform', 'columns'))
+        if wants_filter and PARQUET_AVAILABLE and os.path.isdir(os.path.join(parquet_root, 'orders')):
+            store = ParquetOrderStore(parquet_root)
+            columns = request.args.get('columns')
+            platform = request.args.get('platform')
+            df = store.read_recent(
+                days=request.args.get('days', default=7, type=int),
+                columns=[c.strip() for c in columns.split(',') if c.strip()] if columns else None,
+                platforms=[platform] if platform else None
+            )
+            return jsonify({
+                'success': True,
+                'data': json.loads(df.to_json(orient='records', force_ascii=False, date_format='iso')),
+                'count': len(df),
+                'source': store.base_dir,
+                'timestamp': datetime.now().isoformat()
+            })
 
-        if csv_files:
-            latest_file = max(csv_files, key=os.path.getmtime)
+        # Tìm file CSV mới nhất: ưu tiên catalog, fallback quét thư mục
+        latest_file = _latest_orders_file()
+        if latest_file:
             df = pd.read_csv(latest_file)
             return jsonify({
                 'success': True,
@@ -181,9 +254,11 @@ def run_action():
 def get_products():
     """API endpoint cho products data"""
     try:
-        # Tương tự cho products
+        # Ưu tiên bảng dòng hàng mới nhất do pipeline xuất
         csv_files = []
-        if os.path.exists('data'):
+        if os.path.exists('data/products_latest.csv'):
+            csv_files.append('data/products_latest.csv')
+        elif os.path.exists('data'):
             for file in os.listdir('data'):
                 if file.startswith('products_') and file.endswith('.csv'):
                     csv_files.append(f'data/{file}')
@@ -203,6 +278,68 @@ def get_products():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+def _read_sku_aggregate(name: str):
+    """Đọc bảng tổng hợp SKU đã tính sẵn (data/{name}_latest.csv)"""
+    latest_file = f'data/{name}_latest.csv'
+    if not os.path.exists(latest_file):
+        return None, latest_file
+    return pd.read_csv(latest_file, dtype={'platform': str, 'bucket': str}), latest_file
+
+@app.route('/api/products/top')
+def get_top_products():
+    """Top SKU theo ngày/sàn đã tính sẵn bởi pipeline"""
+    try:
+        df, source = _read_sku_aggregate('sku_top_daily')
+        if df is None:
+            return jsonify({'success': False, 'error': 'No SKU aggregates found'})
+
+        day = request.args.get('date')
+        platform = request.args.get('platform')
+        limit = request.args.get('limit', type=int)
+
+        if day:
+            df = df[df['order_day'] == day]
+        if platform:
+            df = df[df['platform'].str.lower() == platform.lower()]
+        if limit:
+            df = df[df['rank'] <= limit]
+
+        return jsonify({
+            'success': True,
+            'data': df.to_dict('records'),
+            'count': len(df),
+            'source': source
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/products/histogram')
+def get_product_histogram():
+    """Histogram số lượng theo dòng hàng/đơn hàng đã tính sẵn bởi pipeline"""
+    try:
+        df, source = _read_sku_aggregate('sku_quantity_histogram')
+        if df is None:
+            return jsonify({'success': False, 'error': 'No SKU aggregates found'})
+
+        scope = request.args.get('scope')
+        platform = request.args.get('platform')
+
+        if scope:
+            df = df[df['scope'] == scope]
+        if platform:
+            df = df[df['platform'].str.lower() == platform.lower()]
+
+        return jsonify({
+            'success': True,
+            'data': df.to_dict('records'),
+            'count': len(df),
+            'source': source
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
 @app.route('/api/sla')
 def get_sla():
     """API endpoint cho SLA data"""
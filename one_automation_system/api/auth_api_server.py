@@ -7,9 +7,11 @@ Flask API server để xử lý xác thực từ React frontend
 
 import json
 import logging
+import os
 from datetime import datetime
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from auth_service import AuthenticationService
 
 # Setup logging
@@ -22,6 +24,13 @@ logging.basicConfig(
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
 
+# Số reverse proxy tin cậy đứng trước server (nginx, load balancer...).
+# 0 = nhận request trực tiếp: IP client là REMOTE_ADDR, bỏ qua X-Forwarded-For do client tự gửi
+TRUSTED_PROXIES = int(os.getenv('AUTH_TRUSTED_PROXIES', '0'))
+if TRUSTED_PROXIES > 0:
+    # Chỉ lấy IP do proxy của mình thêm vào (đếm từ phải sang), không tin phần client giả mạo
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
+
 # Initialize authentication service
 auth_service = AuthenticationService()
 
@@ -58,7 +67,7 @@ def login():
             }), 400
 
         # Get client info
-        ip_address = request.environ.get('HTTP_X_FORWARDED_FOR', request.environ.get('REMOTE_ADDR', ''))
+        ip_address = request.remote_addr or ''
         user_agent = request.environ.get('HTTP_USER_AGENT', '')
 
         # Authenticate user
@@ -88,6 +97,25 @@ def login():
 
             return response
 
+        elif result.get('busy'):
+            # Worker pool hash mật khẩu đầy - client thử lại sau
+            response = jsonify({
+                'success': False,
+                'error': result['error']
+            })
+            response.headers['Retry-After'] = '1'
+            return response, 503
+
+        elif result.get('retry_after'):
+            # Đang bị khóa tạm do đăng nhập sai nhiều lần
+            response = jsonify({
+                'success': False,
+                'error': result['error'],
+                'retryAfter': result['retry_after']
+            })
+            response.headers['Retry-After'] = str(int(result['retry_after']) + 1)
+            return response, 429
+
         else:
             return jsonify({
                 'success': False,
@@ -228,6 +256,13 @@ def auth_status():
             'success': True,
             'status': {
                 'sheets_connected': sheets_connected,
+                'session_tokens': {
+                    'active_kid': auth_service.tokens.active_kid,
+                    'revoked_sessions': len(auth_service.revocations),
+                    'last_revocation_sync': auth_service.revocations.last_sync
+                },
+                'login_limiter': auth_service.limiter.snapshot(),
+                'password_hasher': auth_service.hasher.metrics(),
                 'service': 'Authentication API',
                 'timestamp': datetime.now().isoformat()
             }
@@ -8,11 +8,27 @@ Xử lý xác thực người dùng qua Google Sheets
 import json
 import os
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, Tuple
-import hashlib
+import time
+from datetime import datetime
+from itertools import zip_longest
+from typing import Dict, Any, List, Optional, Tuple
 import secrets
+from audit_log import LoginAuditLog
+from auth_store import AuthStore
 from google_sheets_config import GoogleSheetsConfigService
+from login_limiter import LoginRateLimiter
+from password_hasher import HasherBusy, PasswordHasher
+from session_tokens import RevocationList, SessionTokenSigner, looks_like_token
+from sheets_client import column_letter
+from sheets_scheduler import PRIORITY_AUTH
+from sheets_writer import a1_range
+
+
+def _to_int(value: Any, default: int = 0) -> int:
+    try:
+        return int(str(value).strip() or default)
+    except (TypeError, ValueError):
+        return default
 
 
 class AuthenticationService:
@@ -28,13 +44,46 @@ class AuthenticationService:
         """
         self.logger = logging.getLogger('AuthService')
         self.sheets_service = GoogleSheetsConfigService(spreadsheet_id, credentials_path)
+        # Worksheet handle + header cache dùng chung với các service khác trong process
+        self.sheets = self.sheets_service.sheets
+        # Request auth được ưu tiên hơn log/export trong scheduler chung
+        self.scheduler = self.sheets_service.scheduler
         self.users_sheet = 'Users'
         self.sessions_sheet = 'User_Sessions'
         self.login_logs_sheet = 'Login_Logs'
 
+        # Hash mật khẩu (scrypt/PBKDF2) chạy trong worker pool có giới hạn hàng đợi
+        self.hasher = PasswordHasher(logger=self.logger)
+
         # Initialize worksheets if not exist
         self._init_auth_worksheets()
 
+        # User/session tra trong bộ nhớ, Sheets chỉ là nơi lưu bền (ghi theo lô)
+        self.store = None
+        if self.sheets_service.client:
+            self.store = AuthStore(
+                self.sheets_service.spreadsheet, self.scheduler,
+                users_sheet=self.users_sheet, sessions_sheet=self.sessions_sheet,
+                worksheets=self.sheets, logger=self.logger
+            )
+
+        # Log đăng nhập: buffer SQLite + gửi Sheets theo lô (không nằm trên luồng request)
+        self.audit = LoginAuditLog(
+            self.sheets_service.spreadsheet, self.scheduler,
+            sheet_name=self.login_logs_sheet, logger=self.logger
+        )
+        if self.sheets_service.spreadsheet is not None:
+            self.audit.start()
+
+        # Đếm đăng nhập sai theo email/IP trong bộ nhớ: request bị chặn không chạm Sheets
+        self.limiter = LoginRateLimiter(logger=self.logger).start()
+
+        # Session token ký HMAC: verify chỉ tốn CPU, logout qua danh sách thu hồi
+        self.tokens = SessionTokenSigner.from_env(logger=self.logger)
+        self.revocations = RevocationList(self._load_revoked_sessions, logger=self.logger)
+        if self.store:
+            self.revocations.start()
+
     def _init_auth_worksheets(self):
         """Khởi tạo các worksheet cần thiết cho authentication"""
         try:
@@ -75,27 +124,42 @@ class AuthenticationService:
 
     def _ensure_worksheet_exists(self, worksheet_name: str, default_data: list):
         """Đảm bảo worksheet tồn tại và có dữ liệu mặc định"""
-        try:
-            worksheet = self.sheets_service.spreadsheet.worksheet(worksheet_name)
+        # Lần kiểm tra đầu lấy metadata cả spreadsheet, các sheet sau dùng cache
+        worksheet, created = self.sheets.get_or_create(worksheet_name, rows=100, cols=15)
+        if not created:
             self.logger.info(f"✅ Worksheet '{worksheet_name}' already exists")
-        except:
-            # Create new worksheet
-            worksheet = self.sheets_service.spreadsheet.add_worksheet(
-                title=worksheet_name, rows=100, cols=15
-            )
-            # Add default data
-            if default_data:
-                worksheet.update('A1', default_data)
-            self.logger.info(f"✅ Created worksheet '{worksheet_name}' with default data")
+            return
+
+        # Add default data
+        if default_data:
+            self.scheduler.write(worksheet.update, 'A1', default_data, priority=PRIORITY_AUTH)
+            self.sheets.remember_headers(worksheet_name, default_data[0])
+        self.logger.info(f"✅ Created worksheet '{worksheet_name}' with default data")
 
     def _hash_password(self, password: str) -> str:
-        """Hash password using SHA-256 with salt"""
-        salt = "mia_vn_salt_2024"  # In production, use random salt per user
-        return hashlib.sha256((password + salt).encode()).hexdigest()
+        """Hash password bằng KDF với salt riêng (qua worker pool)"""
+        return self.hasher.hash(password)
 
     def _verify_password(self, password: str, password_hash: str) -> bool:
-        """Verify password against hash"""
-        return self._hash_password(password) == password_hash
+        """Verify password against hash (hỗ trợ cả hash SHA-256 cũ)"""
+        return self.hasher.verify(password, password_hash)
+
+    def _rehash_password(self, user_id: str, password: str):
+        """Hash lại mật khẩu theo cấu hình hiện tại ở nền (không làm chậm đăng nhập)"""
+        try:
+            future = self.hasher.hash_async(password)
+        except HasherBusy:
+            # Pool đang bận - để lần đăng nhập sau
+            return
+
+        def _save(done):
+            try:
+                if self.store and self.store.update_user(user_id, {'Password Hash': done.result()}):
+                    self.logger.info(f"🔐 Upgraded password hash for {user_id}")
+            except Exception as e:
+                self.logger.error(f"❌ Error rehashing password: {e}")
+
+        future.add_done_callback(_save)
 
     def _generate_session_id(self) -> str:
         """Generate secure session ID"""
@@ -115,12 +179,30 @@ class AuthenticationService:
             Tuple[bool, Dict]: (success, user_data/error_info)
         """
         try:
+            # Email/IP đang bị khóa tạm: trả lời ngay, không tra user
+            allowed, retry_after, scope = self.limiter.check(email, ip_address)
+            if not allowed:
+                self._log_login_attempt(email, ip_address, user_agent, 'FAILED', f'Rate limited ({scope})')
+                minutes = max(1, int(retry_after // 60) + (retry_after % 60 > 0))
+                return False, {
+                    'error': f'Quá nhiều lần đăng nhập thất bại. Vui lòng thử lại sau {minutes} phút',
+                    'retry_after': retry_after
+                }
+
             # Log login attempt
             self._log_login_attempt(email, ip_address, user_agent)
 
             # Get user data
             user_data = self._get_user_by_email(email)
             if not user_data:
+                # Vẫn chạy KDF như email có thật: thời gian trả lời không lộ email nào tồn tại
+                try:
+                    self.hasher.verify_dummy(password)
+                except HasherBusy:
+                    self._log_login_attempt(email, ip_address, user_agent, 'FAILED', 'Hasher busy')
+                    return False, {'error': 'Hệ thống đang bận, vui lòng thử lại sau giây lát', 'busy': True}
+                # Email không tồn tại vẫn tính vào bộ đếm (chống dò email/mật khẩu hàng loạt)
+                self.limiter.record_failure(email, ip_address)
                 self._log_login_attempt(email, ip_address, user_agent, 'FAILED', 'User not found')
                 return False, {'error': 'Thông tin đăng nhập không chính xác'}
 
@@ -134,17 +216,29 @@ class AuthenticationService:
                 self._log_login_attempt(email, ip_address, user_agent, 'FAILED', 'Account inactive')
                 return False, {'error': 'Tài khoản không hoạt động'}
 
-            # Verify password
-            if not self._verify_password(password, user_data.get('password_hash', '')):
+            # Verify password (KDF trong worker pool; pool đầy thì báo bận thay vì xếp hàng)
+            password_hash = user_data.get('password_hash', '')
+            try:
+                password_ok = self._verify_password(password, password_hash)
+            except HasherBusy:
+                self._log_login_attempt(email, ip_address, user_agent, 'FAILED', 'Hasher busy')
+                return False, {'error': 'Hệ thống đang bận, vui lòng thử lại sau giây lát', 'busy': True}
+
+            if not password_ok:
                 # Increase failed attempts
-                self._increment_failed_attempts(user_data['user_id'])
+                self._increment_failed_attempts(user_data['user_id'], email, ip_address)
                 self._log_login_attempt(email, ip_address, user_agent, 'FAILED', 'Invalid password')
                 return False, {'error': 'Thông tin đăng nhập không chính xác'}
 
             # Successful authentication
             # Reset failed attempts
+            self.limiter.record_success(email, ip_address)
             self._reset_failed_attempts(user_data['user_id'])
 
+            # Hash cũ (SHA-256 salt tĩnh) hoặc chi phí KDF đã đổi: hash lại
+            if self.hasher.needs_rehash(password_hash):
+                self._rehash_password(user_data['user_id'], password)
+
             # Update last login
             self._update_last_login(user_data['user_id'])
 
@@ -170,26 +264,26 @@ class AuthenticationService:
             self._log_login_attempt(email, ip_address, user_agent, 'ERROR', str(e))
             return False, {'error': 'Có lỗi xảy ra trong quá trình đăng nhập'}
 
+    def _user_data(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'user_id': record.get('User ID'),
+            'email': record.get('Email'),
+            'password_hash': record.get('Password Hash'),
+            'full_name': record.get('Full Name'),
+            'role': record.get('Role'),
+            'department': record.get('Department'),
+            'status': record.get('Status'),
+            'failed_attempts': _to_int(record.get('Failed Attempts', 0)),
+            'locked_until': record.get('Locked Until', '')
+        }
+
     def _get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
-        """Lấy thông tin user theo email"""
+        """Lấy thông tin user theo email (tra chỉ mục trong bộ nhớ)"""
         try:
-            worksheet = self.sheets_service.spreadsheet.worksheet(self.users_sheet)
-            records = worksheet.get_all_records()
-
-            for record in records:
-                if record.get('Email', '').lower() == email.lower():
-                    return {
-                        'user_id': record.get('User ID'),
-                        'email': record.get('Email'),
-                        'password_hash': record.get('Password Hash'),
-                        'full_name': record.get('Full Name'),
-                        'role': record.get('Role'),
-                        'department': record.get('Department'),
-                        'status': record.get('Status'),
-                        'failed_attempts': int(record.get('Failed Attempts', 0)),
-                        'locked_until': record.get('Locked Until', '')
-                    }
-            return None
+            if not self.store:
+                return None
+            record = self.store.get_user_by_email(email)
+            return self._user_data(record) if record else None
 
         except Exception as e:
             self.logger.error(f"❌ Error getting user by email: {e}")
@@ -208,26 +302,18 @@ class AuthenticationService:
         except:
             return False
 
-    def _increment_failed_attempts(self, user_id: str):
-        """Tăng số lần đăng nhập thất bại"""
+    def _increment_failed_attempts(self, user_id: str, email: str, ip_address: str = ''):
+        """Tăng số lần đăng nhập thất bại (đếm trong bộ nhớ, chỉ ghi Sheets khi khóa)"""
         try:
-            worksheet = self.sheets_service.spreadsheet.worksheet(self.users_sheet)
-            records = worksheet.get_all_records()
-
-            for i, record in enumerate(records):
-                if record.get('User ID') == user_id:
-                    row_num = i + 2  # +2 vì header ở row 1 và index bắt đầu từ 0
-                    failed_attempts = int(record.get('Failed Attempts', 0)) + 1
-
-                    # Update failed attempts
-                    worksheet.update(f'J{row_num}:J{row_num}', [[str(failed_attempts)]])
-
-                    # Lock account if too many attempts
-                    if failed_attempts >= 5:
-                        lock_until = (datetime.now() + timedelta(minutes=15)).strftime('%Y-%m-%d %H:%M:%S')
-                        worksheet.update(f'K{row_num}:K{row_num}', [[lock_until]])
+            locked_until = self.limiter.record_failure(email, ip_address)
+            if locked_until is None or not self.store:
+                return
 
-                    break
+            # Lock account if too many attempts - ghi lên sheet để admin/process khác thấy
+            self.store.update_user(user_id, {
+                'Failed Attempts': str(self.limiter.rules['email']['limit']),
+                'Locked Until': datetime.fromtimestamp(locked_until).strftime('%Y-%m-%d %H:%M:%S')
+            })
 
         except Exception as e:
             self.logger.error(f"❌ Error incrementing failed attempts: {e}")
@@ -235,15 +321,10 @@ class AuthenticationService:
     def _reset_failed_attempts(self, user_id: str):
         """Reset số lần đăng nhập thất bại"""
         try:
-            worksheet = self.sheets_service.spreadsheet.worksheet(self.users_sheet)
-            records = worksheet.get_all_records()
-
-            for i, record in enumerate(records):
-                if record.get('User ID') == user_id:
-                    row_num = i + 2
-                    # Fix: Reset failed attempts and locked until
-                    worksheet.update(f'J{row_num}:K{row_num}', [['0', '']])
-                    break
+            record = self.store.get_user(user_id) if self.store else None
+            # Đã sạch thì không cần ghi
+            if record and (_to_int(record.get('Failed Attempts', 0)) or record.get('Locked Until')):
+                self.store.update_user(user_id, {'Failed Attempts': '0', 'Locked Until': ''})
 
         except Exception as e:
             self.logger.error(f"❌ Error resetting failed attempts: {e}")
@@ -251,42 +332,45 @@ class AuthenticationService:
     def _update_last_login(self, user_id: str):
         """Cập nhật thời gian đăng nhập cuối"""
         try:
-            worksheet = self.sheets_service.spreadsheet.worksheet(self.users_sheet)
-            records = worksheet.get_all_records()
-
-            for i, record in enumerate(records):
-                if record.get('User ID') == user_id:
-                    row_num = i + 2
-                    current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    # Fix: Use correct update format with list of lists
-                    worksheet.update(f'I{row_num}:I{row_num}', [[current_time]])
-                    break
+            if self.store:
+                current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                self.store.update_user(user_id, {'Last Login': current_time})
 
         except Exception as e:
             self.logger.error(f"❌ Error updating last login: {e}")
 
     def _create_session(self, user_data: Dict[str, Any], ip_address: str, user_agent: str) -> Dict[str, Any]:
-        """Tạo session cho user"""
+        """Tạo session cho user (session_id trả về là token ký, mang sẵn thông tin user)"""
         try:
             session_id = self._generate_session_id()
-            created = datetime.now()
-            expires = created + timedelta(hours=24)  # Session expires after 24 hours
-
-            # Save session to sheets
-            worksheet = self.sheets_service.spreadsheet.worksheet(self.sessions_sheet)
-            worksheet.append_row([
-                session_id,
-                user_data['user_id'],
-                user_data['email'],
-                created.strftime('%Y-%m-%d %H:%M:%S'),
-                expires.strftime('%Y-%m-%d %H:%M:%S'),
-                'ACTIVE',
-                ip_address,
-                user_agent
-            ])
+            issued = self.tokens.issue({
+                'sid': session_id,
+                'uid': user_data['user_id'],
+                'email': user_data['email'],
+                'name': user_data['full_name'],
+                'role': user_data['role'],
+                'dept': user_data['department']
+            })
+            created = datetime.fromtimestamp(issued['iat'])
+            expires = datetime.fromtimestamp(issued['exp'])  # Session expires after 24 hours
+
+            # Lưu session (bộ nhớ ngay, Sheets ở lần flush kế tiếp) - dùng cho audit và thu hồi
+            saved = self.store and self.store.add_session({
+                'Session ID': session_id,
+                'User ID': user_data['user_id'],
+                'Email': user_data['email'],
+                'Created': created.strftime('%Y-%m-%d %H:%M:%S'),
+                'Expires': expires.strftime('%Y-%m-%d %H:%M:%S'),
+                'Status': 'ACTIVE',
+                'IP Address': ip_address,
+                'User Agent': user_agent
+            })
+            if not saved:
+                return {}
 
             return {
-                'session_id': session_id,
+                'session_id': issued['token'],
+                'token': issued['token'],
                 'expires': expires.isoformat(),
                 'created': created.isoformat()
             }
@@ -295,76 +379,132 @@ class AuthenticationService:
             self.logger.error(f"❌ Error creating session: {e}")
             return {}
 
+    def _load_revoked_sessions(self) -> Dict[str, float]:
+        """{Session ID: hạn (epoch)} của các session đã logout/thu hồi và chưa hết hạn"""
+        # Chỉ đọc 3 cột cần dùng (header lấy từ cache, AuthStore cập nhật khi nạp sheet)
+        headers = self.sheets.headers(self.sessions_sheet, priority=PRIORITY_AUTH)
+        columns = [column_letter(headers.index(h) + 1) for h in ('Session ID', 'Status', 'Expires')]
+        response = self.scheduler.read(
+            self.sheets_service.spreadsheet.values_batch_get,
+            [a1_range(self.sessions_sheet, f'{col}2:{col}') for col in columns],
+            priority=PRIORITY_AUTH
+        )
+        session_ids, statuses, expires_values = (
+            [row[0] if row else '' for row in value_range.get('values', [])]
+            for value_range in response.get('valueRanges', [])
+        )
+
+        now = time.time()
+        revoked = {}
+        for session_id, status, expires_text in zip_longest(session_ids, statuses, expires_values, fillvalue=''):
+            if not session_id or status == 'ACTIVE':
+                continue
+            try:
+                expires = datetime.strptime(expires_text, '%Y-%m-%d %H:%M:%S').timestamp()
+            except ValueError:
+                continue
+            if expires > now:
+                revoked[session_id] = expires
+        return revoked
+
     def _log_login_attempt(self, email: str, ip_address: str, user_agent: str, status: str = 'ATTEMPT', error_message: str = ''):
         """Log login attempt"""
         try:
-            worksheet = self.sheets_service.spreadsheet.worksheet(self.login_logs_sheet)
             timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-            worksheet.append_row([
+            log_row = [
                 timestamp,
                 email,
                 status,
                 ip_address,
                 user_agent,
                 error_message
-            ])
+            ]
+            # Ghi buffer cục bộ, thread nền gửi lên Login_Logs theo lô
+            self.audit.record(log_row)
 
         except Exception as e:
             self.logger.error(f"❌ Error logging login attempt: {e}")
 
     def verify_session(self, session_id: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
-        """Xác minh session"""
+        """Xác minh session (token ký: chỉ kiểm tra chữ ký, hạn và danh sách thu hồi)"""
         try:
-            worksheet = self.sheets_service.spreadsheet.worksheet(self.sessions_sheet)
-            records = worksheet.get_all_records()
-
-            for record in records:
-                if (record.get('Session ID') == session_id and
-                    record.get('Status') == 'ACTIVE'):
-
-                    # Check if session expired
-                    expires = datetime.strptime(record.get('Expires'), '%Y-%m-%d %H:%M:%S')
-                    if datetime.now() > expires:
-                        return False, None
-
-                    # Get user data
-                    user_data = self._get_user_by_email(record.get('Email'))
-                    if user_data:
-                        return True, {
-                            'user': {
-                                'id': user_data['user_id'],
-                                'email': user_data['email'],
-                                'name': user_data['full_name'],
-                                'role': user_data['role'],
-                                'department': user_data['department']
-                            },
-                            'session': {
-                                'session_id': session_id,
-                                'expires': record.get('Expires')
-                            }
-                        }
-
-            return False, None
+            if looks_like_token(session_id):
+                return self._verify_token(session_id)
+            return self._verify_legacy_session(session_id)
 
         except Exception as e:
             self.logger.error(f"❌ Error verifying session: {e}")
             return False, None
 
-    def logout(self, session_id: str) -> bool:
-        """Đăng xuất - deactivate session"""
-        try:
-            worksheet = self.sheets_service.spreadsheet.worksheet(self.sessions_sheet)
-            records = worksheet.get_all_records()
+    def _verify_token(self, token: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        claims = self.tokens.decode(token)
+        if not claims or self.revocations.is_revoked(claims.get('sid', '')):
+            return False, None
 
-            for i, record in enumerate(records):
-                if record.get('Session ID') == session_id:
-                    row_num = i + 2
-                    # Fix: Use correct update format with list of lists
-                    worksheet.update(f'F{row_num}:F{row_num}', [['INACTIVE']])
-                    return True
+        return True, {
+            'user': {
+                'id': claims.get('uid'),
+                'email': claims.get('email'),
+                'name': claims.get('name'),
+                'role': claims.get('role'),
+                'department': claims.get('dept')
+            },
+            'session': {
+                'session_id': token,
+                'expires': datetime.fromtimestamp(claims['exp']).isoformat()
+            }
+        }
 
-            return False
+    def _verify_legacy_session(self, session_id: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """Session ID cũ (trước khi dùng token ký) - tra trong auth store"""
+        record = self.store.get_session(session_id) if self.store and session_id else None
+        if not record or record.get('Status') != 'ACTIVE':
+            return False, None
+
+        # Check if session expired
+        expires = datetime.strptime(record.get('Expires'), '%Y-%m-%d %H:%M:%S')
+        if datetime.now() > expires:
+            return False, None
+
+        # Get user data
+        user_record = self.store.get_user(record.get('User ID')) or \
+            self.store.get_user_by_email(record.get('Email'))
+        if not user_record:
+            return False, None
+
+        user_data = self._user_data(user_record)
+        return True, {
+            'user': {
+                'id': user_data['user_id'],
+                'email': user_data['email'],
+                'name': user_data['full_name'],
+                'role': user_data['role'],
+                'department': user_data['department']
+            },
+            'session': {
+                'session_id': session_id,
+                'expires': record.get('Expires')
+            }
+        }
+
+    def logout(self, session_id: str) -> bool:
+        """Đăng xuất - thu hồi token và deactivate session trên sheet"""
+        try:
+            if looks_like_token(session_id):
+                # Token đã hết hạn vẫn được logout (chỉ cần chữ ký hợp lệ)
+                claims = self.tokens.decode(session_id, verify_expiry=False)
+                if not claims:
+                    return False
+                session_id = claims['sid']
+                self.revocations.revoke(session_id, claims['exp'])
+                if self.store:
+                    self.store.update_session(session_id, {'Status': 'INACTIVE'})
+                return True
+
+            if not self.store or not session_id:
+                return False
+            return self.store.update_session(session_id, {'Status': 'INACTIVE'})
 
         except Exception as e:
             self.logger.error(f"❌ Error logging out: {e}")
@@ -373,6 +513,9 @@ class AuthenticationService:
     def add_user(self, email: str, password: str, full_name: str, role: str = 'user', department: str = '') -> bool:
         """Thêm user mới"""
         try:
+            if not self.store:
+                return False
+
             # Check if user already exists
             if self._get_user_by_email(email):
                 return False
@@ -380,21 +523,23 @@ class AuthenticationService:
             # Generate user ID
             user_id = f"user_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
 
-            # Add to worksheet
-            worksheet = self.sheets_service.spreadsheet.worksheet(self.users_sheet)
-            worksheet.append_row([
-                user_id,
-                email,
-                self._hash_password(password),
-                full_name,
-                role,
-                department,
-                'ACTIVE',
-                datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                '',
-                '0',
-                ''
-            ])
+            # Add to store (ghi Sheets ngay để user mới bền vững)
+            added = self.store.add_user({
+                'User ID': user_id,
+                'Email': email,
+                'Password Hash': self._hash_password(password),
+                'Full Name': full_name,
+                'Role': role,
+                'Department': department,
+                'Status': 'ACTIVE',
+                'Created Date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'Last Login': '',
+                'Failed Attempts': '0',
+                'Locked Until': ''
+            })
+            if not added:
+                return False
+            self.store.flush()
 
             self.logger.info(f"✅ Added new user: {email}")
             return True
@@ -5,11 +5,29 @@ ONE Automation System - Utilities và Monitoring
 """
 
 import os
+import sys
 import json
+import logging
 import pandas as pd
 from datetime import datetime, timedelta
 import glob
 
+# artifact_catalog/retention_manager nằm ở thư mục automation/ của repo
+# (_paths.py ở thư mục one_automation_system/, thêm vào cuối sys.path để không che module khác)
+_SYSTEM_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _SYSTEM_DIR not in sys.path:
+    sys.path.append(_SYSTEM_DIR)
+from _paths import ensure_automation_path
+
+AUTOMATION_MODULES_PATH = ensure_automation_path()
+
+try:
+    from artifact_catalog import ArtifactCatalog
+    from retention_manager import DEFAULT_POLICY, RetentionManager
+except ImportError as e:
+    RetentionManager = None
+    logging.warning(f"⚠️ Không import được retention_manager ({e}) - cleanup dùng quét thư mục theo ngày")
+
 class AutomationUtils:
     """Tiện ích hỗ trợ cho hệ thống tự động hóa"""
 
@@ -204,9 +222,38 @@ class AutomationUtils:
         html += "</ul>"
         return html
 
-    def cleanup_old_files(self, days=30):
-        """Dọn dẹp file cũ"""
+    def cleanup_old_files(self, days=30, dry_run=False):
+        """
+        Dọn dẹp file cũ quá `days` ngày theo catalog, fallback quét thư mục
+
+        Có retention_manager: file quá `days` ngày bị xóa (nguồn chưa gộp Parquet và
+        bản mới nhất mỗi loại được giữ); tầng nén của DEFAULT_POLICY chỉ áp dụng khi
+        ngắn hơn `days`; vượt hạn mức dung lượng thì xóa thêm file cũ nhất.
+        """
+        if not os.path.isdir(self.data_dir):
+            return {'removed_count': 0, 'files': [], 'dry_run': dry_run}
+
         try:
+            if RetentionManager is not None:
+                catalog = ArtifactCatalog(f"{self.data_dir}/catalog.db")
+                catalog.scan_directory(self.data_dir)
+                policy = {
+                    'tiers': {
+                        kind: {
+                            'delete_after_days': days,
+                            'compress_after_days': rules['compress_after_days']
+                            if rules.get('compress_after_days', days) < days else None,
+                        }
+                        for kind, rules in DEFAULT_POLICY['tiers'].items()
+                    },
+                    'logs_dir': self.logs_dir,
+                    'logs_delete_after_days': days,
+                }
+                report = RetentionManager(catalog, policy).run(dry_run=dry_run)
+                report['removed_count'] = len(report.get('deleted', []))
+                report['files'] = report.get('deleted', [])
+                return report
+
             cutoff_date = datetime.now() - timedelta(days=days)
             removed_files = []
 
@@ -216,15 +263,22 @@ class AutomationUtils:
                 for file_path in files:
                     file_time = datetime.fromtimestamp(os.path.getctime(file_path))
                     if file_time < cutoff_date:
-                        os.remove(file_path)
+                        if not dry_run:
+                            os.remove(file_path)
                         removed_files.append(file_path)
 
-            return {'removed_count': len(removed_files), 'files': removed_files}
+            return {'removed_count': len(removed_files), 'files': removed_files, 'dry_run': dry_run}
 
         except Exception as e:
             return {'error': f'Lỗi dọn dẹp: {e}'}
 
 
+CLEANUP_HELP = (
+    "  --cleanup [days] [--dry-run]: xóa file quá days ngày (mặc định 30); file có tầng nén "
+    "(3/7 ngày) ngắn hơn days được nén gzip trước; vượt hạn mức dung lượng thì xóa thêm file cũ nhất"
+)
+
+
 def main():
     """Hàm chính cho utilities"""
     import sys
@@ -244,14 +298,17 @@ def main():
             print(f"Dashboard tạo tại: {dashboard_file}")
 
         elif command == '--cleanup':
-            days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
-            result = utils.cleanup_old_files(days)
-            print(json.dumps(result, indent=2))
+            args = [arg for arg in sys.argv[2:] if arg != '--dry-run']
+            days = int(args[0]) if args else 30
+            result = utils.cleanup_old_files(days, dry_run='--dry-run' in sys.argv)
+            print(json.dumps(result, indent=2, ensure_ascii=False))
 
         else:
-            print("Lệnh không hợp lệ. Sử dụng: --performance [days] | --dashboard | --cleanup [days]")
+            print("Lệnh không hợp lệ. Sử dụng: --performance [days] | --dashboard | --cleanup [days] [--dry-run]")
+            print(CLEANUP_HELP)
     else:
         print("Sử dụng: python utils.py [--performance|--dashboard|--cleanup] [options]")
+        print(CLEANUP_HELP)
 
 
 if __name__ == "__main__":